@@ -26,6 +26,7 @@ foreach ($json in (Get-ChildItem -Path $root -Filter '*.json' -File)) {
 }
 
 # Build as --onefile so the exe is fully self-contained (no DLL sync issues)
+# pyvisa / matplotlib are imported lazily (utils/startup.py), so list them explicitly
 & $py -m PyInstaller `
     --name $appName `
     --windowed `
@@ -36,6 +37,8 @@ foreach ($json in (Get-ChildItem -Path $root -Filter '*.json' -File)) {
     --collect-all setuptools `
     --collect-all pkg_resources `
     --collect-submodules jaraco `
+    --hidden-import pyvisa `
+    --hidden-import matplotlib.backends.backend_tkagg `
     $datas `
     --distpath $localDist `
     --workpath $localWork `
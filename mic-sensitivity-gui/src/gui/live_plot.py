@@ -0,0 +1,333 @@
+"""Blitting renderer for the live sweep plot.
+
+A full `canvas.draw()` re-renders the log axes, tick labels and grid, which is
+what made every live-plot tick stall the UI. `LivePlotRenderer` marks the trace
+line as animated, caches the static background after each full draw and, on
+updates, only restores that background, draws the line and blits the axes
+area. A full redraw happens only when the caller reports that the axis limits
+(or the Y label) changed, or when the window was resized.
+
+Traces with more points than the axes is wide in pixels are reduced with a
+min/max-per-pixel-bin decimation, so peaks and dips stay visible.
+
+`LiveViewManager` hosts all live traces in one "Live Sweep" window, as
+notebook tabs or as overlaid lines, and closes the least recently used view
+once a configurable cap is reached, so a long sequence no longer leaves one
+Toplevel + Figure per preset behind.
+
+Usage:
+
+    renderer = LivePlotRenderer(canvas, ax, line, log_x=True)
+    changed = self._apply_fixed_freq_and_auto_level(ax, x, y)
+    renderer.update(x, y, ylabel="Level (dBV)", full_redraw=changed)
+
+    views = LiveViewManager(self.master, max_views=8, mode="tabs")
+    view = views.view("FOG_1kHz", "Level (dBV)", force_new=True)
+    view.renderer.update(x, y)
+"""
+from __future__ import annotations
+
+import time
+from typing import List, Optional
+
+import numpy as np
+
+# Default cap on live views kept open (figures in tabs mode, lines in overlay mode)
+DEFAULT_MAX_VIEWS = 8
+
+
+def decimate_minmax(x, y, max_bins: int, *, log_x: bool = False):
+    """Reduce (x, y) to the min and max point of each of *max_bins* equal-width x bins.
+
+    Bins are equal in log10(x) when *log_x* is set (log frequency axis). The
+    first and last points are always kept and the original x order is preserved.
+    Returns the input as arrays unchanged when it already fits.
+    """
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    n = min(len(x), len(y))
+    x, y = x[:n], y[:n]
+    if max_bins <= 0 or n <= 2 * max_bins:
+        return x, y
+    if np.any(np.diff(x) < 0):
+        order = np.argsort(x, kind='stable')
+        x, y = x[order], y[order]
+    u = np.log10(x) if log_x and x[0] > 0 else x
+    if not np.isfinite(u[0]) or not np.isfinite(u[-1]) or u[-1] <= u[0]:
+        return x, y
+    edges = np.linspace(u[0], u[-1], max_bins + 1)[:-1]
+    starts = np.unique(np.searchsorted(u, edges, side='left'))
+    seg = np.repeat(np.arange(len(starts)), np.diff(np.append(starts, n)))
+    # lexsort groups by segment; within each segment the first index is the min (resp. max)
+    i_min = np.lexsort((y, seg))[starts]
+    i_max = np.lexsort((-y, seg))[starts]
+    keep = np.unique(np.concatenate(([0, n - 1], i_min, i_max)))
+    return x[keep], y[keep]
+
+
+class LivePlotRenderer:
+    """Blit one line artist over a cached axes background."""
+
+    def __init__(self, canvas, ax, line, *, log_x: bool = True):
+        self.canvas = canvas
+        self.ax = ax
+        self.line = line
+        self.log_x = log_x
+        # Full-resolution data of the last update (the line holds the decimated copy)
+        self.x = np.empty(0)
+        self.y = np.empty(0)
+        self._background = None
+        self._ylabel = ax.get_ylabel()
+        self._size = None
+        line.set_animated(True)
+        self._cid = canvas.mpl_connect('draw_event', self._on_draw)
+
+    def _on_draw(self, event=None):
+        """Full draw finished: cache the background and paint the animated line on top."""
+        try:
+            self._background = self.canvas.copy_from_bbox(self.ax.bbox)
+            self._size = self.canvas.get_width_height()
+            self.ax.draw_artist(self.line)
+        except Exception:
+            self._background = None
+
+    def _pixel_width(self) -> int:
+        try:
+            return max(int(self.ax.bbox.width), 1)
+        except Exception:
+            return 0
+
+    def update(self, x, y, *, ylabel: str | None = None, full_redraw: bool = False) -> None:
+        """Show (x, y); redraw axes only when *full_redraw* or the label/canvas size changed."""
+        self.x = np.asarray(x, dtype=float)
+        self.y = np.asarray(y, dtype=float)
+        xd, yd = decimate_minmax(self.x, self.y, self._pixel_width(), log_x=self.log_x)
+        self.line.set_data(xd, yd)
+        if ylabel is not None and ylabel != self._ylabel:
+            self.ax.set_ylabel(ylabel)
+            self._ylabel = ylabel
+            full_redraw = True
+        self.refresh(full=full_redraw)
+
+    def refresh(self, *, full: bool = False) -> None:
+        """Re-blit the current line, or do a full draw (which re-caches the background)."""
+        try:
+            size = self.canvas.get_width_height()
+        except Exception:
+            size = None
+        if full or self._background is None or size != self._size:
+            self._background = None  # blit again only after the new background is cached
+            self.canvas.draw_idle()  # _on_draw caches the new background and paints the line
+            return
+        self.canvas.restore_region(self._background)
+        self.ax.draw_artist(self.line)
+        self.canvas.blit(self.ax.bbox)
+
+    def disconnect(self) -> None:
+        try:
+            self.canvas.mpl_disconnect(self._cid)
+        except Exception:
+            pass
+
+
+class LiveView:
+    """One trace slot of the live window: a notebook tab (tabs mode) or a line (overlay mode)."""
+
+    __slots__ = ("title", "frame", "fig", "ax", "canvas", "line", "renderer", "last_used")
+
+    def __init__(self, title, frame, fig, ax, canvas, line, renderer):
+        self.title = title
+        self.frame = frame
+        self.fig = fig
+        self.ax = ax
+        self.canvas = canvas
+        self.line = line
+        self.renderer = renderer
+        self.last_used = time.monotonic()
+
+
+class LiveViewManager:
+    """Single "Live Sweep" window hosting up to *max_views* traces.
+
+    mode "tabs": each view is a notebook tab with its own small figure.
+    mode "overlay": all views are lines in one figure; earlier traces stay
+    visible (dimmed) behind the one being updated.
+
+    When a new view would exceed *max_views*, the least recently used one
+    (by creation / tab selection) is closed and its figure released.
+    *on_closed* is called when the user closes the window.
+    """
+
+    def __init__(self, master, *, max_views: int = DEFAULT_MAX_VIEWS, mode: str = "tabs",
+                 title: str = "Live Sweep", geometry: str = "700x450", on_closed=None):
+        if mode not in ("tabs", "overlay"):
+            raise ValueError(f"Unknown live view mode: {mode!r}")
+        self.master = master
+        self.max_views = max(1, int(max_views))
+        self.mode = mode
+        self.title = title
+        self.geometry = geometry
+        self.on_closed = on_closed
+        self.views: List[LiveView] = []
+        self.current: Optional[LiveView] = None
+        self._win = None
+        self._notebook = None
+        self._open = False  # plain flag so worker threads never call into Tk
+
+    # ---------------- window -----------------
+    def is_open(self) -> bool:
+        return self._open
+
+    @property
+    def window(self):
+        return self._win if self._open else None
+
+    def _ensure_window(self) -> None:
+        if self._open:
+            return
+        from tkinter import Toplevel, ttk
+        win = Toplevel(self.master)
+        win.title(self.title)
+        win.geometry(self.geometry)
+        win.protocol("WM_DELETE_WINDOW", self.close)
+        self._win = win
+        if self.mode == "tabs":
+            self._notebook = ttk.Notebook(win)
+            self._notebook.pack(fill='both', expand=True)
+            self._notebook.bind('<<NotebookTabChanged>>', self._on_tab_changed, add='+')
+        self._open = True
+
+    def close(self) -> None:
+        """Close the window and release every figure."""
+        views, self.views = self.views, []
+        for view in views:
+            self._release(view)
+        self.current = None
+        self._notebook = None
+        win, self._win = self._win, None
+        was_open, self._open = self._open, False
+        try:
+            if win is not None:
+                win.destroy()
+        except Exception:
+            pass
+        if was_open and self.on_closed is not None:
+            self.on_closed()
+
+    # ---------------- views -----------------
+    def new_view(self, title: str, ylabel: str) -> LiveView:
+        """Add a view for the next trace (evicting the least recently used one if full)."""
+        self._ensure_window()
+        while len(self.views) >= self.max_views:
+            self.evict(min(self.views, key=lambda v: v.last_used))
+        if self.mode == "tabs" or self.current is None:
+            view = self._new_figure_view(title, ylabel)
+        else:
+            view = self._new_overlay_view(title, ylabel)
+        self.views.append(view)
+        self.current = view
+        return view
+
+    def view(self, title: str, ylabel: str, *, force_new: bool = False) -> LiveView:
+        """Current view, or a new one when *force_new* or none is open."""
+        if force_new or not self._open or self.current is None:
+            return self.new_view(title, ylabel)
+        self.current.last_used = time.monotonic()
+        return self.current
+
+    def _new_figure_view(self, title: str, ylabel: str) -> LiveView:
+        from tkinter import Frame
+        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+        from matplotlib.figure import Figure
+        parent = self._win
+        if self._notebook is not None:
+            parent = Frame(self._notebook)
+            self._notebook.add(parent, text=title)
+            self._notebook.select(parent)
+        fig = Figure(figsize=(7, 4.2), dpi=100)
+        ax = fig.add_subplot(111)
+        ax.set_xscale('log')
+        ax.set_xlabel('Frequency (Hz)')
+        ax.set_ylabel(ylabel)
+        ax.set_title(title)
+        ax.grid(True, which='both', ls='--', linewidth=0.5)
+        try:
+            ax.set_xlim(100, 12000)
+        except Exception:
+            pass
+        fig.tight_layout()
+        canvas = FigureCanvasTkAgg(fig, master=parent)
+        canvas.draw()
+        canvas.get_tk_widget().pack(fill='both', expand=True)
+        (line,) = ax.semilogx([], [], color='C0', label=title)
+        renderer = LivePlotRenderer(canvas, ax, line)
+        frame = parent if self._notebook is not None else None
+        return LiveView(title, frame, fig, ax, canvas, line, renderer)
+
+    def _new_overlay_view(self, title: str, ylabel: str) -> LiveView:
+        prev = self.current
+        # Freeze the previous trace into the cached background, dimmed
+        prev.renderer.disconnect()
+        prev.line.set_animated(False)
+        prev.line.set_alpha(0.45)
+        ax, canvas = prev.ax, prev.canvas
+        ax.set_title(title)
+        color = f"C{len(self.views) % 10}"
+        (line,) = ax.semilogx([], [], color=color, label=title)
+        renderer = LivePlotRenderer(canvas, ax, line)
+        try:
+            ax.legend(loc='best', fontsize='small')
+        except Exception:
+            pass
+        renderer.refresh(full=True)
+        return LiveView(title, None, prev.fig, ax, canvas, line, renderer)
+
+    def evict(self, view: LiveView) -> None:
+        """Close *view* and release its figure (tab) or line (overlay)."""
+        if view not in self.views:
+            return
+        self.views.remove(view)
+        if view is self.current:
+            self.current = self.views[-1] if self.views else None
+        self._release(view)
+
+    def _release(self, view: LiveView) -> None:
+        try:
+            view.renderer.disconnect()
+        except Exception:
+            pass
+        shared = any(v.fig is view.fig for v in self.views)
+        if shared:
+            # Overlay line: remove it and redraw the remaining ones
+            try:
+                view.line.remove()
+                if view.ax.get_legend() is not None:
+                    view.ax.legend(loc='best', fontsize='small')
+                view.canvas.draw_idle()
+            except Exception:
+                pass
+            return
+        try:
+            view.canvas.get_tk_widget().destroy()
+        except Exception:
+            pass
+        try:
+            if view.frame is not None:
+                view.frame.destroy()
+        except Exception:
+            pass
+        try:
+            view.fig.clear()
+        except Exception:
+            pass
+        view.renderer = view.line = view.canvas = view.fig = view.ax = None
+
+    def _on_tab_changed(self, event=None) -> None:
+        try:
+            selected = self._notebook.select()
+        except Exception:
+            return
+        for view in self.views:
+            if view.frame is not None and str(view.frame) == str(selected):
+                view.last_used = time.monotonic()
+                break
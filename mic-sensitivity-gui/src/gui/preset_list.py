@@ -0,0 +1,144 @@
+"""Virtualized checkbox list for the measurement preset selector.
+
+Only as many row widgets as fit in the visible area are created; scrolling
+re-binds those rows (text, detail label, BooleanVar) to the items at the new
+offset instead of creating one Frame + Checkbutton per preset. Hundreds of
+presets therefore cost hundreds of BooleanVars, not hundreds of widgets.
+
+The list exposes `yview` / `yview_scroll` like a Canvas, so it plugs into the
+window's global mouse-wheel routing (`_activate_scroll`).
+
+Usage:
+
+    lst = VirtualCheckList(parent, height=270, width=240, zebra=self._zebra_color)
+    lst.set_items([(path, path.stem, var, info.summary()) for ...])
+    lst.see(path)
+"""
+from __future__ import annotations
+
+from tkinter import Frame, Label, Scrollbar, ttk
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+# (key, text, variable, detail)
+Item = Tuple[Any, str, Any, str]
+
+
+class VirtualCheckList(Frame):
+    """Scrollable checkbox list that only instantiates the visible rows."""
+
+    def __init__(self, parent, *, height: int = 270, width: int = 240, row_height: int = 34,
+                 zebra: Optional[Callable[[int], str]] = None, hover_bg: str = "#e2e6ea",
+                 check_style: str = "Preset.TCheckbutton", **kw):
+        super().__init__(parent, highlightthickness=1, highlightbackground="#d0d3d6", **kw)
+        self.row_height = row_height
+        self.visible_rows = max(1, height // row_height)
+        self._zebra = zebra or (lambda i: "#ffffff")
+        self._hover_bg = hover_bg
+        self._check_style = check_style
+        self._items: List[Item] = []
+        self._top = 0
+
+        self.body = Frame(self, bg="#ffffff", width=width, height=height)
+        self.body.pack_propagate(False)
+        self.body.pack(side="left", fill="both", expand=False)
+        self.scrollbar = Scrollbar(self, orient="vertical", command=self.yview)
+        self.scrollbar.pack(side="left", fill="y")
+        self._message = Label(self.body, text="", bg="#ffffff", anchor="w")
+        self._rows: List[Tuple[Frame, ttk.Checkbutton, Label]] = []
+        for _ in range(self.visible_rows):
+            self._rows.append(self._make_row())
+
+    def _make_row(self):
+        row = Frame(self.body, bg="#ffffff", height=self.row_height)
+        cb = ttk.Checkbutton(row, text="", style=self._check_style)
+        cb.pack(anchor="w", padx=4, pady=(2, 0))
+        detail = Label(row, text="", font=("Segoe UI", 7), fg="#666", bg="#ffffff", anchor="w")
+        detail.pack(anchor="w", padx=(24, 4))
+        row._zebra_bg = "#ffffff"
+        row.bind('<Enter>', lambda e, r=row: self._set_row_bg(r, self._hover_bg))
+        row.bind('<Leave>', lambda e, r=row: self._set_row_bg(r, r._zebra_bg))
+        return row, cb, detail
+
+    @staticmethod
+    def _set_row_bg(row, bg):
+        try:
+            row.configure(bg=bg)
+            for child in row.winfo_children():
+                if isinstance(child, Label):
+                    child.configure(bg=bg)
+        except Exception:
+            pass
+
+    # ---------------- content -----------------
+    def set_items(self, items: Sequence[Item]) -> None:
+        self._items = list(items)
+        self._top = 0
+        self._message.pack_forget()
+        self._render()
+
+    def set_message(self, text: str) -> None:
+        """Show *text* instead of rows (e.g. 'Scanning...' / 'No preset JSON files found.')."""
+        self._items = []
+        self._top = 0
+        self._render()
+        self._message.configure(text=text)
+        self._message.pack(anchor="w", padx=4, pady=4)
+
+    def keys(self) -> List[Any]:
+        return [item[0] for item in self._items]
+
+    def _render(self) -> None:
+        n = len(self._items)
+        for i, (row, cb, detail) in enumerate(self._rows):
+            idx = self._top + i
+            if idx < n:
+                _key, text, var, info = self._items[idx]
+                cb.configure(text=text, variable=var)
+                detail.configure(text=info or "")
+                row._zebra_bg = self._zebra(idx)
+                self._set_row_bg(row, row._zebra_bg)
+                if not row.winfo_ismapped():
+                    row.pack(fill="x")
+            else:
+                row.pack_forget()
+        if n <= self.visible_rows:
+            self.scrollbar.set(0.0, 1.0)
+        else:
+            self.scrollbar.set(self._top / n, min(1.0, (self._top + self.visible_rows) / n))
+
+    # ---------------- scrolling (Canvas-compatible) -----------------
+    def _max_top(self) -> int:
+        return max(0, len(self._items) - self.visible_rows)
+
+    def _scroll_to(self, top: int) -> None:
+        top = min(max(0, int(top)), self._max_top())
+        if top != self._top:
+            self._top = top
+            self._render()
+
+    def yview(self, *args):
+        if not args:
+            n = max(len(self._items), 1)
+            return self._top / n, min(1.0, (self._top + self.visible_rows) / n)
+        if args[0] == 'moveto':
+            self._scroll_to(round(float(args[1]) * len(self._items)))
+        elif args[0] == 'scroll':
+            self.yview_scroll(int(args[1]), args[2])
+        return None
+
+    def yview_scroll(self, number: int, what: str = 'units') -> None:
+        step = self.visible_rows if what.startswith('page') else 1
+        self._scroll_to(self._top + int(number) * step)
+
+    def yview_moveto(self, fraction: float) -> None:
+        self.yview('moveto', fraction)
+
+    def see(self, key) -> None:
+        """Scroll so the item with *key* is visible."""
+        for idx, item in enumerate(self._items):
+            if item[0] == key:
+                if idx < self._top:
+                    self._scroll_to(idx)
+                elif idx >= self._top + self.visible_rows:
+                    self._scroll_to(idx - self.visible_rows + 1)
+                return
@@ -0,0 +1,159 @@
+"""Sequence stages for the main window (upv.sequence_engine actions).
+
+Instrument work (apply, trace read-back) runs on BackgroundJobs that hold the
+window's VISA lock; their completion resumes the engine on the Tk thread, so
+each stage starts the moment the previous one finished instead of after a
+fixed `after()` delay. The sweep stage waits for the acquisition thread's
+*ESR? end-of-sweep detection (`MainWindow._on_single_sweep_complete`).
+
+The first preset of a run (also of a resumed run) waits in ARM until the
+user presses Start Sweep; later presets start automatically. The combined export goes to the path chosen
+when the sequence was started (no dialog at the end); the export stage completes when the
+export worker has written it.
+
+In a batch (upv.batch) one instance serves every DUT: `begin_dut()` points it
+at the next serial and export file. Within a DUT presets are applied
+differentially against the preset the UPV was left in; the first preset of
+each DUT is applied in full, since the operator may have touched the UPV while
+swapping devices, and `forget_applied()` drops the reference whenever the
+window reconfigures the UPV itself.
+
+Usage:
+
+    engine = SequenceEngine(WindowSequenceActions(self, export_path))
+    engine.subscribe(self._on_sequence_event)
+    engine.start(ordered_paths)
+"""
+from __future__ import annotations
+
+from upv.background import BackgroundJob, JobCancelled, tk_dispatcher
+from upv.batch import tag_trace
+from upv.preset_optimizer import SETTLE_LABELS, switch_cost_model
+from upv.sequence_engine import PENDING, SequenceActions
+from upv.upv_auto_config import apply_grouped_settings, fetch_trace
+
+
+class WindowSequenceActions(SequenceActions):
+    """Runs the sequence stages against a MainWindow."""
+
+    def __init__(self, window, export_path, *, manual_first_start: bool = True, dut=None,
+                 differential: bool = False):
+        self.window = window
+        self.export_path = export_path
+        self.manual_first_start = manual_first_start
+        self.dut = dut
+        self.differential = differential
+        self.costs = switch_cost_model()
+        self._previous = None  # settings of the preset applied before (switching-cost learning)
+        self._applied = None  # CompiledPreset the UPV is configured with (None: unknown)
+        self._job = None
+        self._armed = False  # a sweep of this run has been started
+
+    def begin_dut(self, dut, export_path):
+        """Measure the next DUT of a batch: new serial and export file, wait for Start Sweep again."""
+        self.dut = dut
+        self.export_path = export_path
+        self._armed = False
+        self._applied = None
+
+    def forget_applied(self):
+        """The UPV was configured outside the sequence: the next apply sends the full preset."""
+        self._applied = None
+
+    def _engine(self):
+        return self.window._sequence
+
+    def _run_job(self, work, name, on_done=None):
+        """Start *work* as a BackgroundJob that resumes the engine with its result or error."""
+        engine = self._engine()
+
+        def done(result):
+            self._job = None
+            if on_done is not None:
+                on_done(result)
+            engine.resume(result)
+
+        def failed(exc):
+            self._job = None
+            engine.resume(error=exc)
+
+        self._job = BackgroundJob(work, name=name, dispatch=tk_dispatcher(self.window),
+                                  on_done=done, on_error=failed)
+        self._job.start()
+        return PENDING
+
+    # ---------------- stages -----------------
+    def apply(self, step):
+        w = self.window
+        upv = w.upv
+        if upv is None:
+            raise RuntimeError("UPV is not connected")
+        stop_job = w._stop_job
+        w._settings_applied = False
+        w._refresh_start_sweep_state()
+
+        def log(msg):
+            print(msg)
+            if "❌" in msg:
+                w._thread_safe_status(msg.strip(), color="red")
+
+        preset = step.preset.delta(self._applied) if self.differential else step.preset
+        self._applied = None
+
+        def work(job):
+            if stop_job is not None:
+                stop_job.wait(timeout=10.0)
+            result = apply_grouped_settings(upv, data=preset, status_callback=log,
+                                            cancel_event=job.cancel_event, lock=w._visa_lock,
+                                            settle_labels=SETTLE_LABELS)
+            if result.cancelled:
+                raise JobCancelled()
+            return result
+
+        def applied(result):
+            if not result.errors:
+                self._applied = step.preset
+            self.costs.observe(self._previous, step.data, result.timings)
+            self._previous = step.data
+            w._show_sequence_preset(step)
+
+        return self._run_job(work, f"SequenceApply {step.name}", on_done=applied)
+
+    def arm(self, step):
+        w = self.window
+        if not self._armed and self.manual_first_start:
+            self._armed = True
+            w.update_status(f"Applied {step.name}. Press 'Start Sweep' to begin.")
+            return PENDING
+        self._armed = True
+        w.update_status(f"Applied {step.name}. Starting sweep...")
+        w.start_sweep()
+        if not (w._single_sweep_in_progress or w._continuous_active):
+            raise RuntimeError("sweep did not start")
+        return None
+
+    def sweep(self, step):
+        # Resumed by MainWindow._on_single_sweep_complete
+        return PENDING
+
+    def collect(self, step):
+        w = self.window
+        unit = w._resolve_y_unit_from_settings() or 'dBV'
+
+        def work(job):
+            x_vals, y_vals = fetch_trace(w.upv, query=lambda cmd: w._safe_query(cmd, timeout_ms=3000))
+            return tag_trace({'name': step.name, 'x': x_vals, 'y': y_vals, 'unit': unit}, self.dut)
+
+        return self._run_job(work, f"SequenceCollect {step.name}")
+
+    def export(self, steps):
+        # Resumed once the file is written, so the journal only finishes on a real export
+        engine = self._engine()
+        self.window._export_combined_sequence_hxml(
+            [s.trace for s in steps], self.export_path, dut=self.dut,
+            on_written=lambda path: engine.resume(path), on_failed=lambda exc: engine.resume(error=exc))
+        return PENDING
+
+    def cancel(self):
+        if self._job is not None:
+            self._job.cancel()
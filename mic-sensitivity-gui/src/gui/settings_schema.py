@@ -0,0 +1,393 @@
+"""Declarative schema of the four settings panels.
+
+One `Field` per (section, label) describes how the row is shown and stored:
+the widget kind, the code <-> display option map, the unit family of
+value+unit rows, the SCPI header it is sent to (upv_auto_config.command_groups)
+and the visibility group whose rules may hide the row.
+
+Option maps are compiled once at import (`OptionMap`), so building, reading
+back (Apply Settings) and refreshing the panels is a dict lookup per field
+instead of an if/elif chain that rebuilt reversed dicts on every apply.
+Adding a field means one `Field(...)` line here.
+
+Labels without a field are plain Entry rows stored verbatim.
+
+Usage:
+
+    from gui.settings_schema import field_for, read_widget, write_widget
+
+    field = field_for("Analyzer Function", "Meas Time")
+    combo.set(field.options.to_display("GENT"))
+    settings[section][label] = read_widget(field, widget)
+"""
+from __future__ import annotations
+
+import re
+from typing import Dict, List, Mapping, Optional, Tuple
+
+from gui.display_map import (
+    BANDWIDTH_ANALYZER_CONFIG_OPTIONS,
+    BANDWIDTH_ANALYZER_OPTIONS,
+    BANDWIDTH_GENERATOR_OPTIONS,
+    CH1_COMMON_OPTIONS,
+    CH1_COUPLING_OPTIONS,
+    CH1_IMPEDANCE_OPTIONS,
+    CH1_INPUT_OPTIONS,
+    CH1_RANGE_OPTIONS,
+    CHANNEL_ANALYZER_OPTIONS,
+    CHANNEL_GENERATOR_OPTIONS,
+    COMMON_OPTIONS,
+    FILTER1_OPTIONS,
+    FILTER2_OPTIONS,
+    FILTER3_OPTIONS,
+    FILTER_OPTIONS,
+    FNCT_SETTLING_OPTIONS,
+    FREQ_MODE_OPTIONS,
+    FREQ_OPTIONS,
+    FUNCTION_ANALYZER_OPTIONS,
+    FUNCTION_GENERATOR_OPTIONS,
+    HALT_OPTIONS,
+    IMPEDANCE_OPTIONS_BAL,
+    INPUT_MONITOR_OPTIONS,
+    INSTRUMENT_ANALYZER_OPTIONS,
+    INSTRUMENT_GENERATOR_OPTIONS,
+    LEVEL_MONITOR_OPTIONS,
+    MAX_FFT_SIZE_OPTIONS,
+    MEAS_TIME_OPTIONS,
+    NEXT_STEP_OPTIONS,
+    NOTCH_OPTIONS,
+    OUTPUT_TYPE_OPTIONS,
+    PRE_FILTER_OPTIONS,
+    SECOND_MONITOR_OPTIONS,
+    SPACING_OPTIONS,
+    START_COND_OPTIONS,
+    SWEEP_CTRL_OPTIONS,
+    VOLT_RANGE_OPTIONS,
+    X_AXIS_OPTIONS,
+    Z_AXIS_OPTIONS,
+)
+from upv.units import (
+    FREQUENCY_SCALE,
+    FREQUENCY_UNIT_OPTIONS,
+    IMPEDANCE_SCALE,
+    RESOLUTION_UNIT_OPTIONS,
+    TIME_SCALE,
+    TIME_UNIT_CODES,
+    TIME_UNIT_DISPLAY,
+    VOLTAGE_UNIT_OPTIONS,
+    VOLTAGE_UNIT_OPTIONS_DBR,
+)
+
+try:
+    from upv.upv_auto_config import command_groups
+except Exception:  # SCPI headers are informational here
+    command_groups = {}
+
+# Widget kinds
+COMBO = "combo"            # readonly Combobox over an option map
+RADIO = "radio"            # Radiobuttons over an option map (StringVar holds the code)
+SWITCH = "switch"          # Checkbutton with a StringVar holding "ON"/"OFF"
+CHECK = "check"            # Checkbutton with a BooleanVar, stored as "ON"/"OFF"
+VALUE_UNIT = "value_unit"  # Entry + unit Combobox, stored as "<number> <unit code>"
+FACTOR = "factor"          # Entry holding a bare number (trailing text dropped)
+IMPEDANCE = "impedance"    # Entry (Unbal) or Combobox (Bal), follows Output Type
+ENTRY = "entry"            # plain Entry, stored verbatim
+
+# Visibility groups
+SWEEP = "sweep"              # hidden/shown by Sweep Ctrl (_update_sweep_ctrl_visibility)
+ANALYZER = "analyzer"        # hidden/shown by Function Analyzer / Freq Mode
+SN_SEQUENCE = "sn_sequence"  # S/N Sequence row (only for some analyzer functions)
+
+# Unit spellings found in settings files -> unit combobox option
+UNIT_ALIASES = {"us": "μs", "ohm": "Ω", "kohm": "kΩ", "uv": "μV", "μv": "uV"}
+VALUE_UNIT_RE = re.compile(r"^\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*(.*?)\s*$")
+
+
+def _fold(text) -> str:
+    return str(text).replace(" ", "").lower()
+
+
+class OptionMap:
+    """Code <-> display lookups for one option dict, built once.
+
+    strict: unknown codes / displays map to the first option instead of
+    passing through unchanged.
+    """
+
+    __slots__ = ("codes", "displays", "_to_display", "_to_code", "_folded", "strict")
+
+    def __init__(self, mapping: Mapping[str, str], *, strict: bool = False):
+        self.codes: List[str] = list(mapping.keys())
+        self.displays: List[str] = list(mapping.values())
+        self._to_display: Dict[str, str] = dict(mapping)
+        self._to_code: Dict[str, str] = {v: k for k, v in mapping.items()}
+        self._folded: Dict[str, str] = {_fold(v): k for k, v in mapping.items()}
+        self.strict = strict
+
+    def __contains__(self, code) -> bool:
+        return code in self._to_display
+
+    def to_display(self, code) -> str:
+        display = self._to_display.get(code)
+        if display is not None:
+            return display
+        return self.displays[0] if self.strict and self.displays else code
+
+    def to_code(self, display, default: Optional[str] = None) -> str:
+        code = self._to_code.get(display)
+        if code is None:
+            code = self._folded.get(_fold(display))
+        if code is not None:
+            return code
+        if default is not None:
+            return default
+        return self.codes[0] if self.strict and self.codes else display
+
+
+class UnitFamily:
+    """Unit options of a value+unit row and how a displayed unit is written back."""
+
+    __slots__ = ("name", "options", "codes", "scale", "converter", "width", "_lowered")
+
+    def __init__(self, name: str, options, *, codes: Optional[Mapping[str, str]] = None,
+                 scale: Optional[Mapping[str, float]] = None, converter: Optional[str] = None, width: int = 6):
+        self.name = name
+        self.options: List[str] = list(options)
+        self.codes = dict(codes or {})
+        # Unit conversion on combo change: a scale table, or a named converter the window provides
+        self.scale = scale
+        self.converter = converter
+        self.width = width
+        self._lowered = {opt.lower(): opt for opt in self.options}
+
+    def split(self, value) -> Tuple[str, str]:
+        """'<number> <unit>' -> (number text, matching unit option); unknown units -> first option."""
+        match = VALUE_UNIT_RE.match(str(value))
+        if not match:
+            return str(value), self.options[0]
+        number, raw_unit = match.group(1), match.group(2)
+        if not raw_unit:
+            return number, self.options[0]
+        unit = self._lowered.get(raw_unit.lower())
+        if unit is None:
+            alias = UNIT_ALIASES.get(raw_unit.lower())
+            unit = alias if alias in self.options else self.options[0]
+        return number, unit
+
+    def unit_code(self, unit: str) -> str:
+        """Displayed unit -> the spelling stored in settings.json (e.g. μV -> uV, Ω -> ohm)."""
+        unit = self._lowered.get(unit.lower(), unit)
+        return self.codes.get(unit, unit)
+
+    def join(self, number: str, unit: str) -> str:
+        number = number.strip()
+        return f"{number} {self.unit_code(unit.strip())}" if number else ""
+
+
+UNIT_FAMILIES: Dict[str, UnitFamily] = {u.name: u for u in (
+    UnitFamily("voltage", VOLTAGE_UNIT_OPTIONS, codes={"μV": "uV"}, converter="level"),
+    UnitFamily("voltage_dbr", VOLTAGE_UNIT_OPTIONS_DBR, codes={"μV": "uV"}, converter="level_ref"),
+    UnitFamily("frequency", FREQUENCY_UNIT_OPTIONS, scale=FREQUENCY_SCALE),
+    UnitFamily("impedance", ["Ω", "kΩ"], codes={"Ω": "ohm", "kΩ": "kohm"}, scale=IMPEDANCE_SCALE),
+    UnitFamily("time", TIME_UNIT_DISPLAY.values(), codes=TIME_UNIT_CODES, scale=TIME_SCALE),
+    UnitFamily("tolerance", ["%", "dB"], converter="tolerance", width=5),
+    UnitFamily("resolution", RESOLUTION_UNIT_OPTIONS, converter="level"),
+)}
+
+_option_maps: Dict[Tuple[int, bool], OptionMap] = {}
+
+
+def _options(mapping, *, strict: bool = False) -> OptionMap:
+    """One compiled OptionMap per option dict (several fields share SWEEP_CTRL_OPTIONS)."""
+    key = (id(mapping), strict)
+    if key not in _option_maps:
+        _option_maps[key] = OptionMap(mapping, strict=strict)
+    return _option_maps[key]
+
+
+class Field:
+    """One settings row: widget kind, option map / unit family, SCPI header and visibility group."""
+
+    __slots__ = ("section", "label", "kind", "options", "units", "default", "visibility",
+                 "width", "store_attr", "on_change", "scpi")
+
+    def __init__(self, section: str, label: str, kind: str, options: Optional[Mapping[str, str]] = None, *,
+                 units: Optional[str] = None, default: Optional[str] = None, strict: bool = False,
+                 visibility: Optional[str] = None, width: int = 20, store_attr: Optional[str] = None,
+                 on_change: Optional[str] = None):
+        self.section = section
+        self.label = label
+        self.kind = kind
+        self.options = _options(options, strict=strict) if options is not None else None
+        self.units = UNIT_FAMILIES[units] if units else None
+        self.default = default
+        self.visibility = visibility
+        self.width = width
+        # Attribute name on the window that keeps the widget (e.g. output_type_combo)
+        self.store_attr = store_attr
+        # Window method re-run when the combobox selection changes
+        self.on_change = on_change
+        self.scpi = command_groups.get(section, {}).get(label)
+
+    @property
+    def key(self) -> Tuple[str, str]:
+        return self.section, self.label
+
+    def __repr__(self):
+        return f"Field({self.section!r}, {self.label!r}, {self.kind!r}, scpi={self.scpi!r})"
+
+
+_GC, _GF, _AC, _AF = "Generator Config", "Generator Function", "Analyzer Config", "Analyzer Function"
+_AN_VIS = "_update_analyzer_function_visibility"
+
+FIELDS: Tuple[Field, ...] = (
+    # Generator Config
+    Field(_GC, "Instrument Generator", COMBO, INSTRUMENT_GENERATOR_OPTIONS),
+    Field(_GC, "Channel Generator", COMBO, CHANNEL_GENERATOR_OPTIONS),
+    Field(_GC, "Output Type (Unbal/Bal)", COMBO, OUTPUT_TYPE_OPTIONS, store_attr="output_type_combo"),
+    Field(_GC, "Impedance", IMPEDANCE, IMPEDANCE_OPTIONS_BAL, default="R10"),
+    Field(_GC, "Common (Float/Ground)", RADIO, COMMON_OPTIONS, default="GRO"),
+    Field(_GC, "Bandwidth Generator", COMBO, BANDWIDTH_GENERATOR_OPTIONS),
+    Field(_GC, "Volt Range (Auto/Fix)", RADIO, VOLT_RANGE_OPTIONS, default="AUTO"),
+    Field(_GC, "Max Voltage", VALUE_UNIT, units="voltage"),
+    Field(_GC, "Ref Voltage", VALUE_UNIT, units="voltage"),
+    Field(_GC, "Ref Frequency", VALUE_UNIT, units="frequency"),
+    # Generator Function
+    Field(_GF, "Function Generator", COMBO, FUNCTION_GENERATOR_OPTIONS),
+    Field(_GF, "Low Dist", SWITCH),
+    Field(_GF, "Sweep Ctrl", COMBO, SWEEP_CTRL_OPTIONS),
+    Field(_GF, "Frequency", VALUE_UNIT, units="frequency", visibility=SWEEP),
+    Field(_GF, "Next Step", COMBO, NEXT_STEP_OPTIONS, visibility=SWEEP),
+    Field(_GF, "X Axis", COMBO, X_AXIS_OPTIONS, visibility=SWEEP),
+    Field(_GF, "Z Axis", COMBO, Z_AXIS_OPTIONS, visibility=SWEEP),
+    Field(_GF, "Spacing", COMBO, SPACING_OPTIONS, visibility=SWEEP),
+    Field(_GF, "Start", VALUE_UNIT, units="frequency", visibility=SWEEP),
+    Field(_GF, "Stop", VALUE_UNIT, units="frequency", visibility=SWEEP),
+    Field(_GF, "Points", ENTRY, visibility=SWEEP),
+    Field(_GF, "Halt", COMBO, HALT_OPTIONS, visibility=SWEEP),
+    Field(_GF, "Voltage", VALUE_UNIT, units="voltage_dbr"),
+    Field(_GF, "Filter", COMBO, FILTER_OPTIONS, strict=True),
+    Field(_GF, "Equalizer", SWITCH),
+    Field(_GF, "DC Offset", SWITCH),
+    # Analyzer Config
+    Field(_AC, "Instrument Analyzer", COMBO, INSTRUMENT_ANALYZER_OPTIONS),
+    Field(_AC, "Channel Analyzer", COMBO, CHANNEL_ANALYZER_OPTIONS),
+    Field(_AC, "CH1 Coupling", RADIO, CH1_COUPLING_OPTIONS, default="AC"),
+    Field(_AC, "Bandwidth Analyzer", COMBO, BANDWIDTH_ANALYZER_OPTIONS),
+    Field(_AC, "Pre Filter", COMBO, PRE_FILTER_OPTIONS),
+    Field(_AC, "CH1 Input", COMBO, CH1_INPUT_OPTIONS),
+    Field(_AC, "CH1 Impedance", COMBO, CH1_IMPEDANCE_OPTIONS),
+    Field(_AC, "CH1 Ground/Common", RADIO, CH1_COMMON_OPTIONS, default="FLOat"),
+    Field(_AC, "CH1 Range", COMBO, CH1_RANGE_OPTIONS),
+    Field(_AC, "Ref Imped", VALUE_UNIT, units="impedance"),
+    Field(_AC, "Start Cond", COMBO, START_COND_OPTIONS),
+    Field(_AC, "Delay", VALUE_UNIT, units="time"),
+    Field(_AC, "MAX FFT Size", COMBO, MAX_FFT_SIZE_OPTIONS),
+    # Analyzer Function
+    Field(_AF, "Function Analyzer", COMBO, FUNCTION_ANALYZER_OPTIONS, width=24, on_change=_AN_VIS),
+    Field(_AF, "S/N Sequence", CHECK, visibility=SN_SEQUENCE),
+    Field(_AF, "Meas Time", COMBO, MEAS_TIME_OPTIONS),
+    Field(_AF, "Bandwidth Analyzer Config", COMBO, BANDWIDTH_ANALYZER_CONFIG_OPTIONS, visibility=ANALYZER),
+    Field(_AF, "Sweep Ctrl Analyzer Config", COMBO, SWEEP_CTRL_OPTIONS, visibility=ANALYZER),
+    Field(_AF, "Freq Mode", COMBO, FREQ_MODE_OPTIONS, visibility=ANALYZER, on_change=_AN_VIS),
+    Field(_AF, "Factor", FACTOR, visibility=ANALYZER),
+    Field(_AF, "Notch(Gain)", COMBO, NOTCH_OPTIONS),
+    Field(_AF, "Filter1", COMBO, FILTER1_OPTIONS, visibility=ANALYZER),
+    Field(_AF, "Filter2", COMBO, FILTER2_OPTIONS),
+    Field(_AF, "Filter3", COMBO, FILTER3_OPTIONS, visibility=ANALYZER),
+    Field(_AF, "Fnct Settling", COMBO, FNCT_SETTLING_OPTIONS),
+    Field(_AF, "Samples", ENTRY, visibility=ANALYZER),
+    Field(_AF, "Tolerance", VALUE_UNIT, units="tolerance"),
+    Field(_AF, "Resolution", VALUE_UNIT, units="resolution"),
+    Field(_AF, "Timeout", VALUE_UNIT, units="time"),
+    Field(_AF, "Bargraph", CHECK),
+    Field(_AF, "POST FFT", CHECK),
+    Field(_AF, "Level Monitor", COMBO, LEVEL_MONITOR_OPTIONS),
+    Field(_AF, "Second Monitor", COMBO, SECOND_MONITOR_OPTIONS),
+    Field(_AF, "Input Monitor", COMBO, INPUT_MONITOR_OPTIONS),
+    Field(_AF, "Freq/Phase", COMBO, FREQ_OPTIONS),
+    Field(_AF, "Waveform", CHECK),
+)
+
+FIELD_BY_KEY: Dict[Tuple[str, str], Field] = {f.key: f for f in FIELDS}
+# "Low Dist" has historically been accepted in any section
+_FIELD_BY_LABEL: Dict[str, Field] = {"Low Dist": FIELD_BY_KEY[(_GF, "Low Dist")]}
+
+
+def field_for(section: str, label: str) -> Optional[Field]:
+    """Schema entry for a settings row, or None for a plain Entry row."""
+    return FIELD_BY_KEY.get((section, label)) or _FIELD_BY_LABEL.get(label)
+
+
+def labels_with_visibility(group: str, section: Optional[str] = None) -> set:
+    return {f.label for f in FIELDS if f.visibility == group and (section is None or f.section == section)}
+
+
+# ---------------- values -----------------
+def leading_number(text) -> str:
+    """Numeric prefix of *text* ('2.5 *' -> '2.5'); the stripped text if there is none."""
+    text = str(text).strip()
+    match = VALUE_UNIT_RE.match(text)
+    return match.group(1) if match else text
+
+
+def switch_value(value) -> str:
+    return "ON" if str(value).upper() == "ON" else "OFF"
+
+
+def set_entry_text(entry, text) -> None:
+    """Replace an Entry's text, temporarily lifting readonly/disabled state."""
+    state = str(entry.cget('state'))
+    if state != 'normal':
+        entry.config(state='normal')
+    entry.delete(0, 'end')
+    entry.insert(0, text)
+    if state != 'normal':
+        entry.config(state=state)
+
+
+def read_widget(field: Optional[Field], widget) -> str:
+    """Settings value (codes, '<number> <unit>') of the widget registered for *field*."""
+    kind = field.kind if field is not None else ENTRY
+    if kind == COMBO:
+        return field.options.to_code(widget.get())
+    if kind == CHECK:
+        return "ON" if widget.get() else "OFF"
+    if kind == VALUE_UNIT:
+        entry, combo = widget
+        return field.units.join(entry.get(), combo.get())
+    if kind == FACTOR:
+        return leading_number(widget.get())
+    if kind == IMPEDANCE:
+        # Balanced outputs offer a choice; the unbalanced output is fixed at 5 Ω
+        from tkinter import ttk  # here, so upv.preset_compiler can use the schema without Tk
+        if isinstance(widget, ttk.Combobox):
+            return field.options.to_code(widget.get().strip(), default=field.default)
+        return "R5"
+    return widget.get()  # RADIO / SWITCH variables and plain entries hold the stored value
+
+
+def write_widget(field: Optional[Field], widget, value) -> bool:
+    """Show settings *value* in an existing widget; False if the widget cannot be refreshed."""
+    kind = field.kind if field is not None else ENTRY
+    if kind == COMBO:
+        widget.set(field.options.to_display(value))
+    elif kind == RADIO:
+        widget.set(value if value in field.options else field.default)
+    elif kind == SWITCH:
+        widget.set(switch_value(value))
+    elif kind == CHECK:
+        widget.set(str(value).upper() == "ON")
+    elif kind == VALUE_UNIT:
+        entry, combo = widget
+        number, unit = field.units.split(value)
+        set_entry_text(entry, number)
+        combo.set(unit)
+        combo._last_unit = unit
+    elif kind == FACTOR:
+        set_entry_text(widget, leading_number(value))
+    elif kind == ENTRY and hasattr(widget, 'delete'):
+        set_entry_text(widget, str(value))
+    else:
+        return False
+    return True
@@ -1,25 +1,71 @@
-import datetime
 import json
-import math
 import queue
-import re
 import threading
 import time
 import tkinter as tk
 from pathlib import Path
-from tkinter import Frame, Button, Label, filedialog, messagebox, Canvas, Scrollbar, Toplevel, BooleanVar, Listbox
+from tkinter import Frame, Button, Label, filedialog, messagebox, Canvas, Scrollbar, BooleanVar, Listbox, Toplevel
 from tkinter import ttk, Entry
 
-import pyvisa
+import numpy as np
 
-from upv.upv_auto_config import find_upv_ip, apply_grouped_settings, load_config, fetch_and_plot_trace
+from upv.upv_auto_config import (
+    find_upv_ip,
+    apply_grouped_settings,
+    load_config,
+    fetch_trace,
+    build_export_trace,
+    read_y_unit,
+    plot_trace,
+)
+from upv.upv_readback import save_settings_snapshot
+from upv.units import (
+    convert,
+    convert_scale,
+    db_to_percent,
+    format_entry_value,
+    percent_to_db,
+    to_volts,
+)
+from upv.smoothing import OCTAVE_SMOOTHING_OPTIONS, process_trace
+from upv.hxml_writer import measurement_date
+from upv.background import BackgroundJob, tk_dispatcher
+from upv.batch import Batch, catalog_result
+from upv.export_service import ExportJob, ExportService
+from upv.instrument_io import NORMAL, POLL, PriorityLock, abort_sweep, operation_complete, trigger_sweep
+from upv.preset_compiler import compile_presets, describe_invalid, normalize_value
+from upv.preset_optimizer import order_cost, plan_order, switch_cost_model
+from upv.sequence_engine import APPLY, ARM, COLLECT, EXPORT, SWEEP, SequenceEngine
+from upv.sequence_journal import JournalError, SequenceJournal
+from upv.settings_model import settings_model
+from upv.preset_scanner import PresetScanner
+from gui.live_plot import LiveViewManager
+from gui.preset_list import VirtualCheckList
+from gui.sequence_actions import WindowSequenceActions
+from utils.startup import resource_manager
+from utils.profiling import profiled, span
 from gui.display_map import (
-    INSTRUMENT_GENERATOR_OPTIONS,
-    CHANNEL_GENERATOR_OPTIONS,
-    OUTPUT_TYPE_OPTIONS,
     IMPEDANCE_OPTIONS_BAL,
     IMPEDANCE_OPTIONS_UNBAL,
-    DISPLAY_LABEL_OVERRIDES
+    DISPLAY_LABEL_OVERRIDES,
+)
+from gui.settings_schema import (
+    ANALYZER,
+    CHECK,
+    COMBO,
+    ENTRY,
+    FACTOR,
+    IMPEDANCE,
+    RADIO,
+    SN_SEQUENCE,
+    SWEEP,
+    SWITCH,
+    VALUE_UNIT,
+    field_for,
+    leading_number,
+    read_widget,
+    switch_value,
+    write_widget,
 )
 
 try:
@@ -32,10 +78,14 @@ except Exception:
 # Default preset base name (without .json). When user edits any control after loading a non-default preset,
 # the active preset label reverts to this default to signal divergence from the loaded preset.
 DEFAULT_PRESET_NAME = "settings"  # Changed from 'main_settings' per user request
+# Live sweep window: at most this many traces are kept (least recently used closed first),
+# shown as notebook tabs ("tabs") or as lines in one figure ("overlay").
+LIVE_VIEW_MAX_FIGURES = 8
+LIVE_VIEW_MODE = "tabs"
 
-reverse_output_type_map = {v: k for k, v in OUTPUT_TYPE_OPTIONS.items()}
 
 class MainWindow(Frame):
+    @profiled("MainWindow.__init__", "startup")
     def __init__(self, master, run_upv_callback):
         super().__init__(master)
         self.run_upv_callback = run_upv_callback
@@ -71,6 +121,7 @@ class MainWindow(Frame):
         button_row2 = Frame(self.left_frame, bg="#f5f6f8")
         button_row2.pack(pady=(0,4))
         btn3 = Button(button_row2, text="Apply Settings", command=self.apply_settings, width=btn_width)
+        self.apply_btn = btn3
         btn4 = Button(button_row2, text="Load Preset", command=self.load_preset, width=btn_width)
         btn3.grid(row=0, column=0, padx=(0, 8), pady=0)
         btn4.grid(row=0, column=1, padx=(0, 0), pady=0)
@@ -78,14 +129,22 @@ class MainWindow(Frame):
         # Measurement sequence tracking
         self._measurement_vars = {}
         self._measurement_selection_order = []
-        self._sequence_active = False
-        self._sequence_presets = []
-        self._sequence_index = -1
-        self._sequence_collected_traces = []
+        # Running upv.sequence_engine.SequenceEngine (see apply_selected_measurements)
+        self._sequence = None
+        # Multi-DUT batch (upv.batch.Batch, see open_batch_dialog) and its dialog
+        self._batch = None
+        self._batch_compiled = {}
+        self._batch_actions = None
+        self._batch_dialog = None
+        self._batch_listbox = None
         self._excluded_selected_paths = set()
-        self._measurement_row_frames = {}
+        # Presets the order optimizer must not move (see _optimize_preview_order)
+        self._locked_preview_paths = set()
         self._measurement_canvas = None
         self._measurement_dir = Path(SETTINGS_FILE).parent
+        # Preset folder listings are scanned off the GUI thread and cached (see upv.preset_scanner)
+        self._preset_scanner = PresetScanner()
+        self._preset_scan_token = 0
 
         # Inline multi-measurement selection panel (checkboxes beside buttons)
         self.inline_measure_container = Frame(self.top_frame, bg="#f5f6f8")
@@ -115,6 +174,18 @@ class MainWindow(Frame):
         # Snapshot (read-back) button
         btn_snapshot = Button(self.left_frame, text="Snapshot Settings", command=self.snapshot_upv, width=btn_width)
         btn_snapshot.pack(pady=(0,6))
+        self.snapshot_btn = btn_snapshot
+
+        # Optional fractional-octave smoothing for the live view (and exports if ticked)
+        smoothing_row = Frame(self.left_frame, bg="#f5f6f8")
+        smoothing_row.pack(pady=(0,6))
+        Label(smoothing_row, text="Smoothing", bg="#f5f6f8").pack(side="left", padx=(0,6))
+        self.smoothing_combo = ttk.Combobox(smoothing_row, values=list(OCTAVE_SMOOTHING_OPTIONS.keys()),
+                                            width=11, state="readonly")
+        self.smoothing_combo.set("Off")
+        self.smoothing_combo.pack(side="left")
+        self._smooth_exports_var = BooleanVar(value=False)
+        ttk.Checkbutton(smoothing_row, text="Exports", variable=self._smooth_exports_var).pack(side="left", padx=(6,0))
 
         # Right spacer
         self.right_spacer = Frame(self.top_frame)
@@ -146,38 +217,54 @@ class MainWindow(Frame):
         self.master.bind_all("<Button-5>", self._on_button5, add="+")
 
         self.entries = {}
+        # Parsed settings.json shared with upv_auto_config (mtime-checked cache)
+        self._settings_model = settings_model(SETTINGS_FILE)
         self.load_settings()
         self.upv = None
+        self._upv_idn = None  # *IDN? of the connected UPV (sequence journal identity)
         self._refresh_start_sweep_state()
 
         # Connection state
         self._connecting = False
         self._scan_anim_phase = 0
 
-        # Thread-safe VISA access & background acquisition pipeline
-        self._visa_lock = threading.Lock()
+        # Thread-safe VISA access & background acquisition pipeline.
+        # Waiters are served by priority: stop (URGENT) > settings (NORMAL) > trace polls (POLL)
+        self._visa_lock = PriorityLock()
         self._data_queue = queue.Queue(maxsize=2)
         self._acq_thread = None
         self._acq_stop_event = threading.Event()
         self._acq_fail_count = 0
         self._live_consumer_started = False
 
+        # HXML exports are written on a worker thread (see upv.export_service)
+        self._export_service = ExportService(dispatch=tk_dispatcher(self))
+        # Apply Settings, Snapshot and Stop run as BackgroundJobs (see _start_apply_job / snapshot_upv /
+        # stop_continuous_sweep)
+        self._apply_job = None
+        self._snapshot_job = None
+        self._stop_job = None
+
         # Multi-window live sweep support
-        self._live_windows = []
+        self._live_views = LiveViewManager(self.master, max_views=LIVE_VIEW_MAX_FIGURES, mode=LIVE_VIEW_MODE,
+                                           on_closed=self._on_live_views_closed)
+        self._live_renderer = None
         self._force_new_live_window = False
         self._sequence_completed_lock = False
 
     # ---------------- Safe VISA Helpers -----------------
-    def _safe_query(self, cmd: str, *, timeout_ms: int = 1500, strip: bool = True):
+    @profiled("visa query", "visa")
+    def _safe_query(self, cmd: str, *, timeout_ms: int = 1500, strip: bool = True, priority: int = NORMAL):
         """Thread-safe query that enforces a temporary timeout and never blocks GUI.
 
+        priority: place in the VISA lock queue (upv.instrument_io URGENT / NORMAL / POLL).
         Returns: response string (optionally stripped) or None on failure/timeout.
         """
         upv = self.upv
         if upv is None:
             return None
         try:
-            with self._visa_lock:
+            with self._visa_lock.hold(priority):
                 old_timeout = getattr(upv, 'timeout', None)
                 if old_timeout is not None:
                     try:
@@ -198,12 +285,12 @@ class MainWindow(Frame):
         except Exception:
             return None
 
-    def _safe_write(self, cmd: str):
+    def _safe_write(self, cmd: str, *, priority: int = NORMAL):
         upv = self.upv
         if upv is None:
             return False
         try:
-            with self._visa_lock:
+            with self._visa_lock.hold(priority):
                 upv.write(cmd)
             return True
         except Exception:
@@ -211,60 +298,79 @@ class MainWindow(Frame):
 
     # ---------------- Shared Unit Resolution -----------------
     def _resolve_y_unit_from_settings(self):
-        """Replicate unit resolution logic used in fetch_and_plot_trace.
-
-        Priority:
-          1. SENS:USER (sanitized) if present and non-empty
-          2. SENS:UNIT or SENS1:UNIT (mapped to display forms)
-          3. Fallback 'dBV'
-        Returns sanitized display string.
+        """Trace Y unit display string from the cached settings (see upv.units.resolve_y_unit)."""
+        return self._settings_model.y_unit
+
+    def _ref_voltage_volts(self):
+        """Current Generator Config 'Ref Voltage' in volts (dBr reference); 1.0 if unavailable."""
+        ref_entry, ref_combo = self.entries.get(("Generator Config", "Ref Voltage"), (None, None))
+        if ref_entry is None or ref_combo is None:
+            return 1.0
+        try:
+            return to_volts(float(ref_entry.get()), ref_combo.get())
+        except Exception:
+            return 1.0
+
+    @staticmethod
+    def _convert_level_value(value, old_unit, new_unit, ref_voltage=1.0):
+        """Level conversion used by the voltage / resolution unit combos (600 Ω reference)."""
+        return convert(value, old_unit, new_unit, ref_voltage=ref_voltage)
+
+    @staticmethod
+    def _convert_tolerance_value(value, old_unit, new_unit):
+        if old_unit == "%" and new_unit == "dB":
+            return percent_to_db(value)
+        if old_unit == "dB" and new_unit == "%":
+            return db_to_percent(value)
+        return value
+
+    def _bind_unit_conversion(self, entry, combo, initial_unit, convert_fn):
+        """Convert the entry value whenever the unit combobox selection changes.
+
+        convert_fn(value, old_unit, new_unit) returns the converted scalar; the
+        result is written back through upv.units.format_entry_value.
         """
+        def _on_unit_change(event=None):
+            try:
+                val = float(entry.get())
+            except Exception:
+                return
+            old_unit = getattr(combo, '_last_unit', initial_unit)
+            new_unit = combo.get()
+            if old_unit != new_unit:
+                try:
+                    result = convert_fn(val, old_unit, new_unit)
+                except Exception:
+                    return
+                entry.delete(0, 'end')
+                entry.insert(0, format_entry_value(result))
+            combo._last_unit = new_unit
+        combo._last_unit = initial_unit
+        combo.bind('<<ComboboxSelected>>', _on_unit_change)
+        combo.unbind("<MouseWheel>")
+        self.bind_combobox_mousewheel(combo)
+
+    def _smoothing_fraction(self, *, for_export=False):
+        """Octave fraction selected in the Smoothing combo (None = off / not applied to exports)."""
         try:
-            if not Path(SETTINGS_FILE).exists():
-                return 'dBV'
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as sf:
-                data = json.load(sf)
-            user_unit_raw = data.get('SENS:USER')
-            std_unit_raw = data.get('SENS:UNIT') or data.get('SENS1:UNIT')
-
-            def _sanitize_user_unit(s: str) -> str:
-                if not isinstance(s, str):
-                    return ''
-                s2 = s.strip().strip('"').strip("'")
-                low = s2.lower()
-                if low.startswith('db'):
-                    rest = s2[2:].lstrip()
-                    tokens = rest.split()
-                    tokens = [t.upper() if t.lower() == 'spl' else t for t in tokens]
-                    if tokens:
-                        return 'dB ' + ' '.join(tokens)
-                    return 'dB'
-                return s2
-
-            if isinstance(user_unit_raw, str) and user_unit_raw.strip():
-                cand = _sanitize_user_unit(user_unit_raw)
-                if cand:
-                    return cand
-            if isinstance(std_unit_raw, str):
-                yu = std_unit_raw.strip().upper()
-                unit_map = {
-                    'DBR': 'dBr', 'DBV': 'dBV', 'DBU': 'dBu', 'DBM': 'dBm',
-                    'V': 'V', 'MV': 'mV', 'UV': 'μV', 'UVR': 'μV', 'UV RMS': 'μV',
-                    'UVRMS': 'μV', 'PCT': '%', '%': '%'
-                }
-                return unit_map.get(yu, std_unit_raw.strip())
+            if for_export and not self._smooth_exports_var.get():
+                return None
+            return OCTAVE_SMOOTHING_OPTIONS.get(self.smoothing_combo.get())
         except Exception:
-            pass
-        return 'dBV'
+            return None
 
     def _apply_fixed_freq_and_auto_level(self, ax, x_vals, y_vals):
-        """Apply fixed X-axis and Y-axis limits with auto-expansion if data exceeds bounds."""
+        """Apply fixed X-axis and Y-axis limits with auto-expansion if data exceeds bounds.
+
+        Returns True when the axis limits changed (the live renderer then redraws the axes).
+        """
+        changed = False
         try:
             # Auto-expand X-axis if incoming data exceeds current fixed bounds.
             try:
-                if x_vals:
-                    local_x_min = min(x_vals)
-                    local_x_max = max(x_vals)
+                if len(x_vals):
+                    local_x_min = float(np.nanmin(x_vals))
+                    local_x_max = float(np.nanmax(x_vals))
                     if local_x_min < self._fixed_x_min:
                         span = self._fixed_x_max - self._fixed_x_min if self._fixed_x_max > self._fixed_x_min else 1.0
                         headroom = span * 0.05
@@ -279,14 +385,16 @@ class MainWindow(Frame):
                         if new_max <= self._fixed_x_max:
                             new_max = local_x_max + 1.0
                         self._fixed_x_max = new_max
-                ax.set_xlim(self._fixed_x_min, self._fixed_x_max)
+                if tuple(ax.get_xlim()) != (self._fixed_x_min, self._fixed_x_max):
+                    ax.set_xlim(self._fixed_x_min, self._fixed_x_max)
+                    changed = True
             except Exception:
                 pass
 
             # Apply backend fixed Y-axis limits with auto upward extension if data exceeds current max.
             try:
-                if y_vals:
-                    local_max = max(y_vals)
+                if len(y_vals):
+                    local_max = float(np.nanmax(y_vals))
                     if local_max > self._fixed_y_max:
                         span_y = self._fixed_y_max - self._fixed_y_min if self._fixed_y_max > self._fixed_y_min else abs(local_max)
                         headroom_y = span_y * 0.05
@@ -294,11 +402,14 @@ class MainWindow(Frame):
                         if new_y_max <= self._fixed_y_max:
                             new_y_max = local_max + 1.0
                         self._fixed_y_max = new_y_max
-                ax.set_ylim(self._fixed_y_min, self._fixed_y_max)
+                if tuple(ax.get_ylim()) != (self._fixed_y_min, self._fixed_y_max):
+                    ax.set_ylim(self._fixed_y_min, self._fixed_y_max)
+                    changed = True
             except Exception:
                 pass
         except Exception:
             pass
+        return changed
 
 
     # ---------------- Connection / Scanning -----------------
@@ -358,1447 +469,420 @@ class MainWindow(Frame):
             setattr(self, store_attr, combo)
         return combo
 
-    def load_settings(self):
-        # Clear existing panel containers (if any)
-        for widget in self.grid_frame.winfo_children():
-            widget.destroy()
-        self.entries.clear()
-        # Reset analyzer hidden rows registry early so captures during rebuild are guaranteed
-        self._an_func_hidden_rows = {}
-
-        try:
-            with open(SETTINGS_FILE, "r") as f:
-                settings = json.load(f)
-
-            # --- Normalization: convert legacy/snapshot unit variants to canonical display ---
-            def _normalize_value(val: str) -> str:
-                original = val
-                s = val.strip()
-                if not s:
-                    return s
-                # Only attempt heavy normalization if there's at least one digit (avoid enumerations like AUTO, OFF)
-                if not any(ch.isdigit() for ch in s):
-                    # Still convert pure unit tokens like 'OHM'
-                    pass
-                # Collapse multiple spaces
-                s = re.sub(r"\s+", " ", s)
-                # Guard: skip normalization for pure code tokens (pattern Letter + digits + optional letters, no spaces)
-                # Examples: S256K, R200K, S1K, LINP, LOGS
-                if ' ' not in s and re.fullmatch(r"[A-Za-z]{1,6}\d{1,5}[A-Za-z]{0,4}", s):
-                    return original  # leave as-is
-                # Percent: replace trailing/standalone PCT with %
-                s = re.sub(r"(?i)\bPCT\b", "%", s)
-                # Ensure a space before % if number immediately followed by % without space
-                s = re.sub(r"(\d)(%)", r"\1 \2", s)
-                # dBV / dBu / dBm casing (avoid changing already correct)
-                s = re.sub(r"(?i)\bDBV\b", "dBV", s)
-                s = re.sub(r"(?i)\bDBU\b", "dBu", s)
-                s = re.sub(r"(?i)\bDBM\b", "dBm", s)
-                # Frequency units
-                s = re.sub(r"(?i)\bHZ\b", "Hz", s)
-                s = re.sub(r"(?i)\bKHZ\b", "kHz", s)
-                # Time units (S, MS, US, MIN)
-                # Convert US/us to μs for display, keep ms/s/min lowercase
-                s = re.sub(r"(?i)(\d)\s*US\b", r"\1 μs", s)
-                s = re.sub(r"(?i)\bMS\b", "ms", s)
-                s = re.sub(r"(?i)\bS\b", "s", s)
-                s = re.sub(r"(?i)\bMIN\b", "min", s)
-                # Voltage micro symbol: uV/UV -> μV (display convention)
-                s = re.sub(r"(?i)\buV\b", "μV", s)
-                # Impedance: OHM/Ω -> ohm; KOHM/KΩ -> kohm
-                s = re.sub(r"(?i)\bKOHM\b", "kohm", s)
-                s = re.sub(r"(?i)\bKΩ\b", "kohm", s)
-                s = re.sub(r"(?i)\bOHM\b", "ohm", s)
-                # Replace standalone Ω with ohm
-                s = re.sub(r"Ω", "ohm", s)
-                # Normalize kohm casing
-                s = re.sub(r"(?i)\bkohm\b", "kohm", s)
-                # Ensure single space between numeric and unit if they are concatenated (e.g., 100Hz -> 100 Hz)
-                # Avoid splitting embedded code tokens like S256K (preceded by a letter before the digits)
-                s = re.sub(r"(?<![A-Za-z])(\d+)([a-zA-Zμ])", r"\1 \2", s)
-                # Repair accidental earlier snapshot mutations that may have split code tokens (R200 K -> R200K)
-                s = re.sub(r"\b([A-Za-z])(\d{1,5})\s+([A-Za-z]{1,3})\b",
-                            lambda m: (m.group(1)+m.group(2)+m.group(3))
-                                      if re.fullmatch(r"[A-Za-z]{1,6}\d{1,5}[A-Za-z]{0,4}", m.group(1)+m.group(2)+m.group(3))
-                                      else m.group(0),
-                            s)
-                # Trim again
-                s = s.strip()
-                return s if s != original else original
-
-            try:
-                normalization_changes = []  # collect (section, key, old, new)
-                for section_name in ("Analyzer Function", "Generator Function", "Analyzer Config", "Generator Config"):
-                    section_dict = settings.get(section_name)
-                    if not isinstance(section_dict, dict):
-                        continue
-                    for key, val in list(section_dict.items()):
-                        if isinstance(val, str):
-                            norm = _normalize_value(val)
-                            if norm != val:
-                                section_dict[key] = norm
-                                normalization_changes.append((section_name, key, val, norm))
-                # Persist back to settings.json if any normalization changes occurred
-                if normalization_changes:
+    def _unit_converter(self, units):
+        """convert_fn for _bind_unit_conversion of a schema unit family."""
+        if units.scale is not None:
+            return lambda v, a, b, scale=units.scale: convert_scale(v, a, b, scale)
+        if units.converter == "level_ref":
+            # dBr is relative to the Generator Config reference voltage
+            return lambda v, a, b: self._convert_level_value(v, a, b, ref_voltage=self._ref_voltage_volts())
+        if units.converter == "tolerance":
+            return self._convert_tolerance_value
+        return self._convert_level_value
+
+    def _build_field_widget(self, frame, field, section, label, value, settings, grid_kwargs):
+        """Create the control of one settings row as described by its schema field.
+
+        Registers the widget (or variable / (entry, combo) tuple) in self.entries and
+        returns the gridded control, so visibility rules can hide it with its label.
+        Rows without a schema field get a plain Entry.
+        """
+        key = (section, label)
+        kind = field.kind if field is not None else ENTRY
+        if kind == COMBO:
+            combo = self._create_combo(frame, field.options.displays, field.options.to_display(value),
+                                       width=field.width, grid_kwargs=grid_kwargs, entry_key=key,
+                                       store_attr=field.store_attr)
+            if field.on_change:
+                def _changed(event=None, callback=getattr(self, field.on_change)):
                     try:
-                        with open(SETTINGS_FILE, 'w', encoding='utf-8') as wf:
-                            json.dump(settings, wf, indent=2, ensure_ascii=False)
+                        callback()
                     except Exception:
                         pass
-            except Exception:
-                pass
+                combo.bind('<<ComboboxSelected>>', _changed, add='+')
+            return combo
+        if kind == RADIO:
+            var = tk.StringVar(value=value if value in field.options else field.default)
+            radio_frame = Frame(frame)
+            radio_frame.grid(**grid_kwargs)
+            for code, display in zip(field.options.codes, field.options.displays):
+                ttk.Radiobutton(radio_frame, text=display, variable=var, value=code).pack(side="left", padx=5)
+            self.entries[key] = var
+            return radio_frame
+        if kind in (SWITCH, CHECK):
+            if kind == SWITCH:
+                var = tk.StringVar(value=switch_value(value))
+                chk = tk.Checkbutton(frame, variable=var, onvalue="ON", offvalue="OFF")
+            else:
+                var = tk.BooleanVar(value=str(value).upper() == "ON")
+                chk = tk.Checkbutton(frame, variable=var)
+            chk.grid(**grid_kwargs)
+            self.entries[key] = var
+            return chk
+        if kind == VALUE_UNIT:
+            units = field.units
+            number, unit = units.split(value)
+            hv_frame = Frame(frame)
+            hv_frame.grid(**grid_kwargs)
+            entry = Entry(hv_frame, width=22)
+            entry.insert(0, number)
+            entry.pack(side="left", padx=(0, 8))
+            combo = ttk.Combobox(hv_frame, values=units.options, width=units.width, state="readonly")
+            combo.set(unit)
+            combo.pack(side="left")
+            self._bind_unit_conversion(entry, combo, unit, self._unit_converter(units))
+            self.entries[key] = (entry, combo)
+            return hv_frame
+        if kind == FACTOR:
+            # Numeric multiplier followed by a fixed '*' marker
+            fac_frame = Frame(frame)
+            fac_frame.grid(**grid_kwargs)
+            entry = Entry(fac_frame, width=22)
+            cleaned = leading_number(value)
+            entry.insert(0, cleaned)
+            settings[section][label] = cleaned
+            entry.pack(side="left", padx=(0, 4))
+            Label(fac_frame, text="*", bg=frame["background"], fg="#333").pack(side="left")
+            self.entries[key] = entry
+            return fac_frame
+        entry = Entry(frame, width=22)
+        entry.insert(0, str(value))
+        entry.grid(**grid_kwargs)
+        self.entries[key] = entry
+        return entry
+
+    @profiled("load_settings", "gui")
+    def load_settings(self):
+        """(Re)load settings.json into the four settings panels.
 
-            # Ensure 'Frequency' exists in 'Generator Function' so it can be shown when Sweep Ctrl is Off
+        When the section/label layout matches the panels already on screen the new
+        values are pushed into the existing widgets (_refresh_settings_in_place);
+        otherwise the panels are rebuilt from scratch (_build_settings_panels).
+        """
+        try:
+            settings = self._read_display_settings()
+            layout = self._settings_layout_signature(settings)
+            if layout != getattr(self, '_settings_layout', None) or not self._refresh_settings_in_place(settings):
+                self._build_settings_panels(settings)
+                self._settings_layout = layout
+        except Exception as e:
+            messagebox.showerror("Settings Error", f"Could not load settings.json: {e}")
+        # After (re)loading settings, force user to Apply before sweep
+        if hasattr(self, 'start_sweep_btn'):
+            # Attach modification watchers so ANY change in any panel reverts preset to default
             try:
-                if isinstance(settings, dict) and "Generator Function" in settings:
-                    gf = settings["Generator Function"]
-                    if isinstance(gf, dict) and "Frequency" not in gf:
-                        # Insert Frequency after 'Sweep Ctrl' if present, else at beginning
-                        default_freq = "1000 Hz"
-                        new_gf = {}
-                        inserted = False
-                        for k, v in gf.items():
-                            new_gf[k] = v
-                            if k == "Sweep Ctrl":
-                                new_gf["Frequency"] = default_freq
-                                inserted = True
-                        if not inserted:
-                            # Prepend Frequency
-                            new_gf = {"Frequency": default_freq, **new_gf}
-                        settings["Generator Function"] = new_gf
+                self._attach_modification_watchers()
             except Exception:
                 pass
+            self._settings_applied = False
+            self._refresh_start_sweep_state()
 
-            sections = [
-                ("Generator Config", 0, 0),
-                ("Analyzer Config", 0, 1),
-                ("Generator Function", 1, 0),
-                ("Analyzer Function", 1, 1)
-            ]
-
-            frames = {}
-            # Build four scrollable panels with fixed header and subtle styling
-            header_bg = "#2c3e50"
-            header_fg = "#ffffff"
-            panel_bg = "#f7f9fa"
-            for section, row, col in sections:
-                container = Frame(self.grid_frame, bd=1, relief="solid", background=panel_bg)
-                container.grid(row=row, column=col, sticky="nsew", padx=10, pady=10)
-                container.grid_rowconfigure(1, weight=1)
-                container.grid_columnconfigure(0, weight=1)
-                # Ensure scrollbar column (index 1) reserves space and never collapses
-                container.grid_columnconfigure(1, minsize=14)
-
-                # Header bar (fixed, not scrolling)
-                header = Frame(container, bg=header_bg)
-                header.grid(row=0, column=0, columnspan=2, sticky="ew")
-                # Header label with zero vertical padding to eliminate gap above first row
-                Label(header, text=section, font=("Helvetica", 12, "bold"), fg=header_fg, bg=header_bg, pady=0, padx=10).pack(side="left")
-                # Add a subtle 1px separator line at bottom to clearly delineate header from scroll area
-                sep = Frame(header, height=1, bg="#1b2732")
-                sep.pack(fill="x", side="bottom")
-
-                # Scrollable content area
-                panel_canvas = Canvas(container, highlightthickness=0, bd=0, background=panel_bg)
-                vscroll = Scrollbar(container, orient="vertical", command=panel_canvas.yview)
-                panel_canvas.configure(yscrollcommand=vscroll.set)
-                panel_canvas.grid(row=1, column=0, sticky="nsew")
-                vscroll.grid(row=1, column=1, sticky="ns")
-
-                # Removed top padding (was pady=10). Keep standard y=0 and rely on visual separator.
-                inner_frame = Frame(panel_canvas, bd=0, background=panel_bg, padx=14, pady=0)
-                window_id = panel_canvas.create_window((0, 0), window=inner_frame, anchor="nw")
-
-                def _make_configure_callback(pc=panel_canvas, fr=inner_frame, wid=window_id):
-                    def _on_configure(event):
-                        # Always ensure the embedded frame matches the current canvas width
-                        pc.itemconfig(wid, width=pc.winfo_width())
-                        bbox = pc.bbox("all")
-                        if bbox:
-                            content_height = bbox[3] - bbox[1]
-                            canvas_height = pc.winfo_height()
-                            # Normal scrollregion update
-                            pc.configure(scrollregion=bbox)
-                            # Scenario: when the window is maximized the canvas grows taller so the
-                            # entire content may fit. If the user had previously scrolled, Tk keeps the
-                            # previous yview which produces an apparent blank gap at the top because the
-                            # content is now shorter than the visible area. Force re-alignment to the top
-                            # whenever content fits fully inside the canvas.
-                            if content_height <= canvas_height:
-                                # Keep scrollbar visibility consistent (extend region by 1px so OS themes
-                                # don't sometimes hide the thumb completely on some platforms).
-                                pc.configure(scrollregion=(0, 0, bbox[2], max(canvas_height, content_height) + 1))
-                                pc.yview_moveto(0)
-                            else:
-                                # Only pin to top once on first realization to avoid fighting user scroll.
-                                if not getattr(pc, '_initial_pinned', False):
-                                    pc.yview_moveto(0)
-                                    pc._initial_pinned = True
-                        else:
-                            # Fallback: no bbox yet; do nothing special.
-                            pass
-                    return _on_configure
-                cb = _make_configure_callback()
-                inner_frame.bind("<Configure>", cb)
-                # Also react when canvas itself resizes (first map / window resize)
-                panel_canvas.bind("<Configure>", lambda e, f=cb: f(e))
-                # Keep a reference for manual triggering later
-                panel_canvas._recalc = cb
-
-                # Activate scroll focus when pointer enters this panel
-                panel_canvas.bind("<Enter>", lambda e, pc=panel_canvas: self._activate_scroll(pc))
-                inner_frame.bind("<Enter>", lambda e, pc=panel_canvas: self._activate_scroll(pc))
-
-                frames[section] = (inner_frame, panel_canvas)
-
-            for section, row, col in sections:
-                frame, frame_canvas = frames[section]
-                if section in settings:
-                    impedance_row = None
-                    impedance_frame = None
-                    impedance_value = None
-                    if section == "Generator Config":
-                        self.output_type_combo = None  # <-- Only reset for Generator Config
-
-                    for i, (label, value) in enumerate(settings[section].items(), start=0):
-                        # Remove extra top gap specifically for first row in Generator Config (use int 0 not tuple)
-                        row_pady = 0 if (section == "Generator Config" and i == 0) else 2
-                        # Dynamic sweep control visibility support for Generator Function section
-                        if section == "Generator Function" and i == 0:
-                            # Initialize storage for row widgets (label + control) we may hide/show
-                            self._gen_func_widgets = {}
-                            self._gen_func_dynamic_labels = {"Frequency", "Next Step", "X Axis", "Z Axis", "Spacing", "Start", "Stop", "Points", "Halt"}
-                        # Friendly display names while keeping underlying JSON keys
-                        shown_label = DISPLAY_LABEL_OVERRIDES.get(label, label)
-                        label_widget = Label(frame, text=shown_label, anchor="w", width=22, bg=frame["background"])
-                        label_widget.grid(row=i, column=0, sticky="w", padx=(0,8), pady=row_pady)
-                        if section == "Generator Function" and label in getattr(self, '_gen_func_dynamic_labels', set()):
-                            self._gen_func_widgets.setdefault(label, []).append(label_widget)
-                        if section == "Generator Config" and label == "Instrument Generator":
-                            display_values = list(INSTRUMENT_GENERATOR_OPTIONS.values())
-                            current_display = INSTRUMENT_GENERATOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": row_pady},
-                                               entry_key=("Generator Config", label))
-                        elif section == "Generator Config" and label == "Channel Generator":
-                            display_values = list(CHANNEL_GENERATOR_OPTIONS.values())
-                            current_display = CHANNEL_GENERATOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": row_pady},
-                                               entry_key=("Generator Config", label))
-                        elif section == "Generator Config" and label == "Output Type (Unbal/Bal)":
-                            display_values = list(OUTPUT_TYPE_OPTIONS.values())
-                            current_display = OUTPUT_TYPE_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": row_pady},
-                                               entry_key=("Generator Config", label),
-                                               store_attr="output_type_combo")
-                            output_type_row = i
-                        elif section == "Generator Config" and label == "Common (Float/Ground)":
-                            # Use Radiobuttons for GRO/FLO
-                            from gui.display_map import COMMON_OPTIONS
-                            self.common_var = tk.StringVar()
-                            self.common_var.set(value if value in COMMON_OPTIONS else "GRO")
-                            radio_frame = Frame(frame)
-                            radio_frame.grid(row=i, column=1, sticky="w", pady=row_pady)
-                            for code, display in COMMON_OPTIONS.items():
-                                rb = ttk.Radiobutton(radio_frame, text=display, variable=self.common_var, value=code)
-                                rb.pack(side="left", padx=5)
-                            self.entries[("Generator Config", label)] = self.common_var
-                        elif section == "Generator Config" and label == "Impedance":
-                            self.impedance_row = i
-                            self.impedance_frame = frame
-                            impedance_value = value
-                        elif section == "Generator Config" and label == "Bandwidth Generator":
-                            from gui.display_map import BANDWIDTH_GENERATOR_OPTIONS
-                            display_values = list(BANDWIDTH_GENERATOR_OPTIONS.values())
-                            current_display = BANDWIDTH_GENERATOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": row_pady},
-                                               entry_key=("Generator Config", label))
-                        elif section == "Generator Config" and label == "Volt Range (Auto/Fix)":
-                            from gui.display_map import VOLT_RANGE_OPTIONS
-                            self.volt_range_var = tk.StringVar()
-                            self.volt_range_var.set(value if value in VOLT_RANGE_OPTIONS else "AUTO")
-                            radio_frame = Frame(frame)
-                            radio_frame.grid(row=i, column=1, sticky="w", pady=row_pady)
-                            for code, display in VOLT_RANGE_OPTIONS.items():
-                                rb = ttk.Radiobutton(radio_frame, text=display, variable=self.volt_range_var, value=code)
-                                rb.pack(side="left", padx=5)
-                            self.entries[("Generator Config", label)] = self.volt_range_var
-                        elif section == "Generator Config" and label == "Max Voltage":
-                            # Split value and unit if possible (case-insensitive, normalize dB units)
-                            unit_options = ["V", "mV", "μV", "dBV", "dBu", "dBm"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Zμ]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                raw_unit = match.group(2)
-                                if raw_unit:
-                                    # normalize by case-insensitive match against unit_options
-                                    unit_part = None
-                                    for opt in unit_options:
-                                        if raw_unit.lower() == opt.lower():
-                                            unit_part = opt
-                                            break
-                                    if unit_part is None:
-                                        unit_part = unit_options[0]
-                                else:
-                                    unit_part = unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=row_pady)
-                            entry = Entry(hv_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            def convert_voltage_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"V": 1, "mV": 1e-3, "μV": 1e-6}
-                                Z = 600  # Ohms, for dBm conversion
-                                # Convert any unit to SI volts first
-                                def to_volts(val, unit):
-                                    if unit in scale:
-                                        return val * scale[unit]
-                                    elif unit == "dBV":
-                                        return 10 ** (val / 20)
-                                    elif unit == "dBu":
-                                        return 0.775 * (10 ** (val / 20))
-                                    elif unit == "dBm":
-                                        p = 10 ** (val / 10) / 1000
-                                        return (p * Z) ** 0.5
-                                    else:
-                                        return val
-                                # Convert SI volts to any unit
-                                def from_volts(v, unit):
-                                    if unit in scale:
-                                        new_val = v / scale[unit]
-                                        return int(new_val) if new_val.is_integer() else round(new_val, 6)
-                                    elif unit == "dBV":
-                                        return round(20 * math.log10(v / 1.0), 6) if v > 0 else ""
-                                    elif unit == "dBu":
-                                        return round(20 * math.log10(v / 0.775), 6) if v > 0 else ""
-                                    elif unit == "dBm":
-                                        p = (v ** 2) / Z
-                                        return round(10 * math.log10(p * 1000), 6) if v > 0 else ""
-                                    else:
-                                        return v
-                                v_si = to_volts(val, old_unit)
-                                result = from_volts(v_si, new_unit)
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(result))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_voltage_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Generator Config" and label == "Ref Voltage":
-                            # Same as Max Voltage: value + unit (case-insensitive)
-                            unit_options = ["V", "mV", "μV", "dBV", "dBu", "dBm"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Zμ]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                raw_unit = match.group(2)
-                                if raw_unit:
-                                    unit_part = None
-                                    for opt in unit_options:
-                                        if raw_unit.lower() == opt.lower():
-                                            unit_part = opt
-                                            break
-                                    if unit_part is None:
-                                        unit_part = unit_options[0]
-                                else:
-                                    unit_part = unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=row_pady)
-                            entry = Entry(hv_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            def convert_voltage_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"V": 1, "mV": 1e-3, "μV": 1e-6}
-                                Z = 600  # Ohms, for dBm conversion
-                                def to_volts(val, unit):
-                                    if unit in scale:
-                                        return val * scale[unit]
-                                    elif unit == "dBV":
-                                        return 10 ** (val / 20)
-                                    elif unit == "dBu":
-                                        return 0.775 * (10 ** (val / 20))
-                                    elif unit == "dBm":
-                                        p = 10 ** (val / 10) / 1000
-                                        return (p * Z) ** 0.5
-                                    else:
-                                        return val
-                                def from_volts(v, unit):
-                                    if unit in scale:
-                                        new_val = v / scale[unit]
-                                        return int(new_val) if new_val.is_integer() else round(new_val, 6)
-                                    elif unit == "dBV":
-                                        return round(20 * math.log10(v / 1.0), 6) if v > 0 else ""
-                                    elif unit == "dBu":
-                                        return round(20 * math.log10(v / 0.775), 6) if v > 0 else ""
-                                    elif unit == "dBm":
-                                        p = (v ** 2) / Z
-                                        return round(10 * math.log10(p * 1000), 6) if v > 0 else ""
-                                    else:
-                                        return v
-                                v_si = to_volts(val, old_unit)
-                                result = from_volts(v_si, new_unit)
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(result))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_voltage_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Generator Config" and label == "Ref Frequency":
-                            # Value + unit, only Hz and kHz
-                            unit_options = ["Hz", "kHz"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Z]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) if match.group(2) in unit_options else unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=row_pady)
-                            entry = Entry(hv_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            def convert_freq_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"Hz": 1, "kHz": 1e3}
-                                if old_unit in scale and new_unit in scale:
-                                    val_si = val * scale[old_unit]
-                                    new_val = val_si / scale[new_unit]
-                                    entry.delete(0, 'end')
-                                    entry.insert(0, str(int(new_val) if new_val.is_integer() else round(new_val, 6)))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_freq_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif label == "Low Dist":
-                            var = tk.StringVar()
-                            var.set("ON" if str(value).upper() == "ON" else "OFF")
-                            cb = tk.Checkbutton(frame, variable=var, onvalue="ON", offvalue="OFF")
-                            cb.grid(row=i, column=1, sticky="w", pady=2)
-                            if var.get() == "ON":
-                                cb.select()
-                            else:
-                                cb.deselect()
-                            self.entries[(section, label)] = var
-                        elif section == "Generator Function" and label == "Function Generator":
-                            from gui.display_map import FUNCTION_GENERATOR_OPTIONS
-                            display_values = list(FUNCTION_GENERATOR_OPTIONS.values())
-                            current_display = FUNCTION_GENERATOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Generator Function" and label == "Sweep Ctrl":
-                            from gui.display_map import SWEEP_CTRL_OPTIONS
-                            display_values = list(SWEEP_CTRL_OPTIONS.values())
-                            current_display = SWEEP_CTRL_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            # We'll bind visibility update after building all rows
-                        elif section == "Generator Function" and label == "Frequency":
-                            # Value + unit (Hz / kHz)
-                            unit_options = ["Hz", "kHz"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Z]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2)
-                                # Normalize provided unit to expected capitalization
-                                if unit_part:
-                                    unit_part_norm = unit_part.lower()
-                                    if unit_part_norm in ("hz",):
-                                        unit_part = "Hz"
-                                    elif unit_part_norm in ("khz",):
-                                        unit_part = "kHz"
-                                if unit_part not in unit_options:
-                                    unit_part = unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            freq_frame = Frame(frame)
-                            freq_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(freq_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(freq_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            def convert_freq_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"Hz": 1, "kHz": 1e3}
-                                if old_unit in scale and new_unit in scale:
-                                    val_si = val * scale[old_unit]
-                                    new_val = val_si / scale[new_unit]
-                                    entry.delete(0, 'end')
-                                    entry.insert(0, str(int(new_val) if new_val.is_integer() else round(new_val, 6)))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_freq_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                            # Track for dynamic visibility
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(freq_frame)
-                        elif section == "Generator Function" and label == "Next Step":
-                            from gui.display_map import NEXT_STEP_OPTIONS
-                            display_values = list(NEXT_STEP_OPTIONS.values())
-                            current_display = NEXT_STEP_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(self.entries[(section, label)])
-                        elif section == "Generator Function" and label == "X Axis":
-                            from gui.display_map import X_AXIS_OPTIONS
-                            display_values = list(X_AXIS_OPTIONS.values())
-                            current_display = X_AXIS_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(self.entries[(section, label)])
-                        elif section == "Generator Function" and label == "Z Axis":
-                            from gui.display_map import Z_AXIS_OPTIONS
-                            display_values = list(Z_AXIS_OPTIONS.values())
-                            current_display = Z_AXIS_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(self.entries[(section, label)])
-                        elif section == "Generator Function" and label == "Spacing":
-                            from gui.display_map import SPACING_OPTIONS
-                            display_values = list(SPACING_OPTIONS.values())
-                            current_display = SPACING_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(self.entries[(section, label)])
-                        elif section == "Generator Function" and label in ("Start", "Stop"):
-                            unit_options = ["Hz", "kHz"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Z]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) if match.group(2) in unit_options else unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(hv_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            def convert_freq_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"Hz": 1, "kHz": 1e3}
-                                if old_unit in scale and new_unit in scale:
-                                    val_si = val * scale[old_unit]
-                                    new_val = val_si / scale[new_unit]
-                                    entry.delete(0, 'end')
-                                    entry.insert(0, str(int(new_val) if new_val.is_integer() else round(new_val, 6)))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_freq_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(hv_frame)
-                        elif section == "Generator Function" and label == "Voltage":
-                            # Same as Max Voltage: value + unit (case-insensitive, ensure DBR -> dBr)
-                            unit_options = ["V", "mV", "μV", "dBV", "dBu", "dBm", "dBr"]
-                            val_str = str(value)
-                            match = re.match(r"^([\-\d\.]+)\s*([a-zA-Zμ]+)?$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                raw_unit = match.group(2)
-                                if raw_unit:
-                                    unit_part = None
-                                    for opt in unit_options:
-                                        if raw_unit.lower() == opt.lower():
-                                            unit_part = opt
-                                            break
-                                    if unit_part is None:
-                                        unit_part = unit_options[0]
-                                else:
-                                    unit_part = unit_options[0]
-                            else:
-                                val_part = val_str
-                                unit_part = unit_options[0]
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(hv_frame, width=22)
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=unit_options, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-
-                            def get_ref_voltage_volts():
-                                # Fetch the Ref Voltage entry and combo from self.entries
-                                ref_entry, ref_combo = self.entries.get(("Generator Config", "Ref Voltage"), (None, None))
-                                if ref_entry is None or ref_combo is None:
-                                    return 1.0  # fallback
-                                try:
-                                    val = float(ref_entry.get())
-                                except Exception:
-                                    return 1.0
-                                unit = ref_combo.get()
-                                scale = {"V": 1, "mV": 1e-3, "μV": 1e-6}
-                                if unit in scale:
-                                    return val * scale[unit]
-                                elif unit == "dBV":
-                                    return 10 ** (val / 20)
-                                elif unit == "dBu":
-                                    return 0.775 * (10 ** (val / 20))
-                                elif unit == "dBm":
-                                    Z = 600
-                                    p = 10 ** (val / 10) / 1000
-                                    return (p * Z) ** 0.5
-                                else:
-                                    return val
-
-                            def convert_voltage_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                scale = {"V": 1, "mV": 1e-3, "μV": 1e-6}
-                                Z = 600  # Ohms, for dBm conversion
-
-                                VREF_DBR = get_ref_voltage_volts()
-
-                                def to_volts(val, unit):
-                                    if unit in scale:
-                                        return val * scale[unit]
-                                    elif unit == "dBV":
-                                        return 10 ** (val / 20)
-                                    elif unit == "dBu":
-                                        return 0.775 * (10 ** (val / 20))
-                                    elif unit == "dBm":
-                                        p = 10 ** (val / 10) / 1000
-                                        return (p * Z) ** 0.5
-                                    elif unit == "dBr":
-                                        # dBr: V = Vref * 10^(dBr/20)
-                                        return VREF_DBR * (10 ** (val / 20))
-                                    else:
-                                        return val
-
-                                def from_volts(v, unit):
-                                    if unit in scale:
-                                        new_val = v / scale[unit]
-                                        return int(new_val) if new_val.is_integer() else round(new_val, 6)
-                                    elif unit == "dBV":
-                                        return round(20 * math.log10(v / 1.0), 6) if v > 0 else ""
-                                    elif unit == "dBu":
-                                        return round(20 * math.log10(v / 0.775), 6) if v > 0 else ""
-                                    elif unit == "dBm":
-                                        p = (v ** 2) / Z
-                                        return round(10 * math.log10(p * 1000), 6) if v > 0 else ""
-                                    elif unit == "dBr":
-                                        # dBr: dBr = 20 * log10(V / Vref)
-                                        return round(20 * math.log10(v / VREF_DBR), 6) if v > 0 else ""
-                                    else:
-                                        return v
-
-                                v_si = to_volts(val, old_unit)
-                                result = from_volts(v_si, new_unit)
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(result))
-                                combo._last_unit = new_unit
-
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_voltage_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Generator Function" and label == "Filter":
-                            from gui.display_map import FILTER_OPTIONS
-                            filter_keys = list(FILTER_OPTIONS.keys())
-                            filter_values = [FILTER_OPTIONS[k] for k in filter_keys]
-                            try:
-                                idx = filter_keys.index(value)
-                                display_val = filter_values[idx]
-                            except Exception:
-                                display_val = filter_values[0]
-                            combo = ttk.Combobox(frame, values=filter_values, width=20, state="readonly")
-                            combo.set(display_val)
-                            combo.grid(row=i, column=1, sticky="w", pady=2)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (combo, filter_keys, filter_values)
-                        elif section == "Generator Function" and label == "Halt":
-                            from gui.display_map import HALT_OPTIONS
-                            display_values = list(HALT_OPTIONS.values())
-                            reverse_map = {v: k for k, v in HALT_OPTIONS.items()}
-                            current_display = HALT_OPTIONS.get(value, value)
-                            combo = ttk.Combobox(frame, values=display_values, width=20, state="readonly")
-                            combo.set(current_display)
-                            combo.grid(row=i, column=1, sticky="w", pady=2)
-                            combo.unbind("<MouseWheel>")
-                            self.entries[(section, label)] = combo
-                            self.bind_combobox_mousewheel(combo)
-                            if section == "Generator Function":
-                                self._gen_func_widgets.setdefault(label, []).append(combo)
-                        elif section == "Generator Function" and label == "Equalizer":
-                            var = tk.StringVar()
-                            var.set("ON" if str(value).upper() == "ON" else "OFF")
-                            cb = tk.Checkbutton(frame, variable=var, onvalue="ON", offvalue="OFF")
-                            cb.grid(row=i, column=1, sticky="w", pady=2)
-                            if var.get() == "ON":
-                                cb.select()
-                            else:
-                                cb.deselect()
-                            self.entries[(section, label)] = var
-                        elif section == "Generator Function" and label == "DC Offset":
-                            var = tk.StringVar()
-                            var.set("ON" if str(value).upper() == "ON" else "OFF")
-                            cb = tk.Checkbutton(frame, variable=var, onvalue="ON", offvalue="OFF")
-                            cb.grid(row=i, column=1, sticky="w", pady=2)
-                            if var.get() == "ON":
-                                cb.select()
-                            else:
-                                cb.deselect()
-                            self.entries[(section, label)] = var
-                        elif section == "Analyzer Config" and label == "Instrument Analyzer":
-                            from gui.display_map import INSTRUMENT_ANALYZER_OPTIONS
-                            display_values = list(INSTRUMENT_ANALYZER_OPTIONS.values())
-                            current_display = INSTRUMENT_ANALYZER_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "Channel Analyzer":
-                            from gui.display_map import CHANNEL_ANALYZER_OPTIONS
-                            display_values = list(CHANNEL_ANALYZER_OPTIONS.values())
-                            current_display = CHANNEL_ANALYZER_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "CH1 Coupling":
-                            from gui.display_map import CH1_COUPLING_OPTIONS
-                            ch1_coupling_var = tk.StringVar()
-                            ch1_coupling_var.set(value if value in CH1_COUPLING_OPTIONS else "AC")
-                            radio_frame = Frame(frame)
-                            radio_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            for code, display in CH1_COUPLING_OPTIONS.items():
-                                rb = ttk.Radiobutton(radio_frame, text=display, variable=ch1_coupling_var, value=code)
-                                rb.pack(side="left", padx=5)
-                            self.entries[(section, label)] = ch1_coupling_var
-                        elif section == "Analyzer Config" and label == "Bandwidth Analyzer":
-                            from gui.display_map import BANDWIDTH_ANALYZER_OPTIONS
-                            display_values = list(BANDWIDTH_ANALYZER_OPTIONS.values())
-                            current_display = BANDWIDTH_ANALYZER_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        
-                        elif section == "Analyzer Config" and label == "Pre Filter":
-                            from gui.display_map import PRE_FILTER_OPTIONS
-                            display_values = list(PRE_FILTER_OPTIONS.values())
-                            current_display = PRE_FILTER_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "CH1 Input":
-                            from gui.display_map import CH1_INPUT_OPTIONS
-                            display_values = list(CH1_INPUT_OPTIONS.values())
-                            current_display = CH1_INPUT_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "CH1 Impedance":
-                            from gui.display_map import CH1_IMPEDANCE_OPTIONS
-                            display_values = list(CH1_IMPEDANCE_OPTIONS.values())
-                            current_display = CH1_IMPEDANCE_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "CH1 Ground/Common":
-                            from gui.display_map import CH1_COMMON_OPTIONS
-                            ch1_common_var = tk.StringVar()
-                            ch1_common_var.set(value if value in CH1_COMMON_OPTIONS else "FLOat")
-                            radio_frame = Frame(frame)
-                            radio_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            for code, display in CH1_COMMON_OPTIONS.items():
-                                rb = ttk.Radiobutton(radio_frame, text=display, variable=ch1_common_var, value=code)
-                                rb.pack(side="left", padx=5)
-                            self.entries[(section, label)] = ch1_common_var
-                        elif section == "Analyzer Config" and label == "CH1 Range":
-                            from gui.display_map import CH1_RANGE_OPTIONS
-                            display_values = list(CH1_RANGE_OPTIONS.values())
-                            current_display = CH1_RANGE_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "Ref Imped":
-                            hv_frame = Frame(frame)
-                            hv_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(hv_frame, width=22)
-                            # Parse value and unit (handles "600 Ω", "0.6 kΩ", "600", "0.6kΩ", etc.)
-                            val_str = str(value)
-                            match = re.match(r"^\s*([\d\.\-]+)\s*(k?Ω|k?ohm|k?Ohm)?\s*$", val_str, re.IGNORECASE)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) or "Ω"
-                                unit_part = unit_part.replace("ohm", "Ω").replace("Ohm", "Ω")
-                                if unit_part.lower().startswith("k"):
-                                    unit_part = "kΩ"
-                                else:
-                                    unit_part = "Ω"
-                            else:
-                                val_part = val_str
-                                unit_part = "Ω"
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(hv_frame, values=["Ω", "kΩ"], width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-                            # Conversion logic: when unit changes, convert value
-                            def convert_impedance_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                if old_unit == new_unit:
-                                    return
-                                if old_unit == "Ω" and new_unit == "kΩ":
-                                    val = val / 1000
-                                elif old_unit == "kΩ" and new_unit == "Ω":
-                                    val = val * 1000
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(int(val) if val.is_integer() else round(val, 6)))
-                                combo._last_unit = new_unit
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_impedance_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Analyzer Config" and label == "Start Cond":
-                            from gui.display_map import START_COND_OPTIONS
-                            display_values = list(START_COND_OPTIONS.values())
-                            current_display = START_COND_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Config" and label == "Delay":
-                            delay_frame = Frame(frame)
-                            delay_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(delay_frame, width=22)
-                            # Parse value and unit (handles "2 s", "2000 ms", "0.5 min", etc.)
-                            val_str = str(value)
-                            match = re.match(r"^\s*([\d\.\-]+)\s*(s|ms|us|min)?\s*$", val_str, re.IGNORECASE)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) or "s"
-                                unit_part = unit_part.lower()
-                            else:
-                                val_part = val_str
-                                unit_part = "s"
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            unit_display_map = {"s": "s", "ms": "ms", "us": "μs", "min": "min"}
-                            unit_reverse_map = {v: k for k, v in unit_display_map.items()}
-                            combo = ttk.Combobox(delay_frame, values=list(unit_display_map.values()), width=6, state="readonly")
-                            combo.set(unit_display_map.get(unit_part, unit_part))
-                            combo.pack(side="left")
-                            # Conversion logic: when unit changes, convert value
-                            def convert_delay_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                # Use the display-to-code map
-                                old_unit_display = getattr(combo, '_last_unit', unit_part)
-                                new_unit_display = combo.get()
-                                old_unit = unit_reverse_map.get(old_unit_display, old_unit_display)
-                                new_unit = unit_reverse_map.get(new_unit_display, new_unit_display)
-                                if old_unit == new_unit:
-                                    return
-                                # Conversion factors to seconds
-                                to_sec = {"us": 1e-6, "ms": 1e-3, "s": 1, "min": 60}
-                                from_sec = {"us": 1e6, "ms": 1e3, "s": 1, "min": 1/60}
-                                val_in_sec = val * to_sec.get(old_unit, 1)
-                                new_val = val_in_sec * from_sec.get(new_unit, 1)
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(int(new_val) if new_val.is_integer() else round(new_val, 6)))
-                                combo._last_unit = new_unit_display
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_delay_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Analyzer Config" and label == "MAX FFT Size":
-                            from gui.display_map import MAX_FFT_SIZE_OPTIONS
-                            display_values = list(MAX_FFT_SIZE_OPTIONS.values())
-                            current_display = MAX_FFT_SIZE_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Function Analyzer":
-                            from gui.display_map import FUNCTION_ANALYZER_OPTIONS
-                            display_values = list(FUNCTION_ANALYZER_OPTIONS.values())
-                            current_display = FUNCTION_ANALYZER_OPTIONS.get(value, value)
-                            combo = self._create_combo(frame, display_values, current_display,
-                                                       width=24,
-                                                       grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                                       entry_key=(section, label))
-                            # Bind for dynamic S/N Sequence visibility updates
-                            def _fa_changed(event=None, self=self):
-                                try:
-                                    self._update_analyzer_function_visibility()
-                                except Exception:
-                                    pass
-                            combo.bind('<<ComboboxSelected>>', _fa_changed, add='+')
-                            # Initialize storage for analyzer function rows we may hide dynamically
-                            self._an_func_hidden_rows = getattr(self, '_an_func_hidden_rows', {})
-                        elif section == "Analyzer Function" and label == "S/N Sequence":
-                            var = tk.BooleanVar()
-                            var.set(str(value).upper() == "ON")
-                            chk = tk.Checkbutton(frame, variable=var)
-                            chk.grid(row=i, column=1, sticky="w", pady=2)
-                            self.entries[(section, label)] = var
-                            # Capture row widgets so we can hide/show dynamically
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                # Store tuples of (widget, grid_info)
-                                self._sn_sequence_widgets = [(w, w.grid_info()) for w in row_widgets]
-                                self._sn_sequence_row = i
-                                self._an_func_frame = frame
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Meas Time":
-                            from gui.display_map import MEAS_TIME_OPTIONS
-                            display_values = list(MEAS_TIME_OPTIONS.values())
-                            current_display = MEAS_TIME_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Freq Mode":
-                            from gui.display_map import FREQ_MODE_OPTIONS
-                            display_values = list(FREQ_MODE_OPTIONS.values())
-                            current_display = FREQ_MODE_OPTIONS.get(value, value)
-                            combo = self._create_combo(frame, display_values, current_display,
-                                                       grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                                       entry_key=(section, label))
-                            # Bind to update Factor visibility when Freq Mode changes
-                            def _freq_mode_changed(event=None, self=self):
-                                try:
-                                    self._update_analyzer_function_visibility()
-                                except Exception:
-                                    pass
-                            combo.bind('<<ComboboxSelected>>', _freq_mode_changed, add='+')
-                            # Capture widgets for dynamic hide when Function Analyzer == RMS
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Freq Mode', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Notch(Gain)":
-                            from gui.display_map import NOTCH_OPTIONS
-                            display_values = list(NOTCH_OPTIONS.values())
-                            current_display = NOTCH_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Filter1":
-                            from gui.display_map import FILTER1_OPTIONS
-                            display_values = list(FILTER1_OPTIONS.values())
-                            current_display = FILTER1_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            # Capture for potential RMS Selective hide
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Filter1', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Filter2":
-                            from gui.display_map import FILTER2_OPTIONS
-                            display_values = list(FILTER2_OPTIONS.values())
-                            current_display = FILTER2_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Filter3":
-                            from gui.display_map import FILTER3_OPTIONS
-                            display_values = list(FILTER3_OPTIONS.values())
-                            current_display = FILTER3_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            # Capture for potential RMS Selective hide
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Filter3', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Fnct Settling":
-                            from gui.display_map import FNCT_SETTLING_OPTIONS
-                            display_values = list(FNCT_SETTLING_OPTIONS.values())
-                            current_display = FNCT_SETTLING_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Samples":
-                            # Create an entry for Samples (was missing previously causing empty cell)
-                            try:
-                                entry = Entry(frame, width=22)
-                                entry.insert(0, str(value))
-                                entry.grid(row=i, column=1, sticky="w", pady=2)
-                                self.entries[(section, label)] = entry
-                                # Capture row widgets (label + entry) for dynamic RMS-only visibility
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Samples', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Tolerance":
-                            tol_frame = Frame(frame)
-                            tol_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(tol_frame, width=22)
-                            # Parse value and unit (handles "0.1 %", "0.1 dB", "0.1", etc.)
-                            val_str = str(value)
-                            match = re.match(r"^\s*([\d\.\-]+)\s*(%|dB)?\s*$", val_str, re.IGNORECASE)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) or "%"
-                            else:
-                                val_part = val_str
-                                unit_part = "%"
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            combo = ttk.Combobox(tol_frame, values=["%", "dB"], width=5, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-
-                            def convert_tolerance_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                if old_unit == new_unit:
-                                    return
-                                if old_unit == "%" and new_unit == "dB":
-                                    # Convert percentage to dB using new formula
-                                    if val <= -100:
-                                        entry.delete(0, 'end')
-                                        entry.insert(0, "")
-                                    else:
-                                        db_val = 20 * math.log10(1 + (val / 100))
-                                        entry.delete(0, 'end')
-                                        entry.insert(0, str(round(db_val, 6)))
-                                elif old_unit == "dB" and new_unit == "%":
-                                    # Convert dB to percentage using new formula
-                                    percent_val = (10 ** (val / 20) - 1) * 100
-                                    entry.delete(0, 'end')
-                                    entry.insert(0, str(round(percent_val, 6)))
-                                combo._last_unit = new_unit
-
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_tolerance_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Analyzer Function" and label == "Factor":
-                            # Simple numeric factor with a trailing '*' unit indicator
-                            fac_frame = Frame(frame)
-                            fac_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(fac_frame, width=22)
-                            raw_val = str(value).strip()
-                            # Extract leading numeric (float or int, optional scientific), ignore trailing tokens like 'MLT'
-                            num_match = re.match(r"^[\s]*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)", raw_val)
-                            cleaned = num_match.group(1) if num_match else raw_val
-                            entry.insert(0, cleaned)
-                            # Optionally normalize settings in-memory so future saves drop 'MLT'
-                            try:
-                                if settings.get(section, {}).get(label) != cleaned:
-                                    settings[section][label] = cleaned
-                            except Exception:
-                                pass
-                            entry.pack(side="left", padx=(0, 4))
-                            unit_lbl = Label(fac_frame, text="*", bg=frame["background"], fg="#333")
-                            unit_lbl.pack(side="left")
-                            self.entries[(section, label)] = entry
-                            # Capture for dynamic hide (same rule set as Bandwidth / Sweep Ctrl / Freq Mode)
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Factor', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Resolution":
-                            res_frame = Frame(frame)
-                            res_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(res_frame, width=22)
-                            # Parse value and unit (handles "0.1 dBV", "0.1 V", etc.)
-                            val_str = str(value)
-                            match = re.match(r"^\s*([\d\.\-]+)\s*([a-zA-Z]+)?\s*$", val_str)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) or "V"
-                            else:
-                                val_part = val_str
-                                unit_part = "V"
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            units = ["V", "mV", "uV", "dBV", "dBu", "W", "mW", "uW", "dBm"]
-                            combo = ttk.Combobox(res_frame, values=units, width=6, state="readonly")
-                            combo.set(unit_part)
-                            combo.pack(side="left")
-
-                            def convert_resolution_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit = getattr(combo, '_last_unit', unit_part)
-                                new_unit = combo.get()
-                                if old_unit == new_unit:
-                                    return
-
-                                # Conversion logic
-                                # All conversions go through volts (V) for voltage units and watts (W) for power units
-                                # Reference: 0 dBV = 1 V, 0 dBu = 0.775 V, 0 dBm = 1 mW (in 600 ohm, but usually 1 mW in 1 kohm or 50 ohm for audio/RF)
-                                # We'll use 600 ohm for dBm unless you specify otherwise
-
-                                # Helper functions
-                                def to_volts(val, unit):
-                                    if unit == "V":
-                                        return val
-                                    elif unit == "mV":
-                                        return val / 1e3
-                                    elif unit == "uV":
-                                        return val / 1e6
-                                    elif unit == "dBV":
-                                        return 10 ** (val / 20)
-                                    elif unit == "dBu":
-                                        return 0.775 * (10 ** (val / 20))
-                                    elif unit == "W":
-                                        return math.sqrt(val * 600)
-                                    elif unit == "mW":
-                                        return math.sqrt((val / 1e3) * 600)
-                                    elif unit == "uW":
-                                        return math.sqrt((val / 1e6) * 600)
-                                    elif unit == "dBm":
-                                        # dBm to W: P = 10^(dBm/10) * 1mW, then V = sqrt(P*R)
-                                        p_watt = 10 ** (val / 10) * 1e-3
-                                        return math.sqrt(p_watt * 600)
-                                    else:
-                                        return val
-
-                                def from_volts(v, unit):
-                                    if unit == "V":
-                                        return v
-                                    elif unit == "mV":
-                                        return v * 1e3
-                                    elif unit == "uV":
-                                        return v * 1e6
-                                    elif unit == "dBV":
-                                        return 20 * math.log10(v) if v > 0 else ""
-                                    elif unit == "dBu":
-                                        return 20 * math.log10(v / 0.775) if v > 0 else ""
-                                    elif unit == "W":
-                                        return (v ** 2) / 600
-                                    elif unit == "mW":
-                                        return ((v ** 2) / 600) * 1e3
-                                    elif unit == "uW":
-                                        return ((v ** 2) / 600) * 1e6
-                                    elif unit == "dBm":
-                                        p_watt = (v ** 2) / 600
-                                        return 10 * math.log10(p_watt / 1e-3) if p_watt > 0 else ""
-                                    else:
-                                        return v
-
-                                # Convert old value to volts or watts
-                                v = to_volts(val, old_unit)
-                                # Convert volts to new unit
-                                new_val = from_volts(v, new_unit)
-                                if new_val == "":
-                                    entry.delete(0, 'end')
-                                else:
-                                    entry.delete(0, 'end')
-                                    entry.insert(0, str(round(new_val, 6)))
-                                combo._last_unit = new_unit
-
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_resolution_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Analyzer Function" and label == "Timeout":
-                            timeout_frame = Frame(frame)
-                            timeout_frame.grid(row=i, column=1, sticky="w", pady=2)
-                            entry = Entry(timeout_frame, width=22)
-                            # Parse value and unit (handles "10 s", "10000 ms", etc.)
-                            val_str = str(value)
-                            match = re.match(r"^\s*([\d\.\-]+)\s*(s|ms|us|min)?\s*$", val_str, re.IGNORECASE)
-                            if match:
-                                val_part = match.group(1)
-                                unit_part = match.group(2) or "s"
-                                unit_part = unit_part.lower()
-                            else:
-                                val_part = val_str
-                                unit_part = "s"
-                            entry.insert(0, val_part)
-                            entry.pack(side="left", padx=(0, 8))
-                            unit_display_map = {"s": "s", "ms": "ms", "us": "μs", "min": "min"}
-                            unit_reverse_map = {v: k for k, v in unit_display_map.items()}
-                            combo = ttk.Combobox(timeout_frame, values=list(unit_display_map.values()), width=6, state="readonly")
-                            combo.set(unit_display_map.get(unit_part, unit_part))
-                            combo.pack(side="left")
-                            # Conversion logic: when unit changes, convert value
-                            def convert_timeout_unit(event=None, entry=entry, combo=combo):
-                                try:
-                                    val = float(entry.get())
-                                except Exception:
-                                    return
-                                old_unit_display = getattr(combo, '_last_unit', unit_part)
-                                new_unit_display = combo.get()
-                                old_unit = unit_reverse_map.get(old_unit_display, old_unit_display)
-                                new_unit = unit_reverse_map.get(new_unit_display, new_unit_display)
-                                if old_unit == new_unit:
-                                    return
-                                # Conversion factors to seconds
-                                to_sec = {"us": 1e-6, "ms": 1e-3, "s": 1, "min": 60}
-                                from_sec = {"us": 1e6, "ms": 1e3, "s": 1, "min": 1/60}
-                                val_in_sec = val * to_sec.get(old_unit, 1)
-                                new_val = val_in_sec * from_sec.get(new_unit, 1)
-                                entry.delete(0, 'end')
-                                entry.insert(0, str(int(new_val) if new_val.is_integer() else round(new_val, 6)))
-                                combo._last_unit = new_unit_display
-                            combo._last_unit = unit_part
-                            combo.bind('<<ComboboxSelected>>', convert_timeout_unit)
-                            combo.unbind("<MouseWheel>")
-                            self.bind_combobox_mousewheel(combo)
-                            self.entries[(section, label)] = (entry, combo)
-                        elif section == "Analyzer Function" and label == "Bargraph":
-                            var = tk.BooleanVar()
-                            var.set(str(value).upper() == "ON")
-                            chk = tk.Checkbutton(frame, variable=var)
-                            chk.grid(row=i, column=1, sticky="w", pady=2)
-                            self.entries[(section, label)] = var
-                        elif section == "Analyzer Function" and label == "POST FFT":
-                            var = tk.BooleanVar()
-                            var.set(str(value).upper() == "ON")
-                            chk = tk.Checkbutton(frame, variable=var)
-                            chk.grid(row=i, column=1, sticky="w", pady=2)
-                            self.entries[(section, label)] = var
-                        elif section == "Analyzer Function" and label == "Level Monitor":
-                            from gui.display_map import LEVEL_MONITOR_OPTIONS
-                            display_values = list(LEVEL_MONITOR_OPTIONS.values())
-                            current_display = LEVEL_MONITOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Second Monitor":
-                            from gui.display_map import SECOND_MONITOR_OPTIONS
-                            display_values = list(SECOND_MONITOR_OPTIONS.values())
-                            current_display = SECOND_MONITOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Input Monitor":
-                            from gui.display_map import INPUT_MONITOR_OPTIONS
-                            display_values = list(INPUT_MONITOR_OPTIONS.values())
-                            current_display = INPUT_MONITOR_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Freq/Phase":
-                            from gui.display_map import FREQ_OPTIONS
-                            display_values = list(FREQ_OPTIONS.values())
-                            current_display = FREQ_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                        elif section == "Analyzer Function" and label == "Bandwidth Analyzer Config":
-                            # New combobox for detailed bandwidth pass/stop configuration
-                            from gui.display_map import BANDWIDTH_ANALYZER_CONFIG_OPTIONS
-                            display_values = list(BANDWIDTH_ANALYZER_CONFIG_OPTIONS.values())
-                            current_display = BANDWIDTH_ANALYZER_CONFIG_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            # Capture row widgets for dynamic hide when Function Analyzer == RMS
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Bandwidth Analyzer Config', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Sweep Ctrl Analyzer Config":
-                            # Analyzer sweep control (same display set as generator sweep control)
-                            from gui.display_map import SWEEP_CTRL_OPTIONS
-                            display_values = list(SWEEP_CTRL_OPTIONS.values())
-                            current_display = SWEEP_CTRL_OPTIONS.get(value, value)
-                            self._create_combo(frame, display_values, current_display,
-                                               grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": 2},
-                                               entry_key=(section, label))
-                            # Capture row widgets for dynamic hide when Function Analyzer == RMS
-                            try:
-                                row_widgets = frame.grid_slaves(row=i)
-                                self._an_func_hidden_rows.setdefault('Sweep Ctrl Analyzer Config', [(w, w.grid_info()) for w in row_widgets])
-                            except Exception:
-                                pass
-                        elif section == "Analyzer Function" and label == "Waveform":
-                            var = tk.BooleanVar()
-                            var.set(str(value).upper() == "ON")
-                            chk = tk.Checkbutton(frame, variable=var)
-                            chk.grid(row=i, column=1, sticky="w", pady=2)
-                            self.entries[(section, label)] = var
-                        else:
-                            entry = Entry(frame, width=22)
-                            entry.insert(0, str(value))
-                            entry.grid(row=i, column=1, sticky="w", pady=2)
-                            self.entries[(section, label)] = entry
-                            # Ensure generic dynamic labels (e.g., Points) register their control
-                            if section == "Generator Function" and label in getattr(self, '_gen_func_dynamic_labels', set()):
-                                self._gen_func_widgets.setdefault(label, []).append(entry)
-
-                    # --- Impedance widget logic ---
-                    def set_impedance_widget(output_type_display, selected_code=None):
-                        # Remove previous widget if exists
-                        for widget in self.impedance_frame.grid_slaves(row=self.impedance_row, column=1):
-                            widget.destroy()
-                        if output_type_display == "Unbal":
-                            entry = Entry(self.impedance_frame, width=22, state="normal")
-                            entry.insert(0, IMPEDANCE_OPTIONS_UNBAL["R5"])
-                            entry.config(state="readonly")
-                            entry.grid(row=self.impedance_row, column=1, sticky="w", pady=2)
-                            self.entries[("Generator Config", "Impedance")] = entry
-                        else:
-                            display_values = list(IMPEDANCE_OPTIONS_BAL.values())
-                            reverse_map = {v: k for k, v in IMPEDANCE_OPTIONS_BAL.items()}
-                            if selected_code and selected_code in IMPEDANCE_OPTIONS_BAL:
-                                current_display = IMPEDANCE_OPTIONS_BAL[selected_code]
-                            else:
-                                current_display = display_values[0]
-                            combo = ttk.Combobox(self.impedance_frame, values=display_values, width=20, state="readonly")
-                            combo.set(current_display)
-                            combo.grid(row=self.impedance_row, column=1, sticky="w", pady=2)
-                            combo.unbind("<MouseWheel>")
-                            self.entries[("Generator Config", "Impedance")] = combo
-                            self.bind_combobox_mousewheel(combo)
-
-                    # Initial setup for Impedance widget
-                    if self.output_type_combo:
-                        selected_output_type = self.output_type_combo.get()
-                        set_impedance_widget(selected_output_type, selected_code=impedance_value)
-
-                        # Bind event to Output Type combobox to update Impedance field
-                        def on_output_type_change(event):
-                            selected_display = self.output_type_combo.get()
-                            set_impedance_widget(selected_display)
-                        # Use add='+' so we don't overwrite the preset modification watcher bound in _create_combo
-                        self.output_type_combo.bind("<<ComboboxSelected>>", on_output_type_change, add='+')
-
-            # After building all sections, bind sweep control visibility if present
-            # (Do this inside outer loop but after each section processed; harmless to re-run if not generator function)
-            if ("Generator Function", "Sweep Ctrl") in self.entries and hasattr(self, '_gen_func_widgets'):
+    def _read_display_settings(self):
+        """Read settings.json, normalizing legacy/snapshot unit spellings for display (fixes are persisted)."""
+        if not self._settings_model.path.exists():
+            raise FileNotFoundError(f"{SETTINGS_FILE} not found")
+        settings = self._settings_model.copy()
+
+        # Legacy/snapshot unit spellings -> display spelling (one pass per value, upv.preset_compiler)
+        try:
+            normalization_changes = []  # collect (section, key, old, new)
+            for section_name in ("Analyzer Function", "Generator Function", "Analyzer Config", "Generator Config"):
+                section_dict = settings.get(section_name)
+                if not isinstance(section_dict, dict):
+                    continue
+                for key, val in list(section_dict.items()):
+                    if isinstance(val, str):
+                        norm = normalize_value(val)
+                        if norm != val:
+                            section_dict[key] = norm
+                            normalization_changes.append((section_name, key, val, norm))
+            # Persist back to settings.json if any normalization changes occurred
+            if normalization_changes:
                 try:
-                    sc_widget = self.entries[("Generator Function", "Sweep Ctrl")]
-                    # Ensure single binding
-                    # add='+' so existing modification watcher from _create_combo remains
-                    sc_widget.bind("<<ComboboxSelected>>", lambda e: self._update_sweep_ctrl_visibility(), add='+')
-                    # Apply initial visibility
-                    self._update_sweep_ctrl_visibility()
+                    self._settings_model.write(settings)
                 except Exception:
                     pass
+        except Exception:
+            pass
 
-            # Store frames so we can access canvases later
-            self._panel_frames = frames
-            # Force one immediate recalculation (helps on Windows where first draw is blank)
-            for _section, (inner, canvas) in frames.items():
-                if hasattr(canvas, '_recalc'):
-                    try:
-                        canvas._recalc()
-                    except Exception:
+        # Ensure 'Frequency' exists in 'Generator Function' so it can be shown when Sweep Ctrl is Off
+        try:
+            if isinstance(settings, dict) and "Generator Function" in settings:
+                gf = settings["Generator Function"]
+                if isinstance(gf, dict) and "Frequency" not in gf:
+                    # Insert Frequency after 'Sweep Ctrl' if present, else at beginning
+                    default_freq = "1000 Hz"
+                    new_gf = {}
+                    inserted = False
+                    for k, v in gf.items():
+                        new_gf[k] = v
+                        if k == "Sweep Ctrl":
+                            new_gf["Frequency"] = default_freq
+                            inserted = True
+                    if not inserted:
+                        # Prepend Frequency
+                        new_gf = {"Frequency": default_freq, **new_gf}
+                    settings["Generator Function"] = new_gf
+        except Exception:
+            pass
+        return settings
+
+    def _build_settings_panels(self, settings):
+        """Destroy and rebuild the four scrollable settings panels for *settings*."""
+        # Clear existing panel containers (if any)
+        for widget in self.grid_frame.winfo_children():
+            widget.destroy()
+        self.entries.clear()
+        # Reset analyzer hidden rows registry early so captures during rebuild are guaranteed
+        self._an_func_hidden_rows = {}
+        # Fresh widgets need their own modification watchers
+        self._mod_watchers_attached = False
+
+        sections = [
+            ("Generator Config", 0, 0),
+            ("Analyzer Config", 0, 1),
+            ("Generator Function", 1, 0),
+            ("Analyzer Function", 1, 1)
+        ]
+
+        frames = {}
+        # Build four scrollable panels with fixed header and subtle styling
+        header_bg = "#2c3e50"
+        header_fg = "#ffffff"
+        panel_bg = "#f7f9fa"
+        for section, row, col in sections:
+            container = Frame(self.grid_frame, bd=1, relief="solid", background=panel_bg)
+            container.grid(row=row, column=col, sticky="nsew", padx=10, pady=10)
+            container.grid_rowconfigure(1, weight=1)
+            container.grid_columnconfigure(0, weight=1)
+            # Ensure scrollbar column (index 1) reserves space and never collapses
+            container.grid_columnconfigure(1, minsize=14)
+
+            # Header bar (fixed, not scrolling)
+            header = Frame(container, bg=header_bg)
+            header.grid(row=0, column=0, columnspan=2, sticky="ew")
+            # Header label with zero vertical padding to eliminate gap above first row
+            Label(header, text=section, font=("Helvetica", 12, "bold"), fg=header_fg, bg=header_bg, pady=0, padx=10).pack(side="left")
+            # Add a subtle 1px separator line at bottom to clearly delineate header from scroll area
+            sep = Frame(header, height=1, bg="#1b2732")
+            sep.pack(fill="x", side="bottom")
+
+            # Scrollable content area
+            panel_canvas = Canvas(container, highlightthickness=0, bd=0, background=panel_bg)
+            vscroll = Scrollbar(container, orient="vertical", command=panel_canvas.yview)
+            panel_canvas.configure(yscrollcommand=vscroll.set)
+            panel_canvas.grid(row=1, column=0, sticky="nsew")
+            vscroll.grid(row=1, column=1, sticky="ns")
+
+            # Removed top padding (was pady=10). Keep standard y=0 and rely on visual separator.
+            inner_frame = Frame(panel_canvas, bd=0, background=panel_bg, padx=14, pady=0)
+            window_id = panel_canvas.create_window((0, 0), window=inner_frame, anchor="nw")
+
+            def _make_configure_callback(pc=panel_canvas, fr=inner_frame, wid=window_id):
+                def _on_configure(event):
+                    # Always ensure the embedded frame matches the current canvas width
+                    pc.itemconfig(wid, width=pc.winfo_width())
+                    bbox = pc.bbox("all")
+                    if bbox:
+                        content_height = bbox[3] - bbox[1]
+                        canvas_height = pc.winfo_height()
+                        # Normal scrollregion update
+                        pc.configure(scrollregion=bbox)
+                        # Scenario: when the window is maximized the canvas grows taller so the
+                        # entire content may fit. If the user had previously scrolled, Tk keeps the
+                        # previous yview which produces an apparent blank gap at the top because the
+                        # content is now shorter than the visible area. Force re-alignment to the top
+                        # whenever content fits fully inside the canvas.
+                        if content_height <= canvas_height:
+                            # Keep scrollbar visibility consistent (extend region by 1px so OS themes
+                            # don't sometimes hide the thumb completely on some platforms).
+                            pc.configure(scrollregion=(0, 0, bbox[2], max(canvas_height, content_height) + 1))
+                            pc.yview_moveto(0)
+                        else:
+                            # Only pin to top once on first realization to avoid fighting user scroll.
+                            if not getattr(pc, '_initial_pinned', False):
+                                pc.yview_moveto(0)
+                                pc._initial_pinned = True
+                    else:
+                        # Fallback: no bbox yet; do nothing special.
                         pass
-            # Defer a second pass after geometry is fully settled
-            self.after(80, self._reset_all_panel_views)
-            # Ensure analyzer function dependent visibility matches initial Function Analyzer selection
+                return _on_configure
+            cb = _make_configure_callback()
+            inner_frame.bind("<Configure>", cb)
+            # Also react when canvas itself resizes (first map / window resize)
+            panel_canvas.bind("<Configure>", lambda e, f=cb: f(e))
+            # Keep a reference for manual triggering later
+            panel_canvas._recalc = cb
+
+            # Activate scroll focus when pointer enters this panel
+            panel_canvas.bind("<Enter>", lambda e, pc=panel_canvas: self._activate_scroll(pc))
+            inner_frame.bind("<Enter>", lambda e, pc=panel_canvas: self._activate_scroll(pc))
+
+            frames[section] = (inner_frame, panel_canvas)
+
+        for section, row, col in sections:
+            frame, frame_canvas = frames[section]
+            if section in settings:
+                impedance_row = None
+                impedance_frame = None
+                impedance_value = None
+                if section == "Generator Config":
+                    self.output_type_combo = None  # <-- Only reset for Generator Config
+
+                for i, (label, value) in enumerate(settings[section].items(), start=0):
+                    # Remove extra top gap specifically for first row in Generator Config (use int 0 not tuple)
+                    row_pady = 0 if (section == "Generator Config" and i == 0) else 2
+                    # Dynamic sweep control visibility support for Generator Function section
+                    if section == "Generator Function" and i == 0:
+                        # Initialize storage for row widgets (label + control) we may hide/show
+                        self._gen_func_widgets = {}
+                    # Friendly display names while keeping underlying JSON keys
+                    shown_label = DISPLAY_LABEL_OVERRIDES.get(label, label)
+                    label_widget = Label(frame, text=shown_label, anchor="w", width=22, bg=frame["background"])
+                    label_widget.grid(row=i, column=0, sticky="w", padx=(0,8), pady=row_pady)
+                    field = field_for(section, label)
+                    if field is not None and field.kind == IMPEDANCE:
+                        # Built by set_impedance_widget below: Entry or Combobox depending on Output Type
+                        self.impedance_row = i
+                        self.impedance_frame = frame
+                        impedance_value = value
+                        continue
+                    control = self._build_field_widget(frame, field, section, label, value, settings,
+                                                       grid_kwargs={"row": i, "column": 1, "sticky": "w", "pady": row_pady})
+                    # Register the row with the visibility rule that may hide it
+                    visibility = field.visibility if field is not None else None
+                    if visibility == SWEEP and hasattr(self, '_gen_func_widgets'):
+                        self._gen_func_widgets.setdefault(label, []).extend((label_widget, control))
+                    elif visibility in (ANALYZER, SN_SEQUENCE):
+                        try:
+                            row_widgets = [(w, w.grid_info()) for w in frame.grid_slaves(row=i)]
+                        except Exception:
+                            continue
+                        if visibility == ANALYZER:
+                            self._an_func_hidden_rows.setdefault(label, row_widgets)
+                        else:
+                            self._sn_sequence_widgets = row_widgets
+                            self._sn_sequence_row = i
+                            self._an_func_frame = frame
+
+                # --- Impedance widget logic ---
+                def set_impedance_widget(output_type_display, selected_code=None):
+                    # Remove previous widget if exists
+                    for widget in self.impedance_frame.grid_slaves(row=self.impedance_row, column=1):
+                        widget.destroy()
+                    if output_type_display == "Unbal":
+                        entry = Entry(self.impedance_frame, width=22, state="normal")
+                        entry.insert(0, IMPEDANCE_OPTIONS_UNBAL["R5"])
+                        entry.config(state="readonly")
+                        entry.grid(row=self.impedance_row, column=1, sticky="w", pady=2)
+                        self.entries[("Generator Config", "Impedance")] = entry
+                    else:
+                        display_values = list(IMPEDANCE_OPTIONS_BAL.values())
+                        if selected_code and selected_code in IMPEDANCE_OPTIONS_BAL:
+                            current_display = IMPEDANCE_OPTIONS_BAL[selected_code]
+                        else:
+                            current_display = display_values[0]
+                        combo = ttk.Combobox(self.impedance_frame, values=display_values, width=20, state="readonly")
+                        combo.set(current_display)
+                        combo.grid(row=self.impedance_row, column=1, sticky="w", pady=2)
+                        combo.unbind("<MouseWheel>")
+                        # Recreated on every Output Type change / in-place refresh, after
+                        # _attach_modification_watchers ran: watch it here
+                        combo.bind('<<ComboboxSelected>>', lambda e: self._mark_modified(), add='+')
+                        self.entries[("Generator Config", "Impedance")] = combo
+                        self.bind_combobox_mousewheel(combo)
+
+                # Kept for the in-place refresh (Output Type may change between presets)
+                self._set_impedance_widget = set_impedance_widget
+
+                # Initial setup for Impedance widget
+                if self.output_type_combo:
+                    selected_output_type = self.output_type_combo.get()
+                    set_impedance_widget(selected_output_type, selected_code=impedance_value)
+
+                    # Bind event to Output Type combobox to update Impedance field
+                    def on_output_type_change(event):
+                        selected_display = self.output_type_combo.get()
+                        set_impedance_widget(selected_display)
+                    # Use add='+' so we don't overwrite the preset modification watcher bound in _create_combo
+                    self.output_type_combo.bind("<<ComboboxSelected>>", on_output_type_change, add='+')
+
+        # After building all sections, bind sweep control visibility if present
+        # (Do this inside outer loop but after each section processed; harmless to re-run if not generator function)
+        if ("Generator Function", "Sweep Ctrl") in self.entries and hasattr(self, '_gen_func_widgets'):
             try:
-                # Immediate attempt (handles RMSS presets so Filter1/Filter3 hide right away)
-                self._update_analyzer_function_visibility()
-                # Follow-up after a short delay in case some rows weren't realized yet
-                self.after(120, self._update_analyzer_function_visibility)
+                sc_widget = self.entries[("Generator Function", "Sweep Ctrl")]
+                # Ensure single binding
+                # add='+' so existing modification watcher from _create_combo remains
+                sc_widget.bind("<<ComboboxSelected>>", lambda e: self._update_sweep_ctrl_visibility(), add='+')
+                # Apply initial visibility
+                self._update_sweep_ctrl_visibility()
             except Exception:
                 pass
 
-        except Exception as e:
-            messagebox.showerror("Settings Error", f"Could not load settings.json: {e}")
-        # After (re)loading settings, force user to Apply before sweep
-        if hasattr(self, 'start_sweep_btn'):
-            # Attach modification watchers so ANY change in any panel reverts preset to default
-            try:
-                self._attach_modification_watchers()
-            except Exception:
-                pass
-            self._settings_applied = False
-            self._refresh_start_sweep_state()
+        # Store frames so we can access canvases later
+        self._panel_frames = frames
+        # Force one immediate recalculation (helps on Windows where first draw is blank)
+        for _section, (inner, canvas) in frames.items():
+            if hasattr(canvas, '_recalc'):
+                try:
+                    canvas._recalc()
+                except Exception:
+                    pass
+        # Defer a second pass after geometry is fully settled
+        self.after(80, self._reset_all_panel_views)
+        # Ensure analyzer function dependent visibility matches initial Function Analyzer selection
+        try:
+            # Immediate attempt (handles RMSS presets so Filter1/Filter3 hide right away)
+            self._update_analyzer_function_visibility()
+            # Follow-up after a short delay in case some rows weren't realized yet
+            self.after(120, self._update_analyzer_function_visibility)
+        except Exception:
+            pass
+
+    @staticmethod
+    def _settings_layout_signature(settings):
+        """Section/label layout of a settings dict; equal signatures can share the same widgets."""
+        if not isinstance(settings, dict):
+            return None
+        return tuple((section, tuple(settings[section].keys()))
+                     for section in ("Generator Config", "Analyzer Config", "Generator Function", "Analyzer Function")
+                     if isinstance(settings.get(section), dict))
+
+    def _refresh_settings_in_place(self, settings):
+        """Push *settings* into the existing panel widgets instead of rebuilding them.
+
+        Only the Impedance cell is recreated (its widget type follows Output Type);
+        row visibility is re-evaluated by the usual visibility rules. Returns False
+        when a widget cannot be refreshed, so the caller falls back to a rebuild.
+        """
+        if not self.entries or not self.grid_frame.winfo_children():
+            return False
+        self._suppress_modified = True
+        try:
+            impedance_value = None
+            for section, section_values in settings.items():
+                if not isinstance(section_values, dict):
+                    continue
+                for label, value in section_values.items():
+                    key = (section, label)
+                    if key == ("Generator Config", "Impedance"):
+                        impedance_value = value
+                        continue
+                    widget = self.entries.get(key)
+                    if widget is None or not write_widget(field_for(section, label), widget, value):
+                        return False
+            set_impedance = getattr(self, '_set_impedance_widget', None)
+            if set_impedance is not None and getattr(self, 'output_type_combo', None) is not None:
+                set_impedance(self.output_type_combo.get(), selected_code=impedance_value)
+            self._update_sweep_ctrl_visibility()
+            self._update_analyzer_function_visibility()
+            self.after(80, self._reset_all_panel_views)
+            return True
+        except Exception:
+            return False
+        finally:
+            self._suppress_modified = False
 
     def _mark_modified(self, *args):
         """Handle any user modification.
@@ -1808,6 +892,8 @@ class MainWindow(Frame):
           - Mark settings as not applied (_settings_applied = False).
           - Disable Start Sweep until user clicks 'Apply Settings' again.
         """
+        if getattr(self, '_suppress_modified', False):
+            return  # programmatic refresh (load_settings), not a user edit
         try:
             # Revert preset name if diverged
             if self._current_preset_name != DEFAULT_PRESET_NAME:
@@ -1873,6 +959,16 @@ class MainWindow(Frame):
         self._mod_watchers_attached = True
 
     def apply_settings(self):
+        """Save the panel values to settings.json and apply them to the UPV on a worker thread.
+
+        While the apply job runs the button reads 'Cancel Apply' and clicking it stops the
+        job before its next command. Start Sweep is enabled once the job completes.
+        """
+        job = getattr(self, '_apply_job', None)
+        if job is not None and not job.finished:
+            job.cancel()
+            self.update_status("⏹️ Cancelling apply...", color="orange")
+            return
         try:
             # If a continuous sweep is active, stop it silently before applying new settings
             if getattr(self, '_continuous_active', False):
@@ -1880,370 +976,11 @@ class MainWindow(Frame):
                     self.stop_continuous_sweep(silent=True)
                 except Exception:
                     pass
-            with open(SETTINGS_FILE, "r") as f:
-                settings = json.load(f)
-
-            reverse_instrument_map = {v: k for k, v in INSTRUMENT_GENERATOR_OPTIONS.items()}
-            reverse_channel_map = {v: k for k, v in CHANNEL_GENERATOR_OPTIONS.items()}
-
-            unit_display_map = {"s": "s", "ms": "ms", "us": "μs", "min": "min"}
-            unit_reverse_map = {v: k for k, v in unit_display_map.items()}
+            settings = self._settings_model.copy()
 
+            # One schema lookup per row: codes for option rows, '<number> <unit>' for value rows
             for (section, label), widget in self.entries.items():
-                if section == "Generator Config" and label == "Instrument Generator":
-                    display_value = widget.get()
-                    code_value = reverse_instrument_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Config" and label == "Channel Generator":
-                    display_value = widget.get()
-                    code_value = reverse_channel_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Config" and label == "Output Type (Unbal/Bal)":
-                    display_value = widget.get()
-                    code_value = reverse_output_type_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Config" and label == "Common (Float/Ground)":
-                    settings[section][label] = widget.get()
-                elif section == "Generator Config" and label == "Bandwidth Generator":
-                    from gui.display_map import BANDWIDTH_GENERATOR_OPTIONS
-                    reverse_bw_map = {v: k for k, v in BANDWIDTH_GENERATOR_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_bw_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Config" and label == "Volt Range":
-                    settings[section][label] = widget.get()
-                elif section == "Generator Config" and label == "Max Voltage":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    # Convert micro symbol to ASCII 'u' for UPV compatibility
-                    if unit == "μV":
-                        unit_ascii = "uV"
-                    else:
-                        unit_ascii = unit
-                    # Normalize DBR variants if ever present (shouldn't appear here but keep consistent)
-                    if unit_ascii.lower() == 'dbr':
-                        unit_ascii = 'dBr'
-                    settings[section][label] = f"{val} {unit_ascii}" if val else ""
-                elif section == "Generator Config" and label == "Ref Voltage":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    if unit == "μV":
-                        unit_ascii = "uV"
-                    else:
-                        unit_ascii = unit
-                    if unit_ascii.lower() == 'dbr':
-                        unit_ascii = 'dBr'
-                    settings[section][label] = f"{val} {unit_ascii}" if val else ""
-                elif section == "Generator Config" and label == "Ref Frequency":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif label == "Low Dist":
-                    settings[section][label] = widget.get()
-                elif section == "Generator Function" and label == "Function Generator":
-                    from gui.display_map import FUNCTION_GENERATOR_OPTIONS
-                    reverse_map = {v: k for k, v in FUNCTION_GENERATOR_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Sweep Ctrl":
-                    from gui.display_map import SWEEP_CTRL_OPTIONS
-                    reverse_map = {v: k for k, v in SWEEP_CTRL_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Next Step":
-                    from gui.display_map import NEXT_STEP_OPTIONS
-                    reverse_map = {v: k for k, v in NEXT_STEP_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "X Axis":
-                    from gui.display_map import X_AXIS_OPTIONS
-                    reverse_map = {v: k for k, v in X_AXIS_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Z Axis":
-                    from gui.display_map import Z_AXIS_OPTIONS
-                    reverse_map = {v: k for k, v in Z_AXIS_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Spacing":
-                    from gui.display_map import SPACING_OPTIONS
-                    reverse_map = {v: k for k, v in SPACING_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Frequency":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif section == "Generator Function" and label in ("Start", "Stop"):
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif section == "Generator Function" and label == "Voltage":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    if unit == "μV":
-                        unit_ascii = "uV"
-                    else:
-                        unit_ascii = unit
-                    # Normalize DBR variants to canonical dBr
-                    if unit_ascii.lower() == 'dbr':
-                        unit_ascii = 'dBr'
-                    settings[section][label] = f"{val} {unit_ascii}" if val else ""
-                elif section == "Generator Function" and label == "Filter":
-                    combo, filter_keys, filter_values = widget
-                    selected_display = combo.get()
-                    try:
-                        idx = filter_values.index(selected_display)
-                        selected_key = filter_keys[idx]
-                    except Exception:
-                        selected_key = filter_keys[0]
-                    settings[section][label] = selected_key
-                elif section == "Generator Function" and label == "Halt":
-                    from gui.display_map import HALT_OPTIONS
-                    reverse_map = {v: k for k, v in HALT_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Generator Function" and label == "Equalizer":
-                    settings[section][label] = widget.get()
-                elif section == "Generator Function" and label == "DC Offset":
-                    settings[section][label] = widget.get()
-                elif section == "Analyzer Config" and label == "Instrument Analyzer":
-                    from gui.display_map import INSTRUMENT_ANALYZER_OPTIONS
-                    reverse_map = {v: k for k, v in INSTRUMENT_ANALYZER_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "Channel Analyzer":
-                    from gui.display_map import CHANNEL_ANALYZER_OPTIONS
-                    reverse_map = {v: k for k, v in CHANNEL_ANALYZER_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "CH1 Coupling":
-                    settings[section][label] = widget.get()
-                elif section == "Analyzer Config" and label == "Bandwidth Analyzer":
-                    from gui.display_map import BANDWIDTH_ANALYZER_OPTIONS
-                    reverse_map = {v: k for k, v in BANDWIDTH_ANALYZER_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "Pre Filter":
-                    from gui.display_map import PRE_FILTER_OPTIONS
-                    reverse_map = {v: k for k, v in PRE_FILTER_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "CH1 Input":
-                    from gui.display_map import CH1_INPUT_OPTIONS
-                    reverse_map = {v: k for k, v in CH1_INPUT_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "CH1 Impedance":
-                    from gui.display_map import CH1_IMPEDANCE_OPTIONS
-                    reverse_map = {v: k for k, v in CH1_IMPEDANCE_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "CH1 Ground/Common":
-                    settings[section][label] = widget.get()
-                elif section == "Analyzer Config" and label == "CH1 Range":
-                    from gui.display_map import CH1_RANGE_OPTIONS
-                    reverse_map = {v: k for k, v in CH1_RANGE_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Config" and label == "Ref Imped":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    # Convert symbol to word
-                    if unit == "Ω":
-                        unit_word = "ohm"
-                    elif unit == "kΩ":
-                        unit_word = "kohm"
-                    else:
-                        unit_word = unit
-                    settings[section][label] = f"{val} {unit_word}" if val else ""
-                elif section == "Analyzer Config" and label == "Start Cond":
-                    from gui.display_map import START_COND_OPTIONS
-                    reverse_map = {v: k for k, v in START_COND_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                elif section == "Analyzer Config" and label == "Delay":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit_display = combo.get().strip()
-                    unit = unit_reverse_map.get(unit_display, unit_display)
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif section == "Analyzer Config" and label == "MAX FFT Size":
-                    from gui.display_map import MAX_FFT_SIZE_OPTIONS
-                    reverse_map = {v: k for k, v in MAX_FFT_SIZE_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Function Analyzer":
-                    from gui.display_map import FUNCTION_ANALYZER_OPTIONS
-                    reverse_map = {v: k for k, v in FUNCTION_ANALYZER_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "S/N Sequence":
-                    var = widget
-                    settings[section][label] = "ON" if var.get() else "OFF"
-                elif section == "Analyzer Function" and label == "Meas Time":
-                    from gui.display_map import MEAS_TIME_OPTIONS
-                    reverse_map = {v: k for k, v in MEAS_TIME_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Freq Mode":
-                    from gui.display_map import FREQ_MODE_OPTIONS
-                    reverse_map = {v: k for k, v in FREQ_MODE_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Notch(Gain)":
-                    from gui.display_map import NOTCH_OPTIONS
-                    reverse_map = {v: k for k, v in NOTCH_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Filter1":
-                    from gui.display_map import FILTER1_OPTIONS
-                    reverse_map = {v: k for k, v in FILTER1_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Filter2":
-                    from gui.display_map import FILTER2_OPTIONS
-                    reverse_map = {v: k for k, v in FILTER2_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Filter3":
-                    from gui.display_map import FILTER3_OPTIONS
-                    reverse_map = {v: k for k, v in FILTER3_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Fnct Settling":
-                    from gui.display_map import FNCT_SETTLING_OPTIONS
-                    reverse_map = {v: k for k, v in FNCT_SETTLING_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                elif section == "Analyzer Function" and label == "Tolerance":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    settings[section][label] = f"{val} {unit}" if val else ""
-
-                elif section == "Analyzer Function" and label == "Factor":
-                    # Simple numeric field, store raw string (trimmed)
-                    val = widget.get().strip()
-                    # Extract numeric portion only
-                    num_match = re.match(r"^[\s]*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)", val)
-                    if num_match:
-                        val = num_match.group(1)
-                    settings[section][label] = val
-                elif section == "Analyzer Function" and label == "Resolution":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit = combo.get().strip()
-                    # Force unit to match combobox value exactly (prevents "DBV" if not in combobox)
-                    allowed_units = ["V", "mV", "uV", "dBV", "dBu", "W", "mW", "uW", "dBm"]
-                    if unit not in allowed_units:
-                        # Try to match ignoring case
-                        for u in allowed_units:
-                            if unit.lower() == u.lower():
-                                unit = u
-                                break
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif section == "Analyzer Function" and label == "Timeout":
-                    entry, combo = widget
-                    val = entry.get().strip()
-                    unit_display = combo.get().strip()
-                    unit_reverse_map = {"s": "s", "ms": "ms", "μs": "us", "min": "min"}
-                    unit = unit_reverse_map.get(unit_display, unit_display)
-                    settings[section][label] = f"{val} {unit}" if val else ""
-                elif section == "Analyzer Function" and label == "Bargraph":
-                    var = widget
-                    settings[section][label] = "ON" if var.get() else "OFF"
-                elif section == "Analyzer Function" and label == "POST FFT":
-                    var = widget
-                    settings[section][label] = "ON" if var.get() else "OFF"
-                elif section == "Analyzer Function" and label == "Level Monitor":
-                    from gui.display_map import LEVEL_MONITOR_OPTIONS
-                    reverse_map = {v: k for k, v in LEVEL_MONITOR_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Second Monitor":
-                    from gui.display_map import SECOND_MONITOR_OPTIONS
-                    reverse_map = {v: k for k, v in SECOND_MONITOR_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Input Monitor":
-                    from gui.display_map import INPUT_MONITOR_OPTIONS
-                    reverse_map = {v: k for k, v in INPUT_MONITOR_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Freq/Phase":
-                    from gui.display_map import FREQ_OPTIONS
-                    reverse_map = {v: k for k, v in FREQ_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Waveform":
-                    var = widget
-                    settings[section][label] = "ON" if var.get() else "OFF"
-                elif section == "Analyzer Function" and label == "Sweep Ctrl Analyzer Config":
-                    from gui.display_map import SWEEP_CTRL_OPTIONS
-                    reverse_map = {v: k for k, v in SWEEP_CTRL_OPTIONS.items()}
-                    display_value = widget.get()
-                    code_value = reverse_map.get(display_value, display_value)
-                    settings[section][label] = code_value
-                elif section == "Analyzer Function" and label == "Bandwidth Analyzer Config":
-                            # New detailed bandwidth pass/stop configuration reverse mapping
-                            from gui.display_map import BANDWIDTH_ANALYZER_CONFIG_OPTIONS
-                            reverse_map = {v: k for k, v in BANDWIDTH_ANALYZER_CONFIG_OPTIONS.items()}
-                            display_value = widget.get()
-                            code_value = reverse_map.get(display_value, display_value)
-                            settings[section][label] = code_value
-                else:
-                    settings[section][label] = widget.get()
-
-            # Special handling for Impedance based on widget type
-            imp_widget = self.entries[("Generator Config", "Impedance")]
-            if isinstance(imp_widget, ttk.Combobox):
-                reverse_map = {v: k for k, v in IMPEDANCE_OPTIONS_BAL.items()}
-                display_value = imp_widget.get().strip()
-                code_value = reverse_map.get(display_value)
-                if code_value is None:
-                    for v, k in reverse_map.items():
-                        if v.replace(" ", "").lower() == display_value.replace(" ", "").lower():
-                            code_value = k
-                            break
-                if code_value is None:
-                    code_value = "R10"
-                settings["Generator Config"]["Impedance"] = code_value
-            else:
-                settings["Generator Config"]["Impedance"] = "R5"
+                settings.setdefault(section, {})[label] = read_widget(field_for(section, label), widget)
 
             # --- Prompt user for sweep mode (continuous vs single) and persist to settings.json ---
             try:
@@ -2256,36 +993,123 @@ class MainWindow(Frame):
                 # If dialog fails for any reason, default to existing value or OFF
                 settings.setdefault("INIT:CONT", "OFF")
 
-            with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-                json.dump(settings, f, indent=2, ensure_ascii=False)
+            self._settings_model.write(settings)
 
         except Exception as e:
             messagebox.showerror("Save Error", f"Could not save settings: {e}")
             return
 
         if self.upv:
-            with open(SETTINGS_FILE, "r") as f:
-                updated_settings = json.load(f)
-            apply_grouped_settings(self.upv, data=updated_settings)
-            self.status_label.config(text="Settings applied and saved successfully.")
+            # The dict just written is applied directly (no re-read of settings.json)
+            self._start_apply_job(settings)
         else:
             messagebox.showwarning("Warning", "Not connected to UPV.")
-        # Mark settings as applied regardless of connection so user can attempt sweep after connecting
+            # Mark settings as applied regardless of connection so user can attempt sweep after connecting
+            self._settings_applied = True
+            self._refresh_start_sweep_state()
+
+    def _start_apply_job(self, settings):
+        """Run apply_grouped_settings(settings) as a BackgroundJob with per-section progress."""
+        upv = self.upv
+        self._forget_batch_configuration()
+        # A stop issued just before (apply stops continuous sweeps) must reach the UPV first
+        stop_job = self._stop_job
+        self._settings_applied = False
+        self._refresh_start_sweep_state()
+
+        def log(msg):
+            print(msg)
+            if "❌" in msg:
+                self._thread_safe_status(msg.strip(), color="red")
+
+        def work(job):
+            if stop_job is not None:
+                stop_job.wait(timeout=10.0)
+            return apply_grouped_settings(upv, data=settings, status_callback=log,
+                                          progress_callback=job.report, cancel_event=job.cancel_event,
+                                          lock=self._visa_lock)
+
+        def on_progress(done, total, message):
+            self.update_status(f"⚙️ {message} ({done}/{total})", color="#2c3e50")
+
+        self._apply_job = BackgroundJob(work, name="ApplySettings", dispatch=tk_dispatcher(self),
+                                        on_progress=on_progress, on_done=self._on_apply_done,
+                                        on_error=self._on_apply_error, on_cancelled=self._on_apply_cancelled)
+        self._set_apply_button(running=True)
+        self._apply_job.start()
+
+    def _set_apply_button(self, *, running):
+        try:
+            self.apply_btn.config(text="Cancel Apply" if running else "Apply Settings")
+        except Exception:
+            pass
+
+    def _on_apply_done(self, result):
+        self._apply_job = None
+        self._set_apply_button(running=False)
+        if result is not None and result.errors:
+            label, _msg = result.errors[0]
+            self.update_status(f"⚠️ Settings applied with {len(result.errors)} error(s) (first: {label}).",
+                               color="orange")
+        else:
+            self.update_status("Settings applied and saved successfully.")
         self._settings_applied = True
         self._refresh_start_sweep_state()
 
+    def _on_apply_cancelled(self):
+        self._apply_job = None
+        self._set_apply_button(running=False)
+        self.update_status("⏹️ Apply cancelled - instrument settings are incomplete.", color="orange")
+        self._settings_applied = False
+        self._refresh_start_sweep_state()
+
+    def _on_apply_error(self, exc):
+        self._apply_job = None
+        self._set_apply_button(running=False)
+        self._settings_applied = False
+        self._refresh_start_sweep_state()
+        messagebox.showerror("Apply Failed", f"Could not apply settings: {exc}")
+
     def fetch_data(self):
         if self.upv:
             export_path = filedialog.asksaveasfilename(defaultextension=".hxml",
                                                        filetypes=[("HXML files", "*.hxml"), ("All files", "*.*")])
             if export_path:
-                # Use preset name (self._current_preset_name) as CurveDataName source; unified format handled in helper
-                try:
-                    fetch_and_plot_trace(self.upv, export_path, working_title=self._current_preset_name)
-                except TypeError:
-                    fetch_and_plot_trace(self.upv, export_path)
-                except Exception as e:
-                    messagebox.showerror("Export Error", f"Failed to export sweep: {e}")
+                # The trace and its unit are read right away on a short BackgroundJob (a combined
+                # export queued ahead must not delay them past a re-apply or re-sweep); only the
+                # file write is queued on the export worker. The preset name
+                # (self._current_preset_name) is the CurveDataName source.
+                preset_name = self._current_preset_name
+                upv = self.upv
+
+                def _fetch(job):
+                    x_vals, y_vals = fetch_trace(upv, query=lambda cmd: self._safe_query(cmd, timeout_ms=3000))
+                    return [build_export_trace(x_vals, y_vals, export_path, preset_name, read_y_unit())]
+
+                def _fetched(traces):
+                    self._export_service.submit(ExportJob(
+                        export_path, traces, smoothing=self._smoothing_fraction(for_export=True),
+                        label="Sweep export", on_done=_done, on_error=_failed))
+
+                def _fetch_failed(exc):
+                    self.update_status("Export failed", color="red")
+                    messagebox.showerror("Export Error", f"Failed to read the sweep: {exc}")
+
+                def _done(job):
+                    trace = job.written[0]
+                    self.update_status(f"💾 Saved {job.path.name}")
+                    try:
+                        plot_trace(trace['x'], trace['y'], job.path, trace['unit'])
+                    except Exception as e:
+                        print(f"❌ Failed to plot trace: {e}")
+
+                def _failed(job, exc):
+                    self.update_status("Export failed", color="red")
+                    messagebox.showerror("Export Error", f"Failed to export sweep: {exc}")
+
+                self.update_status(f"💾 Exporting {Path(export_path).name}...")
+                BackgroundJob(_fetch, name="SweepFetch", dispatch=tk_dispatcher(self),
+                              on_done=_fetched, on_error=_fetch_failed).start()
         else:
             messagebox.showwarning("Warning", "Not connected to UPV.")
 
@@ -2315,20 +1139,9 @@ class MainWindow(Frame):
                 self.upv.timeout = 30000
             except Exception:
                 pass
-            status_callback("⚙️ Preparing for {} sweep...".format("continuous" if continuous else "single"))
-            try:
-                self.upv.write("OUTP ON")
-            except Exception:
-                pass
-            try:
-                self.upv.write("INIT:CONT ON" if continuous else "INIT:CONT OFF")
-            except Exception:
-                pass
             status_callback("▶️ Starting {} sweep...".format("continuous" if continuous else "single"))
-            try:
-                self.upv.write("INIT")
-            except Exception:
-                pass
+            # Same start sequence as the headless runner (single sweeps also arm *OPC)
+            trigger_sweep(self.upv, continuous=continuous, lock=self._visa_lock)
             if continuous:
                 status_callback("🔄 Continuous sweep running (preset override).")
                 try:
@@ -2342,11 +1155,6 @@ class MainWindow(Frame):
                     self.stop_sweep_btn.config(state="normal")
                 self.after(600, lambda: self._init_live_sweep_display())
             else:
-                try:
-                    self.upv.write("*CLS")
-                    self.upv.write("*OPC")
-                except Exception:
-                    pass
                 status_callback("⏳ Single sweep running (live)...")
                 self._single_sweep_in_progress = True
                 self._single_sweep_done = False
@@ -2361,6 +1169,9 @@ class MainWindow(Frame):
                 self._refresh_start_sweep_state()
             except Exception:
                 pass
+            # The first sequence preset waits in ARM for this button press
+            if self._sequence is not None and self._sequence.waiting_for(ARM):
+                self._sequence.resume()
         except Exception as e:
             status_callback(f"❌ Failed to start sweep: {e}")
             try:
@@ -2392,13 +1203,12 @@ class MainWindow(Frame):
             self.update_status("⚠️ Single sweep ended (timeout/abort).", color="orange")
         # One last gentle axis freeze (skip full polling to reduce race risk)
         try:
-            if hasattr(self, '_live_ax') and hasattr(self, '_live_line') and self._live_line is not None:
-                xdata = list(getattr(self._live_line, 'get_xdata', lambda: [])())
-                ydata = list(getattr(self._live_line, 'get_ydata', lambda: [])())
-                if xdata and ydata:
-                    self._apply_fixed_freq_and_auto_level(self._live_ax, xdata, ydata)
-                    if hasattr(self, '_live_canvas'):
-                        self._live_canvas.draw_idle()
+            renderer = getattr(self, '_live_renderer', None)
+            if hasattr(self, '_live_ax') and renderer is not None:
+                # Full-resolution data of the last tick (the line itself may be decimated)
+                if len(renderer.x) and len(renderer.y):
+                    changed = self._apply_fixed_freq_and_auto_level(self._live_ax, renderer.x, renderer.y)
+                    renderer.refresh(full=changed)
         except Exception:
             pass
         # Show popup only if root still alive
@@ -2409,36 +1219,16 @@ class MainWindow(Frame):
                 return
         except Exception:
             pass
+        in_sequence = self._sequence_running()
         # Offer export only after popup when NOT in a sequence; sequences export once at end
-        if success and not getattr(self, '_sequence_active', False):
+        if success and not in_sequence:
             try:
                 self.fetch_data()
             except Exception:
                 pass
-        # Collect trace data for sequence aggregation
-        if success and getattr(self, '_sequence_active', False):
-            try:
-                x_raw = self._safe_query("TRAC:SWE1:LOAD:AX?", timeout_ms=3000)
-                y_raw = self._safe_query("TRAC:SWE1:LOAD:AY?", timeout_ms=3000)
-                x_vals, y_vals = [], []
-                if x_raw and y_raw:
-                    try:
-                        x_vals = [float(v) for v in x_raw.split(',') if v.strip()]
-                        y_vals = [float(v) for v in y_raw.split(',') if v.strip()]
-                    except Exception:
-                        x_vals, y_vals = [], []
-                if x_vals and y_vals and len(x_vals) == len(y_vals):
-                    self._sequence_collected_traces.append({
-                        'name': self._current_preset_name,
-                        'x': x_vals,
-                        'y': y_vals,
-                        'unit': self._resolve_y_unit_from_settings() or 'dBV'
-                    })
-            except Exception:
-                pass
         try:
             # If sequence is active, keep settings applied for next preset auto-load; else revert
-            if getattr(self, '_sequence_active', False):
+            if in_sequence:
                 self.update_status("Sweep finished.")
             else:
                 self._settings_applied = False
@@ -2451,77 +1241,66 @@ class MainWindow(Frame):
             self._refresh_start_sweep_state()
         except Exception:
             pass
-        # Sequence continuation (new model)
-        try:
-            if getattr(self, '_sequence_active', False):
-                # Automatic continuation: if more presets remain, proceed without prompting
-                remaining = len(getattr(self, '_sequence_presets', [])) - getattr(self, '_sequence_index', -1) - 1
-                if remaining > 0:
-                    # Reset single sweep done flag for next run
-                    self._single_sweep_done = False
-                    self._sequence_index += 1
-                    self.after(150, lambda: self._apply_preset_and_start(self._sequence_index))
-                else:
-                    # Final sequence completion -> single combined export
-                    self.update_status("Sequence completed. Preparing combined export...")
-                    self._sequence_active = False
-                    self.after(120, self._export_combined_sequence_hxml)
-        except Exception:
-            pass
+        # Sequence continuation: the engine moves on to COLLECT (or skips a failed sweep) right away
+        if in_sequence and self._sequence.waiting_for(SWEEP):
+            self._sequence.resume(error=None if success else TimeoutError("sweep ended (timeout/abort)"))
 
     def stop_continuous_sweep(self, silent: bool = False):
-        """Stop an active continuous sweep and (optionally) fetch current data.
+        """Stop an active continuous sweep without blocking the GUI.
+
+        Polling stops immediately; INIT:CONT OFF / ABOR / *OPC? are sent by a
+        BackgroundJob at URGENT priority on the VISA lock, ahead of queued trace
+        polls (see upv.instrument_io). Buttons and status update when *OPC?
+        confirms or times out.
 
         Parameters:
-            silent (bool): When True, suppress dialogs and data fetch. Used when stopping
+            silent (bool): When True, suppress dialogs. Used when stopping
                            implicitly (e.g., before applying settings)."""
         if self.upv is None:
             messagebox.showerror("Sweep Error", "UPV is not connected.")
-            return
+            return None
         if not self._continuous_active:
             if not silent:
                 messagebox.showinfo("Sweep", "No continuous sweep is currently running.")
-            return
-        try:
-            self.update_status("⏹ Stopping continuous sweep...")
-            # Turn off continuous mode; this stops further automatic re-triggers
-            self.upv.write("INIT:CONT OFF")
-            # Optional abort (ignore if unsupported)
+            return None
+        upv = self.upv
+        self.update_status("⏹ Stopping continuous sweep...")
+        # The acquisition loop checks this flag every iteration, so no further polls are queued
+        self._continuous_active = False
+        # Mark settings as needing re-apply after a run stop
+        self._settings_applied = False
+        for btn in ('stop_sweep_btn', 'start_sweep_btn'):
             try:
-                self.upv.write("ABOR")
+                getattr(self, btn).config(state="disabled")
             except Exception:
                 pass
-            # Small confirmation wait (best-effort)
-            prev_timeout = getattr(self.upv, 'timeout', 2000)
+
+        def on_done(confirmed):
+            self._stop_job = None
+            if confirmed:
+                self.update_status("✅ Continuous sweep stopped.")
+            else:
+                self.update_status("⚠️ Stop sent; the UPV did not confirm within 5 s.", color="orange")
+            self._refresh_start_sweep_state()
+
+        def on_error(e):
+            self._stop_job = None
+            # The instrument may still be sweeping: allow another Stop attempt
+            self._continuous_active = True
             try:
-                self.upv.timeout = 5000
-                try:
-                    self.upv.query("*OPC?")
-                except Exception:
-                    pass
-            finally:
-                self.upv.timeout = prev_timeout
-            self._continuous_active = False
-            if hasattr(self, 'stop_sweep_btn'):
-                self.stop_sweep_btn.config(state="disabled")
-            if hasattr(self, 'start_sweep_btn'):
-                # Respect gating (may remain disabled if settings not applied or not connected)
-                try:
-                    # Mark settings as needing re-apply after a run stop
-                    self._settings_applied = False
-                    self.start_sweep_btn.config(state="disabled")
-                except Exception:
-                    pass
-                self._refresh_start_sweep_state()
-            self.update_status("✅ Continuous sweep stopped.")
-            if not silent:
-                # No automatic fetch or dialog per user request; simply end silently with status label update
+                self.stop_sweep_btn.config(state="normal")
+            except Exception:
                 pass
-        except Exception as e:
             self.update_status(f"❌ Failed to stop sweep: {e}", color="red")
             if not silent:
                 messagebox.showerror("Sweep Error", f"Failed to stop continuous sweep: {e}")
+            self._refresh_start_sweep_state()
 
+        self._stop_job = BackgroundJob(lambda job: abort_sweep(upv, lock=self._visa_lock), name="StopSweep",
+                                       dispatch=tk_dispatcher(self), on_done=on_done, on_error=on_error)
+        return self._stop_job.start()
+
+    @profiled("connect_to_upv", "gui")
     def connect_to_upv(self):
         """Connect to the UPV asynchronously to avoid GUI freeze / flicker."""
         if self._connecting:
@@ -2534,12 +1313,14 @@ class MainWindow(Frame):
         except Exception:
             pass
         self.upv = None
+        self._forget_batch_configuration()
         self._anim_scan_tick()
 
+        @profiled("connect_to_upv (worker)", "visa")
         def worker():
             rm = None
             try:
-                rm = pyvisa.ResourceManager()
+                rm = resource_manager()
                 visa_address = load_config()
                 if visa_address:
                     for attempt in range(2):
@@ -2549,6 +1330,7 @@ class MainWindow(Frame):
                             inst.timeout = 5000
                             idn = inst.query("*IDN?").strip()
                             self.upv = inst
+                            self._upv_idn = idn
                             self._thread_safe_status(f"✅ Connected: {idn}")
                             break
                         except Exception as e:  # retry next
@@ -2569,6 +1351,7 @@ class MainWindow(Frame):
                         inst.timeout = 5000
                         idn = inst.query("*IDN?").strip()
                         self.upv = inst
+                        self._upv_idn = idn
                         self._thread_safe_status(f"✅ Connected: {idn}")
                     except Exception as e:
                         self._thread_safe_status(f"❌ Failed to connect: {e}", color="red")
@@ -2585,123 +1368,103 @@ class MainWindow(Frame):
 
         threading.Thread(target=worker, daemon=True).start()
     def snapshot_upv(self):
-        """Capture current UPV settings and save them to a JSON snapshot file (async-safe)."""
+        """Capture current UPV settings into a JSON snapshot file on a background job.
+
+        Queries share the VISA lock with live trace polling (NORMAL priority, so
+        they go ahead of queued polls). Clicking the button again cancels.
+        """
+        job = getattr(self, '_snapshot_job', None)
+        if job is not None and not job.finished:
+            job.cancel()
+            self.update_status("⏹️ Cancelling snapshot...", color="orange")
+            return
         if self.upv is None:
             messagebox.showerror("Snapshot Error", "UPV is not connected.")
             return
-        try:
-            from upv.upv_readback import save_settings_snapshot
-            dest = filedialog.asksaveasfilename(
-                defaultextension=".json",
-                filetypes=[("JSON files", "*.json")],
-                title="Save UPV Settings Snapshot As",
-                initialfile="snapshot.json"
-            )
-            if not dest:
-                self.update_status("Snapshot cancelled.", color="orange")
-                return
-            mode_continuous = messagebox.askyesno(
-                "Sweep Mode",
-                "Save snapshot as continuous sweep?\nYes = Continuous\nNo = Single"
-            )
-            out_path = save_settings_snapshot(self.upv, Path(dest))
-            try:
-                with open(out_path, 'r', encoding='utf-8') as f:
-                    snap_data = json.load(f)
-                snap_data["INIT:CONT"] = "ON" if mode_continuous else "OFF"
-                with open(out_path, 'w', encoding='utf-8') as f:
-                    json.dump(snap_data, f, indent=2, ensure_ascii=False)
-            except Exception:
-                pass
+        dest = filedialog.asksaveasfilename(
+            defaultextension=".json",
+            filetypes=[("JSON files", "*.json")],
+            title="Save UPV Settings Snapshot As",
+            initialfile="snapshot.json"
+        )
+        if not dest:
+            self.update_status("Snapshot cancelled.", color="orange")
+            return
+        mode_continuous = messagebox.askyesno(
+            "Sweep Mode",
+            "Save snapshot as continuous sweep?\nYes = Continuous\nNo = Single"
+        )
+
+        def query(cmd):
+            resp = self._safe_query(cmd, timeout_ms=3000, priority=NORMAL)
+            if resp is None:
+                raise IOError("no response")
+            return resp
+
+        def work(job):
+            return save_settings_snapshot(None, Path(dest), extra={"INIT:CONT": "ON" if mode_continuous else "OFF"},
+                                          query=query, progress_callback=job.report,
+                                          cancel_event=job.cancel_event)
+
+        def on_progress(done, total, message):
+            self.update_status(f"📸 {message} ({done}/{total})", color="#2c3e50")
+
+        def on_done(out_path):
+            self._snapshot_job = None
+            self._set_snapshot_button(running=False)
             self.update_status(f"Snapshot saved: {out_path.name}")
             messagebox.showinfo(
                 "Snapshot Saved",
                 f"Settings snapshot saved to:\n{out_path}\nSweep Mode: {'Continuous' if mode_continuous else 'Single'}"
             )
-        except Exception as e:
+
+        def on_cancelled():
+            self._snapshot_job = None
+            self._set_snapshot_button(running=False)
+            self.update_status("⏹️ Snapshot cancelled - no file written.", color="orange")
+
+        def on_error(exc):
+            self._snapshot_job = None
+            self._set_snapshot_button(running=False)
             self.update_status("Snapshot failed", color="red")
-            messagebox.showerror("Snapshot Error", f"Failed to create snapshot: {e}")
+            messagebox.showerror("Snapshot Error", f"Failed to create snapshot: {exc}")
+
+        self._snapshot_job = BackgroundJob(work, name="Snapshot", dispatch=tk_dispatcher(self),
+                                           on_progress=on_progress, on_done=on_done,
+                                           on_error=on_error, on_cancelled=on_cancelled)
+        self._set_snapshot_button(running=True)
+        self._snapshot_job.start()
+
+    def _set_snapshot_button(self, *, running):
+        try:
+            self.snapshot_btn.config(text="Cancel Snapshot" if running else "Snapshot Settings")
+        except Exception:
+            pass
 
     # ---------------- Live Sweep Display (Auto Refresh) -----------------
     def _init_live_sweep_display(self):
         """Setup (or reuse) live sweep window and start background acquisition & GUI consumer."""
         if self.upv is None:
             return
-        from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
-        from matplotlib.figure import Figure
-        # Decide whether to create a new window (sequence wants a fresh window per preset)
+        # Sequence steps / manual starts request a fresh view (new tab or overlay line);
+        # otherwise the current view is reused. Old views are evicted beyond the cap.
         force_new = getattr(self, '_force_new_live_window', False)
-        create_new = force_new or not hasattr(self, '_sweep_plot_win') or self._sweep_plot_win is None or not self._sweep_plot_win.winfo_exists()
-        if create_new:
-            try:
-                win = Toplevel(self.master)
-                win.title("Live Sweep")
-                win.geometry("700x450")
-                fig = Figure(figsize=(7, 4.2), dpi=100)
-                ax = fig.add_subplot(111)
-                ax.set_xscale('log')
-                ax.set_xlabel('Frequency (Hz)')
-                ax.set_ylabel(f'Level ({self._resolve_y_unit_from_settings()})')
-                try:
-                    plot_title = self._current_preset_name or 'Live Sweep'
-                except Exception:
-                    plot_title = 'Live Sweep'
-                ax.set_title(plot_title)
-                ax.grid(True, which='both', ls='--', linewidth=0.5)
-                try:
-                    ax.set_xlim(100, 12000)
-                except Exception:
-                    pass
-                fig.tight_layout()
-                canvas = FigureCanvasTkAgg(fig, master=win)
-                canvas.draw()
-                canvas.get_tk_widget().pack(fill='both', expand=True)
-                self._live_fig = fig
-                self._live_ax = ax
-                self._live_canvas = canvas
-                try:
-                    (self._live_line,) = ax.semilogx([], [], color='C0')
-                except Exception:
-                    self._live_line = None
-                # Assign latest window reference
-                self._sweep_plot_win = win
-                def _on_close(local_win=win):
-                    """Robust per-window close handler.
-
-                    Ensures the specific window being closed is destroyed, removed from
-                    tracking list, and acquisition/polling threads stopped ONLY if no
-                    remaining live sweep windows are open.
-                    """
-                    try:
-                        # Remove from tracking list
-                        self._live_windows = [info for info in self._live_windows if info.get('win') is not local_win]
-                    except Exception:
-                        pass
-                    try:
-                        if local_win is self._sweep_plot_win:
-                            self._sweep_plot_win = None
-                    except Exception:
-                        pass
-                    try:
-                        local_win.destroy()
-                    except Exception:
-                        pass
-                    # If no remaining live windows, stop acquisition / polling
-                    try:
-                        if not self._live_windows:
-                            self._live_consumer_started = False
-                            self._stop_acquisition_thread()
-                    except Exception:
-                        pass
-                win.protocol("WM_DELETE_WINDOW", _on_close)
-                # Track this window so previous graphs remain visible
-                try:
-                    self._live_windows.append({'win': win, 'fig': fig, 'ax': ax, 'line': self._live_line})
-                except Exception:
-                    pass
-                self._force_new_live_window = False
-            except Exception:
-                return
+        try:
+            plot_title = self._current_preset_name or 'Live Sweep'
+        except Exception:
+            plot_title = 'Live Sweep'
+        try:
+            view = self._live_views.view(plot_title, f'Level ({self._resolve_y_unit_from_settings()})',
+                                         force_new=force_new)
+            self._live_fig = view.fig
+            self._live_ax = view.ax
+            self._live_canvas = view.canvas
+            self._live_line = view.line
+            # Blitting renderer: per-tick updates redraw only the trace line
+            self._live_renderer = view.renderer
+            self._force_new_live_window = False
+        except Exception:
+            return
         # Start acquisition thread if needed
         if self._acq_thread is None or not self._acq_thread.is_alive():
             self._start_acquisition_thread()
@@ -2710,6 +1473,16 @@ class MainWindow(Frame):
             self._live_consumer_started = True
             self.after(120, self._poll_live_sweep)
 
+    def _on_live_views_closed(self):
+        """Live window closed by the user: stop acquisition / polling."""
+        try:
+            self._live_consumer_started = False
+            self._live_renderer = None
+            self._stop_acquisition_thread()
+        except Exception:
+            pass
+
+    @profiled("_poll_live_sweep", "gui")
     def _poll_live_sweep(self):
         """GUI consumer: apply latest queued data to plot (non-blocking)."""
         try:
@@ -2724,25 +1497,23 @@ class MainWindow(Frame):
                     latest = self._data_queue.get_nowait()
                 except queue.Empty:
                     break
-            if latest and hasattr(self, '_live_ax'):
+            if latest and self._live_views.is_open() and self._live_views.current is not None:
                 x_vals, y_vals = latest
                 unit_display = self._resolve_y_unit_from_settings()
-                ax = self._live_ax
-                try:
-                    if getattr(self, '_live_line', None) is not None:
-                        self._live_line.set_data(x_vals, y_vals)
-                    else:
-                        (self._live_line,) = ax.semilogx(x_vals, y_vals, color='C0')
-                    ax.set_ylabel(f'Level ({unit_display})')
-                    self._apply_fixed_freq_and_auto_level(ax, x_vals, y_vals)
-                except Exception:
-                    pass
+                fraction = self._smoothing_fraction()
+                if fraction:
+                    x_vals, y_vals = process_trace(x_vals, y_vals, fraction, unit=unit_display)
+                view = self._live_views.current
+                ax = self._live_ax = view.ax
+                self._live_renderer = view.renderer
                 try:
-                    self._live_canvas.draw_idle()
+                    limits_changed = self._apply_fixed_freq_and_auto_level(ax, x_vals, y_vals)
+                    self._live_renderer.update(x_vals, y_vals, ylabel=f'Level ({unit_display})',
+                                               full_redraw=limits_changed)
                 except Exception:
                     pass
         finally:
-            if hasattr(self, '_sweep_plot_win') and self._sweep_plot_win and self._sweep_plot_win.winfo_exists() and self._live_consumer_started:
+            if self._live_views.is_open() and self._live_consumer_started:
                 self.after(120, self._poll_live_sweep)
 
     # ---------------- Acquisition Thread Management -----------------
@@ -2770,12 +1541,25 @@ class MainWindow(Frame):
             if not active:
                 # If single sweep finished and not continuous, we can slow down / exit thread if window closed
                 if not self._continuous_active and not getattr(self, '_single_sweep_in_progress', False):
-                    if not hasattr(self, '_sweep_plot_win') or not (self._sweep_plot_win and self._sweep_plot_win.winfo_exists()):
+                    if not self._live_views.is_open():
                         break  # no need to keep thread alive
                 time.sleep(0.25)
                 continue
-            x_raw = self._safe_query("TRAC:SWE1:LOAD:AX?", timeout_ms=2500)
-            y_raw = self._safe_query("TRAC:SWE1:LOAD:AY?", timeout_ms=2500)
+            # One acquisition iteration = trace query + parse (sleeps excluded)
+            with span("_acquisition_loop iteration", "visa"):
+                x_raw = self._safe_query("TRAC:SWE1:LOAD:AX?", timeout_ms=2500, priority=POLL)
+                # Back off between the two queries if a stop is waiting for the session
+                if self._visa_lock.urgent_waiting():
+                    time.sleep(0.05)
+                    continue
+                y_raw = self._safe_query("TRAC:SWE1:LOAD:AY?", timeout_ms=2500, priority=POLL)
+                x_vals = y_vals = None
+                if x_raw is not None and y_raw is not None:
+                    try:
+                        x_vals = [float(v) for v in x_raw.split(',') if v.strip()]
+                        y_vals = [float(v) for v in y_raw.split(',') if v.strip()]
+                    except Exception:
+                        x_vals = y_vals = None
             if x_raw is None or y_raw is None:
                 self._acq_fail_count += 1
                 if self._acq_fail_count == 5:
@@ -2783,10 +1567,7 @@ class MainWindow(Frame):
                 time.sleep(0.35)
                 continue
             self._acq_fail_count = 0
-            try:
-                x_vals = [float(v) for v in x_raw.split(',') if v.strip()]
-                y_vals = [float(v) for v in y_raw.split(',') if v.strip()]
-            except Exception:
+            if x_vals is None:
                 time.sleep(0.18)
                 continue
             if len(x_vals) != len(y_vals):
@@ -2817,13 +1598,9 @@ class MainWindow(Frame):
                 time.sleep(0.4)
             # Single sweep completion detection via ESR bit 0
             if getattr(self, '_single_sweep_in_progress', False) and not self._continuous_active:
-                esr = self._safe_query("*ESR?", timeout_ms=600)
+                esr = self._safe_query("*ESR?", timeout_ms=600, priority=POLL)
                 if esr is not None:
-                    try:
-                        esr_val = int(float(esr))
-                    except Exception:
-                        esr_val = 0
-                    if esr_val & 0x01:
+                    if operation_complete(esr):
                         try:
                             self._thread_safe_status("Single sweep complete", color="green")
                         except Exception:
@@ -2843,51 +1620,27 @@ class MainWindow(Frame):
         # exiting
 
     def destroy(self):  # override
+        try:
+            if self._sequence_running():
+                self._sequence.cancel()
+        except Exception:
+            pass
         try:
             self._stop_acquisition_thread()
         except Exception:
             pass
-        return super().destroy()
-
-    def _is_continuous_sweep_enabled(self):
-        """Determine if preset/settings JSON requests continuous sweep (INIT:CONT ON).
-
-        Priority order / accepted forms (case-insensitive):
-          1. Top-level key "INIT:CONT": "ON" | "OFF"
-          2. Top-level key "SweepMode": "CONT" / "CONTINUOUS" / "ON" (anything else = single)
-          3. Top-level key "ContinuousSweep": true/false
-
-        Example additions to preset JSON (any ONE of these):
-          { "INIT:CONT": "ON" }
-          { "SweepMode": "CONT" }
-          { "ContinuousSweep": true }
-
-        Returns True if continuous sweep requested, False otherwise.
-        """
+        # Let queued exports finish writing before the process exits
         try:
-            with open(SETTINGS_FILE, 'r', encoding='utf-8') as f:
-                data = json.load(f)
+            if self._export_service.pending:
+                self._export_service.shutdown(timeout=15.0)
         except Exception:
-            return False
-
-        # 1. Explicit SCPI style key
-        init_cont = data.get("INIT:CONT")
-        if isinstance(init_cont, str) and init_cont.strip().upper() == "ON":
-            return True
-        if isinstance(init_cont, str) and init_cont.strip().upper() == "OFF":
-            return False
-
-        # 2. Mode key
-        sweep_mode = data.get("SweepMode")
-        if isinstance(sweep_mode, str) and sweep_mode.strip().upper() in {"CONT", "CONTINUOUS", "ON"}:
-            return True
-
-        # 3. Boolean helper key
-        cont_flag = data.get("ContinuousSweep")
-        if isinstance(cont_flag, bool):
-            return cont_flag
+            pass
+        return super().destroy()
 
-        return False
+    def _is_continuous_sweep_enabled(self):
+        """True if settings.json requests continuous sweep (INIT:CONT ON, SweepMode CONT or
+        ContinuousSweep true; see upv.settings_model.continuous_sweep_requested)."""
+        return self._settings_model.continuous
 
     def _activate_scroll(self, canvas):
         self.active_scroll_canvas = canvas
@@ -2932,11 +1685,8 @@ class MainWindow(Frame):
             return
 
         current_display = sc_widget.get().strip()
-        # Determine if OFF; fetch mapping
         try:
-            from gui.display_map import SWEEP_CTRL_OPTIONS
-            reverse_map = {v: k for k, v in SWEEP_CTRL_OPTIONS.items()}
-            code = reverse_map.get(current_display, current_display)
+            code = read_widget(field_for("Generator Function", "Sweep Ctrl"), sc_widget)
         except Exception:
             code = current_display
 
@@ -3029,10 +1779,8 @@ class MainWindow(Frame):
             fa_widget = self.entries.get(("Analyzer Function", "Function Analyzer"))
             if not fa_widget:
                 return
+            code = read_widget(field_for("Analyzer Function", "Function Analyzer"), fa_widget)
             current_display = fa_widget.get().strip()
-            from gui.display_map import FUNCTION_ANALYZER_OPTIONS
-            reverse_map = {v: k for k, v in FUNCTION_ANALYZER_OPTIONS.items()}
-            code = reverse_map.get(current_display, current_display)
 
             # S/N Sequence handling (hide if RMSS)
             widgets = getattr(self, '_sn_sequence_widgets', None)
@@ -3180,9 +1928,7 @@ class MainWindow(Frame):
             try:
                 freq_widget = self.entries.get(("Analyzer Function", "Freq Mode"))
                 if freq_widget:
-                    from gui.display_map import FREQ_MODE_OPTIONS
-                    rev_freq = {v: k for k, v in FREQ_MODE_OPTIONS.items()}
-                    freq_code = rev_freq.get(freq_widget.get().strip(), freq_widget.get().strip())
+                    freq_code = read_widget(field_for("Analyzer Function", "Freq Mode"), freq_widget)
                     factor_widgets = rows.get('Factor', [])
                     if factor_widgets:
                         should_show = (code != 'RMS') and (freq_code == 'GENT')  # hide under RMS anyway; show only if Gen Track
@@ -3263,9 +2009,8 @@ class MainWindow(Frame):
             "Save preset as continuous sweep?\nYes = Continuous\nNo = Single"
         )
 
-        # Read current settings from settings.json
-        with open(SETTINGS_FILE, "r", encoding="utf-8") as f:
-            current_settings = json.load(f)
+        # Current settings (as last written to settings.json)
+        current_settings = self._settings_model.copy()
 
         current_settings["INIT:CONT"] = "ON" if mode_continuous else "OFF"
 
@@ -3293,8 +2038,8 @@ class MainWindow(Frame):
                 preset_settings = json.load(f)
 
             # Overwrite the current settings.json with the preset
-            with open(SETTINGS_FILE, "w", encoding="utf-8") as f:
-                json.dump(preset_settings, f, indent=2, ensure_ascii=False)
+            self._settings_model.write(preset_settings)
+            self._forget_batch_configuration()
 
             # Reload the GUI to reflect the loaded preset
             self.load_settings()
@@ -3366,22 +2111,6 @@ class MainWindow(Frame):
     def _zebra_color(self, idx: int) -> str:
         return "#ffffff" if idx % 2 == 0 else "#f0f2f5"
 
-    def _list_measurement_presets(self):
-        directory = getattr(self, '_measurement_dir', None)
-        files = []
-        try:
-            base_dir = Path(directory) if directory else Path(SETTINGS_FILE).parent
-            if not base_dir.exists() or not base_dir.is_dir():
-                return []
-            for f in base_dir.iterdir():
-                if f.is_file() and f.suffix.lower() == '.json':
-                    if f.name.lower() in {'settings.json', 'config.json'}:
-                        continue
-                    files.append(f)
-        except Exception:
-            return []
-        return sorted(files)
-
     def choose_measurement_folder(self):
         initial = str(getattr(self, '_measurement_dir', Path(SETTINGS_FILE).parent))
         chosen = filedialog.askdirectory(title="Select preset folder",
@@ -3400,6 +2129,7 @@ class MainWindow(Frame):
         # Reset selection state and invalidate sweep start until Apply Selected
         self._measurement_selection_order = []
         self._excluded_selected_paths.clear()
+        self._locked_preview_paths.clear()
         self._sequence_completed_lock = True
         self._settings_applied = False
         try:
@@ -3428,17 +2158,10 @@ class MainWindow(Frame):
         container = Frame(self.inline_measure_container, bg="#f5f6f8")
         container.pack(fill="x", padx=2, pady=2)
 
-        # Scrollable list of presets
-        canvas = Canvas(container, height=270, width=240, highlightthickness=1, highlightbackground="#d0d3d6")
-        scrollbar = Scrollbar(container, orient="vertical", command=canvas.yview)
-        list_frame = Frame(canvas, bg="#ffffff")
-        canvas.create_window((0,0), window=list_frame, anchor="nw")
-        canvas.configure(yscrollcommand=scrollbar.set)
-        list_frame.bind("<Configure>", lambda e: canvas.configure(scrollregion=canvas.bbox("all")))
-        canvas.pack(side="left", fill="both", expand=False)
-        scrollbar.pack(side="left", fill="y")
-        self._measurement_canvas = canvas
-        self._measurement_row_frames.clear()
+        # Scrollable list of presets (only the visible rows exist as widgets)
+        preset_list = VirtualCheckList(container, height=270, width=240, zebra=self._zebra_color)
+        preset_list.pack(side="left", fill="both", expand=False)
+        self._measurement_canvas = preset_list
 
         # Selected preview column
         preview_frame = Frame(container, bg="#eef3fb", highlightthickness=1, highlightbackground="#d0d3d6")
@@ -3459,6 +2182,11 @@ class MainWindow(Frame):
         down_btn = ttk.Button(action_panel, text="Down", width=7, command=lambda: self._move_preview_item(1))
         up_btn.grid(row=1, column=0, padx=(0,8), pady=3, sticky="w")
         down_btn.grid(row=1, column=1, padx=(0,0), pady=3, sticky="w")
+        # Third row: order optimizer (locked presets keep their position)
+        lock_btn = ttk.Button(action_panel, text="Lock", width=7, command=self._toggle_preview_lock)
+        optimize_btn = ttk.Button(action_panel, text="Optimize", width=12, command=self._optimize_preview_order)
+        lock_btn.grid(row=2, column=0, padx=(0,8), pady=3, sticky="w")
+        optimize_btn.grid(row=2, column=1, padx=(0,0), pady=3, sticky="w")
         # Column weight (optional future expansion)
         action_panel.grid_columnconfigure(0, weight=0)
         action_panel.grid_columnconfigure(1, weight=0)
@@ -3466,31 +2194,75 @@ class MainWindow(Frame):
         # Scroll bindings
         def _activate(c):
             self._activate_scroll(c)
-        for widget in (canvas, list_frame):
-            widget.bind("<Enter>", lambda e, c=canvas: _activate(c))
+        for widget in (preset_list, preset_list.body):
+            widget.bind("<Enter>", lambda e, c=preset_list: _activate(c))
             widget.bind("<Leave>", lambda e: _activate(None))
-            def _mw(e, c=canvas):
+            def _mw(e, c=preset_list):
                 delta = e.delta
                 steps = int(-delta/120) if delta else 0
                 if steps:
                     c.yview_scroll(steps, 'units')
                 return 'break'
             widget.bind('<MouseWheel>', _mw, add='+')
-            widget.bind('<Button-4>', lambda e, c=canvas: (c.yview_scroll(-1,'units'), 'break'))
-            widget.bind('<Button-5>', lambda e, c=canvas: (c.yview_scroll(1,'units'), 'break'))
+            widget.bind('<Button-4>', lambda e, c=preset_list: (c.yview_scroll(-1,'units'), 'break'))
+            widget.bind('<Button-5>', lambda e, c=preset_list: (c.yview_scroll(1,'units'), 'break'))
+
+        # Populate presets once the background scan finishes
+        self._measurement_vars.clear()
+        preset_list.set_message("Scanning presets...")
+        self._preset_scan_token += 1
+        token = self._preset_scan_token
+        directory = getattr(self, '_measurement_dir', None) or Path(SETTINGS_FILE).parent
+        self._preset_scanner.scan_async(
+            directory,
+            on_done=lambda presets, t=token: self._populate_measurement_list(presets, t),
+            on_error=lambda exc, t=token: self._populate_measurement_list([], t),
+            dispatch=tk_dispatcher(self),
+        )
+
+        Label(self.inline_measure_container, text="Tick presets then Apply Selected", font=("Segoe UI", 8), fg="#444", bg="#f5f6f8").pack(pady=(6,2))
+        # Action buttons moved to bottom (user request) with refined spacing
+        bottom_actions = Frame(self.inline_measure_container, bg="#f5f6f8")
+        bottom_actions.pack(fill="x", pady=(12,6))
+        # Centered grid layout for consistent professional look
+        btn_select_all = ttk.Button(bottom_actions, text="Select All", width=12, command=lambda: self._set_all_measurements(True))
+        btn_clear = ttk.Button(bottom_actions, text="Clear", width=9, command=lambda: self._set_all_measurements(False))
+        # Explicit text specification; width left flexible to avoid truncation/invisibility on some themes
+        btn_apply = ttk.Button(bottom_actions, text="Apply Selected", style="Primary.TButton", command=self.apply_selected_measurements)
+        btn_resume = ttk.Button(bottom_actions, text="Resume", width=9, command=self.resume_sequence)
+        btn_batch = ttk.Button(bottom_actions, text="Batch...", width=9, command=self.open_batch_dialog)
+        # Use grid with spacer columns to center
+        bottom_actions.grid_columnconfigure(0, weight=1)
+        bottom_actions.grid_columnconfigure(6, weight=1)
+        btn_select_all.grid(row=0, column=1, padx=8, pady=3)
+        btn_clear.grid(row=0, column=2, padx=8, pady=3)
+        btn_apply.grid(row=0, column=3, padx=8, pady=3)
+        btn_resume.grid(row=0, column=4, padx=8, pady=3)
+        btn_batch.grid(row=0, column=5, padx=8, pady=3)
+        self._refresh_selected_preview()
+        # Bind interactions: double-click to scroll, drag reorder
+        self._selected_preview_listbox.bind('<Double-Button-1>', self._on_preview_double_click)
 
-        # Populate presets
+    def _populate_measurement_list(self, presets, token=None):
+        """Fill the preset selector from a scan result (ignored if a newer scan was started)."""
+        if token is not None and token != self._preset_scan_token:
+            return
+        preset_list = self._measurement_canvas
+        if preset_list is None:
+            return
+        try:
+            if not preset_list.winfo_exists():
+                return
+        except Exception:
+            return
         self._measurement_vars.clear()
-        presets = self._list_measurement_presets()
         if not presets:
-            Label(list_frame, text="No preset JSON files found.").pack(anchor="w", pady=4)
-        for idx, p in enumerate(presets):
+            preset_list.set_message("No preset JSON files found.")
+            return
+        items = []
+        for info in presets:
+            p = info.path
             var = BooleanVar(value=False)
-            row_bg = self._zebra_color(idx)
-            row = Frame(list_frame, bg=row_bg)
-            row.pack(fill="x")
-            cb = ttk.Checkbutton(row, text=p.stem, variable=var, style="Preset.TCheckbutton")
-            cb.pack(anchor="w", padx=4, pady=2)
             def _mk_handler(path):
                 def _handler(*_a):
                     try:
@@ -3521,40 +2293,69 @@ class MainWindow(Frame):
                         pass
                 return _handler
             var.trace_add('write', _mk_handler(p))
-            row.bind('<Enter>', lambda e, r=row: r.configure(bg="#e2e6ea"))
-            row.bind('<Leave>', lambda e, r=row, c=row_bg: r.configure(bg=c))
             self._measurement_vars[p] = var
-            self._measurement_row_frames[p] = row
-
-        Label(self.inline_measure_container, text="Tick presets then Apply Selected", font=("Segoe UI", 8), fg="#444", bg="#f5f6f8").pack(pady=(6,2))
-        # Action buttons moved to bottom (user request) with refined spacing
-        bottom_actions = Frame(self.inline_measure_container, bg="#f5f6f8")
-        bottom_actions.pack(fill="x", pady=(12,6))
-        # Centered grid layout for consistent professional look
-        btn_select_all = ttk.Button(bottom_actions, text="Select All", width=12, command=lambda: self._set_all_measurements(True))
-        btn_clear = ttk.Button(bottom_actions, text="Clear", width=9, command=lambda: self._set_all_measurements(False))
-        # Explicit text specification; width left flexible to avoid truncation/invisibility on some themes
-        btn_apply = ttk.Button(bottom_actions, text="Apply Selected", style="Primary.TButton", command=self.apply_selected_measurements)
-        # Use grid with spacer columns to center
-        bottom_actions.grid_columnconfigure(0, weight=1)
-        bottom_actions.grid_columnconfigure(5, weight=1)
-        btn_select_all.grid(row=0, column=1, padx=8, pady=3)
-        btn_clear.grid(row=0, column=2, padx=8, pady=3)
-        btn_apply.grid(row=0, column=3, padx=8, pady=3)
+            items.append((p, p.stem, var, info.summary()))
+        preset_list.set_items(items)
         self._refresh_selected_preview()
-        # Bind interactions: double-click to scroll, drag reorder
-        self._selected_preview_listbox.bind('<Double-Button-1>', self._on_preview_double_click)
+
+    def _preview_order(self):
+        """Ticked presets in selection order (unordered ones alphabetically at the end)."""
+        ordered = [p for p in self._measurement_selection_order if self._measurement_vars.get(p) and self._measurement_vars[p].get() and p not in self._excluded_selected_paths]
+        remaining = [p for p, var in self._measurement_vars.items() if var.get() and p not in ordered and p not in self._excluded_selected_paths]
+        return ordered + sorted(remaining, key=lambda x: x.stem.lower())
 
     def _refresh_selected_preview(self):
-        """Update preview list showing ticked presets in selection order."""
+        """Update preview list showing ticked presets in selection order (locked ones highlighted)."""
         lb = getattr(self, '_selected_preview_listbox', None)
         if lb is None:
             return
         lb.delete(0, 'end')
-        ordered = [p for p in self._measurement_selection_order if self._measurement_vars.get(p) and self._measurement_vars[p].get() and p not in self._excluded_selected_paths]
-        remaining = [p for p, var in self._measurement_vars.items() if var.get() and p not in ordered and p not in self._excluded_selected_paths]
-        for p in ordered + sorted(remaining, key=lambda x: x.stem.lower()):
+        for p in self._preview_order():
             lb.insert('end', p.stem)
+            if p in self._locked_preview_paths:
+                lb.itemconfig('end', bg="#fdebd0")
+
+    def _toggle_preview_lock(self):
+        """Lock / unlock the selected preview item's position for the order optimizer."""
+        lb = getattr(self, '_selected_preview_listbox', None)
+        if not lb or not lb.curselection():
+            return
+        idx = lb.curselection()[0]
+        stem = lb.get(idx)
+        path = next((p for p in self._measurement_vars.keys() if p.stem == stem), None)
+        if not path:
+            return
+        # Pin the displayed order so the locked position is explicit
+        self._measurement_selection_order = self._preview_order()
+        self._locked_preview_paths ^= {path}
+        self._refresh_selected_preview()
+        lb.selection_set(idx)
+
+    def _load_preview_presets(self, order):
+        """{path: settings} for *order* plus the positions the optimizer must keep (locked / invalid)."""
+        compiled, _invalid = compile_presets(order)
+        presets, locked = {}, set()
+        for i, path in enumerate(order):
+            if path in compiled:
+                presets[path] = compiled[path].to_settings()
+            else:
+                presets[path] = {}
+                locked.add(i)
+            if path in self._locked_preview_paths:
+                locked.add(i)
+        return presets, locked
+
+    def _optimize_preview_order(self):
+        """Reorder the unlocked selected presets to minimize predicted UPV reconfiguration time."""
+        order = self._preview_order()
+        if len(order) < 3:
+            self.update_status("Select at least three presets to optimize the order.", color="orange")
+            return
+        presets, locked = self._load_preview_presets(order)
+        plan = plan_order(order, presets, locked=locked, model=switch_cost_model())
+        self._measurement_selection_order = plan.order
+        self._refresh_selected_preview()
+        self.update_status(f"🔀 {plan.summary()}", color="green" if plan.changed else "#2c3e50")
 
     def _on_preview_double_click(self, event):
         lb = self._selected_preview_listbox
@@ -3568,21 +2369,14 @@ class MainWindow(Frame):
         self._scroll_to_measure_row(target)
 
     def _scroll_to_measure_row(self, path):
-        canvas = self._measurement_canvas
-        row = self._measurement_row_frames.get(path)
-        if not canvas or not row:
+        preset_list = self._measurement_canvas
+        if not preset_list:
             return
         try:
-            canvas.update_idletasks()
-            list_frame = row.master
-            total_h = max(list_frame.winfo_height() - canvas.winfo_height(), 1)
-            y = row.winfo_y()
-            fraction = min(max(y / total_h, 0.0), 1.0)
-            canvas.yview_moveto(fraction)
+            preset_list.see(path)
         except Exception:
             pass
 
-
     def _move_preview_item(self, delta: int):
         """Move selected preview item up or down by delta (+1 or -1)."""
         lb = getattr(self, '_selected_preview_listbox', None)
@@ -3681,206 +2475,365 @@ class MainWindow(Frame):
     def apply_selected_measurements(self):
         """Start a measurement sequence using the order the user ticked the boxes.
 
-        Flow:
-          1. Apply first preset immediately and start its sweep (no prompt).
-                    2. Automatically apply next preset and start its sweep until all presets complete (no user prompt).
+        The export file is chosen up front; the sequence then runs on a
+        SequenceEngine (upv.sequence_engine): the first preset is applied and
+        waits for Start Sweep, later presets are applied and swept as soon as
+        the previous trace was collected, and the combined export is written at
+        the end without another dialog.
         """
         if not self.upv:
             messagebox.showwarning("Not Connected", "Connect to UPV before applying measurements.")
             return
+        if self._sequence_running():
+            if messagebox.askyesno("Sequence", "A sequence is running. Cancel it?"):
+                self._sequence.cancel()
+            return
+        if self._batch is not None:
+            messagebox.showinfo("Sequence", "A DUT batch is active. Finish it in the Batch window first.")
+            return
+        selection = self._validated_selection()
+        if selection is None:
+            return
+        ordered, compiled = selection
+        export_path = filedialog.asksaveasfilename(
+            defaultextension=".hxml",
+            filetypes=[("HXML files", "*.hxml"), ("All files", "*.*")],
+            title="Save Combined Sequence Results As"
+        )
+        if not export_path:
+            self.update_status("Sequence not started (no export file chosen).", color="orange")
+            return
+        try:
+            presets = {p: compiled[p].to_settings() for p in ordered}
+            predicted = f", ~{order_cost(ordered, presets, model=switch_cost_model()):.1f} s reconfiguration"
+        except Exception:
+            predicted = ""
+        self.update_status(f"Sequence started ({len(ordered)} presets{predicted}). Applying {ordered[0].stem}...")
+        self._start_sequence(ordered, compiled, export_path)
+
+    def _validated_selection(self):
+        """Ticked presets in selection order and their compiled forms; None (after telling the user) if unusable."""
         # Build ordered list from selection order; fall back to alphabetical if user didn't change order
         selected_paths = [p for p, var in self._measurement_vars.items() if var.get() and p not in self._excluded_selected_paths]
         if not selected_paths:
             messagebox.showinfo("No Selection", "Please tick at least one measurement preset.")
-            return
+            return None
         ordered = [p for p in self._measurement_selection_order if p in selected_paths]
         # Append any selected not yet in order list (e.g. user selected all via Select All)
         for p in selected_paths:
             if p not in ordered:
                 ordered.append(p)
-        self._sequence_presets = ordered
-        self._sequence_index = 0
-        self._sequence_active = True
+        # Validate every preset before anything is applied (compiled once, cached by content)
+        compiled, invalid = compile_presets(ordered)
+        if invalid:
+            messagebox.showerror("Invalid Presets", "Fix these presets before starting the sequence:\n\n"
+                                 + describe_invalid(invalid))
+            self.update_status(f"❌ {len(invalid)} invalid preset(s) - sequence not started.", color="red")
+            return None
+        return ordered, compiled
+
+    def _start_sequence(self, ordered, compiled, export_path, completed=None, actions=None, dut=None):
+        """Run *ordered* presets on a new SequenceEngine, checkpointed to the sequence journal."""
         # Clear any prior completion lock when starting a new sequence
         self._sequence_completed_lock = False
-        self._refresh_start_sweep_state()
-        # Inline version does not destroy any window; just proceed
-        self.update_status(f"Sequence started ({len(ordered)} presets). Applying {ordered[0].stem} (waiting for Start Sweep)...")
-        # Apply first preset only (no auto sweep start)
-        self.after(30, lambda: self._apply_preset(self._sequence_index))
-
-    def _apply_preset(self, index: int):
-        if not self._sequence_active:
+        if actions is None:
+            actions = WindowSequenceActions(self, export_path, dut=dut)
+        self._sequence = SequenceEngine(actions)
+        if self._batch is not None:
+            self._batch.stats.attach(self._sequence)
+        self._sequence.subscribe(self._on_sequence_event)
+        journal = SequenceJournal()
+        journal.begin([compiled[p] for p in ordered], instrument=self._upv_idn, output=export_path,
+                      completed=completed, dut=dut)
+        journal.attach(self._sequence)
+        self._sequence.start(ordered, completed=completed)
+
+    def resume_sequence(self):
+        """Continue the sequence in the journal, skipping the presets it already measured.
+
+        Resuming needs the same UPV (*IDN?) and the preset files; presets whose
+        file changed since they were measured are measured again. The combined
+        export goes to the path chosen when the sequence was first started.
+        """
+        if not self.upv:
+            messagebox.showwarning("Not Connected", "Connect to UPV before resuming a sequence.")
             return
-        if index < 0 or index >= len(self._sequence_presets):
-            self.update_status("Sequence index out of range.", color="red")
-            self._sequence_active = False
+        if self._sequence_running() or self._batch is not None:
+            messagebox.showinfo("Sequence", "A sequence is already running.")
             return
-        path = self._sequence_presets[index]
-        try:
-            with open(path, 'r', encoding='utf-8') as fh:
-                data = json.load(fh)
-        except Exception as e:
-            messagebox.showerror("Load Error", f"{path.name}: {e}")
-            # Skip to next
-            self._sequence_index += 1
-            if self._sequence_index < len(self._sequence_presets):
-                self.after(100, lambda: self._apply_preset(self._sequence_index))
-            else:
-                self.update_status("Sequence finished (errors).", color="orange")
-                self._sequence_active = False
-                # Ensure next measurement opens a fresh Live Sweep window
-                self._force_new_live_window = True
-                # Lock start until measurements re-applied
-                self._sequence_completed_lock = True
-                self._settings_applied = False
-                try:
-                    if hasattr(self, 'start_sweep_btn'):
-                        self.start_sweep_btn.config(state='disabled')
-                except Exception:
-                    pass
-                self._refresh_start_sweep_state()
+        journal = SequenceJournal.load()
+        if journal is None or not journal.resumable:
+            messagebox.showinfo("Resume Sequence", "There is no unfinished sequence to resume.")
             return
         try:
-            apply_grouped_settings(self.upv, data)
-        except Exception as e:
-            messagebox.showerror("Apply Failed", f"{path.name}: {e}")
-            # Same skip logic
-            self._sequence_index += 1
-            if self._sequence_index < len(self._sequence_presets):
-                self.after(100, lambda: self._apply_preset(self._sequence_index))
-            else:
-                self.update_status("Sequence finished (apply errors).", color="orange")
-                self._sequence_active = False
-                self._force_new_live_window = True
-                self._sequence_completed_lock = True
-                self._settings_applied = False
-                try:
-                    if hasattr(self, 'start_sweep_btn'):
-                        self.start_sweep_btn.config(state='disabled')
-                except Exception:
-                    pass
-                self._refresh_start_sweep_state()
+            plan = journal.resume_plan(self._upv_idn)
+        except JournalError as e:
+            messagebox.showerror("Resume Sequence", f"Cannot resume {journal.describe()}:\n\n{e}")
+            return
+        compiled, invalid = compile_presets(plan.presets)
+        if invalid:
+            messagebox.showerror("Invalid Presets", "Fix these presets before resuming the sequence:\n\n"
+                                 + describe_invalid(invalid))
+            return
+        export_path = plan.output
+        if not export_path:
+            export_path = filedialog.asksaveasfilename(
+                defaultextension=".hxml",
+                filetypes=[("HXML files", "*.hxml"), ("All files", "*.*")],
+                title="Save Combined Sequence Results As"
+            )
+            if not export_path:
+                return
+        if not messagebox.askyesno("Resume Sequence", f"{journal.describe()}\n\n{plan.summary()}.\n\n"
+                                   f"Resume and export to {export_path}?"):
+            return
+        self.update_status(f"Sequence resumed ({plan.summary()}).")
+        self._start_sequence(plan.presets, compiled, export_path, completed=plan.completed,
+                             dut=journal.data.get("dut"))
+
+    # ---------------- DUT batch -----------------
+    def open_batch_dialog(self):
+        """Batch window: queue DUT serials (typed or scanned) and run the ticked sequence once per DUT.
+
+        Serials can be added while the batch runs. Every DUT waits for Start
+        Sweep after the previous one finished (time to swap the device); its
+        traces are exported to their own file in the chosen folder and added
+        to the results catalog (see upv.batch).
+        """
+        if self._batch_dialog is not None:
+            self._batch_dialog.lift()
+            return
+        if not self.upv:
+            messagebox.showwarning("Not Connected", "Connect to UPV before starting a DUT batch.")
+            return
+        if self._sequence_running():
+            messagebox.showinfo("Sequence", "A sequence is already running.")
+            return
+        selection = self._validated_selection()
+        if selection is None:
+            return
+        ordered, compiled = selection
+        out_dir = filedialog.askdirectory(title="Select folder for the DUT results")
+        if not out_dir:
+            return
+        self._batch = Batch(ordered, out_dir, manual_start=True)
+        self._batch_compiled = compiled
+        self._batch_actions = WindowSequenceActions(self, None, differential=True)
+
+        win = Toplevel(self.master)
+        win.title(f"DUT Batch - {len(ordered)} presets")
+        win.geometry("340x420")
+        win.protocol("WM_DELETE_WINDOW", self._finish_batch)
+        self._batch_dialog = win
+        Label(win, text="Type or scan a DUT serial, then Enter:", font=("Segoe UI", 9)).pack(anchor="w", padx=10, pady=(10, 2))
+        entry = Entry(win, font=("Segoe UI", 11))
+        entry.pack(fill="x", padx=10)
+        entry.focus_set()
+
+        def add(_event=None):
+            serial = entry.get().strip()
+            entry.delete(0, "end")
+            if self._batch is None or not serial:
+                return
+            if not self._batch.queue.add(serial):
+                self.update_status(f"⚠️ DUT {serial} is already in this batch.", color="orange")
+            self._refresh_batch_queue()
+            if self._batch.current is None and self._batch.stats.duts:
+                # Queue ran dry after the last DUT: carry on with the new one
+                self._next_batch_dut()
+
+        entry.bind("<Return>", add)
+        Label(win, text="Queued DUTs:", font=("Segoe UI", 9)).pack(anchor="w", padx=10, pady=(8, 2))
+        self._batch_listbox = Listbox(win, height=12)
+        self._batch_listbox.pack(fill="both", expand=True, padx=10)
+        buttons = Frame(win)
+        buttons.pack(fill="x", padx=10, pady=8)
+
+        def remove():
+            for i in reversed(self._batch_listbox.curselection()):
+                self._batch.queue.remove(self._batch_listbox.get(i))
+            self._refresh_batch_queue()
+
+        def start():
+            if self._batch is None or self._batch.current is not None or self._sequence_running():
+                return
+            if not len(self._batch.queue):
+                messagebox.showinfo("DUT Batch", "Queue at least one DUT serial first.", parent=win)
+                return
+            self._next_batch_dut()
+
+        ttk.Button(buttons, text="Remove", width=9, command=remove).pack(side="left")
+        ttk.Button(buttons, text="Finish", width=9, command=self._finish_batch).pack(side="right")
+        ttk.Button(buttons, text="Start", style="Primary.TButton", command=start).pack(side="right", padx=6)
+        self.update_status(f"DUT batch: queue serials, then press Start ({len(ordered)} presets per DUT).")
+
+    def _forget_batch_configuration(self):
+        """Settings reached the UPV outside the batch: its next preset must be applied in full."""
+        if self._batch_actions is not None:
+            self._batch_actions.forget_applied()
+
+    def _refresh_batch_queue(self):
+        if self._batch_listbox is None or self._batch is None:
+            return
+        self._batch_listbox.delete(0, "end")
+        for serial in self._batch.queue.pending:
+            self._batch_listbox.insert("end", serial)
+
+    def _next_batch_dut(self):
+        """Start the sequence for the next queued DUT (the instrument keeps its configuration)."""
+        batch = self._batch
+        if batch is None or self._sequence_running():
+            return
+        serial = batch.next_dut()
+        self._refresh_batch_queue()
+        if serial is None:
+            self.update_status(f"DUT batch: queue empty - scan the next serial or press Finish. ({batch.stats.summary()})",
+                               color="orange")
+            return
+        export_path = batch.export_path(serial)
+        self._batch_actions.begin_dut(serial, export_path)
+        self.update_status(f"🔁 DUT {serial} ({len(batch.queue)} queued): connect it and press Start Sweep.")
+        self._start_sequence(batch.presets, self._batch_compiled, export_path,
+                             actions=self._batch_actions, dut=serial)
+
+    def _finish_batch(self):
+        """Close the batch (cancelling a running DUT) and show the throughput summary."""
+        batch = self._batch
+        if batch is None:
             return
-        # Persist preset into settings.json so GUI reflects it
+        if self._sequence_running():
+            if not messagebox.askyesno("DUT Batch", f"DUT {batch.current} is still being measured. Cancel it and finish the batch?",
+                                       parent=self._batch_dialog):
+                return
+            self._batch = None  # the 'done' of the cancelled run must not start another DUT
+            self._sequence.cancel()
+            batch.dut_done(False)
+        elif batch.current is not None:
+            batch.dut_done(False)
+        self._batch = None
+        self._batch_actions = None
+        self._batch_compiled = {}
+        self._batch_listbox = None
+        dialog, self._batch_dialog = self._batch_dialog, None
+        try:
+            if dialog is not None:
+                dialog.destroy()
+        except Exception:
+            pass
+        if batch.stats.duts:
+            summary = batch.stats.summary()
+            self.update_status(f"📊 DUT batch finished: {summary}")
+            messagebox.showinfo("DUT Batch", f"{summary}\n\nResults in {batch.out_dir}\n"
+                                f"Throughput log: {batch.stats.log_file}")
+        else:
+            self.update_status("DUT batch closed.", color="orange")
+
+    def _sequence_running(self) -> bool:
+        return self._sequence is not None and self._sequence.running
+
+    def _show_sequence_preset(self, step):
+        """Reflect the sequence preset just applied in settings.json, the panels and the preset label."""
         try:
-            with open(SETTINGS_FILE, 'w', encoding='utf-8') as sf:
-                json.dump(data, sf, indent=2, ensure_ascii=False)
+            self._settings_model.write(step.data)
             # Reload GUI controls to show new values
             self.load_settings()
         except Exception as e:
-            messagebox.showwarning("Persist Warning", f"Could not write settings.json for {path.stem}: {e}")
-        # Ensure current preset name retained after reload
-        # Update GUI
-        self._current_preset_name = path.stem
-        self.preset_label.config(text=f"Preset: {path.stem}")
+            self.update_status(f"⚠️ Could not write settings.json for {step.name}: {e}", color="orange")
+        self._current_preset_name = step.name
+        self.preset_label.config(text=f"Preset: {step.name}")
         # Mark applied so sweep can start immediately
         self._settings_applied = True
         self._refresh_start_sweep_state()
-        self.update_status(f"Applied {path.stem}. Press 'Start Sweep' to begin.")
 
-    def _apply_preset_and_start(self, index: int):
-        # Wrapper retained for continuation flow after first sweep
-        self._apply_preset(index)
-        if not self._sequence_active:
-            return
-        # If apply failed sequence may be inactive
-        if self._sequence_index != index:
-            return
-        try:
-            self.update_status(f"Applied {self._current_preset_name}. Starting sweep...")
-            # Force creation of a new live window for each sequence preset
-            self._force_new_live_window = True
-            self.start_sweep()
-        except Exception as e:
-            messagebox.showerror("Sweep Error", f"Failed to start sweep for {self._current_preset_name}: {e}")
-            # Move to next preset if available
-            self._sequence_index += 1
-            if self._sequence_index < len(self._sequence_presets):
-                self.after(150, lambda: self._apply_preset_and_start(self._sequence_index))
-            else:
-                self.update_status("Sequence finished (start errors).", color="orange")
-                self._sequence_active = False
+    def _on_sequence_event(self, event, fields):
+        """SequenceEngine listener: status line and Start Sweep gating."""
+        if event == "stage":
+            stage = fields["stage"]
+            if stage == APPLY:
+                self.update_status(f"⚙️ Applying {fields['name']} ({fields['index']}/{fields['total']})...",
+                                   color="#2c3e50")
+            elif stage == COLLECT:
+                self.update_status(f"📥 Reading trace for {fields['name']}...", color="#2c3e50")
+            elif stage == EXPORT:
+                self.update_status("Sequence completed. Writing combined export...")
+        elif event == "failed" and fields.get("name"):
+            self.update_status(f"⚠️ {fields['name']}: {fields['stage']} failed ({fields['error']})", color="orange")
+        elif event == "done":
+            # Keep what this sequence taught the order optimizer
+            switch_cost_model().save()
+            batch = self._batch
+            if batch is not None and batch.current is not None:
+                ok = bool(fields["collected"]) and not fields["failed"] and not fields["cancelled"]
+                record = batch.dut_done(ok, self._sequence.export_result)
+                if fields["cancelled"]:
+                    self.update_status(f"⏹️ DUT {record['dut']} cancelled - batch paused.", color="orange")
+                else:
+                    color = "green" if ok else "orange"
+                    self.update_status(f"✅ DUT {record['dut']} done in {record['seconds']:.0f} s. {batch.stats.summary()}"
+                                       if ok else f"⚠️ DUT {record['dut']} incomplete. {batch.stats.summary()}", color=color)
+                    # Next DUT once this engine has fully finished
+                    self.after(0, self._next_batch_dut)
                 self._force_new_live_window = True
                 self._sequence_completed_lock = True
                 self._settings_applied = False
-                try:
-                    if hasattr(self, 'start_sweep_btn'):
-                        self.start_sweep_btn.config(state='disabled')
-                except Exception:
-                    pass
                 self._refresh_start_sweep_state()
-
-    def _export_combined_sequence_hxml(self):
-        """Export all collected sequence traces into one .hxml file (multi-dataset)."""
-        if not self._sequence_collected_traces:
-            self.update_status("No traces collected for export.", color="orange")
-            return
-        # Enforce lock & disable Start Sweep (extra safeguard if not already applied)
-        try:
+                return
+            # Lock start until measurements re-applied; the next measurement opens a fresh view
+            self._force_new_live_window = True
             self._sequence_completed_lock = True
             self._settings_applied = False
-            if hasattr(self, 'start_sweep_btn'):
-                self.start_sweep_btn.config(state='disabled')
             self._refresh_start_sweep_state()
-        except Exception:
-            pass
-        export_path = filedialog.asksaveasfilename(
-            defaultextension=".hxml",
-            filetypes=[("HXML files", "*.hxml"), ("All files", "*.*")],
-            title="Save Combined Sequence Results"
-        )
-        if not export_path:
-            self.update_status("Combined export cancelled.", color="orange")
+            if fields["cancelled"]:
+                self.update_status("⏹️ Sequence cancelled.", color="orange")
+            elif not fields["collected"]:
+                self.update_status("Sequence finished - no traces collected.", color="orange")
+            elif fields["failed"]:
+                self.update_status(f"Sequence finished ({fields['failed']} preset(s) failed).", color="orange")
+
+    def _export_combined_sequence_hxml(self, traces, export_path, dut=None, on_written=None, on_failed=None):
+        """Export the collected sequence traces into one .hxml file (multi-dataset) on the export worker.
+
+        dut: batch run; the file is added to the results catalog without a dialog.
+        on_written(path) / on_failed(exc): called on the Tk thread once the write finished.
+        """
+        if not traces:
+            self.update_status("No traces collected for export.", color="orange")
+            if on_failed is not None:
+                on_failed(ValueError("No trace data to export."))
             return
-        now = datetime.datetime.now().strftime("%d-%b-%Y %H:%M:%S")
-        try:
-            # Single dataset (WorkingTitle) with multiple curvedata entries like example file
-            working_title = "workingTitle"  # Match provided example; can be parameterized later
-            lines = [
-                "<?xml version=\"1.0\" encoding=\"utf-8\"?>",
-                "<hxml>",
-                "   <head>",
-                "      <Document>",
-                "         <DataVersion XsdVersion=\"0.0.0.1\">0.0.0.1</DataVersion>",
-                "         <DataType>hiCurve</DataType>",
-                "         <LDocNode>//hxml/data</LDocNode>",
-                "         <PlatformVersion>n.a.</PlatformVersion>",
-                "      </Document>",
-                "   </head>",
-                "   <data>",
-                f"      <dataset WorkingTitle=\"{working_title}\">",
-                "         <longDataSetDesc/>",
-                "         <shortDataSetDesc/>",
-                "         <acpEarhookType/>",
-                "         <v-curvedata>"
-            ]
-            for trace in self._sequence_collected_traces:
-                name = trace['name'] or 'measurement'
-                x_vals = trace['x']
-                y_vals = trace['y']
-                unit = trace.get('unit', 'dBV')
-                freq_str = '[' + ' '.join(f"{v:.6f}" for v in x_vals) + ']'
-                mag_str = '[' + ' '.join(f"{v:.6f}" for v in y_vals) + ']'
-                lines.append(f"            <curvedata CurveDataName=\"{name}\" MeasurementDate=\"{now}\" TestEquipmentNr=\"UPV_Audio_Analyzer\" Tester=\"PythonApp\">")
-                lines.append("               <longCurveDesc/>")
-                lines.append("               <shortCurveDesc/>")
-                # Follow example naming: 'f' for frequency; 'level' for magnitude
-                lines.append(f"               <curve name=\"f\" unit=\"Hz\">{freq_str}</curve>")
-                lines.append(f"               <curve name=\"level\" unit=\"{unit}\">{mag_str}</curve>")
-                lines.append("            </curvedata>")
-            lines.append("         </v-curvedata>")
-            lines.append("      </dataset>")
-            lines.append("   </data>")
-            lines.append("   <environment/>")
-            lines.append("</hxml>")
-            with open(export_path, 'w', encoding='utf-8') as f:
-                f.write('\n'.join(lines))
-            self.update_status(f"Combined export saved: {Path(export_path).name}")
-            messagebox.showinfo("Export", f"Combined sequence exported to:\n{export_path}")
-        except Exception as e:
-            messagebox.showerror("Export Error", f"Failed to write combined HXML: {e}")
+        # Single dataset (WorkingTitle) with multiple curvedata entries like example file.
+        date = measurement_date()
+        export_traces = []
+        for trace in traces:
+            entry = {'name': trace['name'] or 'measurement', 'x': trace['x'], 'y': trace['y'],
+                     'unit': trace.get('unit', 'dBV'), 'date': date}
+            for key in ('dut', 'attrs'):
+                if trace.get(key):
+                    entry[key] = trace[key]
+            export_traces.append(entry)
+
+        def _progress(job, done, total):
+            self.update_status(f"💾 Writing combined export ({done}/{total})...")
+
+        def _done(job):
+            if dut:
+                # Keep the operator on the batch; the catalog update runs off the Tk thread
+                self.update_status(f"💾 DUT {dut} saved: {job.path.name}")
+                BackgroundJob(lambda _job, path=job.path: catalog_result(path), name="CatalogResult").start()
+                if on_written is not None:
+                    on_written(job.path)
+                return
+            if on_written is not None:
+                on_written(job.path)
+            self.update_status(f"Combined export saved: {job.path.name}")
+            messagebox.showinfo("Export", f"Combined sequence exported to:\n{job.path}")
+
+        def _failed(job, exc):
+            if on_failed is not None:
+                on_failed(exc)
+            messagebox.showerror("Export Error", f"Failed to write combined HXML: {exc}")
             self.update_status("Combined export failed", color="red")
-        finally:
-            # Clear collected traces for next sequence
-            self._sequence_collected_traces = []
\ No newline at end of file
+
+        self._export_service.submit(ExportJob(
+            export_path, export_traces, smoothing=self._smoothing_fraction(for_export=True),
+            label="Combined export", on_progress=_progress, on_done=_done, on_error=_failed))
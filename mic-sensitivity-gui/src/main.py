@@ -1,11 +1,19 @@
+import sys
+from utils import profiling
+# MIC_GUI_PROFILE=1 or --profile [PATH]: record spans, write a Chrome trace at exit
+profiling.enable_from_env_or_argv(sys.argv)
+from utils.startup import mark, prewarm, report, timed
 import tkinter as tk
 from tkinter import messagebox
-from gui.window import MainWindow
-from upv.upv_auto_config import main as upv_main
-import sys, traceback, datetime, os
+with timed("import gui.window"), profiling.span("import gui.window", "startup"):
+    from gui.window import MainWindow
+import traceback, datetime, os
 
 LOG_FILE = "crash_log.txt"
 
+# Loaded on a background thread once the window is visible (see utils.startup.prewarm)
+PREWARM_MODULES = ["matplotlib", "matplotlib.figure", "matplotlib.backends.backend_tkagg", "pyvisa"]
+
 def _log_exception(exc_type, exc_value, exc_tb):
     try:
         with open(LOG_FILE, 'a', encoding='utf-8') as f:
@@ -22,10 +30,17 @@ sys.excepthook = _log_exception
 
 def run_upv_application():
     try:
+        from upv.upv_auto_config import main as upv_main
         upv_main()
     except Exception as e:
         messagebox.showerror("Error", f"Failed to run UPV application: {e}")
 
+def _on_window_shown(root):
+    mark("window shown")
+    # Heavy modules + VISA ResourceManager load in the background; first use no longer pays for them
+    prewarm(PREWARM_MODULES, resource_manager_too=True,
+            on_done=lambda: root.after(0, report))
+
 def main():
     root = tk.Tk()
     # Intercept Tk callback exceptions (similar to sys.excepthook)
@@ -35,10 +50,13 @@ def main():
     root.title("Mic Sensitivity GUI")
     root.geometry("1280x800")
 
-    main_window = MainWindow(root, run_upv_application)
-    main_window.pack(fill=tk.BOTH, expand=True)
+    with timed("MainWindow init"):
+        main_window = MainWindow(root, run_upv_application)
+        main_window.pack(fill=tk.BOTH, expand=True)
 
+    root.after_idle(lambda: _on_window_shown(root))
     root.mainloop()
+    profiling.finish()
 
 if __name__ == "__main__":
     main()
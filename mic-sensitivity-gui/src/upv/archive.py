@@ -0,0 +1,364 @@
+"""Append-only columnar measurement archive kept alongside the HXML exports.
+
+Layout of an archive directory:
+
+    freq.f64       all frequency arrays back to back (little-endian float64)
+    level.f32      all level arrays back to back (little-endian float32)
+    index.jsonl    one JSON line per curve: offset, points, name, unit, date, ...
+
+A curve is committed when its index line is written (after the data), so a
+crash mid-append leaves trailing bytes that are ignored and truncated on the
+next append. Appends to one directory are serialized across threads (one lock
+per directory, shared by every MeasurementArchive on it) and processes (an OS
+lock on append.lock), so the GUI's export worker, the catalog thread and a
+headless runner cannot interleave their writes.
+Reading maps both data files with `np.memmap`; curves are views into the
+maps, and loading thousands of curves is one index read plus slicing.
+
+Usage:
+
+    from upv.archive import MeasurementArchive
+    arc = MeasurementArchive()                          # default results_archive/
+    arc.append_trace({"name": "FOGm20", "x": x, "y": y, "unit": "dBr"}, source="combined.hxml")
+    rows = arc.select(name="FOGm20")
+    levels = arc.stack(rows)                            # (n_curves, n_points) float32
+
+    python -m upv.archive import Results/*.hxml         # convert existing HXML files
+    python -m upv.archive info
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import threading
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+try:
+    import msvcrt
+except ImportError:  # POSIX
+    msvcrt = None
+
+try:
+    from upv.hxml_reader import iter_curvedata
+    from upv.hxml_writer import measurement_date
+    from upv.units import canonical_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from hxml_reader import iter_curvedata
+    from hxml_writer import measurement_date
+    from units import canonical_unit
+
+try:
+    from utils.paths import data_path
+except Exception:
+    data_path = None
+
+ARCHIVE_DIR = data_path('results_archive') if data_path is not None else Path('results_archive')
+
+FREQ_FILE = "freq.f64"
+LEVEL_FILE = "level.f32"
+INDEX_FILE = "index.jsonl"
+LOCK_FILE = "append.lock"
+FREQ_DTYPE = np.dtype('<f8')
+LEVEL_DTYPE = np.dtype('<f4')
+
+# Metadata keys copied from a trace dict into the index (besides name/unit)
+_TRACE_META_KEYS = ("date", "equipment", "tester", "working_title", "dut")
+
+_dir_locks: Dict[str, threading.Lock] = {}
+_dir_locks_lock = threading.Lock()
+
+
+def _directory_lock(root: Path) -> threading.Lock:
+    """In-process append lock for the archive at *root* (one per resolved directory)."""
+    key = str(Path(root).resolve())
+    with _dir_locks_lock:
+        lock = _dir_locks.get(key)
+        if lock is None:
+            lock = _dir_locks[key] = threading.Lock()
+        return lock
+
+
+@contextmanager
+def _process_lock(root: Path):
+    """Exclusive OS lock on root/append.lock, held while another process appends it blocks."""
+    with open(root / LOCK_FILE, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            f.seek(0)
+            while True:
+                try:
+                    msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:  # LK_LOCK gives up after ~10 s; keep waiting
+                    continue
+        try:
+            yield
+        finally:
+            if fcntl is not None:
+                fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class MeasurementArchive:
+    """Reader/appender for one archive directory (see module docstring)."""
+
+    def __init__(self, root=None):
+        self.root = Path(root) if root else Path(ARCHIVE_DIR)
+        self._lock = _directory_lock(self.root)
+        self._index: Optional[List[Dict[str, Any]]] = None
+        self._index_stamp = None
+        self._maps: Dict[str, Tuple[Any, np.memmap]] = {}
+
+    # ---------------- paths / index -----------------
+    def _path(self, name: str) -> Path:
+        return self.root / name
+
+    def _read_index(self) -> List[Dict[str, Any]]:
+        p = self._path(INDEX_FILE)
+        try:
+            st = p.stat()
+        except OSError:
+            return []
+        stamp = (st.st_mtime_ns, st.st_size)
+        if self._index is not None and self._index_stamp == stamp:
+            return self._index
+        rows = []
+        with open(p, 'r', encoding='utf-8') as f:
+            for line in f:
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    rows.append(json.loads(line))
+                except ValueError:
+                    break  # torn last line
+        for i, r in enumerate(rows):
+            r['id'] = i
+        self._index, self._index_stamp = rows, stamp
+        return rows
+
+    def __len__(self) -> int:
+        return len(self._read_index())
+
+    def index(self) -> List[Dict[str, Any]]:
+        """All committed curve records (dicts; 'id' is the position in the archive)."""
+        return list(self._read_index())
+
+    # ---------------- append -----------------
+    def append_trace(self, trace: Dict[str, Any], *, source: str | None = None) -> int:
+        """Append one trace dict ({'name','x','y','unit',...}); returns its id."""
+        return self.append_traces([trace], source=source)[0]
+
+    def append_traces(self, traces: Iterable[Dict[str, Any]], *, source: str | None = None) -> List[int]:
+        """Append several traces with a single index flush; returns their ids."""
+        ids: List[int] = []
+        self.root.mkdir(parents=True, exist_ok=True)
+        with self._lock, _process_lock(self.root):
+            self._maps.clear()  # release maps before truncating (required on Windows)
+            rows = self._read_index()
+            end = rows[-1]['offset'] + rows[-1]['points'] if rows else 0
+            self._truncate_to(end)
+            lines = []
+            with open(self._path(FREQ_FILE), 'ab') as ff, open(self._path(LEVEL_FILE), 'ab') as lf:
+                for trace in traces:
+                    x = np.asarray(trace['x'], dtype=FREQ_DTYPE).ravel()
+                    y = np.asarray(trace['y'], dtype=LEVEL_DTYPE).ravel()
+                    if x.shape != y.shape:
+                        raise ValueError(f"Trace {trace.get('name')!r}: {x.size} frequencies vs {y.size} levels")
+                    ff.write(x.tobytes())
+                    lf.write(y.tobytes())
+                    rec = {"offset": end, "points": int(x.size), "name": trace.get('name') or 'measurement',
+                           "unit": canonical_unit(trace.get('unit') or '')}
+                    for key in _TRACE_META_KEYS:
+                        if trace.get(key):
+                            rec[key] = trace[key]
+                    rec.setdefault("date", measurement_date())
+                    if source:
+                        rec["source"] = str(source)
+                    lines.append(json.dumps(rec, ensure_ascii=False))
+                    ids.append(len(rows) + len(ids))
+                    end += int(x.size)
+                ff.flush()
+                lf.flush()
+                os.fsync(ff.fileno())
+                os.fsync(lf.fileno())
+            if lines:
+                with open(self._path(INDEX_FILE), 'a', encoding='utf-8') as idx:
+                    idx.write("\n".join(lines) + "\n")
+        return ids
+
+    def _truncate_to(self, points: int) -> None:
+        """Drop data bytes beyond the last committed curve and a torn index line (interrupted append)."""
+        p = self._path(INDEX_FILE)
+        if p.exists():
+            with open(p, 'r+b') as f:
+                content = f.read()
+                if content and not content.endswith(b"\n"):
+                    f.truncate(content.rfind(b"\n") + 1)
+                    self._index = None
+        for name, dtype in ((FREQ_FILE, FREQ_DTYPE), (LEVEL_FILE, LEVEL_DTYPE)):
+            p = self._path(name)
+            want = points * dtype.itemsize
+            try:
+                if p.stat().st_size > want:
+                    with open(p, 'r+b') as f:
+                        f.truncate(want)
+            except FileNotFoundError:
+                pass
+
+    # ---------------- read -----------------
+    def _map(self, name: str, dtype) -> np.ndarray:
+        p = self._path(name)
+        try:
+            st = p.stat()
+        except OSError:
+            return np.empty(0, dtype=dtype)
+        stamp = (st.st_mtime_ns, st.st_size)
+        cached = self._maps.get(name)
+        if cached is not None and cached[0] == stamp:
+            return cached[1]
+        if st.st_size < dtype.itemsize:
+            return np.empty(0, dtype=dtype)
+        mm = np.memmap(p, dtype=dtype, mode='r', shape=(st.st_size // dtype.itemsize,))
+        self._maps[name] = (stamp, mm)
+        return mm
+
+    def load(self, curve_id: int) -> Tuple[np.ndarray, np.ndarray, Dict[str, Any]]:
+        """(freq view, level view, record) for one curve."""
+        rec = self._read_index()[curve_id]
+        a, b = rec['offset'], rec['offset'] + rec['points']
+        return self._map(FREQ_FILE, FREQ_DTYPE)[a:b], self._map(LEVEL_FILE, LEVEL_DTYPE)[a:b], rec
+
+    def select(self, *, name: str | None = None, unit: str | None = None, dut: str | None = None,
+               source: str | None = None) -> List[Dict[str, Any]]:
+        """Index records matching all given fields (exact, name case-insensitive)."""
+        out = []
+        lname = name.lower() if name else None
+        for r in self._read_index():
+            if lname and str(r.get('name', '')).lower() != lname:
+                continue
+            if unit and r.get('unit') != unit:
+                continue
+            if dut and r.get('dut') != dut:
+                continue
+            if source and r.get('source') != source:
+                continue
+            out.append(r)
+        return out
+
+    def stack(self, records: Iterable[Dict[str, Any]], *, column: str = "level") -> np.ndarray:
+        """Stack equal-length curves into a 2-D array (one row per record)."""
+        recs = list(records)
+        if not recs:
+            return np.empty((0, 0), dtype=LEVEL_DTYPE if column == "level" else FREQ_DTYPE)
+        n = recs[0]['points']
+        if any(r['points'] != n for r in recs):
+            raise ValueError("Curves have different point counts; load them individually.")
+        data = self._map(LEVEL_FILE, LEVEL_DTYPE) if column == "level" else self._map(FREQ_FILE, FREQ_DTYPE)
+        offsets = np.fromiter((r['offset'] for r in recs), dtype=np.int64, count=len(recs))
+        return data[offsets[:, None] + np.arange(n)]
+
+    def traces(self, records: Iterable[Dict[str, Any]] | None = None) -> Iterable[Dict[str, Any]]:
+        """Yield trace dicts ({'name','x','y','unit',...}) for *records* (default: all)."""
+        for rec in (self._read_index() if records is None else records):
+            x, y, _ = self.load(rec['id'])
+            trace = {k: v for k, v in rec.items() if k not in ('offset', 'points', 'id')}
+            trace['x'] = np.asarray(x, dtype=float)
+            trace['y'] = np.asarray(y, dtype=float)
+            yield trace
+
+
+def import_hxml(paths: Iterable, archive: MeasurementArchive | None = None, *, skip_known: bool = True) -> int:
+    """Convert HXML files into the archive; returns the number of curves added.
+
+    With *skip_known*, files already recorded as a 'source' are skipped.
+    """
+    arc = archive if archive is not None else MeasurementArchive()
+    known = {r.get('source') for r in arc.index()} if skip_known else set()
+    added = 0
+    for p in paths:
+        src = str(Path(p).resolve())
+        if src in known:
+            continue
+        traces = []
+        for cd in iter_curvedata(p, load=True):
+            t = cd.as_trace()
+            if t['x'] is None or t['y'] is None:
+                continue
+            t['working_title'] = cd.working_title
+            if cd.attrs.get('DUT'):
+                t['dut'] = cd.attrs['DUT']
+            traces.append(t)
+        if traces:
+            added += len(arc.append_traces(traces, source=src))
+    return added
+
+
+_archives: Dict[str, MeasurementArchive] = {}
+_archives_lock = threading.Lock()  # separate from _dir_locks_lock: MeasurementArchive() takes that one
+
+
+def measurement_archive(root=None) -> MeasurementArchive:
+    """Shared MeasurementArchive for *root* (default ARCHIVE_DIR), one instance per resolved directory."""
+    key = str(Path(root or ARCHIVE_DIR).resolve())
+    with _archives_lock:
+        archive = _archives.get(key)
+    if archive is None:
+        # Built outside the lock; a concurrent first call may build a second one, setdefault keeps one
+        created = MeasurementArchive(key)
+        with _archives_lock:
+            archive = _archives.setdefault(key, created)
+    return archive
+
+
+def archive_exported_traces(traces: Iterable[Dict[str, Any]], source, root=None) -> None:
+    """Best-effort archive append used by the export paths (never raises); *root*: archive directory."""
+    try:
+        measurement_archive(root).append_traces(traces, source=str(Path(source).resolve()))
+    except Exception as e:
+        print(f"⚠️ Could not append to measurement archive: {e}")
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Columnar measurement archive (freq/level arrays + index).")
+    parser.add_argument("--archive", help=f"Archive directory (default: {ARCHIVE_DIR})")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+    p_imp = sub.add_parser("import", help="Convert HXML files into the archive")
+    p_imp.add_argument("files", nargs="+", help="HXML files or glob patterns")
+    p_imp.add_argument("--force", action="store_true", help="Re-import files already in the archive")
+    sub.add_parser("info", help="Summarize archive contents")
+    args = parser.parse_args(argv)
+
+    arc = MeasurementArchive(args.archive)
+    if args.cmd == "import":
+        files = []
+        for pattern in args.files:
+            files.extend(sorted(glob.glob(pattern)) or [pattern])
+        n = import_hxml(files, arc, skip_known=not args.force)
+        print(f"✅ Added {n} curve(s) to {arc.root}")
+    else:
+        rows = arc.index()
+        names: Dict[str, int] = {}
+        for r in rows:
+            names[r.get('name', '')] = names.get(r.get('name', ''), 0) + 1
+        print(f"{arc.root}: {len(rows)} curve(s), {sum(r['points'] for r in rows)} points")
+        for name, count in sorted(names.items()):
+            print(f"  {name:<24} {count}")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,139 @@
+"""Worker-thread jobs that report back to the Tk thread.
+
+Tk widgets may only be touched from the main thread, so every callback of a
+`BackgroundJob` (progress, done, error) is handed to a *dispatch* function,
+typically `widget.after(0, fn)` wrapped by `tk_dispatcher(widget)`.
+Without a dispatcher callbacks run directly on the worker thread (CLI use).
+
+Usage:
+
+    def work(job):
+        for i, item in enumerate(items, 1):
+            if job.cancelled:
+                return None
+            process(item)
+            job.report(i, len(items), f"Processed {item}")
+        return "ok"
+
+    job = BackgroundJob(work, name="Export", dispatch=tk_dispatcher(self),
+                        on_progress=lambda done, total, msg: self.update_status(msg),
+                        on_done=lambda result: self.update_status("Done"),
+                        on_error=lambda exc: messagebox.showerror("Error", str(exc)))
+    job.start()
+    ...
+    job.cancel()
+"""
+from __future__ import annotations
+
+import threading
+from typing import Any, Callable, Optional
+
+Dispatch = Callable[[Callable[[], None]], None]
+
+
+def tk_dispatcher(widget) -> Dispatch:
+    """Dispatch function that schedules callbacks on *widget*'s Tk event loop."""
+    def _dispatch(fn):
+        try:
+            widget.after(0, fn)
+        except Exception:
+            pass  # widget destroyed (application closing)
+    return _dispatch
+
+
+def _direct(fn):
+    fn()
+
+
+class JobCancelled(Exception):
+    """Raised by `BackgroundJob.check_cancelled` to unwind a cancelled job."""
+
+
+class BackgroundJob:
+    """Run `target(job)` on a daemon thread with progress, cancel and completion callbacks.
+
+    on_progress(done, total, message), on_done(result) and on_error(exception)
+    are invoked through *dispatch*. A job that returns after `cancel()` (or
+    raises JobCancelled) reports through on_cancelled instead of on_done.
+    """
+
+    def __init__(self, target: Callable[["BackgroundJob"], Any], *, name: str = "BackgroundJob",
+                 dispatch: Optional[Dispatch] = None,
+                 on_progress: Optional[Callable[[int, int, str], None]] = None,
+                 on_done: Optional[Callable[[Any], None]] = None,
+                 on_error: Optional[Callable[[BaseException], None]] = None,
+                 on_cancelled: Optional[Callable[[], None]] = None):
+        self.target = target
+        self.name = name
+        self._dispatch = dispatch or _direct
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        self.on_cancelled = on_cancelled
+        self.cancel_event = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self._thread: Optional[threading.Thread] = None
+        self._finished = threading.Event()
+
+    # ---------------- control -----------------
+    def start(self) -> "BackgroundJob":
+        self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+        self._thread.start()
+        return self
+
+    def run_inline(self) -> Any:
+        """Run on the calling thread (used by worker services that own their own thread)."""
+        self._run()
+        return self.result
+
+    def cancel(self) -> None:
+        self.cancel_event.set()
+
+    @property
+    def cancelled(self) -> bool:
+        return self.cancel_event.is_set()
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    @property
+    def finished(self) -> bool:
+        return self._finished.is_set()
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Block until the job finished (True) or *timeout* elapsed (False)."""
+        return self._finished.wait(timeout)
+
+    # ---------------- called from the worker -----------------
+    def report(self, done: int, total: int, message: str = "") -> None:
+        if self.on_progress is not None:
+            cb = self.on_progress
+            self._dispatch(lambda: cb(done, total, message))
+
+    def check_cancelled(self) -> None:
+        if self.cancel_event.is_set():
+            raise JobCancelled()
+
+    def _run(self) -> None:
+        try:
+            self.result = self.target(self)
+        except JobCancelled:
+            self.cancel_event.set()
+        except BaseException as e:  # reported to the caller, never lost in the thread
+            self.error = e
+        finally:
+            self._finished.set()
+        if self.error is not None:
+            if self.on_error is not None:
+                cb, err = self.on_error, self.error
+                self._dispatch(lambda: cb(err))
+            else:
+                print(f"❌ {self.name} failed: {self.error}")
+        elif self.cancel_event.is_set():
+            if self.on_cancelled is not None:
+                self._dispatch(self.on_cancelled)
+        elif self.on_done is not None:
+            cb, res = self.on_done, self.result
+            self._dispatch(lambda: cb(res))
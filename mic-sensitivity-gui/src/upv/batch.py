@@ -0,0 +1,288 @@
+"""Multi-DUT batch runs: a queue of serial numbers, per-DUT results, throughput accounting.
+
+A batch runs the same preset sequence once per device under test (DUT).
+Serial numbers are entered up front or scanned one by one (a barcode scanner
+types the serial followed by Enter). Per DUT:
+
+- the traces are tagged with the serial (curvedata attribute DUT, archive
+  column dut) and exported to their own file, `{dut}_{timestamp}.hxml` by
+  default, which is then added to the results catalog;
+- the instrument stays configured between DUTs: presets are applied
+  differentially (`CompiledPreset.delta`), so a repeated first preset only
+  sends what differs from the last one applied (headless; the GUI applies
+  the first preset of every DUT in full, see gui.sequence_actions).
+
+`ThroughputStats` listens to each DUT's SequenceEngine and accounts the wall
+time per stage (apply, arm, sweep, collect, export) and the idle time the
+station waits for the operator (between DUTs and, in the GUI, until Start
+Sweep is pressed for a new DUT). Every finished DUT is appended to
+throughput.csv; the summary reports DUTs/hour and where the time went.
+
+Usage:
+
+    batch = Batch(presets, out_dir, queue=DutQueue(["SN001", "SN002"]))
+    batch.stats.attach(engine)
+    serial = batch.next_dut()
+    while serial is not None:
+        actions.export_path, actions.dut = batch.export_path(serial), serial
+        engine.start(presets)
+        batch.dut_done(engine.ok, engine.export_result)
+        serial = batch.next_dut()
+    print(batch.stats.summary())   # '2 DUTs in 0:04:10 (28.8 DUT/h): sweep 61%, apply 22%, idle 9%, ...'
+"""
+from __future__ import annotations
+
+import csv
+import re
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, Iterator, List, Optional, TextIO
+
+try:
+    from upv.results_catalog import ResultsCatalog
+except ImportError:  # executed as a plain script from the upv folder
+    from results_catalog import ResultsCatalog
+
+try:
+    from utils.paths import data_path
+    THROUGHPUT_FILE = data_path('throughput.csv')
+except Exception:
+    THROUGHPUT_FILE = Path('throughput.csv')
+
+DEFAULT_DUT_NAME = "{dut}_{timestamp}.hxml"
+STAGES = ("apply", "arm", "sweep", "collect", "export")
+IDLE = "idle"
+_CSV_FIELDS = ("finished", "dut", "ok", "seconds") + STAGES + (IDLE,)
+_UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def tag_trace(trace: Dict[str, Any], dut: Optional[str]) -> Dict[str, Any]:
+    """Copy of *trace* carrying the DUT serial (curvedata attribute + archive metadata)."""
+    if not dut:
+        return trace
+    attrs = dict(trace.get('attrs') or {}, DUT=dut)
+    return dict(trace, dut=dut, attrs=attrs)
+
+
+def catalog_result(path, catalog_file=None) -> bool:
+    """Add an exported file to the results catalog; False (and a message) if that failed."""
+    try:
+        with ResultsCatalog(catalog_file) as catalog:
+            return catalog.add_file(path)
+    except Exception as e:
+        print(f"⚠️ Could not add {Path(path).name} to the results catalog: {e}")
+        return False
+
+
+class DutQueue:
+    """Serial numbers still to measure, in order (blank entries and serials queued before are ignored)."""
+
+    def __init__(self, serials: Iterable[str] = ()):
+        self._pending: List[str] = []
+        self._seen = set()
+        for serial in serials:
+            self.add(serial)
+
+    def add(self, serial: str) -> bool:
+        serial = str(serial).strip()
+        if not serial or serial in self._seen:
+            return False
+        self._seen.add(serial)
+        self._pending.append(serial)
+        return True
+
+    def remove(self, serial: str) -> None:
+        if serial in self._pending:
+            self._pending.remove(serial)
+            self._seen.discard(serial)
+
+    def pop(self) -> Optional[str]:
+        return self._pending.pop(0) if self._pending else None
+
+    @property
+    def pending(self) -> List[str]:
+        return list(self._pending)
+
+    def __len__(self):
+        return len(self._pending)
+
+
+def read_serials(path) -> List[str]:
+    """Serial numbers from a text file, one per line ('#' starts a comment)."""
+    serials = []
+    with open(path, 'r', encoding='utf-8-sig') as f:
+        for line in f:
+            line = line.split('#', 1)[0].strip()
+            if line:
+                serials.append(line)
+    return serials
+
+
+def scan_serials(stream: TextIO, prompt: Optional[TextIO] = None) -> Iterator[str]:
+    """Serial numbers typed or scanned on *stream*, one per line, until an empty line or EOF."""
+    while True:
+        if prompt is not None:
+            prompt.write("Scan next DUT serial (empty line to finish): ")
+            prompt.flush()
+        line = stream.readline()
+        if not line.strip():
+            return
+        yield line.strip()
+
+
+class ThroughputStats:
+    """Wall time per stage and operator idle time over the DUTs of a batch.
+
+    manual_start: the first ARM of every DUT waits for the operator (GUI Start
+    Sweep) and is counted as idle time instead of arm.
+    """
+
+    def __init__(self, *, manual_start: bool = False, log_file=THROUGHPUT_FILE):
+        self.manual_start = manual_start
+        self.log_file = Path(log_file) if log_file else None
+        self.started = time.monotonic()
+        self.records: List[Dict[str, Any]] = []
+        self.totals: Dict[str, float] = {key: 0.0 for key in STAGES + (IDLE,)}
+        self._current: Optional[Dict[str, Any]] = None
+        self._open: Optional[str] = None
+        self._open_t = 0.0
+        self._armed = False
+        self._last_end = self.started
+
+    # ---------------- DUTs -----------------
+    def dut_started(self, dut: str) -> None:
+        now = time.monotonic()
+        if not self.records and self._current is None:
+            # The batch clock starts with the first DUT, not when the queue was set up
+            self.started = self._last_end = now
+        self._current = {"dut": dut, "started": now, IDLE: now - self._last_end}
+        for stage in STAGES:
+            self._current[stage] = 0.0
+        self._armed = False
+
+    def dut_finished(self, ok: bool) -> Optional[Dict[str, Any]]:
+        """Close the current DUT; returns its record (seconds per stage, rounded) and logs it."""
+        if self._current is None:
+            return None
+        self._close(time.monotonic())
+        now = time.monotonic()
+        current, self._current = self._current, None
+        self._last_end = now
+        record = {"finished": time.strftime("%Y-%m-%d %H:%M:%S"), "dut": current["dut"], "ok": bool(ok),
+                  "seconds": round(now - current["started"] + current[IDLE], 2)}
+        for key in STAGES + (IDLE,):
+            self.totals[key] += current[key]
+            record[key] = round(current[key], 2)
+        self.records.append(record)
+        self._log(record)
+        return record
+
+    def _log(self, record: Dict[str, Any]) -> None:
+        if self.log_file is None:
+            return
+        try:
+            new = not self.log_file.exists()
+            with open(self.log_file, 'a', newline='', encoding='utf-8') as f:
+                writer = csv.DictWriter(f, fieldnames=_CSV_FIELDS)
+                if new:
+                    writer.writeheader()
+                writer.writerow(record)
+        except Exception as e:
+            print(f"⚠️ Could not write throughput log: {e}")
+
+    # ---------------- engine events -----------------
+    def attach(self, engine) -> None:
+        """Account the stages of *engine* (call once per engine)."""
+        engine.subscribe(self._on_event)
+
+    def _close(self, now: float) -> None:
+        if self._open is not None and self._current is not None:
+            self._current[self._open] += now - self._open_t
+        self._open = None
+
+    def _on_event(self, event: str, fields: Dict[str, Any]) -> None:
+        if self._current is None:
+            return
+        now = time.monotonic()
+        self._close(now)
+        if event == "stage":
+            stage = fields["stage"]
+            if stage == "arm" and self.manual_start and not self._armed:
+                stage = IDLE  # waiting for the operator to start the new DUT
+            if stage == "arm" or stage == IDLE:
+                self._armed = True
+            if stage in self._current:
+                self._open, self._open_t = stage, now
+
+    # ---------------- report -----------------
+    @property
+    def duts(self) -> int:
+        return len(self.records)
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self.started
+
+    def duts_per_hour(self) -> float:
+        hours = (self._last_end - self.started) / 3600.0
+        return self.duts / hours if hours > 0 else 0.0
+
+    def report(self) -> Dict[str, Any]:
+        """Totals for the batch so far (JSON-friendly)."""
+        accounted = sum(self.totals.values())
+        return {
+            "duts": self.duts,
+            "ok": sum(1 for r in self.records if r["ok"]),
+            "seconds": round(self._last_end - self.started, 1),
+            "duts_per_hour": round(self.duts_per_hour(), 2),
+            "stages": {key: round(value, 1) for key, value in self.totals.items()},
+            "share": {key: round(value / accounted, 3) if accounted else 0.0 for key, value in self.totals.items()},
+        }
+
+    def summary(self) -> str:
+        report = self.report()
+        seconds = int(report["seconds"])
+        wall = f"{seconds // 3600}:{seconds % 3600 // 60:02d}:{seconds % 60:02d}"
+        shares = sorted(report["share"].items(), key=lambda kv: -kv[1])
+        parts = ", ".join(f"{key} {share:.0%}" for key, share in shares if share >= 0.005)
+        return f"{report['duts']} DUTs in {wall} ({report['duts_per_hour']:.1f} DUT/h)" + (f": {parts}" if parts else "")
+
+
+class Batch:
+    """One batch: the preset sequence, the DUT queue, per-DUT export paths and the stats."""
+
+    def __init__(self, presets: List[Path], out_dir, *, queue: Optional[DutQueue] = None,
+                 name_template: str = DEFAULT_DUT_NAME, manual_start: bool = False,
+                 log_file=THROUGHPUT_FILE):
+        self.presets = list(presets)
+        self.out_dir = Path(out_dir)
+        self.queue = queue if queue is not None else DutQueue()
+        self.name_template = name_template
+        self.stats = ThroughputStats(manual_start=manual_start, log_file=log_file)
+        self.current: Optional[str] = None
+        self.exported: Dict[str, Path] = {}
+
+    def export_path(self, dut: str) -> Path:
+        """Export file of *dut*: name template with {dut}, {timestamp}, {first} and {count}."""
+        safe = _UNSAFE_FILENAME_CHARS.sub("_", dut)
+        name = self.name_template.format(dut=safe, timestamp=time.strftime("%Y%m%d_%H%M%S"),
+                                         first=self.presets[0].stem if self.presets else "sequence",
+                                         count=len(self.presets))
+        if not name.lower().endswith(".hxml"):
+            name += ".hxml"
+        return self.out_dir / name
+
+    def next_dut(self) -> Optional[str]:
+        """Start accounting the next queued DUT; None when the queue is empty."""
+        self.current = self.queue.pop()
+        if self.current is not None:
+            self.stats.dut_started(self.current)
+        return self.current
+
+    def dut_done(self, ok: bool, export_path=None) -> Optional[Dict[str, Any]]:
+        """Finish the current DUT; returns its throughput record."""
+        if export_path is not None and self.current is not None:
+            self.exported[self.current] = Path(export_path)
+        record = self.stats.dut_finished(ok)
+        self.current = None
+        return record
@@ -0,0 +1,143 @@
+"""Export service: HXML exports written on a worker thread.
+
+An `ExportJob` carries the traces (or a callable producing them, e.g. a trace
+fetch from the instrument), the destination and optional smoothing. Jobs are
+processed in submission order by one worker thread, so the GUI returns to the
+event loop immediately and the next measurement can start while an earlier
+export is still being written. Progress and completion are reported through
+the dispatcher (`upv.background.tk_dispatcher`).
+
+Usage:
+
+    service = ExportService(dispatch=tk_dispatcher(self))
+    service.submit(ExportJob(path, traces, label="Combined export",
+                             on_done=lambda job: self.update_status(f"Saved {job.path}")))
+"""
+from __future__ import annotations
+
+import queue
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Union
+
+try:
+    from upv.background import BackgroundJob, Dispatch
+    from upv.hxml_writer import DEFAULT_WORKING_TITLE, HXMLWriter
+    from upv.smoothing import process_trace
+    from upv.archive import archive_exported_traces
+except ImportError:  # executed as a plain script from the upv folder
+    from background import BackgroundJob, Dispatch
+    from hxml_writer import DEFAULT_WORKING_TITLE, HXMLWriter
+    from smoothing import process_trace
+    from archive import archive_exported_traces
+
+try:
+    from utils.profiling import profiled
+except Exception:  # utils not on the path: profiling is a no-op
+    def profiled(name=None, cat="gui"):
+        return lambda fn: fn
+
+TraceSource = Union[Iterable[Dict[str, Any]], Callable[[], Iterable[Dict[str, Any]]]]
+
+
+class ExportJob:
+    """One export request: traces (or a producer callable) + destination + callbacks."""
+
+    def __init__(self, path, traces: TraceSource, *, working_title: str = DEFAULT_WORKING_TITLE,
+                 smoothing: Optional[int] = None, atomic: bool = True, archive: bool = True,
+                 label: str = "Export",
+                 on_progress: Optional[Callable[["ExportJob", int, int], None]] = None,
+                 on_done: Optional[Callable[["ExportJob"], None]] = None,
+                 on_error: Optional[Callable[["ExportJob", BaseException], None]] = None):
+        self.path = Path(path)
+        self.traces = traces
+        self.working_title = working_title
+        self.smoothing = smoothing
+        self.atomic = atomic
+        self.archive = archive
+        self.label = label
+        self.on_progress = on_progress
+        self.on_done = on_done
+        self.on_error = on_error
+        # Filled in by the worker
+        self.written: List[Dict[str, Any]] = []
+        self.error: Optional[BaseException] = None
+
+    def _resolve_traces(self) -> Iterable[Dict[str, Any]]:
+        return self.traces() if callable(self.traces) else self.traces
+
+    @profiled("ExportJob.run", "disk")
+    def run(self, job: BackgroundJob) -> "ExportJob":
+        """Write the HXML file (called on the worker thread)."""
+        traces = list(self._resolve_traces() or [])
+        if not traces:
+            raise ValueError("No trace data to export.")
+        total = len(traces)
+        with HXMLWriter(self.path, working_title=self.working_title, atomic=self.atomic) as writer:
+            for i, trace in enumerate(traces, 1):
+                if self.smoothing:
+                    x, y = process_trace(trace['x'], trace['y'], self.smoothing,
+                                         unit=trace.get('unit'), decimate=False)
+                    trace = dict(trace, x=x, y=y)
+                writer.write_curvedata(trace)
+                self.written.append(trace)
+                job.report(i, total, trace.get('name') or '')
+        if self.archive:
+            archive_exported_traces(self.written, self.path)
+        return self
+
+
+class ExportService:
+    """Single worker thread draining a FIFO of ExportJobs."""
+
+    def __init__(self, dispatch: Optional[Dispatch] = None):
+        self._dispatch = dispatch
+        self._queue: "queue.Queue[Optional[ExportJob]]" = queue.Queue()
+        self._pending = 0
+        self._pending_lock = threading.Lock()
+        self._idle = threading.Event()
+        self._idle.set()
+        self._thread = threading.Thread(target=self._worker, name="HXMLExport", daemon=True)
+        self._thread.start()
+
+    def submit(self, export_job: ExportJob) -> ExportJob:
+        with self._pending_lock:
+            self._pending += 1
+            self._idle.clear()
+        self._queue.put(export_job)
+        return export_job
+
+    @property
+    def pending(self) -> int:
+        """Jobs queued or being written."""
+        with self._pending_lock:
+            return self._pending
+
+    def wait_idle(self, timeout: Optional[float] = None) -> bool:
+        """Block until every submitted job finished (True) or *timeout* elapsed."""
+        return self._idle.wait(timeout)
+
+    def shutdown(self, timeout: Optional[float] = None) -> bool:
+        """Finish queued jobs (up to *timeout*) and stop the worker; True if all were written."""
+        done = self.wait_idle(timeout)
+        self._queue.put(None)
+        return done
+
+    def _worker(self) -> None:
+        while True:
+            ej = self._queue.get()
+            if ej is None:
+                return
+            bg = BackgroundJob(
+                ej.run, name=f"Export {ej.path.name}", dispatch=self._dispatch,
+                on_progress=(lambda done, total, _msg, ej=ej: ej.on_progress(ej, done, total))
+                if ej.on_progress else None,
+                on_done=(lambda _res, ej=ej: ej.on_done(ej)) if ej.on_done else None,
+                on_error=(lambda exc, ej=ej: ej.on_error(ej, exc)) if ej.on_error else None,
+            )
+            bg.run_inline()
+            ej.error = bg.error
+            with self._pending_lock:
+                self._pending -= 1
+                if self._pending == 0:
+                    self._idle.set()
@@ -0,0 +1,196 @@
+"""Merge many HXML results into one combined file, or split one back apart.
+
+Merging streams curvedata entries one at a time from each input (via
+`upv.hxml_reader`) into `upv.hxml_writer.HXMLWriter`, so memory stays
+constant regardless of how many files are combined. The output has the same
+structure as the combined sequence export (one dataset, many curvedata).
+
+Inputs are file paths / glob patterns, or a results catalog query.
+
+Usage:
+
+    python -m upv.hxml_merge merge -o combined.hxml Results/FOG*.hxml
+    python -m upv.hxml_merge merge -o fog_nov.hxml --preset "FOG*" --from 2025-11-01 --to 2025-11-30
+    python -m upv.hxml_merge split Results/combined.hxml --out-dir Results/split
+
+    from upv.hxml_merge import merge_hxml, split_hxml
+    merge_hxml(["a.hxml", "b.hxml"], "ab.hxml")
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import re
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Sequence
+
+try:
+    from upv.hxml_reader import CurveData, iter_curvedata
+    from upv.hxml_writer import DEFAULT_WORKING_TITLE, HXMLWriter
+except ImportError:  # executed as a plain script from the upv folder
+    from hxml_reader import CurveData, iter_curvedata
+    from hxml_writer import DEFAULT_WORKING_TITLE, HXMLWriter
+
+_STANDARD_ATTRS = ("CurveDataName", "MeasurementDate", "TestEquipmentNr", "Tester")
+_UNSAFE_FILENAME_CHARS = re.compile(r'[<>:"/\\|?*\x00-\x1f]')
+
+
+def _trace_from_curvedata(cd: CurveData) -> Dict:
+    """Trace dict for the writer, keeping non-standard curvedata attributes (e.g. DUT)."""
+    trace = cd.as_trace()
+    extra = {k: v for k, v in cd.attrs.items() if k not in _STANDARD_ATTRS}
+    if extra:
+        trace['attrs'] = extra
+    return trace
+
+
+def iter_file_curvedata(paths: Iterable, names: Optional[Sequence[str]] = None) -> Iterator[CurveData]:
+    """Loaded curvedata from *paths* in order, optionally only those named in *names*."""
+    wanted = {n.lower() for n in names} if names else None
+    for p in paths:
+        for cd in iter_curvedata(p, load=True):
+            if wanted is None or cd.name.lower() in wanted:
+                yield cd
+
+
+def iter_catalog_curvedata(rows: Iterable[Dict]) -> Iterator[CurveData]:
+    """Loaded curvedata for results catalog rows ({'path','idx',...}), one parse per file."""
+    by_file: "OrderedDict[str, List[int]]" = OrderedDict()
+    for r in rows:
+        by_file.setdefault(r['path'], []).append(int(r['idx']))
+    for path, indices in by_file.items():
+        want = set(indices)
+        for cd in iter_curvedata(path, load=True, indices=want):
+            if cd.index in want:
+                yield cd
+
+
+def merge_hxml(inputs: Iterable, output, *, working_title: str = DEFAULT_WORKING_TITLE,
+               names: Optional[Sequence[str]] = None, progress=None) -> int:
+    """Stream the curvedata of *inputs* into *output*; returns the number of curves written.
+
+    inputs: file paths, or an iterable of `CurveData` (e.g. `iter_catalog_curvedata`).
+    names: only curves with these CurveDataNames (case-insensitive), for either kind of input.
+    progress: optional callable(count, curvedata) after each written entry.
+    """
+    items = iter(inputs)
+    first = next(items, None)
+    if first is None:
+        source: Iterable[CurveData] = ()
+    elif isinstance(first, CurveData):
+        source = _chain_first(first, items)
+        if names:
+            wanted = {n.lower() for n in names}
+            source = (cd for cd in source if cd.name.lower() in wanted)
+    else:
+        source = iter_file_curvedata(_chain_first(first, items), names)
+    out = Path(output)
+    with HXMLWriter(out, working_title=working_title, atomic=True) as writer:
+        for cd in source:
+            writer.write_curvedata(_trace_from_curvedata(cd))
+            if progress is not None:
+                progress(writer.count, cd)
+        count = writer.count
+    if count == 0:
+        print(f"⚠️ No curves matched; '{out.name}' contains an empty dataset.")
+    return count
+
+
+def _chain_first(first, rest):
+    yield first
+    yield from rest
+
+
+def _unique_path(directory: Path, stem: str, suffix: str = ".hxml") -> Path:
+    """directory/stem.hxml, or stem_2, stem_3, ... if taken."""
+    candidate = directory / f"{stem}{suffix}"
+    n = 2
+    while candidate.exists():
+        candidate = directory / f"{stem}_{n}{suffix}"
+        n += 1
+    return candidate
+
+
+def split_hxml(path, out_dir=None, *, working_title: str | None = None) -> List[Path]:
+    """Write each curvedata of *path* to its own file named after CurveDataName.
+
+    Existing files are never overwritten (suffix _2, _3, ... like the GUI exports).
+    """
+    src = Path(path)
+    target = Path(out_dir) if out_dir else src.parent
+    target.mkdir(parents=True, exist_ok=True)
+    written: List[Path] = []
+    for cd in iter_curvedata(src, load=True):
+        stem = _UNSAFE_FILENAME_CHARS.sub('_', Path(cd.name).stem if cd.name.lower().endswith('.hxml') else cd.name)
+        out = _unique_path(target, stem or f"{src.stem}_{cd.index}")
+        with HXMLWriter(out, working_title=working_title or cd.working_title or DEFAULT_WORKING_TITLE,
+                        atomic=True) as writer:
+            writer.write_curvedata(_trace_from_curvedata(cd))
+        written.append(out)
+    return written
+
+
+def _expand(patterns: Sequence[str]) -> List[str]:
+    files: List[str] = []
+    for pattern in patterns:
+        matches = sorted(glob.glob(pattern))
+        files.extend(matches if matches else [pattern])
+    return files
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Merge HXML results into one file or split a combined file.")
+    sub = parser.add_subparsers(dest="cmd", required=True)
+
+    p_merge = sub.add_parser("merge", help="Stream curvedata from many files into one combined file")
+    p_merge.add_argument("files", nargs="*", help="HXML files or glob patterns")
+    p_merge.add_argument("-o", "--output", required=True, help="Combined output file")
+    p_merge.add_argument("--name", action="append", help="Only curvedata with this CurveDataName (repeatable)")
+    p_merge.add_argument("--working-title", default=DEFAULT_WORKING_TITLE, help="Dataset WorkingTitle")
+    cat = p_merge.add_argument_group("catalog query (instead of files)")
+    cat.add_argument("--preset", help="CurveDataName (wildcards * ? allowed)")
+    cat.add_argument("--from", dest="date_from", help="Earliest MeasurementDate")
+    cat.add_argument("--to", dest="date_to", help="Latest MeasurementDate (inclusive)")
+    cat.add_argument("--dut", help="DUT identifier")
+    cat.add_argument("--results-dir", help="Results folder to index")
+    cat.add_argument("--db", help="Catalog database")
+
+    p_split = sub.add_parser("split", help="Write each curvedata of a combined file to its own file")
+    p_split.add_argument("file", help="Combined HXML file")
+    p_split.add_argument("--out-dir", help="Output folder (default: next to the input)")
+    args = parser.parse_args(argv)
+
+    try:
+        if args.cmd == "split":
+            written = split_hxml(args.file, args.out_dir)
+            for p in written:
+                print(f"✅ {p}")
+            print(f"Split into {len(written)} file(s)")
+            return 0
+
+        if args.files:
+            inputs: Iterable = _expand(args.files)
+        elif any((args.preset, args.date_from, args.date_to, args.dut)):
+            try:
+                from upv.results_catalog import ResultsCatalog
+            except ImportError:
+                from results_catalog import ResultsCatalog
+            with ResultsCatalog(args.db, args.results_dir) as catalog:
+                catalog.update()
+                rows = catalog.query(args.preset, args.date_from, args.date_to, args.dut)
+            # Oldest first, matching the order a sequence would have produced them
+            inputs = iter_catalog_curvedata(reversed(rows))
+        else:
+            parser.error("merge needs input files or a catalog query (--preset/--from/--to/--dut)")
+            return 2
+        count = merge_hxml(inputs, args.output, working_title=args.working_title, names=args.name)
+        print(f"✅ Merged {count} curve(s) into '{args.output}'")
+        return 0
+    except Exception as e:
+        print(f"❌ {args.cmd} failed: {e}")
+        return 1
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
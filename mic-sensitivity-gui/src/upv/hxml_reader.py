@@ -0,0 +1,263 @@
+"""Streaming HXML reader returning NumPy arrays.
+
+Reads the hiCurve files written by `upv.hxml_writer` (and the older
+frequency/magnitude exports found in Results/) with incremental parsing:
+elements are discarded as soon as a curvedata entry is complete, so memory
+stays bounded by one curvedata regardless of file size.
+
+Curve payloads '[v v v ...]' are decoded straight into float64 arrays with
+`np.fromstring(..., sep=' ')` (no intermediate Python float list). With
+`load=False` payloads are not decoded at all; only the point count and the
+first/last values are taken from the text, which is enough for listings and
+for the results catalog.
+
+Usage:
+
+    from upv.hxml_reader import iter_curvedata, HXMLReader
+
+    for cd in iter_curvedata("Results/combined.hxml"):          # metadata only
+        print(cd.name, cd.y_unit, cd.points, cd.freq_range)
+
+    reader = HXMLReader("Results/combined.hxml")
+    names = [cd.name for cd in reader.curvedata()]
+    cd = reader.load(1)                                          # decode one entry
+    x, y = cd.x, cd.y
+"""
+from __future__ import annotations
+
+import xml.etree.ElementTree as ET
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
+
+try:
+    from upv.units import canonical_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from units import canonical_unit
+
+# Curve names used for the frequency axis / level axis across export versions
+X_CURVE_NAMES = ("f", "frequency")
+Y_CURVE_NAMES = ("level", "magnitude")
+
+
+def decode_curve_values(text: str | None) -> np.ndarray:
+    """Decode a bracketed payload '[v v v ...]' into a float64 array."""
+    if not text:
+        return np.empty(0, dtype=float)
+    body = text.strip()
+    if body.startswith("["):
+        body = body[1:]
+    if body.endswith("]"):
+        body = body[:-1]
+    if not body.strip():
+        return np.empty(0, dtype=float)
+    return np.fromstring(body, dtype=float, sep=" ")
+
+
+def _payload_summary(text: str | None) -> Tuple[int, float, float]:
+    """(points, first, last) from the raw payload text without decoding it."""
+    body = (text or "").strip().strip("[]").strip()
+    if not body:
+        return 0, float("nan"), float("nan")
+    if "  " in body or "\n" in body or "\t" in body:
+        points = len(body.split())
+    else:  # single-space separated (all writer output): count separators only
+        points = body.count(" ") + 1
+    head = body.split(None, 1)[0]
+    tail = body.rsplit(None, 1)[-1]
+    try:
+        return points, float(head), float(tail)
+    except ValueError:
+        return points, float("nan"), float("nan")
+
+
+class Curve:
+    """One <curve> element: name, unit, point count and (optionally) the values."""
+
+    __slots__ = ("name", "unit", "points", "first", "last", "values")
+
+    def __init__(self, name, unit, points, first, last, values=None):
+        self.name = name
+        self.unit = unit
+        self.points = points
+        self.first = first
+        self.last = last
+        self.values: Optional[np.ndarray] = values
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.values is not None else "lazy"
+        return f"Curve({self.name!r}, unit={self.unit!r}, points={self.points}, {state})"
+
+
+class CurveData:
+    """One <curvedata> entry with its dataset WorkingTitle and curves."""
+
+    __slots__ = ("index", "working_title", "attrs", "curves")
+
+    def __init__(self, index: int, working_title: str, attrs: Dict[str, str]):
+        self.index = index
+        self.working_title = working_title
+        self.attrs = attrs
+        self.curves: Dict[str, Curve] = {}
+
+    # --- attributes -------------------------------------------------
+    @property
+    def name(self) -> str:
+        return self.attrs.get("CurveDataName", "")
+
+    @property
+    def date(self) -> str:
+        return self.attrs.get("MeasurementDate", "")
+
+    @property
+    def equipment(self) -> str:
+        return self.attrs.get("TestEquipmentNr", "")
+
+    @property
+    def tester(self) -> str:
+        return self.attrs.get("Tester", "")
+
+    # --- curves -----------------------------------------------------
+    def _curve(self, aliases) -> Optional[Curve]:
+        for alias in aliases:
+            c = self.curves.get(alias)
+            if c is not None:
+                return c
+        return None
+
+    @property
+    def x_curve(self) -> Optional[Curve]:
+        return self._curve(X_CURVE_NAMES)
+
+    @property
+    def y_curve(self) -> Optional[Curve]:
+        return self._curve(Y_CURVE_NAMES)
+
+    @property
+    def x(self) -> Optional[np.ndarray]:
+        c = self.x_curve
+        return None if c is None else c.values
+
+    @property
+    def y(self) -> Optional[np.ndarray]:
+        c = self.y_curve
+        return None if c is None else c.values
+
+    @property
+    def y_unit(self) -> str:
+        """Level unit in canonical spelling ('dBSPL' -> 'dB SPL')."""
+        c = self.y_curve
+        return canonical_unit(c.unit) if c is not None and c.unit else ""
+
+    @property
+    def points(self) -> int:
+        c = self.y_curve or self.x_curve
+        return c.points if c is not None else 0
+
+    @property
+    def freq_range(self) -> Tuple[float, float]:
+        c = self.x_curve
+        if c is None:
+            return float("nan"), float("nan")
+        return min(c.first, c.last), max(c.first, c.last)
+
+    @property
+    def loaded(self) -> bool:
+        return all(c.values is not None for c in self.curves.values())
+
+    def as_trace(self) -> Dict:
+        """Trace dict in the shape used by the GUI sequence and `hxml_writer`."""
+        return {"name": self.name, "x": self.x, "y": self.y, "unit": self.y_unit,
+                "date": self.date or None, "equipment": self.equipment or None,
+                "tester": self.tester or None}
+
+    def __repr__(self) -> str:
+        return f"CurveData({self.index}, {self.name!r}, curves={list(self.curves)})"
+
+
+def iter_curvedata(path, *, load: bool = False, indices=None) -> Iterator[CurveData]:
+    """Yield the curvedata entries of *path* in file order.
+
+    load:    decode curve payloads into NumPy arrays (otherwise metadata only)
+    indices: optional set of curvedata indices to decode when *load* is set;
+             other entries are still yielded, lazily.
+    """
+    wanted = None if indices is None else set(indices)
+    working_title = ""
+    current: Optional[CurveData] = None
+    index = -1
+    stack: List[ET.Element] = []
+    for event, elem in ET.iterparse(str(path), events=("start", "end")):
+        if event == "start":
+            stack.append(elem)
+            if elem.tag == "dataset":
+                working_title = elem.get("WorkingTitle", "")
+            elif elem.tag == "curvedata":
+                index += 1
+                current = CurveData(index, working_title, dict(elem.attrib))
+            continue
+        stack.pop()
+        tag = elem.tag
+        if tag == "curve" and current is not None:
+            text = elem.text
+            points, first, last = _payload_summary(text)
+            values = None
+            if load and (wanted is None or current.index in wanted):
+                values = decode_curve_values(text)
+                points = values.shape[0]
+            current.curves[elem.get("name", "")] = Curve(elem.get("name", ""), elem.get("unit", ""),
+                                                          points, first, last, values)
+            elem.clear()
+        elif tag == "curvedata" and current is not None:
+            done, current = current, None
+            elem.clear()
+            if stack:
+                stack[-1].remove(elem)
+            yield done
+
+
+class HXMLReader:
+    """Random access on top of `iter_curvedata`.
+
+    The metadata listing is parsed once and cached; `load(i)` decodes only the
+    requested entry.
+    """
+
+    def __init__(self, path):
+        self.path = Path(path)
+        self._entries: Optional[List[CurveData]] = None
+
+    def curvedata(self) -> List[CurveData]:
+        """All curvedata entries (metadata only, cached)."""
+        if self._entries is None:
+            self._entries = list(iter_curvedata(self.path))
+        return self._entries
+
+    def __len__(self) -> int:
+        return len(self.curvedata())
+
+    def __iter__(self) -> Iterator[CurveData]:
+        return iter(self.curvedata())
+
+    def names(self) -> List[str]:
+        return [cd.name for cd in self.curvedata()]
+
+    def load(self, index: int) -> CurveData:
+        """Decode curvedata *index* and return it."""
+        for cd in iter_curvedata(self.path, load=True, indices=(index,)):
+            if cd.index == index:
+                if self._entries is not None and index < len(self._entries):
+                    self._entries[index] = cd
+                return cd
+        raise IndexError(f"{self.path.name} has no curvedata #{index}")
+
+    def load_all(self) -> List[CurveData]:
+        """Decode every entry (single pass) and return them."""
+        self._entries = list(iter_curvedata(self.path, load=True))
+        return self._entries
+
+
+def read_traces(path) -> List[Dict]:
+    """Load every curvedata of *path* as trace dicts ({'name','x','y','unit',...})."""
+    return [cd.as_trace() for cd in iter_curvedata(path, load=True)]
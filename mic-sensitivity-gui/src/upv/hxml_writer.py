@@ -0,0 +1,194 @@
+"""Single HXML emitter shared by every export path.
+
+Produces the hiCurve layout used by the single-trace export
+(`fetch_and_plot_trace`) and the combined sequence export: one dataset with
+one or more `curvedata` entries, each carrying an 'f' (Hz) curve and a 'level'
+curve.
+
+Numeric payloads are formatted in bulk (one C-level `%` format call per curve
+with a cached template) and streamed straight to the file, so memory stays
+bounded by the largest single curve even for very large combined exports.
+With `atomic=True` the file is written to a temporary sibling and renamed
+into place only after the closing tag has been written.
+
+A trace is a dict as collected by the GUI sequence:
+
+    {"name": "FOGm20", "x": [...], "y": [...], "unit": "dBr"}
+
+Optional keys: "date" (MeasurementDate string), "equipment", "tester",
+"x_name" / "y_name" (curve names, default 'f' / 'level'), "x_unit" and
+"attrs" (extra curvedata attributes, written after the standard ones).
+"""
+from __future__ import annotations
+
+import datetime
+import os
+import tempfile
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, Iterable
+
+import numpy as np
+
+DEFAULT_WORKING_TITLE = "workingTitle"
+DEFAULT_TEST_EQUIPMENT = "UPV_Audio_Analyzer"
+DEFAULT_TESTER = "PythonApp"
+MEASUREMENT_DATE_FORMAT = "%d-%b-%Y %H:%M:%S"
+
+_HEAD = (
+    '<?xml version="1.0" encoding="utf-8"?>\n'
+    "<hxml>\n"
+    "   <head>\n"
+    "      <Document>\n"
+    "         <DataVersion XsdVersion=\"0.0.0.1\">0.0.0.1</DataVersion>\n"
+    "         <DataType>hiCurve</DataType>\n"
+    "         <LDocNode>//hxml/data</LDocNode>\n"
+    "         <PlatformVersion>n.a.</PlatformVersion>\n"
+    "      </Document>\n"
+    "   </head>\n"
+    "   <data>\n"
+)
+_DATASET_OPEN = (
+    "      <dataset WorkingTitle=\"{title}\">\n"
+    "         <longDataSetDesc/>\n"
+    "         <shortDataSetDesc/>\n"
+    "         <acpEarhookType/>\n"
+    "         <v-curvedata>\n"
+)
+_TAIL = (
+    "         </v-curvedata>\n"
+    "      </dataset>\n"
+    "   </data>\n"
+    "   <environment/>\n"
+    "</hxml>\n"
+)
+
+
+def xml_escape_attr(value: Any) -> str:
+    """Escape a value for use inside a double-quoted XML attribute."""
+    s = "" if value is None else str(value)
+    return (s.replace('&', '&amp;')
+             .replace('"', '&quot;')
+             .replace("'", '&apos;')
+             .replace('<', '&lt;')
+             .replace('>', '&gt;'))
+
+
+@lru_cache(maxsize=32)
+def _value_template(count: int) -> str:
+    return " ".join(["%.6f"] * count)
+
+
+def format_curve_values(values) -> str:
+    """Format a numeric array as the bracketed HXML payload '[v v v ...]' (6 decimals)."""
+    arr = np.asarray(values, dtype=float).ravel()
+    if arr.size == 0:
+        return "[]"
+    return "[" + (_value_template(arr.size) % tuple(arr.tolist())) + "]"
+
+
+def measurement_date(when: datetime.datetime | None = None) -> str:
+    """MeasurementDate attribute string, e.g. '20-Nov-2025 11:29:32'."""
+    return (when or datetime.datetime.now()).strftime(MEASUREMENT_DATE_FORMAT)
+
+
+class HXMLWriter:
+    """Streaming writer; use as a context manager and call `write_curvedata` per trace."""
+
+    def __init__(self, path, *, working_title: str = DEFAULT_WORKING_TITLE, atomic: bool = False):
+        self.path = Path(path)
+        self.working_title = working_title or DEFAULT_WORKING_TITLE
+        self.atomic = atomic
+        self.count = 0
+        self._fh = None
+        self._tmp_path: Path | None = None
+        self._default_date = measurement_date()
+
+    def open(self) -> "HXMLWriter":
+        if self.atomic:
+            fd, tmp = tempfile.mkstemp(prefix=f".{self.path.stem}.", suffix=".tmp",
+                                       dir=str(self.path.parent or Path('.')))
+            self._tmp_path = Path(tmp)
+            self._fh = os.fdopen(fd, "w", encoding="utf-8")
+        else:
+            self._fh = open(self.path, "w", encoding="utf-8")
+        self._fh.write(_HEAD)
+        self._fh.write(_DATASET_OPEN.format(title=xml_escape_attr(self.working_title)))
+        return self
+
+    def write_curvedata(self, trace: Dict[str, Any]) -> None:
+        """Append one curvedata entry built from a trace dict."""
+        fh = self._fh
+        if fh is None:
+            raise RuntimeError("HXMLWriter is not open.")
+        attrs = {
+            "CurveDataName": trace.get("name") or "measurement",
+            "MeasurementDate": trace.get("date") or self._default_date,
+            "TestEquipmentNr": trace.get("equipment") or DEFAULT_TEST_EQUIPMENT,
+            "Tester": trace.get("tester") or DEFAULT_TESTER,
+        }
+        attrs.update(trace.get("attrs") or {})
+        attr_str = " ".join(f'{k}="{xml_escape_attr(v)}"' for k, v in attrs.items())
+        x_name = xml_escape_attr(trace.get("x_name", "f"))
+        x_unit = xml_escape_attr(trace.get("x_unit", "Hz"))
+        y_name = xml_escape_attr(trace.get("y_name", "level"))
+        y_unit = xml_escape_attr(trace.get("unit", "dBV"))
+        fh.write(f"            <curvedata {attr_str}>\n")
+        fh.write("               <longCurveDesc/>\n")
+        fh.write("               <shortCurveDesc/>\n")
+        fh.write(f"               <curve name=\"{x_name}\" unit=\"{x_unit}\">")
+        fh.write(format_curve_values(trace["x"]))
+        fh.write("</curve>\n")
+        fh.write(f"               <curve name=\"{y_name}\" unit=\"{y_unit}\">")
+        fh.write(format_curve_values(trace["y"]))
+        fh.write("</curve>\n")
+        fh.write("            </curvedata>\n")
+        self.count += 1
+
+    def close(self) -> None:
+        """Write the closing tags and (atomic mode) move the file into place."""
+        if self._fh is None:
+            return
+        try:
+            self._fh.write(_TAIL)
+            self._fh.flush()
+            if self.atomic:
+                os.fsync(self._fh.fileno())
+        finally:
+            self._fh.close()
+            self._fh = None
+        if self._tmp_path is not None:
+            os.replace(self._tmp_path, self.path)
+            self._tmp_path = None
+
+    def abort(self) -> None:
+        """Close without finishing; an atomic temp file is removed, the target untouched."""
+        if self._fh is not None:
+            try:
+                self._fh.close()
+            finally:
+                self._fh = None
+        if self._tmp_path is not None:
+            try:
+                self._tmp_path.unlink()
+            except OSError:
+                pass
+            self._tmp_path = None
+
+    def __enter__(self) -> "HXMLWriter":
+        return self.open()
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+
+def write_hxml(path, traces: Iterable[Dict[str, Any]], *, working_title: str = DEFAULT_WORKING_TITLE,
+               atomic: bool = False) -> Path:
+    """Write all *traces* (any iterable, consumed lazily) into one HXML file and return its path."""
+    with HXMLWriter(path, working_title=working_title, atomic=atomic) as writer:
+        for trace in traces:
+            writer.write_curvedata(trace)
+    return Path(path)
@@ -0,0 +1,201 @@
+"""Priority-ordered access to the VISA session shared by the GUI threads.
+
+The acquisition thread polls the trace continuously, Apply Settings writes
+from a background job and Stop must reach the instrument as soon as possible.
+A plain `threading.Lock` serves waiters in arbitrary order, so a Stop could
+wait behind several queued trace polls. `PriorityLock` hands the session to
+the waiting caller with the lowest priority value first (FIFO within one
+priority):
+
+    URGENT (0)   stop / abort
+    NORMAL (10)  settings writes, one-off queries
+    POLL   (20)  live trace polling
+
+A call already talking to the instrument is never interrupted; the urgent
+caller gets the session as soon as that call returns. Pollers can also check
+`urgent_waiting()` between queries and back off.
+
+`trigger_sweep()` / `wait_sweep_complete()` / `abort_sweep()` are the sweep
+start, completion (*ESR? bit 0) and stop sequences shared by the GUI and the
+headless runner (upv.run_sequence).
+
+Usage:
+
+    lock = PriorityLock()
+    with lock:                          # NORMAL
+        upv.write("SOUR:VOLT 1 V")
+    with lock.hold(POLL):
+        trace = upv.query("TRAC:SWE1:LOAD:AY?")
+    trigger_sweep(upv, continuous=False, lock=lock)
+    done = wait_sweep_complete(upv, timeout_s=120, lock=lock)
+    confirmed = abort_sweep(upv, lock=lock)
+"""
+from __future__ import annotations
+
+import heapq
+import itertools
+import threading
+import time
+from contextlib import contextmanager, nullcontext
+from typing import Callable, Optional
+
+URGENT = 0
+NORMAL = 10
+POLL = 20
+
+
+class PriorityLock:
+    """Non-reentrant mutex whose waiters are granted in priority order."""
+
+    def __init__(self):
+        self._cond = threading.Condition(threading.Lock())
+        self._locked = False
+        self._waiters = []  # heap of (priority, seq)
+        self._seq = itertools.count()
+
+    def acquire(self, priority: int = NORMAL, timeout: Optional[float] = None) -> bool:
+        """Wait for the session; False if *timeout* seconds passed first."""
+        with self._cond:
+            if not self._locked and not self._waiters:
+                self._locked = True
+                return True
+            entry = (priority, next(self._seq))
+            heapq.heappush(self._waiters, entry)
+            deadline = None if timeout is None else time.monotonic() + timeout
+            while self._locked or self._waiters[0] != entry:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    self._waiters.remove(entry)
+                    heapq.heapify(self._waiters)
+                    self._cond.notify_all()  # the next waiter may now be at the head
+                    return False
+                self._cond.wait(remaining)
+            heapq.heappop(self._waiters)
+            self._locked = True
+            return True
+
+    def release(self) -> None:
+        with self._cond:
+            if not self._locked:
+                raise RuntimeError("release of an unlocked PriorityLock")
+            self._locked = False
+            self._cond.notify_all()
+
+    def locked(self) -> bool:
+        return self._locked
+
+    def urgent_waiting(self, threshold: int = URGENT) -> bool:
+        """True if a caller with priority <= *threshold* is waiting for the session."""
+        with self._cond:
+            return bool(self._waiters) and self._waiters[0][0] <= threshold
+
+    @contextmanager
+    def hold(self, priority: int = NORMAL, timeout: Optional[float] = None):
+        """Context manager form of acquire/release; raises TimeoutError if *timeout* expires."""
+        if not self.acquire(priority, timeout):
+            raise TimeoutError("instrument session busy")
+        try:
+            yield self
+        finally:
+            self.release()
+
+    # `with lock:` behaves like a NORMAL-priority threading.Lock
+    def __enter__(self):
+        self.acquire(NORMAL)
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.release()
+        return False
+
+
+def _held(lock: Optional[PriorityLock], priority: int):
+    return lock.hold(priority) if lock is not None else nullcontext()
+
+
+def trigger_sweep(upv, *, continuous: bool = False, lock: Optional[PriorityLock] = None, log=print) -> None:
+    """Start a sweep: OUTP ON, INIT:CONT ON/OFF, INIT.
+
+    A single sweep is followed by *CLS + *OPC so its end sets ESR bit 0 (see
+    `operation_complete`). Each write is best effort; failures are logged.
+    """
+    commands = ["OUTP ON", "INIT:CONT ON" if continuous else "INIT:CONT OFF", "INIT"]
+    if not continuous:
+        commands += ["*CLS", "*OPC"]
+    with _held(lock, NORMAL):
+        for cmd in commands:
+            try:
+                upv.write(cmd)
+            except Exception as e:
+                log(f"⚠️ {cmd} failed: {e}")
+
+
+def operation_complete(esr) -> bool:
+    """True if an *ESR? response has the Operation Complete bit (0) set."""
+    try:
+        return bool(int(float(esr)) & 0x01)
+    except (TypeError, ValueError):
+        return False
+
+
+def wait_sweep_complete(upv, *, timeout_s: float = 120.0, poll_s: float = 0.25,
+                        query: Optional[Callable[[str], str]] = None, lock: Optional[PriorityLock] = None,
+                        cancel_event: Optional[threading.Event] = None) -> bool:
+    """Poll *ESR? until a single sweep started by `trigger_sweep` completes.
+
+    Returns False on timeout or when *cancel_event* is set. *query* replaces
+    `upv.query`; otherwise each poll holds *lock* at POLL priority.
+    """
+    deadline = time.monotonic() + timeout_s
+    while time.monotonic() < deadline:
+        if cancel_event is not None and cancel_event.is_set():
+            return False
+        try:
+            if query is not None:
+                esr = query("*ESR?")
+            else:
+                with _held(lock, POLL):
+                    esr = upv.query("*ESR?")
+        except Exception:
+            esr = None
+        if operation_complete(esr):
+            return True
+        if cancel_event is not None:
+            cancel_event.wait(poll_s)
+        else:
+            time.sleep(poll_s)
+    return False
+
+
+def abort_sweep(upv, *, lock: Optional[PriorityLock] = None, opc_timeout_ms: int = 5000,
+                log=print) -> bool:
+    """Stop a running sweep: INIT:CONT OFF + ABOR at URGENT priority, then confirm with *OPC?.
+
+    The confirmation query also runs at URGENT priority but releases the session
+    between commands. Returns True when *OPC? answered within *opc_timeout_ms*.
+    """
+    with _held(lock, URGENT):
+        upv.write("INIT:CONT OFF")
+        try:
+            upv.write("ABOR")  # optional; ignored by firmware that does not support it
+        except Exception:
+            pass
+    with _held(lock, URGENT):
+        prev_timeout = getattr(upv, 'timeout', None)
+        try:
+            upv.timeout = opc_timeout_ms
+        except Exception:
+            prev_timeout = None
+        try:
+            upv.query("*OPC?")
+            return True
+        except Exception as e:
+            log(f"⚠️ Stop not confirmed (*OPC?): {e}")
+            return False
+        finally:
+            if prev_timeout is not None:
+                try:
+                    upv.timeout = prev_timeout
+                except Exception:
+                    pass
+
@@ -0,0 +1,470 @@
+"""Compiled, validated presets: one immutable SCPI command list per preset file.
+
+Applying a preset used to mean `json.load` from disk on every apply, sending
+whatever strings the file held, and finding a bad value only when the UPV
+rejected it halfway through a sequence. `PresetCompiler` turns a preset into
+a `CompiledPreset` once:
+
+- every (section, label) is resolved to its SCPI header (command_groups) and
+  every top-level "HEADER:..." key becomes a raw command, in apply order;
+- each value is validated against the settings schema (gui.settings_schema):
+  option codes against the display_map option sets (display names and case
+  variants are mapped to the code), ON/OFF switches, and "<number> <unit>"
+  rows against the unit grammar of their family (PCT/%, HZ/Hz, μV/uV, ...);
+- values are canonicalized to the UPV's own spelling ("0.1 PCT", "100 HZ",
+  "600 OHM", "5 US"), so equal settings compare equal across presets.
+
+Problems are collected per preset and raised together as a `PresetError`, so
+a sequence can check all its presets before anything is applied. Labels the
+UPV has no command for are skipped (as apply always did) and kept with their
+raw values in `CompiledPreset.skipped`, so `to_settings()` still carries them
+(e.g. "Play bef.Meas") into settings.json and later saved presets.
+
+Compiled presets are cached by the SHA-1 of the file bytes, in memory and on
+disk (preset_compiled.json, invalidated when the schema changes), so a
+preset is parsed and validated once per content, not once per apply.
+
+`normalize_value` is the one-pass replacement for the regex chain the
+settings panels used to run on every value (display spelling: "0.1 %",
+"100 Hz", "5 μs").
+
+Usage:
+
+    python -m upv.preset_compiler presets/*.json          # validate, print problems
+
+    compiled, invalid = compile_presets(paths)             # {path: CompiledPreset}, {path: error}
+    apply_grouped_settings(upv, data=compiled[path])       # sends preset.commands
+    settings = compiled[path].to_settings()                # grouped dict for the panels
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import hashlib
+import json
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple
+
+try:
+    from upv.upv_auto_config import RAW_EXCLUDE, command_groups
+except ImportError:  # executed as a plain script from the upv folder
+    from upv_auto_config import RAW_EXCLUDE, command_groups
+
+# The schema lives with the panels; without it (plain script from the upv
+# folder) presets are still compiled, but option codes and units are not checked
+try:
+    from gui.display_map import IMPEDANCE_OPTIONS_UNBAL
+    from gui.settings_schema import (CHECK, COMBO, FACTOR, FIELD_BY_KEY, IMPEDANCE, RADIO, SWITCH,
+                                     VALUE_UNIT, VALUE_UNIT_RE)
+except Exception:
+    IMPEDANCE_OPTIONS_UNBAL = {}
+    FIELD_BY_KEY = {}
+    CHECK = COMBO = FACTOR = IMPEDANCE = RADIO = SWITCH = VALUE_UNIT = None
+    VALUE_UNIT_RE = re.compile(r"^\s*([+-]?(?:\d+(?:\.\d*)?|\.\d+)(?:[eE][+-]?\d+)?)\s*(.*?)\s*$")
+
+try:
+    from utils.paths import data_path
+    CACHE_FILE = data_path('preset_compiled.json')
+except Exception:
+    CACHE_FILE = Path('preset_compiled.json')
+
+_CACHE_VERSION = 2  # 2: skipped entries keep (section, label, raw value)
+# Compiled presets kept on disk (least recently used are dropped)
+MAX_CACHED = 500
+
+Command = Tuple[str, str, str, str]  # (section, label, SCPI header, value); section "" for raw keys
+
+# Settings whose change re-initializes dependent settings on the UPV: a
+# differential apply sends the full command list when one of them changes
+RESET_LABELS = {"Instrument Generator", "Instrument Analyzer", "Function Generator", "Function Analyzer"}
+
+
+class PresetError(ValueError):
+    """A preset that cannot be applied; `problems` lists every invalid setting."""
+
+    def __init__(self, name: str, problems: List[str]):
+        self.name = name
+        self.problems = list(problems)
+        shown = "; ".join(self.problems[:3])
+        more = f" (+{len(self.problems) - 3} more)" if len(self.problems) > 3 else ""
+        super().__init__(f"{name}: {shown}{more}")
+
+
+# ---------------- value spelling -----------------
+# Unit token (lower case) -> display spelling used by the settings panels
+_DISPLAY_UNITS = {
+    "pct": "%", "dbv": "dBV", "dbu": "dBu", "dbm": "dBm", "hz": "Hz", "khz": "kHz",
+    "us": "μs", "ms": "ms", "s": "s", "min": "min", "uv": "μV",
+    "kohm": "kohm", "kω": "kohm", "ohm": "ohm", "ω": "ohm",
+}
+# Unit token (lower case) -> the UPV's SCPI spelling (as it reports settings back)
+SCPI_UNITS = {
+    "v": "V", "mv": "MV", "uv": "UV", "μv": "UV", "w": "W", "mw": "MW", "uw": "UW", "μw": "UW",
+    "dbv": "DBV", "dbu": "DBU", "dbm": "DBM", "dbr": "DBR", "db": "DB", "%": "PCT", "pct": "PCT",
+    "hz": "HZ", "khz": "KHZ", "ohm": "OHM", "ω": "OHM", "kohm": "KOHM", "kω": "KOHM",
+    "s": "S", "ms": "MS", "us": "US", "μs": "US", "min": "MIN",
+}
+
+_CODE_TOKEN_RE = re.compile(r"[A-Za-z]{1,6}\d{1,5}[A-Za-z]{0,4}")  # S256K, R200K, UFIL1
+# One pass: a number glued to its unit (not inside a code token or an exponent) | a unit word | Ω
+_VALUE_TOKEN_RE = re.compile(
+    r"(?<![A-Za-z0-9_.])(\d+(?:\.\d+)?)(?![eE][+-]?\d)(?=[A-Za-zμΩ%])"
+    r"|(?<![^\W\d])(pct|dbv|dbu|dbm|khz|hz|kohm|kΩ|ohm|ms|min|us|uv|s)(?!\w)"
+    r"|(Ω)",
+    re.IGNORECASE)
+# Code tokens split by older snapshot normalization ("R200 K" -> "R200K")
+_SPLIT_CODE_RE = re.compile(r"\b([A-Za-z]\d{1,5}) ([A-Za-z]{1,3})\b")
+
+
+def normalize_value(value: str) -> str:
+    """Display spelling of a settings value ('0.1PCT' -> '0.1 %', '100 HZ' -> '100 Hz').
+
+    Pure code tokens (S256K, R200K) and enumerations are left alone.
+    """
+    text = " ".join(str(value).split())
+    if not text or (' ' not in text and _CODE_TOKEN_RE.fullmatch(text)):
+        return text
+
+    def token(match):
+        number, unit, ohm = match.groups()
+        if number is not None:
+            return number + " "
+        if ohm is not None:
+            return "ohm"
+        lowered = unit.lower()
+        # 'us' is only a time unit after a number (not the word "US")
+        if lowered == "us" and not match.string[:match.start()].rstrip()[-1:].isdigit():
+            return unit
+        return _DISPLAY_UNITS.get(lowered, unit)
+
+    text = _VALUE_TOKEN_RE.sub(token, text)
+    if ' ' in text:
+        text = _SPLIT_CODE_RE.sub(r"\1\2", text)
+    return text.strip()
+
+
+def _number_unit(value: str) -> Optional[Tuple[str, str]]:
+    """('<number>', '<unit as written>') of a value row, None if it does not start with a number."""
+    match = VALUE_UNIT_RE.match(normalize_value(value))
+    return (match.group(1), match.group(2)) if match else None
+
+
+# ---------------- schema checks -----------------
+_code_lookup: Dict[int, Dict[str, str]] = {}
+_family_units: Dict[str, Dict[str, str]] = {}
+
+
+def _codes(field) -> Dict[str, str]:
+    """Lower-cased code -> code for a field's option set (IMPEDANCE also accepts the unbalanced 5 Ω)."""
+    key = id(field)
+    lookup = _code_lookup.get(key)
+    if lookup is None:
+        codes = list(field.options.codes)
+        if field.kind == IMPEDANCE:
+            codes += list(IMPEDANCE_OPTIONS_UNBAL)
+        lookup = _code_lookup[key] = {c.lower(): c for c in codes}
+    return lookup
+
+
+def _units(family) -> Dict[str, str]:
+    """SCPI units accepted by a unit family, keyed by every accepted lower-case spelling."""
+    units = _family_units.get(family.name)
+    if units is None:
+        allowed = {SCPI_UNITS.get(option.lower(), option.upper()) for option in family.options}
+        units = {token: scpi for token, scpi in SCPI_UNITS.items() if scpi in allowed}
+        units.update({scpi.lower(): scpi for scpi in allowed})
+        _family_units[family.name] = units
+    return units
+
+
+def canonical_value(section: str, label: str, value: Any) -> str:
+    """SCPI value string for one settings row; raises ValueError when the schema rejects it."""
+    text = " ".join(str(value).split())
+    if not text:
+        raise ValueError("empty value")
+    field = FIELD_BY_KEY.get((section, label))
+    if field is None:
+        return text
+    kind = field.kind
+    if kind in (COMBO, RADIO, IMPEDANCE) and field.options is not None:
+        code = _codes(field).get(text.lower()) or field.options.to_code(text, default="")
+        if not code:
+            raise ValueError(f"'{text}' is not one of {', '.join(field.options.codes)}")
+        return code
+    if kind in (SWITCH, CHECK):
+        upper = text.upper()
+        if upper in ("ON", "1"):
+            return "ON"
+        if upper in ("OFF", "0"):
+            return "OFF"
+        raise ValueError(f"'{text}' is not ON or OFF")
+    if kind == FACTOR:
+        parsed = _number_unit(text)
+        if parsed is None:
+            raise ValueError(f"'{text}' is not a number")
+        return parsed[0]
+    if kind == VALUE_UNIT:
+        parsed = _number_unit(text)
+        if parsed is None:
+            raise ValueError(f"'{text}' is not '<number> <unit>'")
+        number, unit = parsed
+        if not unit:
+            return number  # instrument default unit
+        scpi_unit = _units(field.units).get(unit.lower())
+        if scpi_unit is None:
+            raise ValueError(f"unit '{unit}' is not a {field.units.name} unit")
+        return f"{number} {scpi_unit}"
+    return text
+
+
+def compile_settings(data: Mapping[str, Any], name: str = "preset") -> Tuple[Tuple[Command, ...], tuple, tuple]:
+    """(commands, extras, skipped) for a preset dict; raises PresetError listing every invalid setting.
+
+    commands are in apply_grouped_settings order; extras are the top-level
+    keys that are not sent (INIT:CONT, SweepMode, ...) kept verbatim; skipped
+    holds (section, label, raw value) of the labels without a SCPI command.
+    """
+    if not isinstance(data, Mapping):
+        raise PresetError(name, ["preset is not a JSON object"])
+    commands: List[Command] = []
+    problems: List[str] = []
+    skipped: List[Tuple[str, str, Any]] = []
+    for section, scpi_map in command_groups.items():
+        values = data.get(section)
+        if values is None:
+            continue
+        if not isinstance(values, Mapping):
+            problems.append(f"{section}: not a group of settings")
+            continue
+        for label, value in values.items():
+            scpi = scpi_map.get(label)
+            if scpi is None:
+                skipped.append((section, label, value))
+                continue
+            try:
+                commands.append((section, label, scpi, canonical_value(section, label, value)))
+            except ValueError as e:
+                problems.append(f"{section} / {label}: {e}")
+    extras: List[Tuple[str, Any]] = []
+    for key, value in data.items():
+        if key in command_groups:
+            continue
+        if isinstance(value, Mapping):
+            problems.append(f"{key}: unknown settings group")
+        elif key in RAW_EXCLUDE or ':' not in key:
+            extras.append((key, value))
+        else:
+            text = " ".join(str(value).split())
+            if text:
+                commands.append(("", key, key, text))
+            else:
+                problems.append(f"{key}: empty value")
+    if problems:
+        raise PresetError(name, problems)
+    return tuple(commands), tuple(extras), tuple(skipped)
+
+
+class CompiledPreset:
+    """Validated, canonical command list of one preset file (immutable)."""
+
+    __slots__ = ("path", "sha1", "commands", "extras", "skipped")
+
+    def __init__(self, path, sha1: str, commands: Tuple[Command, ...], extras: Tuple[Tuple[str, Any], ...],
+                 skipped: Tuple[str, ...] = ()):
+        self.path = Path(path)
+        self.sha1 = sha1
+        self.commands = commands
+        self.extras = extras
+        self.skipped = skipped  # (section, label, raw value) without a SCPI command (not applied)
+
+    @property
+    def name(self) -> str:
+        return self.path.stem
+
+    def to_settings(self) -> Dict[str, Any]:
+        """Grouped settings dict (sections, raw keys, extras) with the canonical values; a fresh copy.
+
+        Labels without a SCPI command keep their raw value, so nothing of the preset is lost.
+        """
+        settings: Dict[str, Any] = {}
+        for section, label, _scpi, value in self.commands:
+            if section:
+                settings.setdefault(section, {})[label] = value
+            else:
+                settings[label] = value
+        for section, label, value in self.skipped:
+            settings.setdefault(section, {})[label] = value
+        settings.update(self.extras)
+        return settings
+
+    def delta(self, previous: Optional["CompiledPreset"]) -> "CompiledPreset":
+        """Only the commands whose value differs from *previous* (the preset the UPV is set to).
+
+        The full preset when *previous* is unknown or an instrument / function
+        setting changes (see RESET_LABELS).
+        """
+        if previous is None:
+            return self
+        before = {(c[0], c[1]): c[3] for c in previous.commands}
+        changed = tuple(c for c in self.commands if before.get((c[0], c[1])) != c[3])
+        if any(c[0] and c[1] in RESET_LABELS for c in changed):
+            return self
+        return CompiledPreset(self.path, self.sha1, changed, self.extras, self.skipped)
+
+    def __len__(self):
+        return len(self.commands)
+
+    def __repr__(self):
+        return f"CompiledPreset({self.name!r}, {len(self.commands)} commands)"
+
+
+def _schema_key() -> str:
+    """Fingerprint of the SCPI map and option sets; cached compilations of another schema are dropped."""
+    h = hashlib.sha1(json.dumps(command_groups, sort_keys=True).encode('utf-8'))
+    for key, field in sorted(FIELD_BY_KEY.items()):
+        options = field.options.codes if field.options is not None else None
+        units = field.units.options if field.units is not None else None
+        h.update(repr((key, field.kind, options, units)).encode('utf-8'))
+    return h.hexdigest()
+
+
+class PresetCompiler:
+    """Compiles preset files once per content (SHA-1), caching in memory and in *path*."""
+
+    def __init__(self, path=CACHE_FILE):
+        self.path = Path(path) if path else None
+        self._lock = threading.Lock()
+        self._schema = _schema_key()
+        # sha1 -> {"commands": [...], "extras": [...], "skipped": [...]}, least recently used first
+        self._entries: Dict[str, Dict[str, list]] = {}
+        self._dirty = False
+        self._load()
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if raw.get("version") == _CACHE_VERSION and raw.get("schema") == self._schema:
+                self._entries = dict(raw.get("presets", {}))
+        except Exception:
+            self._entries = {}  # corrupt cache: recompile
+
+    def save(self) -> None:
+        """Write the cache (atomic replace); no-op if nothing was compiled."""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            entries = list(self._entries.items())[-MAX_CACHED:]
+            payload = {"version": _CACHE_VERSION, "schema": self._schema, "presets": dict(entries)}
+            self._dirty = False
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass  # the cache is an optimization only
+
+    def compile(self, path) -> CompiledPreset:
+        """CompiledPreset for the file at *path*; raises PresetError (invalid) or OSError."""
+        path = Path(path)
+        raw = path.read_bytes()
+        sha1 = hashlib.sha1(raw).hexdigest()
+        with self._lock:
+            entry = self._entries.pop(sha1, None)
+            if entry is not None:
+                self._entries[sha1] = entry  # most recently used last
+        if entry is not None:
+            commands = tuple(tuple(c) for c in entry["commands"])
+            return CompiledPreset(path, sha1, commands, tuple(tuple(e) for e in entry["extras"]),
+                                  tuple(tuple(k) for k in entry.get("skipped", ())))
+        try:
+            data = json.loads(raw.decode('utf-8-sig'))
+        except ValueError as e:
+            raise PresetError(path.stem, [f"not valid JSON ({e})"]) from None
+        commands, extras, skipped = compile_settings(data, path.stem)
+        with self._lock:
+            self._entries[sha1] = {"commands": [list(c) for c in commands], "extras": [list(e) for e in extras],
+                                   "skipped": [list(k) for k in skipped]}
+            self._dirty = True
+        return CompiledPreset(path, sha1, commands, extras, skipped)
+
+    def compile_all(self, paths: Iterable) -> Tuple[Dict[Path, CompiledPreset], Dict[Path, Exception]]:
+        """({path: CompiledPreset}, {path: error}) for *paths*; the cache is saved afterwards."""
+        compiled: Dict[Path, CompiledPreset] = {}
+        invalid: Dict[Path, Exception] = {}
+        for path in paths:
+            try:
+                compiled[path] = self.compile(path)
+            except (OSError, PresetError) as e:
+                invalid[path] = e
+        self.save()
+        return compiled, invalid
+
+
+_compilers: Dict[str, PresetCompiler] = {}
+_compilers_lock = threading.Lock()
+
+
+def preset_compiler(path=CACHE_FILE) -> PresetCompiler:
+    """Shared PresetCompiler for the cache file *path* (one instance per resolved file)."""
+    key = str(Path(path).resolve())
+    with _compilers_lock:
+        compiler = _compilers.get(key)
+        if compiler is None:
+            compiler = _compilers[key] = PresetCompiler(key)
+        return compiler
+
+
+def compile_preset(path) -> CompiledPreset:
+    """Compile one preset with the shared cache (see PresetCompiler.compile)."""
+    return preset_compiler().compile(path)
+
+
+def compile_presets(paths: Iterable) -> Tuple[Dict[Path, CompiledPreset], Dict[Path, Exception]]:
+    """Compile and validate *paths* with the shared cache (see PresetCompiler.compile_all)."""
+    return preset_compiler().compile_all(paths)
+
+
+def describe_invalid(invalid: Mapping[Path, Exception]) -> str:
+    """One line per problem of every invalid preset (for dialogs and logs)."""
+    lines: List[str] = []
+    for path, error in invalid.items():
+        problems = error.problems if isinstance(error, PresetError) else [str(error)]
+        lines.extend(f"{Path(path).stem}: {p}" for p in problems)
+    return "\n".join(lines)
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Validate presets and compile them into SCPI command lists.")
+    parser.add_argument("presets", nargs="+", help="Preset JSON files or glob patterns")
+    parser.add_argument("--show", action="store_true", help="Print the compiled commands of valid presets")
+    args = parser.parse_args(argv)
+    paths: List[Path] = []
+    for arg in args.presets:
+        if any(ch in arg for ch in "*?["):
+            paths.extend(Path(p) for p in sorted(glob.glob(arg)))
+        else:
+            paths.append(Path(arg))
+    if not FIELD_BY_KEY:
+        print("⚠️ Settings schema not available: option codes and units are not checked.")
+    compiled, invalid = compile_presets(paths)
+    for path, preset in compiled.items():
+        print(f"✅ {path.stem}: {len(preset)} commands")
+        for section, label, _value in preset.skipped:
+            print(f"   ⚠️ Unknown setting label skipped: {section} / {label}")
+        if args.show:
+            for _section, label, scpi, value in preset.commands:
+                print(f"     {scpi} {value}    ({label})")
+    if invalid:
+        print(describe_invalid(invalid))
+    return 1 if invalid else 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,340 @@
+"""Preset order optimizer: minimize reconfiguration time between sequence presets.
+
+Changing Instrument, Output Type, Impedance, Bandwidth or Filter settings
+switches relays and ranges on the UPV, and each switch adds settling time to
+the apply step. Running presets that share those settings back to back saves
+that time.
+
+- `SwitchCostModel` estimates the seconds a *change* of each setting costs.
+  It starts from rough priors (`DEFAULT_SWITCH_COSTS`) and learns from the
+  settling timings of `apply_grouped_settings` (`ApplyResult.timings`, a
+  write plus its *OPC? round-trip, taken for the `SETTLE_LABELS` only): an
+  exponential moving average of the latency when the value changed minus the
+  latency when it did not. Other settings keep `DEFAULT_CHANGE_COST`. The
+  model is kept in switch_costs.json.
+- `plan_order()` treats the presets as a small asymmetric TSP over the diff
+  graph (cost of A -> B = summed cost of the settings B writes differently
+  from A). Locked presets keep their position; the others are ordered by
+  nearest neighbour, then improved by swaps and 2-opt segment reversals.
+  The resulting `OrderPlan` reports the predicted time saved.
+
+Usage:
+
+    python -m upv.preset_optimizer presets/*.json --lock 1
+
+    model = switch_cost_model()
+    plan = plan_order(paths, {p: load(p) for p in paths}, locked={0}, model=model)
+    print(plan.summary())       # 'Reconfiguration ~12.4 s -> ~7.9 s (saves ~4.5 s)'
+    apply_result = apply_grouped_settings(upv, data=data, settle_labels=SETTLE_LABELS)
+    model.observe(previous_data, data, apply_result.timings)
+    model.save()
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Sequence, Tuple
+
+try:
+    from upv.upv_auto_config import RAW_EXCLUDE, command_groups
+except ImportError:  # executed as a plain script from the upv folder
+    from upv_auto_config import RAW_EXCLUDE, command_groups
+
+try:
+    from utils.paths import data_path
+    COSTS_FILE = data_path('switch_costs.json')
+except Exception:
+    COSTS_FILE = Path('switch_costs.json')
+
+SettingKey = Tuple[str, str]  # (section, label); section "" for raw SCPI keys
+
+# Prior seconds per change for settings that switch relays / ranges (by label)
+DEFAULT_SWITCH_COSTS = {
+    "Instrument Generator": 1.5,
+    "Instrument Analyzer": 1.5,
+    "Function Generator": 0.5,
+    "Function Analyzer": 0.5,
+    "Output Type (Unbal/Bal)": 0.4,
+    "Impedance": 0.3,
+    "Common (Float/Ground)": 0.2,
+    "Bandwidth Generator": 0.4,
+    "Bandwidth Analyzer": 0.4,
+    "Volt Range (Auto/Fix)": 0.3,
+    "Filter": 0.3,
+    "Pre Filter": 0.3,
+    "Filter1": 0.3,
+    "Filter2": 0.3,
+    "Filter3": 0.3,
+    "CH1 Input": 0.3,
+    "CH1 Impedance": 0.3,
+    "CH1 Coupling": 0.2,
+    "CH1 Range": 0.3,
+    "CH1 Ground/Common": 0.2,
+    "MAX FFT Size": 0.3,
+}
+# Settings whose apply is timed until the UPV settled (write + *OPC?) and learned
+SETTLE_LABELS = frozenset(DEFAULT_SWITCH_COSTS)
+# Prior for any other setting whose value changes
+DEFAULT_CHANGE_COST = 0.02
+# Observed changes of a setting before its learned cost fully replaces the prior
+MIN_SAMPLES = 3
+# 2: timings include *OPC? settling (version 1 learned bare write() latencies)
+_COSTS_VERSION = 2
+
+
+def _norm(value) -> str:
+    return " ".join(str(value).split()).upper()
+
+
+def flatten_preset(data: Mapping[str, Any]) -> Dict[SettingKey, str]:
+    """Values apply_grouped_settings would write for *data*, keyed by (section, label), normalized."""
+    flat: Dict[SettingKey, str] = {}
+    for section in command_groups:
+        values = data.get(section)
+        if isinstance(values, dict):
+            for label, value in values.items():
+                flat[(section, label)] = _norm(value)
+    for key, value in data.items():
+        if key in command_groups or isinstance(value, dict) or key in RAW_EXCLUDE or ':' not in key:
+            continue
+        flat[("", key)] = _norm(value)
+    return flat
+
+
+def changed_settings(before: Optional[Mapping[SettingKey, str]], after: Mapping[SettingKey, str]) -> List[SettingKey]:
+    """Settings *after* writes with a different value than *before* (all of them if *before* is unknown)."""
+    if before is None:
+        return list(after)
+    return [key for key, value in after.items() if before.get(key) != value]
+
+
+class SwitchCostModel:
+    """Learned seconds-per-change for each setting (EMA of changed minus unchanged write latency)."""
+
+    def __init__(self, path=COSTS_FILE, *, alpha: float = 0.3):
+        self.path = Path(path) if path else None
+        self.alpha = alpha
+        self._lock = threading.Lock()
+        # "section/label" -> {"changed": s, "same": s, "n_changed": n, "n_same": n}
+        self._stats: Dict[str, Dict[str, float]] = {}
+        self._dirty = False
+        self._load()
+
+    @staticmethod
+    def _key(key: SettingKey) -> str:
+        return f"{key[0]}/{key[1]}"
+
+    def _load(self) -> None:
+        if self.path is None or not self.path.exists():
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if raw.get("version") == _COSTS_VERSION:
+                self._stats = {k: dict(v) for k, v in raw.get("settings", {}).items()}
+        except Exception:
+            self._stats = {}  # corrupt file: start from the priors
+
+    def save(self) -> None:
+        """Write the learned costs (atomic replace); no-op if nothing changed."""
+        if self.path is None or not self._dirty:
+            return
+        with self._lock:
+            payload = {"version": _COSTS_VERSION, "settings": self._stats}
+            self._dirty = False
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, indent=1)
+            os.replace(tmp, self.path)
+        except Exception:
+            pass  # learned costs are an optimization only
+
+    def cost(self, key: SettingKey) -> float:
+        """Predicted seconds for changing *key* (the prior blends into the learned value over MIN_SAMPLES changes)."""
+        prior = DEFAULT_SWITCH_COSTS.get(key[1], DEFAULT_CHANGE_COST)
+        stats = self._stats.get(self._key(key))
+        if not stats or not stats.get("n_changed"):
+            return prior
+        learned = max(0.0, stats["changed"] - stats.get("same", 0.0))
+        weight = min(1.0, stats["n_changed"] / MIN_SAMPLES)
+        return prior + weight * (learned - prior)
+
+    def transition_cost(self, before: Optional[Mapping[SettingKey, str]], after: Mapping[SettingKey, str]) -> float:
+        return sum(self.cost(key) for key in changed_settings(before, after))
+
+    def observe(self, before_data: Optional[Mapping[str, Any]], after_data: Mapping[str, Any],
+                timings: Mapping[SettingKey, float]) -> None:
+        """Learn from one apply of *after_data* following *before_data* (None if unknown)."""
+        if before_data is None or not timings:
+            return
+        before = flatten_preset(before_data)
+        after = flatten_preset(after_data)
+        with self._lock:
+            for key, seconds in timings.items():
+                if key not in after or key[1] not in SETTLE_LABELS:
+                    continue
+                kind = "changed" if before.get(key) != after[key] else "same"
+                stats = self._stats.setdefault(self._key(key), {})
+                n = stats.get(f"n_{kind}", 0)
+                prev = stats.get(kind)
+                stats[kind] = seconds if prev is None else prev + self.alpha * (seconds - prev)
+                stats[f"n_{kind}"] = n + 1
+            self._dirty = True
+
+
+_models: Dict[str, SwitchCostModel] = {}
+_models_lock = threading.Lock()
+
+
+def switch_cost_model(path=COSTS_FILE) -> SwitchCostModel:
+    """Shared SwitchCostModel for *path* (one instance per resolved file)."""
+    key = str(Path(path).resolve())
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = SwitchCostModel(key)
+        return model
+
+
+class OrderPlan:
+    """Optimized preset order with the predicted reconfiguration time before and after."""
+
+    __slots__ = ("order", "original_order", "cost", "original_cost")
+
+    def __init__(self, order, original_order, cost: float, original_cost: float):
+        self.order = list(order)
+        self.original_order = list(original_order)
+        self.cost = cost
+        self.original_cost = original_cost
+
+    @property
+    def saved(self) -> float:
+        return max(0.0, self.original_cost - self.cost)
+
+    @property
+    def changed(self) -> bool:
+        return self.order != self.original_order
+
+    def summary(self) -> str:
+        if not self.changed:
+            return f"Reconfiguration ~{self.cost:.1f} s (order already optimal)"
+        return f"Reconfiguration ~{self.original_cost:.1f} s -> ~{self.cost:.1f} s (saves ~{self.saved:.1f} s)"
+
+    def __repr__(self):
+        return f"OrderPlan({len(self.order)} presets, {self.summary()!r})"
+
+
+def order_cost(order: Sequence[Hashable], presets: Mapping[Hashable, Mapping[str, Any]], *,
+               model: Optional[SwitchCostModel] = None, start: Optional[Mapping[str, Any]] = None) -> float:
+    """Predicted reconfiguration seconds for running *order* (from *start* settings if known)."""
+    model = model or switch_cost_model()
+    flats = [flatten_preset(presets[key]) for key in order]
+    before = flatten_preset(start) if start is not None else None
+    total = 0.0
+    for i, flat in enumerate(flats):
+        if i or before is not None:
+            total += model.transition_cost(flats[i - 1] if i else before, flat)
+    return total
+
+
+def plan_order(order: Sequence[Hashable], presets: Mapping[Hashable, Mapping[str, Any]], *,
+               locked: Iterable[int] = (), model: Optional[SwitchCostModel] = None,
+               start: Optional[Mapping[str, Any]] = None, max_passes: int = 50) -> OrderPlan:
+    """Reorder the unlocked entries of *order* to minimize predicted reconfiguration time.
+
+    *presets* maps each entry to its settings dict; *locked* holds positions
+    that must not move; *start* is the instrument's current settings (the
+    first preset's transition is free when unknown).
+    """
+    model = model or switch_cost_model()
+    n = len(order)
+    flats = [flatten_preset(presets[key]) for key in order]
+    start_flat = flatten_preset(start) if start is not None else None
+    cost = [[0.0 if i == j else model.transition_cost(flats[i], flats[j]) for j in range(n)] for i in range(n)]
+    start_cost = [model.transition_cost(start_flat, f) if start_flat is not None else 0.0 for f in flats]
+
+    def total(seq: List[int]) -> float:
+        if not seq:
+            return 0.0
+        return start_cost[seq[0]] + sum(cost[a][b] for a, b in zip(seq, seq[1:]))
+
+    locked_pos = {i for i in locked if 0 <= i < n}
+    free_pos = [i for i in range(n) if i not in locked_pos]
+    original = list(range(n))
+
+    # Nearest neighbour over the free positions (ties keep the original order)
+    seq = list(original)
+    remaining = [i for i in free_pos]
+    for pos in free_pos:
+        prev = seq[pos - 1] if pos else None
+        best = min(remaining, key=lambda j: (start_cost[j] if prev is None else cost[prev][j], j))
+        remaining.remove(best)
+        seq[pos] = best
+
+    # Local search: swap two free entries, or reverse a run of consecutive free positions (2-opt)
+    best_cost = total(seq)
+    for _ in range(max_passes):
+        improved = False
+        for a in range(len(free_pos)):
+            for b in range(a + 1, len(free_pos)):
+                i, j = free_pos[a], free_pos[b]
+                cand = list(seq)
+                cand[i], cand[j] = cand[j], cand[i]
+                c = total(cand)
+                if c < best_cost - 1e-9:
+                    seq, best_cost, improved = cand, c, True
+                    continue
+                if j - i == b - a and j - i > 1:  # i..j are all free
+                    cand = seq[:i] + seq[i:j + 1][::-1] + seq[j + 1:]
+                    c = total(cand)
+                    if c < best_cost - 1e-9:
+                        seq, best_cost, improved = cand, c, True
+        if not improved:
+            break
+
+    original_cost = total(original)
+    if best_cost >= original_cost:
+        seq, best_cost = original, original_cost
+    return OrderPlan([order[i] for i in seq], order, best_cost, original_cost)
+
+
+def _load_json(path: Path) -> Dict[str, Any]:
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    if not isinstance(data, dict):
+        raise ValueError(f"{path.name}: not a JSON object")
+    return data
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Suggest a preset order with less UPV reconfiguration time.")
+    parser.add_argument("presets", nargs="+", help="Preset JSON files or glob patterns, in the current order")
+    parser.add_argument("--lock", default="", help="Comma-separated 1-based positions that must not move")
+    parser.add_argument("--costs", default=str(COSTS_FILE), help="Learned switching costs (default: %(default)s)")
+    args = parser.parse_args(argv)
+    paths: List[Path] = []
+    for arg in args.presets:
+        if any(ch in arg for ch in "*?["):
+            paths.extend(Path(p) for p in sorted(glob.glob(arg)))
+        else:
+            paths.append(Path(arg))
+    try:
+        presets = {p: _load_json(p) for p in paths}
+    except Exception as e:
+        print(f"❌ {e}")
+        return 1
+    locked = {int(x) - 1 for x in args.lock.split(",") if x.strip()}
+    plan = plan_order(paths, presets, locked=locked, model=SwitchCostModel(args.costs))
+    for i, path in enumerate(plan.order, 1):
+        print(f"{i:>3}{'*' if i - 1 in locked else ' '} {path.stem}")
+    print(plan.summary())
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
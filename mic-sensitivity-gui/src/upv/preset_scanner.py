@@ -0,0 +1,257 @@
+"""Cached scanner for preset folders (*.json presets next to settings.json).
+
+Listing a preset folder used to mean an `iterdir()` + `is_file()` on the GUI
+thread every time the measurement selector was rebuilt, which is slow on
+network / OneDrive folders with hundreds of presets. `PresetScanner`:
+
+- skips the folder listing while the folder's mtime is unchanged, but still
+  stats every cached preset (a preset overwritten in place does not change
+  the folder mtime);
+- re-parses only presets whose mtime/size changed, keeping the rest from the
+  cache;
+- keeps the cache on disk (preset_cache.json) so a restart starts warm;
+- parses metadata for display: sweep start/stop, points, Y unit and the
+  continuous-sweep flag;
+- can run off the GUI thread (`scan_async`, see upv.background).
+
+Usage:
+
+    python -m upv.preset_scanner ..\\..            # list presets with metadata
+
+    scanner = PresetScanner()
+    for info in scanner.scan(folder):
+        print(info.name, info.summary())
+    scanner.scan_async(folder, on_done=self._show_presets, dispatch=tk_dispatcher(self))
+"""
+from __future__ import annotations
+
+import argparse
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Optional
+
+try:
+    from upv.background import BackgroundJob, Dispatch
+    from upv.settings_model import continuous_sweep_requested
+    from upv.units import resolve_y_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from background import BackgroundJob, Dispatch
+    from settings_model import continuous_sweep_requested
+    from units import resolve_y_unit
+
+try:
+    from utils.paths import data_path
+    CACHE_FILE = data_path('preset_cache.json')
+except Exception:
+    CACHE_FILE = Path('preset_cache.json')
+
+# JSON files in a preset folder that are not presets (settings, config and the caches kept next to them)
+EXCLUDED_NAMES = {'settings.json', 'config.json', 'preset_cache.json', 'preset_compiled.json', 'switch_costs.json',
+                  'sequence_journal.json'}
+_CACHE_VERSION = 1
+
+
+class PresetInfo:
+    """Preset file + display metadata (None where the preset does not say)."""
+
+    __slots__ = ("path", "mtime_ns", "size", "sweep_start", "sweep_stop", "points",
+                 "unit", "continuous", "sweep_ctrl", "error")
+
+    def __init__(self, path, mtime_ns: int = 0, size: int = 0, *, sweep_start=None, sweep_stop=None,
+                 points=None, unit=None, continuous=False, sweep_ctrl=None, error=None):
+        self.path = Path(path)
+        self.mtime_ns = mtime_ns
+        self.size = size
+        self.sweep_start = sweep_start
+        self.sweep_stop = sweep_stop
+        self.points = points
+        self.unit = unit
+        self.continuous = continuous
+        self.sweep_ctrl = sweep_ctrl
+        self.error = error
+
+    @property
+    def name(self) -> str:
+        return self.path.stem
+
+    def summary(self) -> str:
+        """Short one-line description, e.g. '100 Hz–10000 Hz · 152 pts · dBr · cont'."""
+        if self.error:
+            return f"⚠ {self.error}"
+        parts = []
+        if self.sweep_ctrl and str(self.sweep_ctrl).upper() != 'OFF' and (self.sweep_start or self.sweep_stop):
+            parts.append(f"{self.sweep_start or '?'}–{self.sweep_stop or '?'}")
+        if self.points:
+            parts.append(f"{self.points} pts")
+        if self.unit:
+            parts.append(self.unit)
+        if self.continuous:
+            parts.append("cont")
+        return " · ".join(parts)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {k: (str(getattr(self, k)) if k == "path" else getattr(self, k)) for k in self.__slots__}
+
+    @classmethod
+    def from_dict(cls, d: Dict[str, Any]) -> "PresetInfo":
+        d = dict(d)
+        path = d.pop("path")
+        return cls(path, d.pop("mtime_ns", 0), d.pop("size", 0), **d)
+
+    def __repr__(self):
+        return f"PresetInfo({self.name!r}, {self.summary()!r})"
+
+
+def parse_preset(path, mtime_ns: int = 0, size: int = 0) -> PresetInfo:
+    """Read *path* and extract the display metadata (errors are recorded, not raised)."""
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            data = json.load(f)
+        if not isinstance(data, dict):
+            raise ValueError("not a JSON object")
+    except Exception as e:
+        return PresetInfo(path, mtime_ns, size, error=f"unreadable: {e.__class__.__name__}")
+    gen = data.get("Generator Function") if isinstance(data.get("Generator Function"), dict) else {}
+    try:
+        unit = resolve_y_unit(data)
+    except Exception:
+        unit = None
+    return PresetInfo(
+        path, mtime_ns, size,
+        sweep_start=gen.get("Start"),
+        sweep_stop=gen.get("Stop"),
+        points=gen.get("Points"),
+        unit=unit,
+        continuous=continuous_sweep_requested(data),
+        sweep_ctrl=gen.get("Sweep Ctrl"),
+    )
+
+
+class PresetScanner:
+    """Preset listings per folder, cached on the folder mtime and per-file mtime/size."""
+
+    def __init__(self, cache_file=CACHE_FILE):
+        self.cache_file = Path(cache_file) if cache_file else None
+        self._lock = threading.Lock()
+        # folder -> {"mtime_ns": int, "files": {name: PresetInfo}}
+        self._dirs: Dict[str, Dict[str, Any]] = {}
+        self._loaded = False
+
+    # ---------------- persistent cache -----------------
+    def _load_cache(self) -> None:
+        self._loaded = True
+        if self.cache_file is None or not self.cache_file.exists():
+            return
+        try:
+            with open(self.cache_file, 'r', encoding='utf-8') as f:
+                raw = json.load(f)
+            if raw.get("version") != _CACHE_VERSION:
+                return
+            for folder, entry in raw.get("dirs", {}).items():
+                self._dirs[folder] = {
+                    "mtime_ns": entry.get("mtime_ns"),
+                    "files": {name: PresetInfo.from_dict(info) for name, info in entry.get("files", {}).items()},
+                }
+        except Exception:
+            self._dirs.clear()  # corrupt cache: rebuild
+
+    def _save_cache(self) -> None:
+        if self.cache_file is None:
+            return
+        payload = {
+            "version": _CACHE_VERSION,
+            "dirs": {folder: {"mtime_ns": entry["mtime_ns"],
+                              "files": {name: info.to_dict() for name, info in entry["files"].items()}}
+                     for folder, entry in self._dirs.items()},
+        }
+        try:
+            tmp = self.cache_file.with_name(self.cache_file.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(payload, f, ensure_ascii=False)
+            os.replace(tmp, self.cache_file)
+        except Exception:
+            pass  # cache is an optimization only
+
+    # ---------------- scanning -----------------
+    def scan(self, directory, *, force: bool = False) -> List[PresetInfo]:
+        """Presets in *directory*, sorted by file name; [] if it is not a folder."""
+        folder = Path(directory)
+        try:
+            dir_mtime = folder.stat().st_mtime_ns
+        except OSError:
+            return []
+        if not folder.is_dir():
+            return []
+        key = str(folder.resolve())
+        with self._lock:
+            if not self._loaded:
+                self._load_cache()
+            entry = self._dirs.get(key)
+            previous = entry["files"] if entry else {}
+            listed = entry is not None and entry["mtime_ns"] == dir_mtime and not force
+        files: Dict[str, PresetInfo] = {}
+        if listed:
+            # Same file names as cached: one stat per preset, no directory listing
+            for name, cached in previous.items():
+                try:
+                    st = cached.path.stat()
+                except OSError:
+                    continue
+                files[name] = self._current(cached, cached.path, st)
+        else:
+            with os.scandir(folder) as it:
+                for de in it:
+                    if not de.name.lower().endswith('.json') or de.name.lower() in EXCLUDED_NAMES:
+                        continue
+                    try:
+                        if not de.is_file():
+                            continue
+                        st = de.stat()
+                    except OSError:
+                        continue
+                    files[de.name] = self._current(previous.get(de.name), Path(de.path), st)
+        with self._lock:
+            changed = files != previous or entry is None or entry["mtime_ns"] != dir_mtime
+            self._dirs[key] = {"mtime_ns": dir_mtime, "files": files}
+            if changed:
+                self._save_cache()
+        return self._sorted(files)
+
+    @staticmethod
+    def _current(cached: Optional[PresetInfo], path: Path, st: os.stat_result) -> PresetInfo:
+        """*cached* if the file's mtime/size still match, otherwise freshly parsed metadata."""
+        if cached is not None and cached.mtime_ns == st.st_mtime_ns and cached.size == st.st_size:
+            return cached
+        return parse_preset(path, st.st_mtime_ns, st.st_size)
+
+    @staticmethod
+    def _sorted(files: Dict[str, PresetInfo]) -> List[PresetInfo]:
+        return sorted(files.values(), key=lambda info: info.path)
+
+    def scan_async(self, directory, *, on_done: Callable[[List[PresetInfo]], None],
+                   on_error: Optional[Callable[[BaseException], None]] = None,
+                   dispatch: Optional[Dispatch] = None, force: bool = False) -> BackgroundJob:
+        """Run `scan` on a worker thread; *on_done(presets)* is called through *dispatch*."""
+        job = BackgroundJob(lambda _job: self.scan(directory, force=force), name="PresetScan",
+                            dispatch=dispatch, on_done=on_done, on_error=on_error)
+        return job.start()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="List preset JSON files with their sweep metadata.")
+    parser.add_argument("folder", nargs="?", default=".", help="Preset folder")
+    parser.add_argument("--force", action="store_true", help="Re-check every file even if the folder is unchanged")
+    parser.add_argument("--no-cache", action="store_true", help="Do not read or write the cache file")
+    args = parser.parse_args(argv)
+    scanner = PresetScanner(None if args.no_cache else CACHE_FILE)
+    presets = scanner.scan(args.folder, force=args.force)
+    for info in presets:
+        print(f"{info.name:<32} {info.summary()}")
+    print(f"{len(presets)} preset(s)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
@@ -0,0 +1,323 @@
+"""Indexed catalog (SQLite) of the HXML files in a results folder.
+
+`update()` walks the results directory and re-parses only new or changed
+files (mtime/size check, then a content SHA-1 so a touched-but-identical file
+is not re-read). Curve metadata comes from `upv.hxml_reader` without decoding
+the curve payloads. Files that disappeared are dropped from the index.
+
+Lookups by preset (CurveDataName), date range, DUT or unit are plain indexed
+SQL queries and do not touch the HXML files.
+
+Usage:
+
+    from upv.results_catalog import ResultsCatalog
+    with ResultsCatalog() as cat:                 # Results/ + results_catalog.sqlite
+        cat.update()
+        rows = cat.query(preset="FOGm20", date_from="2025-11-01")
+        for r in rows:
+            print(r["path"], r["idx"], r["date"], r["points"])
+
+Command line:
+
+    python -m upv.results_catalog [results_dir] [--preset NAME] [--from DATE] [--to DATE] [--dut ID]
+"""
+from __future__ import annotations
+
+import argparse
+import datetime
+import hashlib
+import os
+import sqlite3
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from upv.hxml_reader import iter_curvedata
+    from upv.hxml_writer import MEASUREMENT_DATE_FORMAT
+except ImportError:  # executed as a plain script from the upv folder
+    from hxml_reader import iter_curvedata
+    from hxml_writer import MEASUREMENT_DATE_FORMAT
+
+try:
+    from utils.paths import data_path
+except Exception:
+    data_path = None
+
+if data_path is not None:
+    RESULTS_DIR = data_path('Results')
+    CATALOG_FILE = data_path('results_catalog.sqlite')
+else:
+    RESULTS_DIR = Path('Results')
+    CATALOG_FILE = Path('results_catalog.sqlite')
+
+# curvedata attribute carrying the device-under-test identifier (if present)
+DUT_ATTRIBUTE = "DUT"
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    id INTEGER PRIMARY KEY,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL NOT NULL,
+    size INTEGER NOT NULL,
+    sha1 TEXT NOT NULL,
+    working_title TEXT,
+    error TEXT,
+    indexed_at TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS curves (
+    id INTEGER PRIMARY KEY,
+    file_id INTEGER NOT NULL REFERENCES files(id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    name TEXT,
+    working_title TEXT,
+    date TEXT,
+    equipment TEXT,
+    tester TEXT,
+    unit TEXT,
+    points INTEGER,
+    f_min REAL,
+    f_max REAL,
+    dut TEXT
+);
+CREATE INDEX IF NOT EXISTS curves_name ON curves(name COLLATE NOCASE);
+CREATE INDEX IF NOT EXISTS curves_date ON curves(date);
+CREATE INDEX IF NOT EXISTS curves_dut ON curves(dut);
+CREATE INDEX IF NOT EXISTS curves_file ON curves(file_id);
+"""
+
+
+def parse_measurement_date(value: Any) -> Optional[str]:
+    """Normalize a MeasurementDate / user date to ISO 'YYYY-MM-DDTHH:MM:SS'.
+
+    Accepts datetime/date objects, the HXML format ('20-Nov-2025 11:29:32')
+    and ISO strings ('2025-11-20', '2025-11-20 11:29'). Returns None when the
+    value cannot be interpreted.
+    """
+    if value is None or value == "":
+        return None
+    if isinstance(value, datetime.datetime):
+        return value.replace(microsecond=0).isoformat()
+    if isinstance(value, datetime.date):
+        return datetime.datetime(value.year, value.month, value.day).isoformat()
+    s = str(value).strip()
+    try:
+        return datetime.datetime.strptime(s, MEASUREMENT_DATE_FORMAT).isoformat()
+    except ValueError:
+        pass
+    try:
+        return datetime.datetime.fromisoformat(s).replace(microsecond=0).isoformat()
+    except ValueError:
+        return None
+
+
+def file_sha1(path: Path, chunk_size: int = 1 << 20) -> str:
+    """SHA-1 of the file content (streamed)."""
+    h = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+class ResultsCatalog:
+    """SQLite index of HXML result files; see module docstring."""
+
+    def __init__(self, db_path=None, results_dir=None):
+        self.db_path = Path(db_path) if db_path else Path(CATALOG_FILE)
+        self.results_dir = Path(results_dir) if results_dir else Path(RESULTS_DIR)
+        self._conn = sqlite3.connect(str(self.db_path))
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA foreign_keys = ON")
+        self._conn.executescript(_SCHEMA)
+
+    # ---------------- maintenance -----------------
+    def update(self, results_dir=None, *, progress=None) -> Dict[str, int]:
+        """Bring the index up to date with *results_dir* (default: self.results_dir).
+
+        progress: optional callable(done, total, path) called per scanned file.
+        Returns counts {'scanned','added','updated','unchanged','removed','failed'}.
+        """
+        root = Path(results_dir) if results_dir else self.results_dir
+        stats = dict(scanned=0, added=0, updated=0, unchanged=0, removed=0, failed=0)
+        if not root.is_dir():
+            return stats
+        root_abs = root.resolve()
+        # Rows of files below root only: not of sibling folders sharing the prefix (Results_old)
+        prefix = str(root_abs).rstrip(os.sep) + os.sep
+        esc = prefix.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+        known = {row['path']: row for row in self._conn.execute(
+            "SELECT id, path, mtime, size, sha1 FROM files WHERE path LIKE ? ESCAPE '\\'", (esc + '%',))
+            if Path(row['path']).is_relative_to(root_abs)}
+        files = sorted(root.rglob('*.hxml'))
+        total = len(files)
+        seen = set()
+        with self._conn:
+            for n, fp in enumerate(files, 1):
+                key = str(fp.resolve())
+                seen.add(key)
+                stats['scanned'] += 1
+                try:
+                    st = fp.stat()
+                except OSError:
+                    continue
+                row = known.get(key)
+                sha1 = None
+                if row is not None and row['size'] == st.st_size and row['mtime'] != st.st_mtime:
+                    sha1 = file_sha1(fp)  # reused by _index_file if the content did change
+                if row is not None and row['mtime'] == st.st_mtime and row['size'] == st.st_size:
+                    stats['unchanged'] += 1
+                elif sha1 is not None and sha1 == row['sha1']:
+                    # Touched but identical content: refresh the stamp only
+                    self._conn.execute("UPDATE files SET mtime=? WHERE id=?", (st.st_mtime, row['id']))
+                    stats['unchanged'] += 1
+                else:
+                    ok = self._index_file(fp, key, st, row['id'] if row is not None else None, sha1=sha1)
+                    stats['added' if row is None else 'updated'] += 1
+                    if not ok:
+                        stats['failed'] += 1
+                if progress is not None:
+                    try:
+                        progress(n, total, fp)
+                    except Exception:
+                        pass
+            for key, row in known.items():
+                if key not in seen:
+                    self._conn.execute("DELETE FROM files WHERE id=?", (row['id'],))
+                    stats['removed'] += 1
+        return stats
+
+    def add_file(self, path) -> bool:
+        """Index (or re-index) one HXML file right after it was written; False if it could not be parsed."""
+        fp = Path(path)
+        key = str(fp.resolve())
+        st = fp.stat()
+        row = self._conn.execute("SELECT id FROM files WHERE path = ?", (key,)).fetchone()
+        with self._conn:
+            return self._index_file(fp, key, st, row['id'] if row is not None else None)
+
+    def _index_file(self, fp: Path, key: str, st, file_id: Optional[int], sha1: Optional[str] = None) -> bool:
+        """(Re-)index one file; *sha1*: its content hash if the caller already computed it."""
+        now = datetime.datetime.now().replace(microsecond=0).isoformat()
+        if sha1 is None:
+            sha1 = file_sha1(fp)
+        curves = []
+        error = None
+        try:
+            for cd in iter_curvedata(fp):
+                f_min, f_max = cd.freq_range
+                curves.append((cd.index, cd.name, cd.working_title, parse_measurement_date(cd.date),
+                               cd.equipment, cd.tester, cd.y_unit, cd.points,
+                               f_min, f_max, cd.attrs.get(DUT_ATTRIBUTE) or None))
+        except Exception as e:  # malformed / truncated file: keep it indexed with the error
+            curves = []
+            error = str(e)
+        working_title = curves[0][2] if curves else None
+        if file_id is None:
+            cur = self._conn.execute(
+                "INSERT INTO files(path, mtime, size, sha1, working_title, error, indexed_at) VALUES (?,?,?,?,?,?,?)",
+                (key, st.st_mtime, st.st_size, sha1, working_title, error, now))
+            file_id = cur.lastrowid
+        else:
+            self._conn.execute(
+                "UPDATE files SET mtime=?, size=?, sha1=?, working_title=?, error=?, indexed_at=? WHERE id=?",
+                (st.st_mtime, st.st_size, sha1, working_title, error, now, file_id))
+            self._conn.execute("DELETE FROM curves WHERE file_id=?", (file_id,))
+        self._conn.executemany(
+            "INSERT INTO curves(file_id, idx, name, working_title, date, equipment, tester, unit, points,"
+            " f_min, f_max, dut) VALUES (?,?,?,?,?,?,?,?,?,?,?,?)",
+            [(file_id,) + c for c in curves])
+        return error is None
+
+    # ---------------- lookups -----------------
+    def query(self, preset: str | None = None, date_from=None, date_to=None, dut: str | None = None,
+              unit: str | None = None, limit: int | None = None) -> List[Dict[str, Any]]:
+        """Return matching curves (newest first) as dicts.
+
+        preset: CurveDataName, case-insensitive; '*' / '?' act as wildcards.
+        date_from / date_to: inclusive bounds (datetime, date or string); a
+        bare date as upper bound covers that whole day.
+        """
+        where, params = [], []
+        if preset:
+            if any(ch in preset for ch in '*?'):
+                where.append("c.name LIKE ? ESCAPE '\\' COLLATE NOCASE")
+                esc = preset.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+                params.append(esc.replace('*', '%').replace('?', '_'))
+            else:
+                where.append("c.name = ? COLLATE NOCASE")
+                params.append(preset)
+        lo = parse_measurement_date(date_from)
+        if lo:
+            where.append("c.date >= ?")
+            params.append(lo)
+        hi = parse_measurement_date(date_to)
+        if hi:
+            if hi.endswith("T00:00:00") and not isinstance(date_to, datetime.datetime):
+                hi = hi[:10] + "T23:59:59"
+            where.append("c.date <= ?")
+            params.append(hi)
+        if dut:
+            where.append("c.dut = ?")
+            params.append(dut)
+        if unit:
+            where.append("c.unit = ?")
+            params.append(unit)
+        sql = ("SELECT f.path, f.sha1, c.idx, c.name, c.working_title, c.date, c.equipment, c.tester,"
+               " c.unit, c.points, c.f_min, c.f_max, c.dut FROM curves c JOIN files f ON f.id = c.file_id")
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY c.date DESC, f.path, c.idx"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in self._conn.execute(sql, params)]
+
+    def presets(self) -> List[str]:
+        """Distinct curve names in the catalog."""
+        return [r[0] for r in self._conn.execute(
+            "SELECT DISTINCT name FROM curves ORDER BY name COLLATE NOCASE")]
+
+    def failed_files(self) -> List[Dict[str, Any]]:
+        return [dict(r) for r in self._conn.execute("SELECT path, error FROM files WHERE error IS NOT NULL")]
+
+    def close(self) -> None:
+        try:
+            self._conn.close()
+        except Exception:
+            pass
+
+    def __enter__(self) -> "ResultsCatalog":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.close()
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Index a results folder and query measured curves.")
+    parser.add_argument("results_dir", nargs="?", help=f"Results folder (default: {RESULTS_DIR})")
+    parser.add_argument("--db", help=f"Catalog database (default: {CATALOG_FILE})")
+    parser.add_argument("--preset", help="CurveDataName (wildcards * ? allowed)")
+    parser.add_argument("--from", dest="date_from", help="Earliest MeasurementDate (e.g. 2025-11-01)")
+    parser.add_argument("--to", dest="date_to", help="Latest MeasurementDate (inclusive)")
+    parser.add_argument("--dut", help="DUT identifier")
+    parser.add_argument("--unit", help="Level unit (e.g. dBr)")
+    parser.add_argument("--limit", type=int, help="Maximum number of rows")
+    parser.add_argument("--no-update", action="store_true", help="Query the existing index without rescanning")
+    args = parser.parse_args(argv)
+
+    with ResultsCatalog(args.db, args.results_dir) as cat:
+        if not args.no_update:
+            stats = cat.update()
+            print(f"📚 Indexed {stats['scanned']} file(s): {stats['added']} new, {stats['updated']} changed, "
+                  f"{stats['removed']} removed, {stats['failed']} failed")
+        rows = cat.query(args.preset, args.date_from, args.date_to, args.dut, args.unit, args.limit)
+        for r in rows:
+            print(f"{r['date'] or '-':19}  {r['name']:<24} {r['unit']:<7} {r['points']:>6} pts  "
+                  f"{r['f_min']:g}-{r['f_max']:g} Hz  {Path(r['path']).name}#{r['idx']}"
+                  + (f"  DUT={r['dut']}" if r['dut'] else ""))
+        print(f"{len(rows)} curve(s)")
+    return 0
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
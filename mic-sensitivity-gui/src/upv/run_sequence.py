@@ -0,0 +1,444 @@
+"""Headless measurement sequence runner (no Tk, no matplotlib).
+
+Runs the same steps as the GUI's preset sequence (apply preset -> single
+sweep -> wait for *ESR? bit 0 -> fetch trace), then writes one combined .hxml
+like the sequence export, without any dialog. Intended for test racks where a
+line controller starts one run per DUT.
+
+The sequence is driven by upv.sequence_engine (the engine the GUI uses) with
+synchronous actions. stdout carries the engine events, one JSON object per
+line (machine-readable progress); every human-readable message goes to
+stderr. Events:
+
+    invalid   {"name": "...", "problems": ["Generator Function / Start: unit 'V' is not a frequency unit"]}
+    plan      {"order": [...], "predicted_s": 7.9, "original_s": 12.4, "saved_s": 4.5}  (--optimize)
+    resume    {"skipped": 12, "remaining": 8, "changed": ["OSPL90"]}                   (--resume)
+    start     {"presets": [...], "skipped": [...], "output": "..."}
+    stage     {"stage": "apply", "index": 1, "total": 3, "name": "..."}
+    collected {"index": 1, "name": "...", "points": 152, "seconds": 8.4}
+    failed    {"index": 1, "name": "...", "stage": "sweep", "error": "..."}
+    exported  {"output": "...", "traces": 3}
+    done      {"ok": true, "collected": 3, "failed": 0, "cancelled": false, "seconds": 27.1}
+
+With --dut / --duts / --scan the sequence runs once per DUT serial (upv.batch):
+every event above carries "dut", each DUT is exported to "{dut}_{timestamp}.hxml"
+and added to the results catalog, and the UPV stays configured between DUTs
+(only settings that differ are sent). Throughput events:
+
+    dut       {"dut": "SN001", "ok": true, "seconds": 41.2, "apply": 3.1, "sweep": 30.4, ..., "idle": 6.0}
+    batch     {"duts": 12, "ok": 12, "duts_per_hour": 58.3, "stages": {...}, "share": {...}}
+
+Every preset is compiled and validated (upv.preset_compiler) before the
+instrument is touched; any invalid preset stops the run with exit code 1.
+
+Progress is checkpointed after every preset (upv.sequence_journal). After a
+crash or a dropped link, `--resume` runs the journal's sequence again on the
+same instrument, skipping the presets already measured (unless their file
+changed since) and exporting all traces to the original output path.
+
+Exit codes: 0 all presets collected, 1 connection / usage error or invalid
+presets, 2 exported with failed presets, 3 nothing exported, 130 interrupted.
+
+Usage:
+
+    cd mic-sensitivity-gui/src
+    python -m upv.run_sequence presets/*.json --out results/
+    python -m upv.run_sequence presets/ --out results/ --name "{first}_{timestamp}.hxml" --smoothing 12
+    python -m upv.run_sequence --resume
+    python -m upv.run_sequence presets/ --out results/ --dut SN001 --dut SN002 --scan
+"""
+from __future__ import annotations
+
+import argparse
+import glob
+import itertools
+import json
+import sys
+import time
+from contextlib import redirect_stdout
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+try:
+    from upv.upv_auto_config import apply_grouped_settings, fetch_trace, find_upv_ip, load_config, \
+        resource_manager, save_config
+    from upv.instrument_io import abort_sweep, trigger_sweep, wait_sweep_complete
+    from upv.background import BackgroundJob
+    from upv.export_service import ExportJob
+    from upv.hxml_writer import measurement_date
+    from upv.preset_compiler import CompiledPreset, PresetError, compile_presets
+    from upv.preset_optimizer import SETTLE_LABELS, plan_order, switch_cost_model
+    from upv.preset_scanner import EXCLUDED_NAMES
+    from upv.sequence_engine import SequenceActions, SequenceEngine
+    from upv.sequence_journal import JOURNAL_FILE, JournalError, SequenceJournal
+    from upv.batch import DEFAULT_DUT_NAME, Batch, catalog_result, read_serials, scan_serials, tag_trace
+    from upv.units import resolve_y_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from upv_auto_config import apply_grouped_settings, fetch_trace, find_upv_ip, load_config, \
+        resource_manager, save_config
+    from instrument_io import abort_sweep, trigger_sweep, wait_sweep_complete
+    from background import BackgroundJob
+    from export_service import ExportJob
+    from hxml_writer import measurement_date
+    from preset_compiler import CompiledPreset, PresetError, compile_presets
+    from preset_optimizer import SETTLE_LABELS, plan_order, switch_cost_model
+    from preset_scanner import EXCLUDED_NAMES
+    from sequence_engine import SequenceActions, SequenceEngine
+    from sequence_journal import JOURNAL_FILE, JournalError, SequenceJournal
+    from batch import DEFAULT_DUT_NAME, Batch, catalog_result, read_serials, scan_serials, tag_trace
+    from units import resolve_y_unit
+
+DEFAULT_NAME = "sequence_{timestamp}.hxml"
+
+Emit = Callable[..., None]
+
+
+def json_emitter(stream) -> Emit:
+    """emit(event, **fields) writing one JSON line to *stream* (flushed immediately)."""
+    t0 = time.monotonic()
+
+    def emit(event: str, **fields) -> None:
+        record = {"event": event, "t": round(time.monotonic() - t0, 3)}
+        record.update(fields)
+        stream.write(json.dumps(record, ensure_ascii=False) + "\n")
+        stream.flush()
+    return emit
+
+
+def expand_presets(args: List[str]) -> List[Path]:
+    """Preset paths from files, folders and glob patterns (globs are expanded here for Windows shells)."""
+    paths: List[Path] = []
+    for arg in args:
+        if any(ch in arg for ch in "*?["):
+            paths.extend(Path(p) for p in sorted(glob.glob(arg)))
+            continue
+        path = Path(arg)
+        if path.is_dir():
+            paths.extend(p for p in sorted(path.glob("*.json")) if p.name.lower() not in EXCLUDED_NAMES)
+        else:
+            paths.append(path)
+    return paths
+
+
+def output_path(out_dir, template: str, presets: List[Path]) -> Path:
+    """Export path from *template*: {timestamp}, {first} (first preset stem) and {count}."""
+    name = template.format(timestamp=time.strftime("%Y%m%d_%H%M%S"),
+                           first=presets[0].stem if presets else "sequence", count=len(presets))
+    if not name.lower().endswith(".hxml"):
+        name += ".hxml"
+    return Path(out_dir) / name
+
+
+def connect(visa_address: Optional[str] = None, timeout_ms: int = 5000):
+    """Open the UPV at *visa_address*, else the saved address, else the first one found."""
+    rm = resource_manager()
+    candidates = [visa_address] if visa_address else [load_config()]
+    for address in candidates:
+        if not address:
+            continue
+        try:
+            upv = rm.open_resource(address)
+            upv.timeout = timeout_ms
+            print("✅ Connected to:", upv.query("*IDN?").strip())
+            return upv
+        except Exception as e:
+            if visa_address:
+                raise
+            print(f"❌ Saved address failed: {e} -> searching...")
+    address = find_upv_ip()
+    if not address:
+        raise RuntimeError("No UPV found (LAN/USB).")
+    upv = rm.open_resource(address)
+    upv.timeout = timeout_ms
+    print("✅ Connected to:", upv.query("*IDN?").strip())
+    save_config(address)
+    return upv
+
+
+class HeadlessActions(SequenceActions):
+    """Sequence stages run synchronously on the calling thread.
+
+    dut: serial the traces are tagged with; differential: send only the
+    settings that differ from the preset applied before (batch runs).
+    """
+
+    def __init__(self, upv, export_path: Optional[Path], *, sweep_timeout: float = 120.0,
+                 smoothing: Optional[int] = None, archive: bool = True, dut: Optional[str] = None,
+                 differential: bool = False):
+        self.upv = upv
+        self.export_path = Path(export_path) if export_path is not None else None
+        self.sweep_timeout = sweep_timeout
+        self.smoothing = smoothing
+        self.archive = archive
+        self.dut = dut
+        self.differential = differential
+        self.costs = switch_cost_model()
+        self._previous = None  # settings of the preset applied before (switching-cost learning)
+        self._applied = None  # CompiledPreset the UPV is configured with (None: unknown)
+
+    def apply(self, step):
+        preset = step.preset.delta(self._applied) if self.differential else step.preset
+        self._applied = None
+        result = apply_grouped_settings(self.upv, data=preset, settle_labels=SETTLE_LABELS)
+        if result.cancelled:
+            raise RuntimeError("apply cancelled")
+        if not result.errors:
+            self._applied = step.preset
+        self.costs.observe(self._previous, step.data, result.timings)
+        self._previous = step.data
+
+    def arm(self, step):
+        # Continuous presets cannot complete unattended; the runner always sweeps once
+        trigger_sweep(self.upv, continuous=False)
+
+    def sweep(self, step):
+        if not wait_sweep_complete(self.upv, timeout_s=self.sweep_timeout):
+            raise TimeoutError(f"sweep did not complete within {self.sweep_timeout:.0f} s")
+
+    def collect(self, step):
+        x_vals, y_vals = fetch_trace(self.upv)
+        trace = {'name': step.name, 'x': x_vals, 'y': y_vals, 'unit': resolve_y_unit(step.data) or 'dBV'}
+        return tag_trace(trace, self.dut)
+
+    def export(self, steps):
+        date = measurement_date()
+        traces = [dict(s.trace, date=date) for s in steps]
+        self.export_path.parent.mkdir(parents=True, exist_ok=True)
+        export = ExportJob(self.export_path, traces, smoothing=self.smoothing, archive=self.archive,
+                           label="Sequence export")
+        job = BackgroundJob(export.run, name="SequenceExport")
+        job.run_inline()
+        if job.error is not None:
+            raise job.error
+        return self.export_path
+
+
+def exit_code(engine: SequenceEngine) -> int:
+    """0 all collected and exported, 2 exported with failed presets, 3 nothing exported."""
+    if not engine.collected or engine.export_error is not None:
+        return 3
+    return 2 if engine.failed else 0
+
+
+def run_sequence(upv, presets: List[Path], export_path: Path, *, emit: Emit,
+                 sweep_timeout: float = 120.0, smoothing: Optional[int] = None, archive: bool = True,
+                 journal: Optional[SequenceJournal] = None,
+                 completed: Optional[Dict[int, Dict[str, Any]]] = None, dut: Optional[str] = None) -> int:
+    """Run every preset in order, export the collected traces and return the exit code.
+
+    journal: checkpointed after every preset; completed: traces of a resumed run (index -> trace);
+    dut: serial the traces are tagged with (the export is then added to the results catalog).
+    """
+    actions = HeadlessActions(upv, export_path, sweep_timeout=sweep_timeout, smoothing=smoothing,
+                              archive=archive, dut=dut)
+    engine = SequenceEngine(actions)
+    if journal is not None:
+        journal.attach(engine)
+
+    def forward(event, fields):
+        if event == "start":
+            fields = dict(fields, output=str(export_path))
+        emit(event, **fields)
+
+    engine.subscribe(forward)
+    try:
+        engine.start(presets, completed=completed)
+    except KeyboardInterrupt:
+        engine.cancel()
+        raise
+    finally:
+        actions.costs.save()
+    if dut and engine.export_result is not None:
+        catalog_result(export_path)
+    return exit_code(engine)
+
+
+def batch_exit_code(codes: List[int]) -> int:
+    """0 every DUT complete, 3 nothing exported for any DUT, otherwise 2."""
+    if codes and all(code == 0 for code in codes):
+        return 0
+    if not codes or all(code == 3 for code in codes):
+        return 3
+    return 2
+
+
+def run_batch(upv, presets: List[Path], compiled: Dict[Path, CompiledPreset], batch: Batch,
+              serials: Iterable[str], *, emit: Emit, instrument: Optional[str] = None,
+              sweep_timeout: float = 120.0, smoothing: Optional[int] = None, archive: bool = True,
+              journal: Optional[SequenceJournal] = None) -> int:
+    """Run the sequence once per DUT serial and return the batch exit code.
+
+    The UPV stays configured between DUTs (differential apply); every DUT gets
+    its own export, added to the results catalog, and a 'dut' throughput event.
+    """
+    actions = HeadlessActions(upv, None, sweep_timeout=sweep_timeout, smoothing=smoothing,
+                              archive=archive, differential=True)
+    engine = SequenceEngine(actions)
+    batch.stats.attach(engine)
+    if journal is not None:
+        journal.attach(engine)
+
+    def forward(event, fields):
+        if event == "start":
+            fields = dict(fields, output=str(actions.export_path))
+        emit(event, dut=actions.dut, **fields)
+
+    engine.subscribe(forward)
+    codes: List[int] = []
+    try:
+        for serial in serials:
+            if not batch.queue.add(serial):
+                print(f"⚠️ Skipping '{serial}' (empty or already measured in this batch)")
+                continue
+            serial = batch.next_dut()
+            actions.export_path, actions.dut = batch.export_path(serial), serial
+            if journal is not None:
+                journal.begin([compiled[p] for p in presets], instrument=instrument,
+                              output=actions.export_path, dut=serial)
+            engine.start(presets)
+            code = exit_code(engine)
+            codes.append(code)
+            if engine.export_result is not None:
+                catalog_result(actions.export_path)
+            emit("dut", **batch.dut_done(code == 0, engine.export_result))
+    except KeyboardInterrupt:
+        engine.cancel()
+        batch.dut_done(False)
+        raise
+    finally:
+        actions.costs.save()
+        emit("batch", **batch.stats.report())
+        print(f"📊 {batch.stats.summary()}")
+    return batch_exit_code(codes)
+
+
+def validate_presets(presets: List[Path], emit: Emit) -> Optional[Dict[Path, CompiledPreset]]:
+    """Compile every preset up front; emits 'invalid' per bad preset and returns None if any is."""
+    compiled, invalid = compile_presets(presets)
+    for path, error in invalid.items():
+        problems = error.problems if isinstance(error, PresetError) else [str(error)]
+        emit("invalid", name=path.stem, problems=problems)
+    return None if invalid else compiled
+
+
+def optimize_order(presets: List[Path], compiled: Dict[Path, CompiledPreset], locked_names: List[str],
+                   emit: Emit) -> List[Path]:
+    """Reorder *presets* for less reconfiguration time (--lock presets stay put)."""
+    data: Dict[Path, Dict[str, Any]] = {path: compiled[path].to_settings() for path in presets}
+    locked = {i for i, path in enumerate(presets) if path.stem in locked_names}
+    plan = plan_order(presets, data, locked=locked)
+    emit("plan", order=[p.stem for p in plan.order], predicted_s=round(plan.cost, 2),
+         original_s=round(plan.original_cost, 2), saved_s=round(plan.saved, 2))
+    return plan.order
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="Run a preset sequence on the UPV without the GUI.")
+    parser.add_argument("presets", nargs="*", help="Preset JSON files, folders or glob patterns (run in order)")
+    parser.add_argument("--out", default="results", help="Output folder (default: results)")
+    parser.add_argument("--name", default=DEFAULT_NAME,
+                        help="Export file name; {timestamp}, {first}, {count} are filled in (default: %(default)s)")
+    parser.add_argument("--visa", help="VISA address (default: saved address, then discovery)")
+    parser.add_argument("--sweep-timeout", type=float, default=120.0, help="Seconds to wait per sweep")
+    parser.add_argument("--smoothing", type=int, default=None, help="1/N octave smoothing for the export")
+    parser.add_argument("--no-archive", action="store_true", help="Do not append the traces to the archive")
+    parser.add_argument("--optimize", action="store_true",
+                        help="Reorder presets to minimize predicted reconfiguration time (see upv.preset_optimizer)")
+    parser.add_argument("--lock", action="append", default=[], metavar="NAME",
+                        help="With --optimize: keep this preset (file stem) at its position; repeatable")
+    parser.add_argument("--resume", action="store_true",
+                        help="Continue the interrupted sequence in the journal (presets and output come from it)")
+    parser.add_argument("--journal", default=str(JOURNAL_FILE), help="Checkpoint file (default: %(default)s)")
+    parser.add_argument("--no-journal", action="store_true", help="Do not checkpoint this run")
+    batch_args = parser.add_argument_group("batch (one run per DUT, see upv.batch)")
+    batch_args.add_argument("--dut", action="append", default=[], metavar="SERIAL",
+                            help="DUT serial number; repeatable")
+    batch_args.add_argument("--duts", metavar="FILE", help="Text file with one DUT serial per line")
+    batch_args.add_argument("--scan", action="store_true",
+                            help="Read DUT serials from stdin (barcode scanner) after each DUT until an empty line")
+    args = parser.parse_args(argv)
+    batch_mode = bool(args.dut or args.duts or args.scan)
+    if batch_mode and args.resume:
+        parser.error("--resume continues one sequence; it cannot be combined with --dut/--duts/--scan")
+
+    emit = json_emitter(sys.stdout)
+    previous = None
+    if args.resume:
+        previous = SequenceJournal.load(args.journal)
+        if previous is None or not previous.resumable:
+            emit("done", ok=False, collected=0, failed=0, error="no unfinished sequence to resume")
+            return 1
+        presets = [Path(entry["path"]) for entry in previous.data["presets"]]
+    else:
+        presets = expand_presets(args.presets)
+    if not presets:
+        emit("done", ok=False, collected=0, failed=0, error="no presets")
+        return 1
+    compiled = validate_presets(presets, emit)
+    if compiled is None:
+        emit("done", ok=False, collected=0, failed=0, error="invalid presets")
+        return 1
+    if args.optimize and previous is None:
+        presets = optimize_order(presets, compiled, args.lock, emit)
+    if previous is not None and previous.data.get("output"):
+        export_path = Path(previous.data["output"])
+    else:
+        export_path = output_path(args.out, args.name, presets)
+    journal = None if args.no_journal else SequenceJournal(args.journal)
+    batch = None
+    if batch_mode:
+        serials = list(args.dut)
+        if args.duts:
+            try:
+                serials += read_serials(args.duts)
+            except OSError as e:
+                emit("done", ok=False, collected=0, failed=0, error=f"cannot read {args.duts}: {e}")
+                return 1
+        if args.scan:
+            serials = itertools.chain(serials, scan_serials(sys.stdin, prompt=sys.stderr))
+        name = DEFAULT_DUT_NAME if args.name == DEFAULT_NAME else args.name
+        batch = Batch(presets, args.out, name_template=name)
+    # Library code prints progress; keep stdout for the JSON events
+    with redirect_stdout(sys.stderr):
+        try:
+            upv = connect(args.visa)
+        except Exception as e:
+            emit("done", ok=False, collected=0, failed=0, error=f"connection failed: {e}")
+            return 1
+        try:
+            try:
+                idn = upv.query("*IDN?").strip()
+            except Exception:
+                idn = None
+            completed = None
+            if previous is not None:
+                try:
+                    plan = previous.resume_plan(idn)
+                except JournalError as e:
+                    emit("done", ok=False, collected=0, failed=0, error=f"cannot resume: {e}")
+                    return 1
+                completed = plan.completed
+                emit("resume", skipped=len(plan.completed), remaining=plan.remaining, changed=plan.changed)
+            if batch is not None:
+                return run_batch(upv, presets, compiled, batch, serials, emit=emit, instrument=idn,
+                                 sweep_timeout=args.sweep_timeout, smoothing=args.smoothing,
+                                 archive=not args.no_archive, journal=journal)
+            dut = previous.data.get("dut") if previous is not None else None
+            if journal is not None:
+                journal.begin([compiled[p] for p in presets], instrument=idn, output=export_path,
+                              completed=completed, dut=dut)
+            return run_sequence(upv, presets, export_path, emit=emit, sweep_timeout=args.sweep_timeout,
+                                smoothing=args.smoothing, archive=not args.no_archive, journal=journal,
+                                completed=completed, dut=dut)
+        except KeyboardInterrupt:
+            abort_sweep(upv)
+            return 130
+        finally:
+            try:
+                upv.close()
+            except Exception:
+                pass
+
+
+if __name__ == "__main__":  # pragma: no cover
+    raise SystemExit(main())
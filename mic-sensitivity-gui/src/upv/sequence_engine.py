@@ -0,0 +1,319 @@
+"""Measurement sequence engine: explicit states, event-driven transitions.
+
+Every preset of a sequence goes through APPLY -> ARM -> SWEEP -> COLLECT;
+the collected traces are written by one EXPORT at the end:
+
+    IDLE -> [APPLY -> ARM -> SWEEP -> COLLECT] x N -> EXPORT -> DONE
+    (cancel() -> CANCELLED from any state)
+
+What each stage does is supplied by a `SequenceActions` object (the GUI, the
+headless runner, tests). An action either returns / raises, and the engine
+moves on at once, or returns PENDING and reports later through `resume()`,
+e.g. when a BackgroundJob finishes or the instrument signals the end of the
+sweep. There are no timers: the next stage starts as soon as the previous
+one completes. A failing stage marks its preset failed and the sequence
+continues with the next preset; EXPORT runs if anything was collected.
+Presets whose traces are passed as `completed` (a resumed sequence, see
+upv.sequence_journal) are not measured again but are exported.
+
+Transitions are queued and drained in a loop, so a sequence of synchronous
+actions runs without recursion. Call start / resume / cancel from one thread
+(in the GUI: the Tk thread, through BackgroundJob dispatch).
+
+Listeners are called as listener(event, fields):
+
+    start     presets=[names], skipped=[names already measured]
+    stage     stage, index, total, name
+    collected index, name, points, seconds
+    failed    index, name, stage, error     (index/name None for export)
+    exported  output, traces
+    done      ok, collected, failed, cancelled, seconds
+
+Usage:
+
+    engine = SequenceEngine(actions)
+    engine.subscribe(lambda event, fields: print(event, fields))
+    engine.start(preset_paths)
+    ...
+    engine.resume(result=trace)        # an action returned PENDING earlier
+"""
+from __future__ import annotations
+
+import time
+from collections import deque
+from pathlib import Path
+from typing import Any, Callable, Deque, Dict, List, Optional
+
+try:
+    from upv.preset_compiler import CompiledPreset, compile_preset
+except ImportError:  # executed as a plain script from the upv folder
+    from preset_compiler import CompiledPreset, compile_preset
+
+IDLE = "idle"
+APPLY = "apply"
+ARM = "arm"
+SWEEP = "sweep"
+COLLECT = "collect"
+EXPORT = "export"
+DONE = "done"
+CANCELLED = "cancelled"
+
+_NEXT = {APPLY: ARM, ARM: SWEEP, SWEEP: COLLECT}
+
+# Returned by an action that completes later through SequenceEngine.resume()
+PENDING = object()
+
+Listener = Callable[[str, Dict[str, Any]], None]
+
+
+class SequenceStep:
+    """One preset of a sequence: its compiled commands, settings, collected trace and outcome."""
+
+    __slots__ = ("path", "index", "preset", "data", "trace", "error", "failed_stage", "started", "seconds")
+
+    def __init__(self, path, index: int):
+        self.path = Path(path)
+        self.index = index  # 1-based
+        self.preset: Optional[CompiledPreset] = None
+        self.data: Optional[Dict[str, Any]] = None  # preset.to_settings()
+        self.trace: Optional[Dict[str, Any]] = None
+        self.error: Optional[str] = None
+        self.failed_stage: Optional[str] = None
+        self.started = 0.0
+        self.seconds = 0.0
+
+    @property
+    def name(self) -> str:
+        return self.path.stem
+
+    @property
+    def collected(self) -> bool:
+        return self.trace is not None
+
+    def __repr__(self):
+        return f"SequenceStep({self.index}, {self.name!r})"
+
+
+class SequenceActions:
+    """What the stages do. Each method returns a result, raises, or returns PENDING."""
+
+    def load(self, step: SequenceStep) -> CompiledPreset:
+        """Compiled preset for *step* (default: the file through the upv.preset_compiler cache)."""
+        return compile_preset(step.path)
+
+    def apply(self, step: SequenceStep):
+        raise NotImplementedError
+
+    def arm(self, step: SequenceStep):
+        raise NotImplementedError
+
+    def sweep(self, step: SequenceStep):
+        raise NotImplementedError
+
+    def collect(self, step: SequenceStep) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def export(self, steps: List[SequenceStep]):
+        """Write the collected steps; the result (e.g. the output path) is reported as 'exported'."""
+        raise NotImplementedError
+
+    def cancel(self) -> None:
+        """Stop whatever a PENDING action is waiting for (optional)."""
+
+
+class SequenceEngine:
+    """State machine driving a list of presets through a SequenceActions implementation."""
+
+    def __init__(self, actions: SequenceActions):
+        self.actions = actions
+        self.state = IDLE
+        self.steps: List[SequenceStep] = []
+        self.current: Optional[SequenceStep] = None
+        self.export_result: Any = None
+        self.export_error: Optional[str] = None
+        self._pending = False
+        self._listeners: List[Listener] = []
+        self._queue: Deque[Callable[[], None]] = deque()
+        self._draining = False
+        self._t0 = 0.0
+
+    # ---------------- listeners -----------------
+    def subscribe(self, listener: Listener) -> Listener:
+        self._listeners.append(listener)
+        return listener
+
+    def unsubscribe(self, listener: Listener) -> None:
+        try:
+            self._listeners.remove(listener)
+        except ValueError:
+            pass
+
+    def _emit(self, event: str, **fields) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(event, fields)
+            except Exception as e:
+                print(f"⚠️ Sequence listener failed on '{event}': {e}")
+
+    # ---------------- state -----------------
+    @property
+    def running(self) -> bool:
+        return self.state not in (IDLE, DONE, CANCELLED)
+
+    def waiting_for(self, stage: str) -> bool:
+        """True while *stage* is the current state and its action returned PENDING."""
+        return self._pending and self.state == stage
+
+    @property
+    def collected(self) -> List[SequenceStep]:
+        return [s for s in self.steps if s.collected]
+
+    @property
+    def failed(self) -> List[SequenceStep]:
+        return [s for s in self.steps if s.error is not None]
+
+    @property
+    def ok(self) -> bool:
+        return (self.state == DONE and not self.failed and self.export_error is None
+                and bool(self.collected))
+
+    # ---------------- control -----------------
+    def start(self, presets, completed: Optional[Dict[int, Dict[str, Any]]] = None) -> None:
+        """Run *presets* (paths) in order; returns when the sequence finished or an action is PENDING.
+
+        completed: traces measured by an earlier run (1-based index -> trace);
+        those presets are skipped and exported with the new traces.
+        """
+        if self.running:
+            raise RuntimeError("sequence already running")
+        self.steps = [SequenceStep(p, i) for i, p in enumerate(presets, 1)]
+        for index, trace in (completed or {}).items():
+            if 1 <= index <= len(self.steps):
+                self.steps[index - 1].trace = trace
+        self.current = None
+        self.export_result = None
+        self.export_error = None
+        self._pending = False
+        self._t0 = time.monotonic()
+        self.state = APPLY
+        self._emit("start", presets=[s.name for s in self.steps], skipped=[s.name for s in self.collected])
+        self._post(lambda: self._begin_step(0))
+
+    def resume(self, result: Any = None, error: Optional[BaseException] = None) -> bool:
+        """Complete the PENDING stage with *result* (or *error*); False if nothing was waiting."""
+        if not self._pending or not self.running:
+            return False
+        self._pending = False
+        stage, step = self.state, self.current
+        self._post(lambda: self._stage_finished(stage, step, result, error))
+        return True
+
+    def cancel(self) -> None:
+        """Stop the sequence; nothing further is applied, swept or exported."""
+        if not self.running:
+            return
+        self.state = CANCELLED
+        self._pending = False
+        self._queue.clear()
+        try:
+            self.actions.cancel()
+        except Exception:
+            pass
+        self._emit_done(cancelled=True)
+
+    # ---------------- transitions -----------------
+    def _post(self, fn: Callable[[], None]) -> None:
+        self._queue.append(fn)
+        if self._draining:
+            return
+        self._draining = True
+        try:
+            while self._queue:
+                self._queue.popleft()()
+        finally:
+            self._draining = False
+
+    def _begin_step(self, i: int) -> None:
+        while i < len(self.steps) and self.steps[i].collected:
+            i += 1  # measured by the run this one resumes
+        if i >= len(self.steps):
+            self._enter(EXPORT, None)
+            return
+        step = self.steps[i]
+        self.current = step
+        step.started = time.monotonic()
+        self._enter(APPLY, step)
+
+    def _enter(self, stage: str, step: Optional[SequenceStep]) -> None:
+        if self.state == CANCELLED:
+            return
+        self.state = stage
+        if stage == EXPORT:
+            collected = self.collected
+            if not collected:
+                self.state = DONE
+                self._emit_done()
+                return
+            self._emit("stage", stage=stage, index=None, total=len(self.steps), name=None)
+            self._run(stage, None, lambda: self.actions.export(collected))
+            return
+        self._emit("stage", stage=stage, index=step.index, total=len(self.steps), name=step.name)
+        if stage == APPLY:
+            def call():
+                if step.preset is None:
+                    step.preset = self.actions.load(step)
+                    step.data = step.preset.to_settings()
+                return self.actions.apply(step)
+        else:
+            action = getattr(self.actions, stage)
+
+            def call():
+                return action(step)
+        self._run(stage, step, call)
+
+    def _run(self, stage: str, step: Optional[SequenceStep], call: Callable[[], Any]) -> None:
+        try:
+            result = call()
+        except Exception as e:
+            self._post(lambda exc=e: self._stage_finished(stage, step, None, exc))
+            return
+        if result is PENDING:
+            self._pending = True
+            return
+        self._post(lambda: self._stage_finished(stage, step, result, None))
+
+    def _stage_finished(self, stage: str, step: Optional[SequenceStep], result: Any,
+                        error: Optional[BaseException]) -> None:
+        if self.state != stage or (stage != EXPORT and self.current is not step):
+            return  # cancelled or superseded
+        if stage == EXPORT:
+            if error is not None:
+                self.export_error = str(error)
+                self._emit("failed", index=None, name=None, stage=EXPORT, error=self.export_error)
+            else:
+                self.export_result = result
+                self._emit("exported", output=str(result) if result is not None else None,
+                           traces=len(self.collected))
+            self.state = DONE
+            self._emit_done()
+            return
+        if error is not None:
+            step.error = str(error) or error.__class__.__name__
+            step.failed_stage = stage
+            step.seconds = time.monotonic() - step.started
+            self._emit("failed", index=step.index, name=step.name, stage=stage, error=step.error)
+            self._begin_step(step.index)
+            return
+        if stage == COLLECT:
+            step.trace = result
+            step.seconds = time.monotonic() - step.started
+            points = len(result['x']) if isinstance(result, dict) and 'x' in result else None
+            self._emit("collected", index=step.index, name=step.name, points=points,
+                       seconds=round(step.seconds, 2))
+            self._begin_step(step.index)
+            return
+        self._enter(_NEXT[stage], step)
+
+    def _emit_done(self, cancelled: bool = False) -> None:
+        self._emit("done", ok=self.ok, collected=len(self.collected), failed=len(self.failed),
+                   cancelled=cancelled, seconds=round(time.monotonic() - self._t0, 2))
@@ -0,0 +1,233 @@
+"""Sequence checkpoints: resume a measurement sequence after a crash or link drop.
+
+A `SequenceJournal` listens to a SequenceEngine and rewrites a small JSON
+file (atomic replace) after every preset: the preset list with the SHA-1 of
+each file, the index being measured, every trace collected so far, the
+instrument identity (*IDN?) and the export path. When the app dies or the
+VISA link drops halfway through a long suite, the journal still holds every
+trace measured up to then.
+
+`resume_plan()` checks the journal against the current state before anything
+is skipped:
+
+- the instrument must be the one that measured the traces (same *IDN?);
+- every preset file must still exist;
+- a preset whose file changed since it was measured is measured again
+  (its old trace is dropped), unchanged ones are skipped.
+
+The journal is marked finished once every preset was collected and the
+combined export was written; a cancelled, interrupted or failed-export
+sequence, or one with failed presets, stays resumable (a resume measures the
+failed presets again).
+
+Usage:
+
+    journal = SequenceJournal()
+    journal.begin(compiled_presets, instrument=idn, output=export_path)
+    journal.attach(engine)
+    engine.start(paths)
+
+    plan = SequenceJournal.load().resume_plan(idn)     # JournalError if it cannot resume
+    engine.start(plan.presets, completed=plan.completed)
+"""
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+try:
+    from utils.paths import data_path
+    JOURNAL_FILE = data_path('sequence_journal.json')
+except Exception:
+    JOURNAL_FILE = Path('sequence_journal.json')
+
+_JOURNAL_VERSION = 1
+
+# Journal status
+RUNNING = "running"      # in progress, or interrupted (crash / link drop)
+CANCELLED = "cancelled"  # cancelled by the operator
+INCOMPLETE = "incomplete"  # presets failed (e.g. link dropped), nothing collected or export failed
+FINISHED = "finished"    # every preset collected and the combined export written
+
+
+class JournalError(ValueError):
+    """The journal cannot be resumed (missing, finished, other instrument, missing presets)."""
+
+
+def _file_sha1(path: Path) -> Optional[str]:
+    try:
+        return hashlib.sha1(Path(path).read_bytes()).hexdigest()
+    except OSError:
+        return None
+
+
+def _plain_trace(trace: Dict[str, Any]) -> Dict[str, Any]:
+    """JSON-safe copy of a collected trace (numpy arrays -> lists of floats)."""
+    plain = dict(trace)
+    for key in ('x', 'y'):
+        if key in plain and plain[key] is not None:
+            plain[key] = [float(v) for v in plain[key]]
+    return plain
+
+
+class ResumePlan:
+    """Presets to run again and the traces kept from the journal (1-based index -> trace)."""
+
+    __slots__ = ("presets", "completed", "changed", "output", "instrument")
+
+    def __init__(self, presets: List[Path], completed: Dict[int, Dict[str, Any]], changed: List[str],
+                 output: Optional[str], instrument: Optional[str]):
+        self.presets = presets
+        self.completed = completed
+        self.changed = changed  # names of presets re-measured because their file changed
+        self.output = output
+        self.instrument = instrument
+
+    @property
+    def remaining(self) -> int:
+        return len(self.presets) - len(self.completed)
+
+    def summary(self) -> str:
+        text = f"{len(self.completed)} of {len(self.presets)} presets already measured, {self.remaining} to go"
+        if self.changed:
+            text += f" ({len(self.changed)} changed since: {', '.join(self.changed)})"
+        return text
+
+    def __repr__(self):
+        return f"ResumePlan({len(self.completed)}/{len(self.presets)}, changed={self.changed})"
+
+
+class SequenceJournal:
+    """Checkpoint file of one sequence run (see module docstring)."""
+
+    def __init__(self, path=JOURNAL_FILE):
+        self.path = Path(path)
+        self.data: Dict[str, Any] = {}
+        self._engine = None
+
+    # ---------------- file -----------------
+    @classmethod
+    def load(cls, path=JOURNAL_FILE) -> Optional["SequenceJournal"]:
+        """Journal stored at *path*; None if there is none (or it is unreadable)."""
+        journal = cls(path)
+        try:
+            with open(journal.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+        except Exception:
+            return None
+        if not isinstance(data, dict) or data.get("version") != _JOURNAL_VERSION:
+            return None
+        journal.data = data
+        return journal
+
+    def write(self) -> None:
+        """Write the checkpoint (atomic replace); a failing write never stops the sequence."""
+        self.data["updated"] = time.strftime("%Y-%m-%d %H:%M:%S")
+        try:
+            tmp = self.path.with_name(self.path.name + ".tmp")
+            with open(tmp, 'w', encoding='utf-8') as f:
+                json.dump(self.data, f, ensure_ascii=False)
+            os.replace(tmp, self.path)
+        except Exception as e:
+            print(f"⚠️ Could not write sequence journal: {e}")
+
+    # ---------------- recording -----------------
+    def begin(self, presets, *, instrument: Optional[str], output, completed=None, dut: Optional[str] = None) -> None:
+        """Start a journal for *presets* (CompiledPresets, in run order).
+
+        completed: traces carried over from a resumed journal (1-based index -> trace);
+        dut: serial of the device being measured (batch runs), kept for the resume.
+        """
+        self.data = {
+            "version": _JOURNAL_VERSION,
+            "status": RUNNING,
+            "started": time.strftime("%Y-%m-%d %H:%M:%S"),
+            "instrument": instrument,
+            "output": str(output) if output is not None else None,
+            "dut": dut,
+            "presets": [{"path": str(p.path), "name": p.name, "sha1": p.sha1} for p in presets],
+            "current": None,
+            "steps": {str(i): {"trace": _plain_trace(t), "sha1": presets[i - 1].sha1}
+                      for i, t in (completed or {}).items()},
+        }
+        self.write()
+
+    def attach(self, engine) -> None:
+        """Checkpoint *engine*'s progress from now on."""
+        self._engine = engine
+        engine.subscribe(self._on_event)
+
+    def _on_event(self, event: str, fields: Dict[str, Any]) -> None:
+        if event == "stage" and fields.get("stage") == "apply":
+            self.data["current"] = fields["index"]
+            self.write()
+        elif event == "collected":
+            step = self._engine.steps[fields["index"] - 1]
+            sha1 = step.preset.sha1 if step.preset is not None else None
+            self.data.setdefault("steps", {})[str(step.index)] = {
+                "trace": _plain_trace(step.trace), "sha1": sha1, "seconds": round(step.seconds, 2)}
+            self.write()
+        elif event == "done":
+            engine = self._engine
+            if fields.get("cancelled"):
+                self.data["status"] = CANCELLED
+            elif engine.export_result is not None and engine.export_error is None and not engine.failed:
+                self.data["status"] = FINISHED
+            else:
+                self.data["status"] = INCOMPLETE
+            self.data["current"] = None
+            self.write()
+
+    # ---------------- resuming -----------------
+    @property
+    def status(self) -> Optional[str]:
+        return self.data.get("status")
+
+    @property
+    def resumable(self) -> bool:
+        return bool(self.data.get("presets")) and self.status != FINISHED
+
+    @property
+    def measured(self) -> int:
+        return len(self.data.get("steps", {}))
+
+    def describe(self) -> str:
+        presets = self.data.get("presets", [])
+        first = presets[0]["name"] if presets else "?"
+        return (f"{first} (+{len(presets) - 1} more), started {self.data.get('started', '?')}: "
+                f"{self.measured} of {len(presets)} measured, {self.status}")
+
+    def resume_plan(self, instrument: Optional[str]) -> ResumePlan:
+        """What a resume would skip and re-measure; raises JournalError if it must not resume."""
+        if not self.resumable:
+            raise JournalError("no unfinished sequence to resume")
+        recorded = self.data.get("instrument")
+        if recorded and instrument and recorded.strip() != instrument.strip():
+            raise JournalError(f"the sequence was measured on another instrument ({recorded})")
+        presets: List[Path] = []
+        missing: List[str] = []
+        current_sha1: List[Optional[str]] = []
+        for entry in self.data["presets"]:
+            path = Path(entry["path"])
+            sha1 = _file_sha1(path)
+            if sha1 is None:
+                missing.append(entry["name"])
+            presets.append(path)
+            current_sha1.append(sha1)
+        if missing:
+            raise JournalError(f"preset file(s) missing: {', '.join(missing)}")
+        completed: Dict[int, Dict[str, Any]] = {}
+        changed: List[str] = []
+        for key, step in self.data.get("steps", {}).items():
+            index = int(key)
+            if not 1 <= index <= len(presets):
+                continue
+            if step.get("sha1") != current_sha1[index - 1]:
+                changed.append(presets[index - 1].stem)
+                continue
+            completed[index] = step["trace"]
+        return ResumePlan(presets, dict(sorted(completed.items())), changed, self.data.get("output"), recorded)
@@ -0,0 +1,216 @@
+"""In-memory model of settings.json with an mtime-checked cache.
+
+The live plot asks for the Y unit every poll (~120 ms) and every trace
+collection asks again; re-opening and re-parsing settings.json each time is
+slow on OneDrive-synced folders. `SettingsModel` parses the file once and
+keeps it in memory:
+
+- writes made through `write()` update the cache directly (atomic replace);
+- external edits are picked up by comparing the file's mtime/size, checked
+  at most every `stat_interval` seconds;
+- derived values (Y unit display string, continuous sweep flag) are computed
+  once per file version.
+
+One shared instance per file is returned by `settings_model()`, so the GUI and
+`upv_auto_config` see the same cache.
+
+Usage:
+
+    from upv.settings_model import settings_model
+    model = settings_model()
+    unit = model.y_unit            # e.g. 'dBV'
+    data = model.copy()            # mutable deep copy
+    data["INIT:CONT"] = "ON"
+    model.write(data)
+"""
+from __future__ import annotations
+
+import copy
+import json
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+try:
+    from upv.units import resolve_y_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from units import resolve_y_unit
+
+try:
+    from utils.paths import data_path
+    SETTINGS_FILE = str(data_path('settings.json'))
+except Exception:
+    SETTINGS_FILE = "settings.json"
+
+try:
+    from utils.profiling import profiled
+except Exception:  # utils not on the path: profiling is a no-op
+    def profiled(name=None, cat="gui"):
+        return lambda fn: fn
+
+# Seconds between stat() calls on the hot path; writes through the model are seen immediately.
+DEFAULT_STAT_INTERVAL = 0.5
+
+
+def continuous_sweep_requested(data: Dict[str, Any] | None) -> bool:
+    """Whether settings/preset JSON requests continuous sweep (INIT:CONT ON).
+
+    Priority order / accepted forms (case-insensitive):
+      1. Top-level key "INIT:CONT": "ON" | "OFF"
+      2. Top-level key "SweepMode": "CONT" / "CONTINUOUS" / "ON" (anything else = single)
+      3. Top-level key "ContinuousSweep": true/false
+    """
+    if not isinstance(data, dict):
+        return False
+    init_cont = data.get("INIT:CONT")
+    if isinstance(init_cont, str) and init_cont.strip().upper() == "ON":
+        return True
+    if isinstance(init_cont, str) and init_cont.strip().upper() == "OFF":
+        return False
+    sweep_mode = data.get("SweepMode")
+    if isinstance(sweep_mode, str) and sweep_mode.strip().upper() in {"CONT", "CONTINUOUS", "ON"}:
+        return True
+    cont_flag = data.get("ContinuousSweep")
+    if isinstance(cont_flag, bool):
+        return cont_flag
+    return False
+
+
+class SettingsModel:
+    """Parsed settings.json held in memory, reloaded only when the file changes."""
+
+    def __init__(self, path=SETTINGS_FILE, *, stat_interval: float = DEFAULT_STAT_INTERVAL):
+        self.path = Path(path)
+        self.stat_interval = stat_interval
+        self._lock = threading.RLock()
+        self._data: Optional[Dict[str, Any]] = None
+        self._signature: Optional[Tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._derived: Dict[str, Any] = {}
+        self.version = 0  # bumped on every (re)load or write
+
+    # ---------------- cache -----------------
+    def _stat_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = self.path.stat()
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    @profiled("SettingsModel.load", "disk")
+    def _load(self, signature) -> None:
+        if signature is None:
+            data: Dict[str, Any] = {}
+        else:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                data = json.load(f)
+            if not isinstance(data, dict):
+                raise ValueError(f"{self.path.name} does not contain a JSON object")
+        self._data = data
+        self._signature = signature
+        self._derived.clear()
+        self.version += 1
+
+    def _current(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            if self._data is None or now - self._checked_at >= self.stat_interval:
+                self._checked_at = now
+                signature = self._stat_signature()
+                if self._data is None or signature != self._signature:
+                    self._load(signature)
+            return self._data
+
+    def invalidate(self) -> None:
+        """Forget the cached content; the next access re-reads the file."""
+        with self._lock:
+            self._data = None
+            self._signature = None
+            self._derived.clear()
+
+    # ---------------- access -----------------
+    @property
+    def data(self) -> Dict[str, Any]:
+        """Cached settings dict. Treat as read-only; use `copy()` to modify."""
+        return self._current()
+
+    def copy(self) -> Dict[str, Any]:
+        """Deep copy of the current settings, safe to mutate and pass to `write()`."""
+        with self._lock:
+            return copy.deepcopy(self._current())
+
+    def get(self, section: str, key: str | None = None, default: Any = None) -> Any:
+        """settings[section] or settings[section][key]."""
+        value = self._current().get(section, default if key is None else {})
+        if key is None:
+            return value
+        return value.get(key, default) if isinstance(value, dict) else default
+
+    @profiled("SettingsModel.write", "disk")
+    def write(self, data: Dict[str, Any]) -> None:
+        """Write *data* to the file (temp file + replace) and make it the cached version."""
+        text = json.dumps(data, indent=2, ensure_ascii=False)
+        with self._lock:
+            tmp = self.path.with_name(f".{self.path.name}.{os.getpid()}.tmp")
+            try:
+                with open(tmp, 'w', encoding='utf-8') as f:
+                    f.write(text)
+                os.replace(tmp, self.path)
+            except OSError:
+                # Replace can be refused while a sync client holds the file; write in place instead
+                try:
+                    tmp.unlink()
+                except OSError:
+                    pass
+                with open(self.path, 'w', encoding='utf-8') as f:
+                    f.write(text)
+            self._data = copy.deepcopy(data)
+            self._signature = self._stat_signature()
+            self._checked_at = time.monotonic()
+            self._derived.clear()
+            self.version += 1
+
+    # ---------------- derived values -----------------
+    def _derive(self, name: str, fn):
+        with self._lock:
+            data = self._current()
+            if name not in self._derived:
+                self._derived[name] = fn(data)
+            return self._derived[name]
+
+    @property
+    def y_unit(self) -> str:
+        """Trace Y unit display string (see upv.units.resolve_y_unit); 'dBV' if unavailable."""
+        def _resolve(data):
+            try:
+                return resolve_y_unit(data) or 'dBV'
+            except Exception:
+                return 'dBV'
+        try:
+            return self._derive('y_unit', _resolve)
+        except Exception:
+            return 'dBV'
+
+    @property
+    def continuous(self) -> bool:
+        """True if the settings request a continuous sweep (see continuous_sweep_requested)."""
+        try:
+            return self._derive('continuous', continuous_sweep_requested)
+        except Exception:
+            return False
+
+
+_models: Dict[str, SettingsModel] = {}
+_models_lock = threading.Lock()
+
+
+def settings_model(path=SETTINGS_FILE) -> SettingsModel:
+    """Shared SettingsModel for *path* (one instance per resolved file)."""
+    key = str(Path(path).resolve())
+    with _models_lock:
+        model = _models.get(key)
+        if model is None:
+            model = _models[key] = SettingsModel(key)
+        return model
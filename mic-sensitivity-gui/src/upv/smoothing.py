@@ -0,0 +1,156 @@
+"""Fractional-octave smoothing and display decimation for sweep traces.
+
+Traces read with `TRAC:SWE1:LOAD:AX?/AY?` share the same frequency grid for
+every refresh of a live sweep, so the smoothing weights are computed once per
+(grid, fraction) and cached as a sparse row matrix. Smoothing a trace is then
+a single sparse matrix-vector product (gather + multiply + `np.add.reduceat`).
+
+Each output point is the mean over the band [f / 2**(1/2N), f * 2**(1/2N)]
+for 1/N octave smoothing. dB levels are averaged on a power scale, linear
+units (V, mV, %, ...) directly.
+
+Usage:
+
+    from upv.smoothing import smooth_trace, process_trace
+    y_s = smooth_trace(x, y, 6, unit="dBr")            # 1/6 octave
+    x_d, y_d = process_trace(x, y, 12, unit="dBV")     # smooth + decimate
+"""
+from __future__ import annotations
+
+from collections import OrderedDict
+from typing import Tuple
+
+import numpy as np
+
+try:
+    from upv.units import is_db_unit
+except ImportError:  # executed as a plain script from the upv folder
+    from units import is_db_unit
+
+# Display label -> octave fraction denominator (None = no smoothing)
+OCTAVE_SMOOTHING_OPTIONS = {
+    "Off": None,
+    "1/3 octave": 3,
+    "1/6 octave": 6,
+    "1/12 octave": 12,
+    "1/24 octave": 24,
+}
+
+# Points per octave kept after smoothing at 1/N octave (N * factor)
+DECIMATION_POINTS_PER_BAND = 4
+
+_CACHE_SIZE = 16
+_matrix_cache: "OrderedDict[tuple, SmoothingMatrix]" = OrderedDict()
+
+
+class SmoothingMatrix:
+    """Row-compressed averaging matrix for one frequency grid.
+
+    Row i holds the uniform weights of all grid points inside the smoothing
+    band of point i; `indptr[i]:indptr[i+1]` slices `indices` / `weights`.
+    """
+
+    __slots__ = ("indptr", "indices", "weights", "size")
+
+    def __init__(self, indptr, indices, weights, size):
+        self.indptr = indptr
+        self.indices = indices
+        self.weights = weights
+        self.size = size
+
+    @classmethod
+    def for_grid(cls, freqs, fraction: int) -> "SmoothingMatrix":
+        """Build the matrix for an ascending frequency grid and 1/fraction octave."""
+        x = np.asarray(freqs, dtype=float)
+        n = x.shape[0]
+        half_band = 2.0 ** (1.0 / (2.0 * fraction))
+        lo = np.searchsorted(x, x / half_band, side="left")
+        hi = np.searchsorted(x, x * half_band, side="right")
+        # Non-positive frequencies have no octave band: keep the point as-is
+        own = np.arange(n)
+        invalid = x <= 0
+        lo = np.where(invalid, own, np.minimum(lo, own))
+        hi = np.where(invalid, own + 1, np.maximum(hi, own + 1))
+        counts = hi - lo
+        indptr = np.zeros(n + 1, dtype=np.intp)
+        np.cumsum(counts, out=indptr[1:])
+        # Concatenated ranges lo[i]..hi[i]-1 without a Python loop
+        indices = np.arange(indptr[-1], dtype=np.intp) - np.repeat(indptr[:-1] - lo, counts)
+        weights = np.repeat(1.0 / counts, counts)
+        return cls(indptr, indices, weights, n)
+
+    def apply(self, values) -> np.ndarray:
+        """Return the smoothed vector (matrix-vector product)."""
+        y = np.asarray(values, dtype=float)
+        if y.shape[0] != self.size:
+            raise ValueError(f"Trace has {y.shape[0]} points, smoothing grid has {self.size}.")
+        if self.size == 0:
+            return y.copy()
+        return np.add.reduceat(y[self.indices] * self.weights, self.indptr[:-1])
+
+
+def smoothing_matrix(freqs, fraction: int) -> SmoothingMatrix:
+    """Return the (cached) smoothing matrix for *freqs* at 1/fraction octave."""
+    x = np.ascontiguousarray(freqs, dtype=float)
+    key = (int(fraction), x.shape[0], hash(x.tobytes()))
+    m = _matrix_cache.get(key)
+    if m is not None:
+        _matrix_cache.move_to_end(key)
+        return m
+    m = SmoothingMatrix.for_grid(x, int(fraction))
+    _matrix_cache[key] = m
+    if len(_matrix_cache) > _CACHE_SIZE:
+        _matrix_cache.popitem(last=False)
+    return m
+
+
+def smooth_trace(freqs, values, fraction, *, unit: str | None = None) -> np.ndarray:
+    """Smooth *values* over *freqs* with 1/fraction octave bands.
+
+    fraction None / 0 returns the values unchanged (as ndarray). The grid must
+    be ascending, which holds for all UPV sweep traces.
+    """
+    y = np.asarray(values, dtype=float)
+    if not fraction or y.shape[0] < 2:
+        return y
+    m = smoothing_matrix(freqs, fraction)
+    if unit is not None and is_db_unit(unit):
+        power = m.apply(np.power(10.0, y / 10.0))
+        with np.errstate(divide="ignore"):
+            return 10.0 * np.log10(power)
+    return m.apply(y)
+
+
+def decimate_log(freqs, values, points_per_octave: float) -> Tuple[np.ndarray, np.ndarray]:
+    """Keep roughly *points_per_octave* samples per octave (nearest grid points).
+
+    Returns the input unchanged when it is already sparser than requested.
+    """
+    x = np.asarray(freqs, dtype=float)
+    y = np.asarray(values, dtype=float)
+    positive = x > 0
+    if x.shape[0] < 3 or not positive.all():
+        return x, y
+    octaves = np.log2(x[-1] / x[0])
+    target = int(np.ceil(octaves * points_per_octave)) + 1
+    if target >= x.shape[0]:
+        return x, y
+    grid = np.geomspace(x[0], x[-1], target)
+    idx = np.unique(np.clip(np.searchsorted(x, grid), 0, x.shape[0] - 1))
+    return x[idx], y[idx]
+
+
+def process_trace(freqs, values, fraction, *, unit: str | None = None,
+                  decimate: bool = True) -> Tuple[np.ndarray, np.ndarray]:
+    """Smoothing stage used by the live view and the exports.
+
+    Applies 1/fraction octave smoothing and, if *decimate* is set, drops the
+    points the smoothing made redundant (DECIMATION_POINTS_PER_BAND per band).
+    """
+    x = np.asarray(freqs, dtype=float)
+    if not fraction:
+        return x, np.asarray(values, dtype=float)
+    y = smooth_trace(x, values, fraction, unit=unit)
+    if decimate:
+        return decimate_log(x, y, fraction * DECIMATION_POINTS_PER_BAND)
+    return x, y
@@ -0,0 +1,287 @@
+"""Shared unit handling for levels, frequencies, times and impedances.
+
+All level conversions route through volts and are array-aware: pass a scalar
+and get a float back, pass a list / ndarray and get an ndarray back. The
+reference voltage (dBr, dB SPL) and reference impedance (dBm, W) are explicit
+parameters, so a whole trace set can be re-rendered in another unit without
+asking the instrument again:
+
+    from upv.units import convert
+    y_dbv = convert(y_dbr, "dBr", "dBV", ref_voltage=0.0277)
+
+Lookup tables are precomputed per (ref_voltage, impedance, spl_ref_voltage)
+combination; conversions between two logarithmic units reduce to a single
+offset add and between two linear units to a single multiply.
+
+The module also hosts the instrument unit-code -> display mapping
+(`SENS:UNIT` / `SENS:USER`) that used to be duplicated in the GUI and in
+`fetch_and_plot_trace`.
+"""
+from __future__ import annotations
+
+import math
+from functools import lru_cache
+from typing import Any, Dict, Tuple
+
+import numpy as np
+
+# 0 dBu reference used throughout the GUI (kept at the historical 0.775 V).
+DBU_REF_VOLTS = 0.775
+# Default reference impedance for dBm / power units (matches Ref Imped default).
+DEFAULT_IMPEDANCE = 600.0
+
+# Linear voltage units -> factor to volts
+VOLTAGE_SCALE = {"V": 1.0, "mV": 1e-3, "μV": 1e-6, "uV": 1e-6}
+# Linear power units -> factor to watts
+POWER_SCALE = {"W": 1.0, "mW": 1e-3, "μW": 1e-6, "uW": 1e-6}
+# Logarithmic units expressed as 20*log10(V / Vref)
+DB_UNITS = ("dBV", "dBu", "dBm", "dBr", "dB SPL")
+
+FREQUENCY_SCALE = {"Hz": 1.0, "kHz": 1e3}
+TIME_SCALE = {"us": 1e-6, "μs": 1e-6, "ms": 1e-3, "s": 1.0, "min": 60.0}
+IMPEDANCE_SCALE = {"Ω": 1.0, "kΩ": 1e3, "ohm": 1.0, "kohm": 1e3}
+
+# Unit option lists shown in the GUI value+unit widgets
+VOLTAGE_UNIT_OPTIONS = ["V", "mV", "μV", "dBV", "dBu", "dBm"]
+VOLTAGE_UNIT_OPTIONS_DBR = VOLTAGE_UNIT_OPTIONS + ["dBr"]
+RESOLUTION_UNIT_OPTIONS = ["V", "mV", "uV", "dBV", "dBu", "W", "mW", "uW", "dBm"]
+FREQUENCY_UNIT_OPTIONS = ["Hz", "kHz"]
+TIME_UNIT_DISPLAY = {"s": "s", "ms": "ms", "us": "μs", "min": "min"}
+TIME_UNIT_CODES = {v: k for k, v in TIME_UNIT_DISPLAY.items()}
+
+# Instrument unit codes (SENS:UNIT) -> display strings
+UNIT_CODE_DISPLAY = {
+    'DBR': 'dBr',
+    'DBV': 'dBV',
+    'DBU': 'dBu',
+    'DBM': 'dBm',
+    'V': 'V',
+    'MV': 'mV',
+    'UV': 'μV',
+    'UVR': 'μV',
+    'UV RMS': 'μV',
+    'UVRMS': 'μV',
+    'PCT': '%',
+    '%': '%',
+}
+
+DEFAULT_Y_UNIT = 'dBV'
+
+
+def canonical_unit(unit: str) -> str:
+    """Return the canonical spelling of a level unit (case-insensitive match).
+
+    Unknown units are returned stripped but otherwise unchanged.
+    """
+    if not isinstance(unit, str):
+        return unit
+    u = unit.strip()
+    key = u.replace(' ', '').lower()
+    return _CANONICAL.get(key, u)
+
+
+_CANONICAL = {u.replace(' ', '').lower(): u for u in
+              list(VOLTAGE_SCALE) + list(POWER_SCALE) + list(DB_UNITS) + ['%']}
+# ASCII micro spellings map onto the display form
+_CANONICAL['uv'] = 'μV'
+_CANONICAL['uw'] = 'μW'
+_CANONICAL['dbspl'] = 'dB SPL'
+
+
+def is_db_unit(unit: str) -> bool:
+    """True when *unit* is one of the logarithmic level units."""
+    return canonical_unit(unit) in DB_UNITS
+
+
+def unit_display_from_code(code: str) -> str:
+    """Map an instrument unit code (e.g. 'DBR', 'UVRMS') to its display form."""
+    if not isinstance(code, str):
+        return DEFAULT_Y_UNIT
+    return UNIT_CODE_DISPLAY.get(code.strip().upper(), code.strip())
+
+
+def sanitize_user_unit(s: str) -> str:
+    """Normalize a user-defined unit string (SENS:USER), e.g. '"db spl"' -> 'dB SPL'."""
+    if not isinstance(s, str):
+        return ''
+    s2 = s.strip().strip('"').strip("'")
+    if s2.lower().startswith('db'):
+        tokens = s2[2:].lstrip().split()
+        tokens = [t.upper() if t.lower() == 'spl' else t for t in tokens]
+        if tokens:
+            return 'dB ' + ' '.join(tokens)
+        return 'dB'
+    return s2
+
+
+def resolve_y_unit(settings: Dict[str, Any] | None) -> str:
+    """Resolve the trace Y unit display string from a settings/preset dict.
+
+    Priority:
+      1. SENS:USER (sanitized) if present and non-empty
+      2. SENS:UNIT or SENS1:UNIT (mapped to display forms)
+      3. Fallback 'dBV'
+    """
+    if not isinstance(settings, dict):
+        return DEFAULT_Y_UNIT
+    user_unit_raw = settings.get('SENS:USER')
+    std_unit_raw = settings.get('SENS:UNIT') or settings.get('SENS1:UNIT')
+    if isinstance(user_unit_raw, str) and user_unit_raw.strip():
+        cand = sanitize_user_unit(user_unit_raw)
+        if cand:
+            return cand
+    if isinstance(std_unit_raw, str):
+        return unit_display_from_code(std_unit_raw)
+    return DEFAULT_Y_UNIT
+
+
+# ---------------- Level conversion -----------------
+
+@lru_cache(maxsize=64)
+def _level_table(ref_voltage: float, impedance: float, spl_ref_voltage: float) -> Dict[str, Tuple[str, float]]:
+    """Build unit -> (kind, constant) table for one reference combination.
+
+    kind 'lin': volts = value * constant
+    kind 'pow': volts = sqrt(value * constant)          (constant = factor_to_W * Z)
+    kind 'db' : volts = 10**(value/20) * constant       (constant = Vref)
+    """
+    table: Dict[str, Tuple[str, float]] = {}
+    for unit, factor in VOLTAGE_SCALE.items():
+        table[unit] = ('lin', factor)
+    for unit, factor in POWER_SCALE.items():
+        table[unit] = ('pow', factor * impedance)
+    table['dBV'] = ('db', 1.0)
+    table['dBu'] = ('db', DBU_REF_VOLTS)
+    table['dBm'] = ('db', math.sqrt(1e-3 * impedance))
+    table['dBr'] = ('db', ref_voltage)
+    table['dB SPL'] = ('db', spl_ref_voltage)
+    return table
+
+
+def _lookup(unit: str, ref_voltage: float, impedance: float, spl_ref_voltage: float | None):
+    spl_ref = ref_voltage if spl_ref_voltage is None else spl_ref_voltage
+    table = _level_table(float(ref_voltage), float(impedance), float(spl_ref))
+    entry = table.get(canonical_unit(unit))
+    if entry is None:
+        raise ValueError(f"Unsupported level unit: {unit!r}")
+    return entry
+
+
+def _as_array(values):
+    scalar = np.ndim(values) == 0
+    return np.asarray(values, dtype=float), scalar
+
+
+def _finish(arr, scalar):
+    return float(arr) if scalar else arr
+
+
+def to_volts(values, unit: str, *, ref_voltage: float = 1.0, impedance: float = DEFAULT_IMPEDANCE,
+             spl_ref_voltage: float | None = None):
+    """Convert level values in *unit* to volts (RMS)."""
+    arr, scalar = _as_array(values)
+    kind, k = _lookup(unit, ref_voltage, impedance, spl_ref_voltage)
+    with np.errstate(invalid='ignore'):
+        if kind == 'lin':
+            out = arr * k
+        elif kind == 'pow':
+            out = np.sqrt(arr * k)
+        else:
+            out = np.power(10.0, arr / 20.0) * k
+    return _finish(out, scalar)
+
+
+def from_volts(volts, unit: str, *, ref_voltage: float = 1.0, impedance: float = DEFAULT_IMPEDANCE,
+               spl_ref_voltage: float | None = None):
+    """Convert volts (RMS) to *unit*. Non-positive volts map to NaN for dB units."""
+    arr, scalar = _as_array(volts)
+    kind, k = _lookup(unit, ref_voltage, impedance, spl_ref_voltage)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        if kind == 'lin':
+            out = arr / k
+        elif kind == 'pow':
+            out = (arr * arr) / k
+        else:
+            out = 20.0 * np.log10(arr / k)
+            out = np.where(arr > 0, out, np.nan)
+    return _finish(out, scalar)
+
+
+def convert(values, from_unit: str, to_unit: str, *, ref_voltage: float = 1.0,
+            impedance: float = DEFAULT_IMPEDANCE, spl_ref_voltage: float | None = None):
+    """Convert level values between any two supported units.
+
+    Same-unit conversions return the input unchanged (as float / ndarray).
+    dB -> dB conversions are a single offset add and lin -> lin a single
+    multiply, so re-rendering large trace sets is cheap.
+    A '%' unit can only be converted to itself.
+    """
+    src = canonical_unit(from_unit)
+    dst = canonical_unit(to_unit)
+    arr, scalar = _as_array(values)
+    if src == dst:
+        return _finish(arr, scalar)
+    kw = dict(ref_voltage=ref_voltage, impedance=impedance, spl_ref_voltage=spl_ref_voltage)
+    kind_s, k_s = _lookup(src, **kw)
+    kind_d, k_d = _lookup(dst, **kw)
+    if kind_s == 'db' and kind_d == 'db':
+        return _finish(arr + 20.0 * math.log10(k_s / k_d), scalar)
+    if kind_s == kind_d:
+        return _finish(arr * (k_s / k_d), scalar)
+    return from_volts(to_volts(values, src, **kw), dst, **kw)
+
+
+# ---------------- Simple scale families -----------------
+
+def convert_scale(value, from_unit: str, to_unit: str, scale: Dict[str, float]):
+    """Convert between units of a purely multiplicative family (Hz/kHz, s/ms, Ω/kΩ)."""
+    if from_unit == to_unit or from_unit not in scale or to_unit not in scale:
+        return value
+    arr, scalar = _as_array(value)
+    return _finish(arr * (scale[from_unit] / scale[to_unit]), scalar)
+
+
+def percent_to_db(pct):
+    """Tolerance percent -> dB (20*log10(1 + pct/100)); NaN at or below -100 %."""
+    arr, scalar = _as_array(pct)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = np.where(arr > -100, 20.0 * np.log10(1.0 + arr / 100.0), np.nan)
+    return _finish(out, scalar)
+
+
+def db_to_percent(db):
+    """Tolerance dB -> percent ((10**(dB/20) - 1) * 100)."""
+    arr, scalar = _as_array(db)
+    return _finish((np.power(10.0, arr / 20.0) - 1.0) * 100.0, scalar)
+
+
+def format_entry_value(value) -> str:
+    """Format a converted scalar for an Entry widget.
+
+    Integral values drop the decimal part, others are rounded to 6 places;
+    NaN / inf (e.g. dB of a non-positive voltage) become an empty string.
+    """
+    try:
+        v = float(value)
+    except (TypeError, ValueError):
+        return ""
+    if not math.isfinite(v):
+        return ""
+    if v.is_integer():
+        return str(int(v))
+    return str(round(v, 6))
+
+
+def parse_level(text: str, default_unit: str = "V") -> Tuple[float, str] | None:
+    """Parse a '<number> <unit>' level string into (value, canonical_unit)."""
+    if not isinstance(text, str):
+        return None
+    parts = text.strip().split(None, 1)
+    if not parts:
+        return None
+    try:
+        val = float(parts[0])
+    except ValueError:
+        return None
+    unit = canonical_unit(parts[1]) if len(parts) > 1 else default_unit
+    return val, unit
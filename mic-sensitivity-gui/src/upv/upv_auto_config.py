@@ -1,20 +1,47 @@
-import pyvisa
 import json
 import time
+from contextlib import nullcontext
 from pathlib import Path
-import matplotlib
-matplotlib.use("TkAgg")
-import matplotlib.pyplot as plt
 import numpy as np
-import tkinter as tk
-from tkinter import filedialog, messagebox
-import datetime
+
+try:
+    from upv.units import canonical_unit
+    from upv.settings_model import settings_model
+    from upv.smoothing import smooth_trace
+    from upv.hxml_writer import DEFAULT_WORKING_TITLE, write_hxml
+    from upv.archive import archive_exported_traces
+except ImportError:  # executed as a plain script from the upv folder
+    from units import canonical_unit
+    from settings_model import settings_model
+    from smoothing import smooth_trace
+    from hxml_writer import DEFAULT_WORKING_TITLE, write_hxml
+    from archive import archive_exported_traces
 
 try:
     from utils.paths import data_path
 except Exception:
     data_path = None
 
+try:
+    from utils.profiling import profiled
+except Exception:  # utils not on the path: profiling is a no-op
+    def profiled(name=None, cat="gui"):
+        return lambda fn: fn
+
+# pyplot and pyvisa are loaded on first use (see utils.startup), not at import
+try:
+    from utils.startup import pyplot, resource_manager
+except Exception:
+    def pyplot():
+        import matplotlib
+        matplotlib.use("TkAgg")
+        import matplotlib.pyplot as plt
+        return plt
+
+    def resource_manager():
+        import pyvisa
+        return pyvisa.ResourceManager()
+
 if data_path is not None:
     CONFIG_FILE = str(data_path('config.json'))
     SETTINGS_FILE = str(data_path('settings.json'))
@@ -105,7 +132,7 @@ def find_upv_ip(status_callback=None):
             status_callback(msg)
         else:
             print(msg)
-    rm = pyvisa.ResourceManager()
+    rm = resource_manager()
     log("🔍 Scanning VISA resources for UPV (LAN/USB)...")
     found = []
     for res in rm.list_resources():
@@ -142,6 +169,9 @@ def load_config():
 
 def get_save_path_from_dialog():
     """Show a file dialog to get the export path for .hxml file."""
+    # Tk is only needed for this dialog; headless callers never import it
+    import tkinter as tk
+    from tkinter import filedialog
     root = tk.Tk()
     root.withdraw()
     file_path = filedialog.asksaveasfilename(
@@ -152,32 +182,128 @@ def get_save_path_from_dialog():
     )
     return file_path
 
-def apply_grouped_settings(upv, data=None, config_file=SETTINGS_FILE, status_callback=None):
-    """Apply grouped settings from JSON to the UPV instrument."""
+# Top-level preset keys that are not sent as raw SCPI (handled in runtime logic)
+RAW_EXCLUDE = {"INIT:CONT", "SweepMode", "ContinuousSweep"}
+
+
+class ApplyResult:
+    """Outcome of `apply_grouped_settings`: commands written, failures and whether it was cancelled.
+
+    timings maps (section, label) to the seconds a write plus its *OPC?
+    round-trip took, i.e. until the UPV finished switching (section "" for raw
+    SCPI keys). Only labels passed as *settle_labels* are timed;
+    upv.preset_optimizer learns switching costs from them.
+    """
+
+    __slots__ = ("applied", "errors", "cancelled", "timings")
+
+    def __init__(self):
+        self.applied = 0
+        self.errors = []  # (label, message)
+        self.cancelled = False
+        self.timings = {}
+
+    @property
+    def ok(self) -> bool:
+        return not self.errors and not self.cancelled
+
+    def __repr__(self):
+        return f"ApplyResult(applied={self.applied}, errors={len(self.errors)}, cancelled={self.cancelled})"
+
+
+@profiled("apply_grouped_settings", "visa")
+def apply_grouped_settings(upv, data=None, config_file=SETTINGS_FILE, status_callback=None, *,
+                           progress_callback=None, cancel_event=None, lock=None, settle_labels=None):
+    """Apply grouped settings from JSON to the UPV instrument.
+
+    data: settings dict to apply, or a CompiledPreset (upv.preset_compiler)
+    whose validated command list is sent as is; when None it is read from
+    *config_file*.
+    progress_callback(done, total, message) is called once per section (plus the
+    raw SCPI phase). Setting *cancel_event* stops before the next command.
+    Each write holds *lock* (e.g. the GUI's VISA lock) so polls can interleave.
+    Writes of labels in *settle_labels* are followed by *OPC? and timed into
+    ApplyResult.timings (relay / range settling happens after write() returns).
+    Returns an ApplyResult.
+    """
+    result = ApplyResult()
+
     def log(msg):
         if status_callback:
             status_callback(msg)
         else:
             print(msg)
+
+    def progress(done, total, msg):
+        if progress_callback:
+            progress_callback(done, total, msg)
+
+    def cancelled():
+        if cancel_event is not None and cancel_event.is_set():
+            if not result.cancelled:
+                result.cancelled = True
+                log("⏹️ Apply cancelled.")
+            return True
+        return False
+
+    def send(section, label, cmd, value, prefix=""):
+        timed = settle_labels is not None and label in settle_labels
+        try:
+            with lock if lock is not None else nullcontext():
+                t0 = time.perf_counter()
+                upv.write(f"{cmd} {value}")
+                if timed:
+                    try:
+                        upv.query("*OPC?")
+                        result.timings[(section, label)] = time.perf_counter() - t0
+                    except Exception as e:  # written; only the settling time is unknown
+                        log(f"   ⚠️ {prefix}{label}: *OPC? failed ({e})")
+            result.applied += 1
+            log(f"   ✓ {prefix}{label}: {value}")
+        except Exception as e:
+            result.errors.append((label, str(e)))
+            log(f"   ❌ {prefix}Failed to apply {label}: {e}")
+
     if data is None:
         if not Path(config_file).exists():
             log(f"⚠️ Settings file '{config_file}' not found.")
-            return
+            return result
         with open(config_file, "r") as f:
             data = json.load(f)
 
-    for section, settings_map in command_groups.items():
+    total = len(command_groups) + 1
+    commands = getattr(data, "commands", None)
+    if commands is not None:
+        # Compiled preset: (section, label, SCPI header, value) in apply order, already validated
+        section_index = {name: i for i, name in enumerate(command_groups)}
+        current = None
+        for section, label, scpi, value in commands:
+            if cancelled():
+                return result
+            if section != current:
+                current = section
+                if section:
+                    progress(section_index.get(section, 0), total, f"Applying {section}...")
+                    log(f"\n➡️ Applying {section}")
+                else:
+                    progress(total - 1, total, "Applying raw SCPI keys...")
+            send(section, label, scpi, value, prefix="" if section else "(raw) ")
+        progress(total, total, "Settings applied.")
+        return result
+
+    for done, (section, settings_map) in enumerate(command_groups.items()):
+        if cancelled():
+            return result
+        progress(done, total, f"Applying {section}...")
         if section in data:
             log(f"\n➡️ Applying {section}")
             settings = data[section]
             for label, value in settings.items():
+                if cancelled():
+                    return result
                 scpi = settings_map.get(label)
                 if scpi:
-                    try:
-                        upv.write(f"{scpi} {value}")
-                        log(f"   ✓ {label}: {value}")
-                    except Exception as e:
-                        log(f"   ❌ Failed to apply {label}: {e}")
+                    send(section, label, scpi, value)
                 else:
                     log(f"   ⚠️ Unknown setting label: {label}")
         else:
@@ -191,7 +317,7 @@ def apply_grouped_settings(upv, data=None, config_file=SETTINGS_FILE, status_cal
     #   * has a non-dict value
     #   * contains at least one colon (heuristic for SCPI command)
     # Skip keys we intentionally interpret elsewhere (e.g., INIT:CONT used later to decide sweep mode).
-    RAW_EXCLUDE = {"INIT:CONT", "SweepMode", "ContinuousSweep"}  # handled in runtime logic
+    progress(total - 1, total, "Applying raw SCPI keys...")
     try:
         for key, value in data.items():
             if key in command_groups:  # section dicts already processed
@@ -201,198 +327,126 @@ def apply_grouped_settings(upv, data=None, config_file=SETTINGS_FILE, status_cal
             if key in RAW_EXCLUDE:
                 continue
             if ':' in key:
-                try:
-                    upv.write(f"{key} {value}")
-                    log(f"   ✓ (raw) {key}: {value}")
-                except Exception as e:
-                    log(f"   ❌ (raw) Failed {key}: {e}")
+                if cancelled():
+                    return result
+                send("", key, key, value, prefix="(raw) ")
     except Exception as e:
         log(f"⚠️ Raw SCPI application phase encountered an error: {e}")
+    progress(total, total, "Settings applied.")
+    return result
 
-def fetch_and_plot_trace(upv, export_path="sweep_trace.hxml", working_title=None):
-    """Fetch sweep trace data from UPV, save as .hxml, and plot.
-
-    Parameters:
-        upv: VISA instrument handle
-        export_path (str|Path): destination .hxml path (user-chosen file name)
-        working_title (str|None): preset file stem to use for dataset WorkingTitle. If None, falls back to export file stem.
+@profiled("fetch_trace", "visa")
+def fetch_trace(upv, query=None):
+    """Read the current sweep trace from the UPV as (x, y) float arrays.
 
-    Behavior change:
-        - WorkingTitle attribute: based on preset (working_title param) if provided
-        - CurveDataName attribute: always based on the user-typed export file name stem
+    query: optional callable(cmd) -> str used instead of `upv.query` (e.g. the
+    GUI's lock-protected `_safe_query`). Raises ValueError on empty/mismatched data.
     """
+    q = query if query is not None else upv.query
+    x_raw = q("TRAC:SWE1:LOAD:AX?")
+    y_raw = q("TRAC:SWE1:LOAD:AY?")
+    if not x_raw or not y_raw:
+        raise ValueError("No sweep data returned.")
+    x_vals = np.fromstring(x_raw, sep=',')
+    y_vals = np.fromstring(y_raw, sep=',')
+    if len(x_vals) != len(y_vals) or len(x_vals) == 0:
+        raise ValueError("Empty or mismatched sweep data.")
+    return x_vals, y_vals
+
+
+def read_y_unit():
+    """Y-axis / magnitude unit from the current settings file (cached, see upv.settings_model)."""
     try:
-        print("📊 Fetching Sweep trace data directly from UPV...")
+        return settings_model(SETTINGS_FILE).y_unit
+    except Exception:
+        return 'dBV'
 
-        x_raw = upv.query("TRAC:SWE1:LOAD:AX?")
-        y_raw = upv.query("TRAC:SWE1:LOAD:AY?")
-        x_vals = np.fromstring(x_raw, sep=',')
-        y_vals = np.fromstring(y_raw, sep=',')
 
-        if len(x_vals) != len(y_vals) or len(x_vals) == 0:
-            raise ValueError("Empty or mismatched sweep data.")
+def build_export_trace(x_vals, y_vals, export_path, working_title=None, y_unit=None):
+    """Trace dict for a single-sweep export.
 
-        now = datetime.datetime.now().strftime("%d-%b-%Y %H:%M:%S")
-
-        # Derive CurveDataName (preset focused) and dataset WorkingTitle constant per new unified format.
-        # WorkingTitle: always literal "workingTitle" (matches combined export example)
-        working_title_raw = "workingTitle"
-        # CurveDataName priority: explicit working_title argument (preset stem) > export file stem > fallback
-        if isinstance(working_title, str) and working_title.strip():
-            curve_data_name_source = working_title.strip()
-        else:
-            try:
-                curve_data_name_source = Path(export_path).stem if export_path else "measurement"
-                if not curve_data_name_source:
-                    curve_data_name_source = "measurement"
-            except Exception:
+    CurveDataName priority: explicit working_title (preset stem) > export file stem > 'measurement'.
+    The level unit is written without spaces ('dBSPL'), as single exports always did.
+    """
+    if isinstance(working_title, str) and working_title.strip():
+        curve_data_name_source = working_title.strip()
+    else:
+        try:
+            curve_data_name_source = Path(export_path).stem if export_path else "measurement"
+            if not curve_data_name_source:
                 curve_data_name_source = "measurement"
+        except Exception:
+            curve_data_name_source = "measurement"
+    y_unit_display = y_unit or read_y_unit()
+    return {
+        'name': curve_data_name_source,
+        'x': x_vals,
+        'y': y_vals,
+        'unit': y_unit_display.replace(' ', ''),
+    }
 
-        # Simple XML escape for attribute context
-        def _xml_escape(s: str) -> str:
-            return (s.replace('&', '&amp;')
-                     .replace('"', '&quot;')
-                     .replace("'", '&apos;')
-                     .replace('<', '&lt;')
-                     .replace('>', '&gt;'))
 
-        working_title_xml = _xml_escape(working_title_raw)
+@profiled("export_trace", "disk")
+def export_trace(trace, export_path):
+    """Write one trace as .hxml (dataset WorkingTitle 'workingTitle') and append it to the archive."""
+    write_hxml(export_path, [trace], working_title=DEFAULT_WORKING_TITLE)
+    # Columnar copy for bulk analysis (best effort, see upv.archive)
+    archive_exported_traces([trace], export_path)
+    print(f"✅ File saved to '{export_path}'")
 
-        curve_data_name_xml = _xml_escape(curve_data_name_source)
 
-        # Determine Y-axis / magnitude units from current settings.
-        # Priority:
-        #   1. SENS:USER (user-defined textual unit) -> sanitized (strip quotes)
-        #   2. SENS:UNIT (standard unit selection)
-        #   3. SENS1:UNIT (legacy / alternative key)
-        # Fallback: dBV
-        try:
-            y_unit_display = 'dBV'
-            if Path(SETTINGS_FILE).exists():
-                with open(SETTINGS_FILE, 'r', encoding='utf-8') as sf:
-                    settings_data = json.load(sf)
-                user_unit_raw = settings_data.get('SENS:USER')
-                std_unit_raw = settings_data.get('SENS:UNIT') or settings_data.get('SENS1:UNIT')
-
-                def _sanitize_user_unit(s: str) -> str:
-                    if not isinstance(s, str):
-                        return ''
-                    # Strip surrounding quotes (single or double)
-                    s2 = s.strip().strip('"').strip('\'')
-                    # Common normalization: 'db spl' -> 'dB SPL'
-                    low = s2.lower()
-                    if low.startswith('db'):
-                        # split after 'db'
-                        rest = s2[2:].lstrip()
-                        # Uppercase SPL token if present
-                        tokens = rest.split()
-                        tokens = [t.upper() if t.lower() == 'spl' else t for t in tokens]
-                        if tokens:
-                            return 'dB ' + ' '.join(tokens)
-                        return 'dB'
-                    return s2
-
-                if isinstance(user_unit_raw, str) and user_unit_raw.strip():
-                    candidate = _sanitize_user_unit(user_unit_raw)
-                    if candidate:
-                        y_unit_display = candidate
-                    else:
-                        # fall back to std unit if user unit empty after sanitize
-                        if isinstance(std_unit_raw, str):
-                            yu = std_unit_raw.strip().upper()
-                            unit_map = {
-                                'DBR': 'dBr',
-                                'DBV': 'dBV',
-                                'DBU': 'dBu',
-                                'DBM': 'dBm',
-                                'V': 'V',
-                                'MV': 'mV',
-                                'UV': 'μV',
-                                'UVR': 'μV',
-                                'UV RMS': 'μV',
-                                'UVRMS': 'μV',
-                                'PCT': '%',
-                                '%': '%'
-                            }
-                            y_unit_display = unit_map.get(yu, std_unit_raw.strip())
-                elif isinstance(std_unit_raw, str):
-                    yu = std_unit_raw.strip().upper()
-                    unit_map = {
-                        'DBR': 'dBr',
-                        'DBV': 'dBV',
-                        'DBU': 'dBu',
-                        'DBM': 'dBm',
-                        'V': 'V',
-                        'MV': 'mV',
-                        'UV': 'μV',
-                        'UVR': 'μV',
-                        'UV RMS': 'μV',
-                        'UVRMS': 'μV',
-                        'PCT': '%',
-                        '%': '%'
-                    }
-                    y_unit_display = unit_map.get(yu, std_unit_raw.strip())
-        except Exception:
-            y_unit_display = 'dBV'
-
-        # For HXML attribute, use the same token (without spaces)
-        hxml_y_unit = y_unit_display.replace(' ', '')
-
-        with open(export_path, "w", encoding="utf-8") as f:
-            f.write('<?xml version="1.0" encoding="utf-8"?>\n')
-            f.write("<hxml>\n")
-            f.write("   <head>\n")
-            f.write("      <Document>\n")
-            f.write("         <DataVersion XsdVersion=\"0.0.0.1\">0.0.0.1</DataVersion>\n")
-            f.write("         <DataType>hiCurve</DataType>\n")
-            f.write("         <LDocNode>//hxml/data</LDocNode>\n")
-            f.write("         <PlatformVersion>n.a.</PlatformVersion>\n")
-            f.write("      </Document>\n")
-            f.write("   </head>\n")
-            f.write("   <data>\n")
-            f.write(f"      <dataset WorkingTitle=\"{working_title_xml}\">\n")
-            f.write("         <longDataSetDesc/>\n")
-            f.write("         <shortDataSetDesc/>\n")
-            f.write("         <acpEarhookType/>\n")
-            f.write("         <v-curvedata>\n")
-            f.write(f"            <curvedata CurveDataName=\"{curve_data_name_xml}\" MeasurementDate=\"{now}\" TestEquipmentNr=\"UPV_Audio_Analyzer\" Tester=\"PythonApp\">\n")
-            f.write("               <longCurveDesc/>\n")
-            f.write("               <shortCurveDesc/>\n")
-            f.write("               <curve name=\"f\" unit=\"Hz\">[" + " ".join(f"{x:.6f}" for x in x_vals) + "]</curve>\n")
-            f.write(f"               <curve name=\"level\" unit=\"{hxml_y_unit}\">[" + " ".join(f"{y:.6f}" for y in y_vals) + "]</curve>\n")
-            f.write("            </curvedata>\n")
-            f.write("         </v-curvedata>\n")
-            f.write("      </dataset>\n")
-            f.write("   </data>\n")
-            f.write("   <environment/>\n")
-            f.write("</hxml>\n")
-
-        print(f"✅ File saved to '{export_path}'")
-
-        # Plot (Logarithmic X-Axis)
-        plt.figure(figsize=(10, 6))
-        plt.semilogx(x_vals, y_vals)
-        # Use the saved file's base name (without extension) as the plot title
-        try:
-            file_title = Path(export_path).stem if export_path else "Sweep Measurement Result"
-            if not file_title:
-                file_title = "Sweep Measurement Result"
-        except Exception:
+def plot_trace(x_vals, y_vals, export_path=None, y_unit='dBV'):
+    """Show the trace in a matplotlib window (log X axis), titled after the export file."""
+    plt = pyplot()
+    plt.figure(figsize=(10, 6))
+    plt.semilogx(x_vals, y_vals)
+    # Use the saved file's base name (without extension) as the plot title
+    try:
+        file_title = Path(export_path).stem if export_path else "Sweep Measurement Result"
+        if not file_title:
             file_title = "Sweep Measurement Result"
-        plt.title(file_title)
-        plt.xlabel("Frequency (Hz)")
-        plt.ylabel(f"Level ({y_unit_display})")
-        plt.grid(True, which="both", ls="--", linewidth=0.5)
-        plt.tight_layout()
-        plt.show()
+    except Exception:
+        file_title = "Sweep Measurement Result"
+    plt.title(file_title)
+    plt.xlabel("Frequency (Hz)")
+    plt.ylabel(f"Level ({canonical_unit(y_unit)})")
+    plt.grid(True, which="both", ls="--", linewidth=0.5)
+    plt.tight_layout()
+    plt.show()
+
+
+def fetch_and_plot_trace(upv, export_path="sweep_trace.hxml", working_title=None, smoothing=None):
+    """Fetch sweep trace data from UPV, save as .hxml, and plot.
 
+    Parameters:
+        upv: VISA instrument handle
+        export_path (str|Path): destination .hxml path (user-chosen file name)
+        working_title (str|None): preset file stem to use for dataset WorkingTitle. If None, falls back to export file stem.
+        smoothing (int|None): optional 1/N octave smoothing applied before export and plot (e.g. 3, 6, 12, 24).
+
+    Behavior change:
+        - WorkingTitle attribute: based on preset (working_title param) if provided
+        - CurveDataName attribute: always based on the user-typed export file name stem
+
+    The GUI runs the fetch/export steps on its export worker (see
+    `upv.export_service`) and only the plot on the Tk thread.
+    """
+    try:
+        print("📊 Fetching Sweep trace data directly from UPV...")
+        x_vals, y_vals = fetch_trace(upv)
+        y_unit_display = read_y_unit()
+        if smoothing:
+            y_vals = smooth_trace(x_vals, y_vals, smoothing, unit=y_unit_display)
+        trace = build_export_trace(x_vals, y_vals, export_path, working_title, y_unit_display)
+        export_trace(trace, export_path)
+        plot_trace(x_vals, y_vals, export_path, y_unit_display)
     except Exception as e:
         print(f"❌ Failed to fetch or plot trace: {e}")
 
 # --- Main Routine ---
 
 def main():
-    rm = pyvisa.ResourceManager()
+    rm = resource_manager()
     visa_address = load_config()
     upv = None
 
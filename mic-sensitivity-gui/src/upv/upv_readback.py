@@ -30,21 +30,29 @@ or simply:
 
 If no output path is provided, a timestamped file is created next to
 `settings.json`.
+
+The GUI runs the read-back as a background job: queries go through its
+shared instrument lock (`query=`), progress is reported once per section and
+the snapshot can be cancelled between queries:
+
+    save_settings_snapshot(None, path, extra={"INIT:CONT": "ON"},
+                           query=lambda cmd: safe_query(cmd),
+                           progress_callback=job.report, cancel_event=job.cancel_event)
 """
 from __future__ import annotations
 
 import json
+import os
 import time
 import argparse
 from pathlib import Path
-from typing import Dict, Any
-
-import pyvisa
+from typing import Any, Callable, Dict, Optional
 
 from .upv_auto_config import (
     command_groups,
     load_config,
     find_upv_ip,
+    resource_manager,
     save_config,
 )
 
@@ -85,7 +93,8 @@ def _derive_query(scpi: str, label: str) -> str | None:
     return f"{scpi}?"
 
 
-def read_current_settings(upv) -> Dict[str, Dict[str, Any]]:
+def read_current_settings(upv, *, query: Optional[Callable[[str], str]] = None,
+                          progress_callback=None, cancel_event=None) -> Optional[Dict[str, Dict[str, Any]]]:
     """Query the UPV for all known settings and return a nested dict.
 
     Structure:
@@ -95,16 +104,24 @@ def read_current_settings(upv) -> Dict[str, Dict[str, Any]]:
     }
 
     Query failures are logged (printed) and the offending label omitted.
+    *query* replaces `upv.query` (e.g. a lock-aware query shared with other
+    threads); progress_callback(done, total, message) is called after each
+    section. Returns None if *cancel_event* is set before the walk finishes.
     """
+    if query is None:
+        query = upv.query
     snapshot: Dict[str, Dict[str, Any]] = {}
-    for section, mapping in command_groups.items():
+    total = len(command_groups)
+    for done, (section, mapping) in enumerate(command_groups.items(), 1):
         section_out: Dict[str, Any] = {}
         for label, scpi in mapping.items():
+            if cancel_event is not None and cancel_event.is_set():
+                return None
             q = _derive_query(scpi, label)
             if q is None:
                 continue
             try:
-                resp = upv.query(q).strip()
+                resp = query(q).strip()
                 # Basic normalization: remove enclosing quotes if any
                 if resp.startswith('"') and resp.endswith('"') and len(resp) >= 2:
                     resp = resp[1:-1]
@@ -121,24 +138,48 @@ def read_current_settings(upv) -> Dict[str, Dict[str, Any]]:
                 print(f"⚠️ Query failed for {section}/{label} ({q}): {e}")
                 continue
         snapshot[section] = section_out
+        if progress_callback:
+            progress_callback(done, total, f"Read {section} ({len(section_out)} values)")
     return snapshot
 
 
-def save_settings_snapshot(upv, output_path: Path | None = None) -> Path:
-    """Create a settings snapshot JSON file and return its path."""
+def save_settings_snapshot(upv, output_path: Path | None = None, *, extra: Optional[Dict[str, Any]] = None,
+                           query: Optional[Callable[[str], str]] = None, progress_callback=None,
+                           cancel_event=None) -> Optional[Path]:
+    """Create a settings snapshot JSON file and return its path.
+
+    *extra* top-level keys (e.g. {"INIT:CONT": "ON"}) are merged in before the
+    file is written once, atomically. Returns None (nothing written) if the
+    read-back was cancelled.
+    """
     if output_path is None:
         ts = time.strftime("%Y%m%d_%H%M%S")
         output_path = Path(f"upv_snapshot_{ts}.json")
-    data = read_current_settings(upv)
-    with output_path.open("w", encoding="utf-8") as f:
-        json.dump(data, f, indent=2, ensure_ascii=False)
+    output_path = Path(output_path)
+    data = read_current_settings(upv, query=query, progress_callback=progress_callback,
+                                 cancel_event=cancel_event)
+    if data is None:
+        print("⏹️ Settings snapshot cancelled")
+        return None
+    if extra:
+        data.update(extra)
+    tmp = output_path.with_name(output_path.name + ".tmp")
+    try:
+        with tmp.open("w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2, ensure_ascii=False)
+        os.replace(tmp, output_path)
+    finally:
+        try:
+            tmp.unlink()
+        except OSError:
+            pass
     print(f"✅ Settings snapshot written to {output_path}")
     return output_path
 
 
 def connect_upv() -> Any:
     """Connect to the UPV using stored config or discovery."""
-    rm = pyvisa.ResourceManager()
+    rm = resource_manager()
     visa_address = load_config()
     upv = None
 
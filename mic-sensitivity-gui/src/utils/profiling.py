@@ -0,0 +1,199 @@
+"""Opt-in span profiling with Chrome trace (Perfetto) export.
+
+Enable with the environment variable MIC_GUI_PROFILE (``1`` or an output
+path) or ``python main.py --profile [PATH]``. While enabled, every `span()` /
+`@profiled` call records one complete event (start, duration, thread) into a
+bounded in-memory buffer; at exit the buffer is written as a Chrome trace JSON
+(open in https://ui.perfetto.dev or chrome://tracing) and a per-span summary
+table is printed and saved next to it.
+
+Disabled, `span()` returns a shared no-op context manager and `@profiled`
+costs one flag check per call, so the instrumentation stays in the code.
+
+Categories used by the app: "startup", "gui" (Tk thread work), "visa"
+(instrument I/O) and "disk" (settings / HXML files).
+
+Usage:
+
+    from utils.profiling import profiled, span
+
+    @profiled("load_settings", "gui")
+    def load_settings(self): ...
+
+    with span("acquisition iteration", "visa", points=len(x)):
+        ...
+"""
+from __future__ import annotations
+
+import atexit
+import functools
+import json
+import os
+import threading
+import time
+from collections import deque
+from contextlib import nullcontext
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, List, Optional
+
+ENV_VAR = "MIC_GUI_PROFILE"
+# Newest events kept (ring buffer); ~100 bytes each
+MAX_EVENTS = 200_000
+
+_NULL = nullcontext()
+_enabled = False
+_finished = False
+_output: Optional[Path] = None
+_events: "deque[tuple]" = deque(maxlen=MAX_EVENTS)
+_thread_names: Dict[int, str] = {}
+_t0_ns = time.perf_counter_ns()
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def _default_output() -> Path:
+    stamp = datetime.now().strftime("%Y%m%d_%H%M%S")
+    try:
+        from utils.paths import data_path
+        return data_path('profiles', f"trace_{stamp}.json")
+    except Exception:
+        return Path('profiles') / f"trace_{stamp}.json"
+
+
+def enable(output=None) -> Path:
+    """Start recording; the trace is written to *output* (default profiles/trace_<time>.json) at exit."""
+    global _enabled, _output
+    _output = Path(output) if output else _default_output()
+    if not _enabled:
+        _enabled = True
+        atexit.register(finish)
+    return _output
+
+
+def enable_from_env_or_argv(argv: Optional[List[str]] = None) -> Optional[Path]:
+    """Enable when MIC_GUI_PROFILE is set or ``--profile [PATH]`` is in *argv* (removed from it)."""
+    output = None
+    requested = False
+    env = os.environ.get(ENV_VAR, "").strip()
+    if env and env.lower() not in {"0", "false", "off", "no"}:
+        requested = True
+        if env.lower() not in {"1", "true", "on", "yes"}:
+            output = env
+    if argv is not None and "--profile" in argv:
+        requested = True
+        i = argv.index("--profile")
+        del argv[i]
+        if i < len(argv) and not argv[i].startswith("-"):
+            output = argv.pop(i)
+    return enable(output) if requested else None
+
+
+class _Span:
+    __slots__ = ("name", "cat", "args", "start")
+
+    def __init__(self, name, cat, args):
+        self.name = name
+        self.cat = cat
+        self.args = args
+
+    def __enter__(self):
+        self.start = time.perf_counter_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        end = time.perf_counter_ns()
+        tid = threading.get_ident()
+        if tid not in _thread_names:
+            _thread_names[tid] = threading.current_thread().name
+        if exc_type is not None:
+            self.args = dict(self.args or {}, error=exc_type.__name__)
+        _events.append((self.name, self.cat, self.start - _t0_ns, end - self.start, tid, self.args))
+        return False
+
+
+def span(name: str, cat: str = "gui", **args):
+    """Context manager timing one occurrence of *name* (no-op unless profiling is enabled)."""
+    if not _enabled:
+        return _NULL
+    return _Span(name, cat, args or None)
+
+
+def profiled(name: Optional[str] = None, cat: str = "gui"):
+    """Decorator form of `span()`; the name defaults to the function's qualified name."""
+    def decorate(fn):
+        label = name or fn.__qualname__
+
+        @functools.wraps(fn)
+        def wrapper(*a, **kw):
+            if not _enabled:
+                return fn(*a, **kw)
+            with _Span(label, cat, None):
+                return fn(*a, **kw)
+        return wrapper
+    return decorate
+
+
+# ---------------- output -----------------
+def trace_events() -> List[dict]:
+    """Recorded spans as Chrome trace events ("X" complete events + thread names)."""
+    pid = os.getpid()
+    events: List[dict] = [
+        {"name": "thread_name", "ph": "M", "pid": pid, "tid": tid, "args": {"name": tname}}
+        for tid, tname in list(_thread_names.items())
+    ]
+    for name, cat, start_ns, dur_ns, tid, args in list(_events):
+        ev = {"name": name, "cat": cat, "ph": "X", "pid": pid, "tid": tid,
+              "ts": start_ns / 1000.0, "dur": dur_ns / 1000.0}
+        if args:
+            ev["args"] = {k: (v if isinstance(v, (int, float, str, bool)) or v is None else str(v))
+                          for k, v in args.items()}
+        events.append(ev)
+    return events
+
+
+def write_trace(path=None) -> Path:
+    """Write the Chrome trace JSON; returns its path."""
+    out = Path(path) if path else (_output or _default_output())
+    out.parent.mkdir(parents=True, exist_ok=True)
+    with open(out, 'w', encoding='utf-8') as f:
+        json.dump({"traceEvents": trace_events(), "displayTimeUnit": "ms"}, f)
+    return out
+
+
+def summary() -> str:
+    """Per-span table: category, count, total / mean / p95 / max milliseconds (sorted by total)."""
+    stats: Dict[tuple, List[float]] = {}
+    for name, cat, _start, dur_ns, _tid, _args in list(_events):
+        stats.setdefault((cat, name), []).append(dur_ns / 1e6)
+    rows = []
+    for (cat, name), durs in stats.items():
+        durs.sort()
+        p95 = durs[min(len(durs) - 1, int(round(0.95 * (len(durs) - 1))))]
+        rows.append((sum(durs), cat, name, len(durs), sum(durs) / len(durs), p95, durs[-1]))
+    rows.sort(reverse=True)
+    header = f"{'category':<8} {'span':<40} {'count':>7} {'total ms':>10} {'mean ms':>9} {'p95 ms':>9} {'max ms':>9}"
+    lines = [header, "-" * len(header)]
+    for total, cat, name, count, mean, p95, mx in rows:
+        lines.append(f"{cat:<8} {name[:40]:<40} {count:>7} {total:>10.1f} {mean:>9.2f} {p95:>9.2f} {mx:>9.2f}")
+    return "\n".join(lines)
+
+
+def finish() -> Optional[Path]:
+    """Write the trace and the summary table once (main() and atexit both call it)."""
+    global _finished
+    if not _enabled or _finished or not _events:
+        return None
+    _finished = True
+    try:
+        out = write_trace()
+        table = summary()
+        out.with_suffix('.txt').write_text(table + "\n", encoding='utf-8')
+        print(table)
+        print(f"📈 Profile trace written to {out}")
+        return out
+    except Exception as e:
+        print(f"⚠️ Could not write profile trace: {e}")
+        return None
@@ -0,0 +1,166 @@
+"""Startup helpers: lazy module imports, background prewarming and timings.
+
+Importing matplotlib/pyplot and pyvisa (and creating the VISA ResourceManager)
+used to happen before the main window was shown. They are now imported on
+first use through `lazy_module`, and `prewarm()` loads them on a background
+thread once the window is on screen, so the first live plot or connect does
+not pay the cost either.
+
+`mark()` records named checkpoints relative to process start (this module's
+import) and `timed()` measures a block; `report()` prints the summary.
+
+Usage:
+
+    from utils.startup import lazy_module, mark, prewarm, report, resource_manager
+    pyvisa = lazy_module("pyvisa")       # imported on first attribute access
+    mark("window shown")
+    root.after(200, lambda: prewarm(["matplotlib.figure", "pyvisa"], on_done=report))
+    rm = resource_manager()              # shared pyvisa.ResourceManager
+"""
+from __future__ import annotations
+
+import importlib
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Iterable, List, Optional, Tuple
+
+_T0 = time.perf_counter()
+# (label, seconds, kind): kind "at" = checkpoint since start, "took" = duration of a block
+_timings: List[Tuple[str, float, str]] = []
+_timings_lock = threading.Lock()
+
+
+def elapsed() -> float:
+    """Seconds since startup timing began."""
+    return time.perf_counter() - _T0
+
+
+def mark(label: str) -> float:
+    """Record checkpoint *label* at the current time since start; returns that time."""
+    t = elapsed()
+    with _timings_lock:
+        _timings.append((label, t, "at"))
+    return t
+
+
+@contextmanager
+def timed(label: str):
+    """Record how long the block took under *label*."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        with _timings_lock:
+            _timings.append((label, time.perf_counter() - start, "took"))
+
+
+def timings() -> List[Tuple[str, float, str]]:
+    with _timings_lock:
+        return list(_timings)
+
+
+def report(printer: Callable[[str], None] = print) -> None:
+    """Print every recorded checkpoint / duration."""
+    for label, t, kind in timings():
+        printer(f"⏱️ {label}: {kind} {t * 1000:.0f} ms")
+
+
+class _LazyModule:
+    """Module proxy that imports the real module on first attribute access."""
+
+    def __init__(self, name: str):
+        self.__dict__['_name'] = name
+        self.__dict__['_module'] = None
+        self.__dict__['_lock'] = threading.Lock()
+
+    def _load(self):
+        module = self.__dict__['_module']
+        if module is None:
+            with self.__dict__['_lock']:
+                module = self.__dict__['_module']
+                if module is None:
+                    with timed(f"import {self.__dict__['_name']}"):
+                        module = importlib.import_module(self.__dict__['_name'])
+                    self.__dict__['_module'] = module
+        return module
+
+    def __getattr__(self, attr):
+        return getattr(self._load(), attr)
+
+    def __setattr__(self, attr, value):
+        setattr(self._load(), attr, value)
+
+    def __repr__(self):
+        state = "loaded" if self.__dict__['_module'] is not None else "not loaded"
+        return f"<lazy module {self.__dict__['_name']!r} ({state})>"
+
+
+_lazy_modules = {}
+
+
+def lazy_module(name: str):
+    """Proxy for module *name*; the import happens on first attribute access (shared per name)."""
+    proxy = _lazy_modules.get(name)
+    if proxy is None:
+        proxy = _lazy_modules.setdefault(name, _LazyModule(name))
+    return proxy
+
+
+_pyplot = None
+_pyplot_lock = threading.Lock()
+
+
+def pyplot():
+    """matplotlib.pyplot with the TkAgg backend selected (imported on first call)."""
+    global _pyplot
+    with _pyplot_lock:
+        if _pyplot is None:
+            with timed("import matplotlib.pyplot"):
+                import matplotlib
+                matplotlib.use("TkAgg")
+                import matplotlib.pyplot as plt
+            _pyplot = plt
+        return _pyplot
+
+
+_rm = None
+_rm_lock = threading.Lock()
+
+
+def resource_manager():
+    """Shared pyvisa.ResourceManager, created on first use (VISA library load is slow)."""
+    global _rm
+    with _rm_lock:
+        if _rm is None:
+            with timed("pyvisa ResourceManager"):
+                _rm = lazy_module("pyvisa").ResourceManager()
+        return _rm
+
+
+def prewarm(modules: Iterable[str], *, resource_manager_too: bool = False,
+            on_done: Optional[Callable[[], None]] = None) -> threading.Thread:
+    """Import *modules* (and optionally create the ResourceManager) on a daemon thread.
+
+    Failures are ignored: the same import simply happens (and reports) on first use.
+    """
+    names = list(modules)
+
+    def _worker():
+        for name in names:
+            try:
+                lazy_module(name)._load()
+            except Exception:
+                pass
+        if resource_manager_too:
+            try:
+                resource_manager()
+            except Exception:
+                pass
+        mark("prewarm done")
+        if on_done is not None:
+            on_done()
+
+    t = threading.Thread(target=_worker, name="Prewarm", daemon=True)
+    t.start()
+    return t